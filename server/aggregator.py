@@ -4,16 +4,28 @@ import asyncio
 import logging
 import os
 import struct
+import threading
 import time
 from typing import Any
 
-from bleak import BleakClient, BleakScanner
-
-from constants import CHAR_UUID, SCANNER_DELAY
+from constants import CHAR_UUID
+from descriptor_cache import DescriptorCache, resolve_descriptor_cache_path
 from device_config_store import DeviceConfigStore
 from hid_mode_state import HIDModeState
+from input_recording import InputRecorder, resolve_input_recording_capacity, resolve_input_recording_path
+from known_device_registry import KnownDeviceRegistry, resolve_known_devices_path
+from latency_trace import STAGE_PUBLISH, STAGE_REDUCE, LatencyHistograms, next_trace_id
 from pairing_mode_state import PairingModeState
+from runtime.adapter_balancer import AdapterBalancer
+from runtime.connection_scheduler import ConnectCandidate, ConnectionScheduler
 from runtime.control_server import RuntimeControlServer
+from runtime.info_reader import InfoReader
+from runtime.link_monitor import LinkMonitor
+from runtime.metrics import MetricsExporter, RuntimeMetrics, resolve_metrics_port
+from runtime.reconnect_backoff import ReconnectBackoff
+from runtime.scan_scheduler import ScanScheduler
+from runtime.shard_coordinator import ShardCoordinator
+from runtime.state_decoder import AnalogAxes, StateDecoder, build_decoder_cache
 from runtime.report_builder import (
     build_gamepad_pc_report,
     build_gamepad_switch_hori_report,
@@ -21,14 +33,18 @@ from runtime.report_builder import (
     build_mapping_cache,
 )
 from runtime.state_reducer import StateReducer, HIDMode
+from runtime.transport import DEFAULT_ADAPTER, BleClient, BleScanner, BleTransport, create_ble_transport
+from state_board import StateBoardSnapshot
+from state_watcher import StateWatcher
 
 
 logger = logging.getLogger("OpenArcade")
 TARGET_DEVICE_NAME = "NimBLE_GATT"
-CONNECTED_SCAN_SETTLE_SECONDS = 5.0
-BACKGROUND_SCAN_INTERVAL_SECONDS = 15.0
-BACKGROUND_SCAN_DURATION_SECONDS = 1.0
-SWITCH_TIMING_DEBUG = os.environ.get("OPENARCADE_SWITCH_TIMING_DEBUG", "").lower() in {"1", "true", "yes", "on"}
+# Connect order: known modules reconnecting directly, then configured, then new.
+DIRECT_CONNECT_PRIORITY = 2
+CONFIGURED_DEVICE_PRIORITY = 1
+# Only used where inotify is unavailable; otherwise file changes arrive as events.
+STATE_POLL_SECONDS = 0.5
 
 
 def set_cpu_affinity(core_id: int) -> None:
@@ -57,34 +73,45 @@ def aggregator_process(
     
     logger.info("Aggregator Process Started on core %d", cpu_core)
 
-    report_array = mailbox["report_array"]
-    report_version = mailbox["report_version"]
-    last_input_event_shared = mailbox["last_input_event_at"]
-    report_published_at = mailbox["report_published_at"]
-    report_event = mailbox["report_event"]
+    report_ring = mailbox["report_ring"]
+    report_wakeup = mailbox["report_wakeup"]
+    latency_histograms: LatencyHistograms | None = mailbox.get("latency_histograms")
+    mode_wakeup = mailbox.get("mode_wakeup")
+    # Load tests hand in a simulated transport; normally it comes from the environment.
+    ble_transport: BleTransport = mailbox.get("ble_transport") or create_ble_transport()
     
     # Track last published report for deduplication
     last_published_report: bytes | None = None
 
-    connected_clients: dict[str, BleakClient] = {}
-    connecting_addresses: set[str] = set()
+    connected_clients: dict[str, BleClient] = {}
     discovered_devices: dict[str, Any] = {}
-    pending_connects: set[str] = set()
-    retry_after: dict[str, float] = {}
+    connection_scheduler: ConnectionScheduler | None = None
+    # Sharded mode: BLE connections live in ingest_shard processes started by runtime_main.
+    shard_coordinator: ShardCoordinator | None = None
+    configured_addresses: set[str] = set()
     device_states: dict[str, int] = {}
+    # Analog axes of devices whose descriptor has them.
+    device_axes: dict[str, AnalogAxes] = {}
     live_states: dict[str, dict[str, Any]] = {}
     state_sequence = 0
-    last_input_event_at = 0.0
-    agg_debug_last_log_at = time.monotonic()
-    agg_debug_samples = 0
-    agg_debug_reduce_total_ms = 0.0
-    agg_debug_reduce_max_ms = 0.0
-    agg_debug_input_to_publish_total_ms = 0.0
-    agg_debug_input_to_publish_max_ms = 0.0
-    scan_until = time.monotonic() + CONNECTED_SCAN_SETTLE_SECONDS
-    next_background_scan_at = scan_until + BACKGROUND_SCAN_INTERVAL_SECONDS
+    last_trace_id = 0
+    metrics = RuntimeMetrics()
+    scan_scheduler = ScanScheduler(metrics=metrics)
+    adapter_balancer = AdapterBalancer(ble_transport.adapters)
+    link_monitor = LinkMonitor()
+    reconnect_backoff = ReconnectBackoff()
+    # Wakes the scanner reconciler in run(); set on anything that can change should_scan.
+    scan_changed = asyncio.Event()
 
     config_store = DeviceConfigStore(path=config_path)
+    known_devices = KnownDeviceRegistry(resolve_known_devices_path(config_store.path))
+    known_addresses = known_devices.addresses()
+    info_reader = InfoReader(
+        DescriptorCache(resolve_descriptor_cache_path(config_store.path)),
+        config_store,
+        metrics=metrics,
+    )
+    disconnected_at: dict[str, float] = {}
     hid_mode_state = HIDModeState()
     pairing_mode_state = PairingModeState()
 
@@ -99,70 +126,67 @@ def aggregator_process(
     pairing_sequence: int = initial_pairing_state.get("sequence", 0)
     pairing_file_mtime: float | None = None
 
-    reducer = StateReducer(build_mapping_cache(config_store.load(), mode=current_mode), mode=current_mode)
+    # Mode/pairing changes reach the input path through the shared-memory state
+    # board; the JSON files are re-read when the state watcher sees them change.
+    state_board = hid_mode_state.state_board
+    board_snapshot: StateBoardSnapshot | None = None
+
+    initial_config = config_store.load()
+    reducer = StateReducer(build_mapping_cache(initial_config, mode=current_mode), mode=current_mode)
+    # Devices whose descriptor needs more than the 4-byte bitfield state.
+    state_decoders: dict[str, StateDecoder] = build_decoder_cache(initial_config)
+    recording_path = resolve_input_recording_path()
+    input_recorder: InputRecorder | None = None
+    if recording_path is not None:
+        try:
+            input_recorder = InputRecorder(recording_path, resolve_input_recording_capacity())
+            input_recorder.record_mode(current_mode)
+            input_recorder.start()
+            logger.info("Recording BLE input to %s", recording_path)
+        except OSError as exc:
+            logger.warning("Input recording disabled: %s", exc)
     config_mtime: float | None = None
     mode_file_mtime: float | None = None
 
-    def publish_report(report: bytes | None) -> None:
+    def publish_report(
+        report: bytes | None,
+        input_at: float = 0.0,
+        trace_id: int = 0,
+    ) -> float | None:
+        """Publish a changed report; returns its publish timestamp, or None if skipped."""
         nonlocal last_published_report
         if report is None:
-            return
+            return None
         # Deduplication: only publish if report actually changed
         if report == last_published_report:
-            return
+            metrics.increment("publish_dedup_hits")
+            return None
         last_published_report = report
 
         published_at = time.perf_counter()
 
-        # Write to shared memory and clear any trailing bytes from a prior report.
-        for i in range(len(report_array)):
-            report_array[i] = report[i] if i < len(report) else 0
-
-        with report_published_at.get_lock():
-            report_published_at.value = published_at
-
-        # Increment version and signal writer
-        with report_version.get_lock():
-            report_version.value += 1
-            version = report_version.value
-        report_event.set()
-
-        if SWITCH_TIMING_DEBUG and current_mode == "gamepad_switch_hori":
-            nonlocal agg_debug_last_log_at, agg_debug_samples
-            nonlocal agg_debug_reduce_total_ms, agg_debug_reduce_max_ms
-            nonlocal agg_debug_input_to_publish_total_ms, agg_debug_input_to_publish_max_ms
-            latency_ms = 0.0
-            if last_input_event_at > 0:
-                latency_ms = (published_at - last_input_event_at) * 1000.0
-            agg_debug_samples += 1
-            agg_debug_input_to_publish_total_ms += latency_ms
-            agg_debug_input_to_publish_max_ms = max(agg_debug_input_to_publish_max_ms, latency_ms)
-            now = time.monotonic()
-            if (now - agg_debug_last_log_at) >= 1.0:
-                avg_input_to_publish_ms = (
-                    agg_debug_input_to_publish_total_ms / agg_debug_samples
-                    if agg_debug_samples else 0.0
-                )
-                avg_reduce_ms = (
-                    agg_debug_reduce_total_ms / agg_debug_samples
-                    if agg_debug_samples else 0.0
-                )
-                logger.info(
-                    "[SWITCH_TIMING][AGG] samples=%s avg_reduce_ms=%.3f max_reduce_ms=%.3f avg_input_to_publish_ms=%.3f max_input_to_publish_ms=%.3f last_version=%s last_report=%s",
-                    agg_debug_samples,
-                    avg_reduce_ms,
-                    agg_debug_reduce_max_ms,
-                    avg_input_to_publish_ms,
-                    agg_debug_input_to_publish_max_ms,
-                    version,
-                    report[:8].hex(),
-                )
-                agg_debug_last_log_at = now
-                agg_debug_samples = 0
-                agg_debug_reduce_total_ms = 0.0
-                agg_debug_reduce_max_ms = 0.0
-                agg_debug_input_to_publish_total_ms = 0.0
-                agg_debug_input_to_publish_max_ms = 0.0
+        # Report, trace and timestamps land in the ring in one publish; then signal writer.
+        report_ring.publish(
+            report,
+            input_at=input_at,
+            published_at=published_at,
+            trace_id=trace_id,
+        )
+        report_wakeup.set()
+        metrics.increment("reports_published")
+        return published_at
+
+    def rebuild_mapping_cache(snapshot: dict[str, Any]) -> bytes | None:
+        """Recompile the reducer's mapping tables for the current mode."""
+        nonlocal configured_addresses, state_decoders
+        started_at = time.perf_counter()
+        configured_addresses = set(snapshot.get("devices", {}))
+        state_decoders = build_decoder_cache(snapshot)
+        if shard_coordinator is not None:
+            shard_coordinator.refresh_decoders()
+        report = reducer.set_mapping_cache(build_mapping_cache(snapshot, mode=current_mode))
+        metrics.record_mapping_cache_rebuild(time.perf_counter() - started_at)
+        return report
 
     def refresh_mapping_cache(force: bool = False) -> None:
         nonlocal config_mtime
@@ -174,27 +198,44 @@ def aggregator_process(
             return
         config_mtime = mtime
         snapshot = config_store.load()
-        publish_report(reducer.set_mapping_cache(build_mapping_cache(snapshot, mode=current_mode)))
+        publish_report(rebuild_mapping_cache(snapshot))
+
+    def read_state_board() -> bool:
+        """Refresh board_snapshot; returns True if the board changed."""
+        nonlocal board_snapshot
+        if state_board is None:
+            return False
+        last_seen_version = board_snapshot.version if board_snapshot is not None else -1
+        snapshot = state_board.read(last_seen_version)
+        if snapshot is None:
+            return False
+        board_snapshot = snapshot
+        return True
 
-    def check_mode_change() -> None:
+    def check_mode_change(from_file: bool = False) -> None:
         """Check if HID mode has changed and update if needed."""
         nonlocal current_mode, current_mode_sequence, mode_file_mtime
 
         try:
-            # Always read the state and compare sequence numbers directly.
-            # File mtime is not reliable enough here because multiple mode changes can
-            # happen within the same timestamp granularity, which would leave the
-            # aggregator building reports for the old mode while the writer has already
-            # switched endpoints.
-            mode_state = hid_mode_state.load()
+            new_mode: HIDMode
+            if not from_file and board_snapshot is not None and board_snapshot.mode is not None:
+                new_mode = board_snapshot.mode  # type: ignore[assignment]
+                new_sequence = board_snapshot.mode_sequence
+            else:
+                # Always read the state and compare sequence numbers directly.
+                # File mtime is not reliable enough here because multiple mode changes can
+                # happen within the same timestamp granularity, which would leave the
+                # aggregator building reports for the old mode while the writer has already
+                # switched endpoints.
+                mode_state = hid_mode_state.load()
 
-            try:
-                mode_file_mtime = os.path.getmtime(hid_mode_state.path)
-            except FileNotFoundError:
-                mode_file_mtime = None
+                try:
+                    mode_file_mtime = os.path.getmtime(hid_mode_state.path)
+                except FileNotFoundError:
+                    mode_file_mtime = None
 
-            new_mode: HIDMode = mode_state["active_mode"]
-            new_sequence = mode_state["sequence"]
+                new_mode = mode_state["active_mode"]
+                new_sequence = mode_state["sequence"]
             
             # Ignore stale or regressive updates.
             if new_sequence < current_mode_sequence:
@@ -226,19 +267,24 @@ def aggregator_process(
             # Switch mode
             current_mode = new_mode
             current_mode_sequence = new_sequence
+            if input_recorder is not None:
+                input_recorder.record_mode(current_mode)
             
             # Rebuild mapping cache for new mode
             snapshot = config_store.load()
-            mapping_cache = build_mapping_cache(snapshot, mode=current_mode)
-            
+            rebuild_mapping_cache(snapshot)
+
             # Update reducer and publish new report
-            reducer.set_mapping_cache(mapping_cache)
             publish_report(reducer.set_mode(current_mode))
+
+            # Let the writer reopen its endpoint now instead of at its next mode poll.
+            if mode_wakeup is not None:
+                mode_wakeup.set()
             
         except Exception as exc:
             logger.error(f"Error checking mode change: {exc}", exc_info=True)
 
-    def check_pairing_change() -> tuple[bool, bool]:
+    def check_pairing_change(from_file: bool = False) -> tuple[bool, bool]:
         """
         Check if pairing mode has changed and update if needed.
 
@@ -248,24 +294,34 @@ def aggregator_process(
         nonlocal pairing_enabled, pairing_sequence, pairing_file_mtime
 
         try:
-            pairing_state = pairing_mode_state.load()
-
-            try:
-                mtime = os.path.getmtime(pairing_mode_state.path)
-            except FileNotFoundError:
-                pairing_file_mtime = None
-                mtime = None
-
+            new_enabled: bool
+            new_sequence: int
             if (
-                mtime is not None
-                and pairing_file_mtime is not None
-                and mtime == pairing_file_mtime
+                not from_file
+                and board_snapshot is not None
+                and board_snapshot.pairing_enabled is not None
             ):
-                return False, pairing_enabled
+                new_enabled = board_snapshot.pairing_enabled
+                new_sequence = board_snapshot.pairing_sequence
+            else:
+                pairing_state = pairing_mode_state.load()
 
-            pairing_file_mtime = mtime
-            new_enabled: bool = pairing_state.get("enabled", False)
-            new_sequence: int = pairing_state.get("sequence", 0)
+                try:
+                    mtime = os.path.getmtime(pairing_mode_state.path)
+                except FileNotFoundError:
+                    pairing_file_mtime = None
+                    mtime = None
+
+                if (
+                    mtime is not None
+                    and pairing_file_mtime is not None
+                    and mtime == pairing_file_mtime
+                ):
+                    return False, pairing_enabled
+
+                pairing_file_mtime = mtime
+                new_enabled = pairing_state.get("enabled", False)
+                new_sequence = pairing_state.get("sequence", 0)
 
             if new_sequence < pairing_sequence:
                 logger.warning(
@@ -293,7 +349,7 @@ def aggregator_process(
             logger.error(f"Error checking pairing change: {exc}", exc_info=True)
             return False, pairing_enabled
 
-    def update_live_state(address: str, state: int) -> None:
+    def update_live_state(address: str, state: int, axes: AnalogAxes | None = None) -> None:
         nonlocal state_sequence
         state_sequence += 1
         live_states[address] = {
@@ -301,35 +357,101 @@ def aggregator_process(
             "seq": state_sequence,
             "updated_at": time.time(),
         }
-
-    def extend_scan_window(duration: float = CONNECTED_SCAN_SETTLE_SECONDS) -> None:
-        nonlocal scan_until, next_background_scan_at
-        now = time.monotonic()
-        scan_until = max(scan_until, now + duration)
-        next_background_scan_at = scan_until + BACKGROUND_SCAN_INTERVAL_SECONDS
+        if axes is not None:
+            live_states[address]["axes"] = list(axes)
+
+    def request_scan_window() -> None:
+        scan_scheduler.extend_window()
+        scan_changed.set()
+
+    def sync_mode_from_board() -> None:
+        # One sequence-word read; apply a pending mode switch before reducing.
+        if (
+            state_board is not None
+            and board_snapshot is not None
+            and state_board.version() != board_snapshot.version
+            and read_state_board()
+        ):
+            check_mode_change()
+
+    def apply_state(
+        address: str,
+        state: int,
+        received_at: float,
+        axes: AnalogAxes | None = None,
+    ) -> None:
+        """Reduce and publish a changed device state received at received_at."""
+        nonlocal last_trace_id
+        if scan_scheduler.note_input():
+            scan_changed.set()
+        last_trace_id = trace_id = next_trace_id(last_trace_id)
+        device_states[address] = state
+        if axes is None:
+            device_axes.pop(address, None)
+        else:
+            device_axes[address] = axes
+        update_live_state(address, state, axes)
+        report = reducer.update_device_state(address, state, axes)
+        reduced_at = time.perf_counter()
+        if latency_histograms is not None:
+            latency_histograms.record(current_mode, STAGE_REDUCE, reduced_at - received_at, trace_id)
+        published_at = publish_report(report, input_at=received_at, trace_id=trace_id)
+        if published_at is not None and latency_histograms is not None:
+            latency_histograms.record(current_mode, STAGE_PUBLISH, published_at - reduced_at, trace_id)
 
     def make_notification_handler(address: str):
         def handler(_sender: Any, data: bytearray) -> None:
-            nonlocal last_input_event_at, agg_debug_reduce_total_ms, agg_debug_reduce_max_ms
-            if len(data) < 4:
-                return
-            state = struct.unpack("<I", data[:4])[0]
-            if device_states.get(address) == state:
+            received_at = time.perf_counter()
+            decoder = state_decoders.get(address)
+            axes: AnalogAxes | None = None
+            if decoder is None:
+                if len(data) < 4:
+                    return
+                state = struct.unpack("<I", data[:4])[0]
+            else:
+                decoded = decoder.decode(data)
+                if decoded is None:
+                    return
+                state, axes = decoded
+                # The module's microsecond clock at the input edge, if its descriptor flags one.
+                device_us = decoder.device_time(data)
+                if device_us is not None:
+                    link_monitor.note_device_time(address, device_us, received_at)
+            sync_mode_from_board()
+            if input_recorder is not None:
+                input_recorder.record_state(address, state)
+            metrics.increment_device("notifications_received", address)
+            scan_scheduler.note_notification(address, received_at)
+            adapter_balancer.note_notification(address, received_at)
+            duplicate = device_states.get(address) == state and device_axes.get(address) == axes
+            link_monitor.note_notification(address, received_at, duplicate)
+            if duplicate:
+                metrics.increment_device("duplicate_notifications_suppressed", address)
                 return
-            last_input_event_at = time.perf_counter()
-            with last_input_event_shared.get_lock():
-                last_input_event_shared.value = last_input_event_at
-            device_states[address] = state
-            update_live_state(address, state)
-            reduce_started_at = time.perf_counter()
-            report = reducer.update_device_state(address, state)
-            reduce_ms = (time.perf_counter() - reduce_started_at) * 1000.0
-            if SWITCH_TIMING_DEBUG and current_mode == "gamepad_switch_hori":
-                agg_debug_reduce_total_ms += reduce_ms
-                agg_debug_reduce_max_ms = max(agg_debug_reduce_max_ms, reduce_ms)
-            publish_report(report)
+            apply_state(address, state, received_at, axes)
         return handler
 
+    def apply_merged_state(
+        address: str,
+        state: int,
+        input_at: float,
+        notifications: int,
+        duplicates: int,
+        axes: AnalogAxes | None,
+    ) -> None:
+        """Merge-stage counterpart of the notification handler for sharded ingestion."""
+        if notifications:
+            metrics.increment_device("notifications_received", address, notifications)
+        if duplicates:
+            metrics.increment_device("duplicate_notifications_suppressed", address, duplicates)
+        link_monitor.note_merged(address, notifications, duplicates)
+        if device_states.get(address) == state and device_axes.get(address) == axes:
+            return
+        sync_mode_from_board()
+        if input_recorder is not None:
+            input_recorder.record_state(address, state)
+        apply_state(address, state, input_at, axes)
+
     def detection_callback(device: Any, advertisement_data: Any) -> None:
         name = device.name or getattr(advertisement_data, "local_name", None)
         if name != TARGET_DEVICE_NAME:
@@ -337,23 +459,53 @@ def aggregator_process(
 
         address = str(device.address)
         discovered_devices[address] = device
+        rssi = getattr(advertisement_data, "rssi", None)
+        if rssi is not None:
+            link_monitor.note_rssi(address, rssi)
 
-        if address in connected_clients or address in connecting_addresses:
-            return
-        if time.monotonic() < retry_after.get(address, 0.0):
+        if connection_scheduler is None or address in connected_clients:
             return
-        if address in pending_connects:
+        if not reconnect_backoff.ready(address):
             return
 
-        pending_connects.add(address)
-        extend_scan_window()
-        logger.info("Discovered Target Device: %s (%s)", address, name)
+        # Configured modules go first, then the strongest signal.
+        queued = connection_scheduler.submit(
+            address,
+            device,
+            rssi=rssi,
+            priority=CONFIGURED_DEVICE_PRIORITY if address in configured_addresses else 0,
+        )
+        if queued:
+            request_scan_window()
+            logger.info("Discovered Target Device: %s (%s)", address, name)
+
+    def make_detection_callback(adapter: str):
+        def on_detection(device: Any, advertisement_data: Any) -> None:
+            adapter_balancer.note_advertisement(str(device.address), adapter)
+            detection_callback(device, advertisement_data)
+        return on_detection
 
     async def run() -> None:
-        connect_lock = asyncio.Lock()
-        scanner: BleakScanner | None = None
-        scanner_running = False
-        pending_tasks: set[asyncio.Task] = set()
+        nonlocal connection_scheduler, shard_coordinator
+        # One scanner per adapter, so every adapter sees which modules are in its range.
+        scanners: dict[str, BleScanner] = {}
+        running_scanners: set[str] = set()
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        state_changed = asyncio.Event()
+        known_retry_timers: dict[str, asyncio.TimerHandle] = {}
+        # Loop lag only matters while input can arrive; an idle loop stays asleep.
+        modules_connected = asyncio.Event()
+        if mailbox.get("shard_links"):
+            # Shards decode with the same decoders as the in-process notification handler.
+            shard_coordinator = ShardCoordinator(
+                mailbox["shard_links"],
+                mailbox["state_table"],
+                mailbox["merge_wakeup"],
+                apply_merged_state,
+                metrics=metrics,
+                decoder_of=lambda address: state_decoders.get(address),
+            )
 
         async def handle_config_updated() -> None:
             refresh_mapping_cache(force=True)
@@ -362,19 +514,41 @@ def aggregator_process(
             return set(connected_clients)
 
         def get_device_states() -> dict[str, dict[str, Any]]:
-            return {
+            states = {
                 address: dict(state)
                 for address, state in live_states.items()
             }
+            for address, state in states.items():
+                state["adapter"] = adapter_balancer.adapter_of(address)
+                state["link"] = link_monitor.brief(address)
+                if shard_coordinator is not None:
+                    state["shard"] = shard_coordinator.shard_of(address)
+            return states
+
+        def get_report_stats() -> dict[str, Any]:
+            return report_ring.stats()
+
+        def get_latency_stats() -> dict[str, Any]:
+            assert latency_histograms is not None
+            return latency_histograms.summary()
+
+        def get_scan_stats() -> dict[str, Any]:
+            return scan_scheduler.stats()
+
+        def get_shard_stats() -> dict[str, Any]:
+            assert shard_coordinator is not None
+            return shard_coordinator.stats()
 
         def get_pairing_status() -> dict[str, Any]:
             state = pairing_mode_state.load(use_cache=True)
             return {
                 "enabled": pairing_enabled,
-                "scanner_running": scanner_running,
+                "scanner_running": bool(running_scanners),
                 "source": state.get("source", "unknown"),
                 "sequence": pairing_sequence,
                 "updated_at": state.get("updated_at", ""),
+                "connections": connection_scheduler.stats() if connection_scheduler is not None else None,
+                "adapters": adapter_balancer.stats(),
             }
 
         control_server = RuntimeControlServer(
@@ -382,197 +556,325 @@ def aggregator_process(
             get_connected_devices=get_connected_devices,
             get_device_states=get_device_states,
             get_pairing_status=get_pairing_status,
+            get_report_stats=get_report_stats,
+            get_latency_stats=get_latency_stats if latency_histograms is not None else None,
+            get_metrics=metrics.snapshot,
+            get_scan_stats=get_scan_stats,
+            get_shard_stats=get_shard_stats if shard_coordinator is not None else None,
+            get_link_stats=link_monitor.stats,
+            get_reconnect_stats=reconnect_backoff.stats,
         )
+        metrics_port = resolve_metrics_port()
+        metrics_exporter = MetricsExporter(metrics, metrics_port) if metrics_port is not None else None
 
         def should_scan() -> bool:
-            nonlocal next_background_scan_at
-
-            if not pairing_enabled:
-                return False
-
-            now = time.monotonic()
-            if not connected_clients:
-                return True
-            if pending_connects or connecting_addresses:
-                return True
-            if now < scan_until:
-                return True
-            if now >= next_background_scan_at:
-                extend_scan_window(BACKGROUND_SCAN_DURATION_SECONDS)
-                return True
-            return False
+            # A finished connect attempt sets scan_changed, so a blocked scan is re-checked then.
+            return scan_scheduler.should_scan(
+                pairing_enabled,
+                len(connected_clients),
+                discovery_pending=not connection_scheduler.idle,
+                connect_in_flight=ble_transport.scan_blocks_connect and connection_scheduler.in_flight_count > 0,
+            )
 
         async def ensure_scanner_running() -> None:
-            nonlocal scanner, scanner_running
-            if scanner_running and scanner is not None:
-                return
-            if scanner is None:
-                scanner = BleakScanner(detection_callback=detection_callback)
-            try:
-                await scanner.start()
-                scanner_running = True
-                logger.info("Scanner started")
-            except Exception as exc:
-                logger.error("Failed to start scanner: %s", exc)
+            was_running = bool(running_scanners)
+            for adapter in adapter_balancer.adapters:
+                if adapter in running_scanners or not adapter_balancer.available(adapter):
+                    continue
+                scanner = scanners.get(adapter)
+                if scanner is None:
+                    scanner = scanners[adapter] = ble_transport.create_scanner(
+                        make_detection_callback(adapter),
+                        adapter=adapter,
+                    )
+                try:
+                    await scanner.start()
+                    running_scanners.add(adapter)
+                except Exception as exc:
+                    logger.error("Failed to start scanner on %s: %s", adapter, exc)
+                    adapter_balancer.adapter_failed(adapter, f"scanner failed to start: {exc}")
+            if running_scanners and not was_running:
+                scan_scheduler.scan_started()
+                metrics.scanner_started()
+                logger.info("Scanner started on %s", ", ".join(sorted(running_scanners)))
 
         async def stop_scanner() -> None:
-            nonlocal scanner_running
-            if not scanner_running or scanner is None:
+            if not running_scanners:
                 return
+            for adapter in list(running_scanners):
+                try:
+                    await scanners[adapter].stop()
+                except Exception as exc:
+                    logger.warning("Scanner stop error on %s: %s", adapter, exc)
+                running_scanners.discard(adapter)
+            scan_scheduler.scan_stopped()
+            metrics.scanner_stopped()
+
+        async def reconcile_scanner() -> None:
+            """Start or stop the scanner on each change, or when the scan schedule next moves."""
+            while True:
+                scan_changed.clear()
+                if should_scan():
+                    await ensure_scanner_running()
+                else:
+                    await stop_scanner()
+                timeout = scan_scheduler.next_change_in(pairing_enabled, len(connected_clients))
+                try:
+                    await asyncio.wait_for(scan_changed.wait(), timeout)
+                except TimeoutError:
+                    pass
+
+        def schedule_known_reconnects(
+            priority: int = DIRECT_CONNECT_PRIORITY,
+            addresses: list[str] | None = None,
+        ) -> None:
+            """Connect straight to known modules by address instead of waiting for an advertisement."""
+            now = time.monotonic()
+            for address in known_addresses if addresses is None else addresses:
+                if address in connected_clients or connection_scheduler.is_scheduled(address):
+                    continue
+                if not reconnect_backoff.ready(address, now):
+                    continue
+                entry = known_devices.get(address) or {}
+                queued = connection_scheduler.submit(
+                    address,
+                    discovered_devices.get(address, address),
+                    rssi=entry.get("rssi"),
+                    priority=priority,
+                    # Only a tie-break for placement: the module may be closer to another adapter now.
+                    adapter=entry.get("adapter") or DEFAULT_ADAPTER,
+                )
+                if queued:
+                    metrics.increment("direct_connect_attempts")
+
+        def retry_known_device(address: str) -> None:
+            # Behind new devices, so a module that is still away does not hold connect slots.
+            known_retry_timers.pop(address, None)
+            if not stop_event.is_set():
+                schedule_known_reconnects(priority=0, addresses=[address])
+
+        def schedule_known_retry(address: str, delay: float) -> None:
+            if address in known_addresses and address not in known_retry_timers:
+                known_retry_timers[address] = loop.call_later(delay, retry_known_device, address)
+
+        async def remember_device(candidate: ConnectCandidate, connect_seconds: float) -> None:
+            nonlocal known_addresses
             try:
-                await scanner.stop()
-                scanner_running = False
-            except Exception as exc:
-                logger.warning("Scanner stop error: %s", exc)
+                await asyncio.to_thread(
+                    known_devices.record_connect,
+                    candidate.address,
+                    name=getattr(candidate.device, "name", None),
+                    rssi=candidate.rssi,
+                    adapter=candidate.adapter,
+                    connect_seconds=connect_seconds,
+                )
+            except OSError as exc:
+                logger.warning("Failed to update known device registry: %s", exc)
+                return
+            if candidate.address not in known_addresses:
+                known_addresses = [candidate.address, *known_addresses]
 
-        async def connect_device(address: str) -> None:
+        async def connect_device(candidate: ConnectCandidate) -> bool:
+            address = candidate.address
             if address in connected_clients:
-                connecting_addresses.discard(address)
-                return
+                return True
 
-            device = discovered_devices.get(address)
-            if device is None:
-                logger.warning("Skipping connect for %s: device not cached", address)
-                connecting_addresses.discard(address)
-                return
+            logger.info("Connecting to %s on %s...", address, candidate.adapter)
+            started_at = time.monotonic()
+
+            def on_disconnect(client: BleClient) -> None:
+                disconnected_address = str(client.address)
+                logger.warning("Disconnected: %s", disconnected_address)
+                connected_clients.pop(disconnected_address, None)
+                device_states.pop(disconnected_address, None)
+                device_axes.pop(disconnected_address, None)
+                live_states.pop(disconnected_address, None)
+                scan_scheduler.forget_device(disconnected_address)
+                adapter_balancer.released(disconnected_address)
+                link_monitor.disconnected(disconnected_address)
+                retry_delay = reconnect_backoff.disconnected(disconnected_address)
+                request_scan_window()
+                publish_report(reducer.remove_device_state(disconnected_address))
+                if not connected_clients:
+                    modules_connected.clear()
+                if not stop_event.is_set() and connection_scheduler is not None:
+                    disconnected_at[disconnected_address] = time.monotonic()
+                    schedule_known_reconnects()
+                    if retry_delay is not None:
+                        schedule_known_retry(disconnected_address, retry_delay)
+
+            create_client = (
+                ble_transport.create_client if shard_coordinator is None else shard_coordinator.create_client
+            )
+            client = create_client(
+                candidate.device,
+                disconnected_callback=on_disconnect,
+                timeout=10.0,
+                adapter=candidate.adapter,
+            )
 
-            async with connect_lock:
-                await stop_scanner()
-                logger.info("Connecting to %s...", address)
-
-                def on_disconnect(client: BleakClient) -> None:
-                    disconnected_address = str(client.address)
-                    logger.warning("Disconnected: %s", disconnected_address)
-                    connected_clients.pop(disconnected_address, None)
-                    device_states.pop(disconnected_address, None)
-                    live_states.pop(disconnected_address, None)
-                    extend_scan_window()
-                    publish_report(reducer.remove_device_state(disconnected_address))
-
-                client = BleakClient(
-                    device,
-                    disconnected_callback=on_disconnect,
-                    timeout=10.0,
+            try:
+                metrics.increment("connect_attempts")
+                await client.connect()
+                connected_clients[address] = client
+                modules_connected.set()
+                adapter_balancer.connected(address)
+                link_monitor.connected(address)
+                logger.info("Connected: %s", address)
+
+                # Shard clients cannot read; their modules still get cached descriptors.
+                await info_reader.sync(address, client, read=shard_coordinator is None)
+                await client.start_notify(CHAR_UUID, make_notification_handler(address))
+                reconnect_backoff.connected(address)
+                device_states[address] = 0
+                update_live_state(address, 0)
+                request_scan_window()
+                publish_report(reducer.update_device_state(address, 0))
+                connected_at = time.monotonic()
+                if address in disconnected_at:
+                    metrics.set_gauge("reconnect_seconds", connected_at - disconnected_at.pop(address))
+                await remember_device(candidate, connected_at - started_at)
+                return True
+
+            except asyncio.CancelledError:
+                if address not in connected_clients:
+                    adapter_balancer.released(address)
+                raise
+            except Exception as exc:
+                metrics.increment("connect_failures")
+                if address in connected_clients:
+                    adapter_balancer.released(address)  # dropped during setup, not the adapter's fault
+                    link_monitor.disconnected(address)
+                else:
+                    adapter_balancer.connect_failed(address)
+                connected_clients.pop(address, None)
+                if not connected_clients:
+                    modules_connected.clear()
+                retry_delay = reconnect_backoff.connect_failed(address)
+                logger.error(
+                    "Failed to connect to %s: %s. Retrying after %.1fs",
+                    address,
+                    exc,
+                    retry_delay,
                 )
+                if client.is_connected:
+                    await client.disconnect()
+                schedule_known_retry(address, retry_delay)
+                return False
 
-                try:
-                    await client.connect()
-                    connected_clients[address] = client
-                    retry_after.pop(address, None)
-                    logger.info("Connected: %s", address)
+        async def resume_scanning() -> None:
+            scan_changed.set()
 
-                    await client.start_notify(CHAR_UUID, make_notification_handler(address))
-                    device_states[address] = 0
-                    update_live_state(address, 0)
-                    extend_scan_window()
-                    publish_report(reducer.update_device_state(address, 0))
+        connection_scheduler = ConnectionScheduler(
+            connect_device,
+            stop_scanning=stop_scanner if ble_transport.scan_blocks_connect else None,
+            resume_scanning=resume_scanning,
+            metrics=metrics,
+            place=adapter_balancer.place,
+            on_attempt_finished=scan_changed.set,
+        )
 
-                except Exception as exc:
-                    retry_after[address] = time.monotonic() + SCANNER_DELAY
-                    logger.error(
-                        "Failed to connect to %s: %s. Retrying after %ss",
-                        address,
-                        exc,
-                        SCANNER_DELAY,
+        async def apply_state_changes() -> None:
+            """Apply mode and pairing changes as they are signalled."""
+            while True:
+                await state_changed.wait()
+                state_changed.clear()
+                # Signalled by the state watcher, so a file changed: read the JSON, the
+                # source of truth, rather than the board.
+                read_state_board()
+                check_mode_change(from_file=True)
+
+                pairing_changed, now_enabled = check_pairing_change(from_file=True)
+                if not pairing_changed:
+                    continue
+                if not now_enabled:
+                    await stop_scanner()
+                    connection_scheduler.cancel_pending()
+                    reconnect_backoff.clear()
+                    logger.info(
+                        "Pairing disabled - scanner stopped, pending connects cleared. "
+                        f"Active connections preserved: {len(connected_clients)}"
                     )
-                    if client.is_connected:
-                        await client.disconnect()
-                finally:
-                    connecting_addresses.discard(address)
-                    if not stop_event.is_set():
-                        if should_scan():
-                            await ensure_scanner_running()
-                        else:
-                            await stop_scanner()
-
-        def cleanup_task(task: asyncio.Task) -> None:
-            pending_tasks.discard(task)
-            if task.exception():
-                logger.error("Connect task failed: %s", task.exception())
+                    scan_changed.set()
+                else:
+                    request_scan_window()
+                    logger.info("Pairing enabled - scanner will start")
+
+        def wait_for_stop() -> None:
+            stop_event.wait()
+            try:
+                loop.call_soon_threadsafe(stopped.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+        # Same watcher as the services use: inotify with stat polling and a safety reload.
+        state_watcher = StateWatcher(poll_interval=STATE_POLL_SECONDS)
+        state_watcher.watch_file(config_store.path, refresh_mapping_cache)
+        state_watcher.watch_file(hid_mode_state.path, state_changed.set)
+        state_watcher.watch_file(pairing_mode_state.path, state_changed.set)
 
         # Initial setup
+        if shard_coordinator is not None:
+            shard_coordinator.start(loop)
+            logger.info("Sharded BLE ingestion across %d shard processes", shard_coordinator.shard_count)
         refresh_mapping_cache()
-        check_mode_change()  # Ensure we're in sync with current mode
-        check_pairing_change()  # Ensure we're in sync with current pairing state
+        check_mode_change(from_file=True)  # Ensure we're in sync with current mode
+        check_pairing_change(from_file=True)  # Ensure we're in sync with current pairing state
+        read_state_board()
         publish_report(reducer.build_report())
+        schedule_known_reconnects()
         await control_server.start()
+        loop_lag_task = asyncio.create_task(metrics.monitor_loop_lag(active=modules_connected))
+        if metrics_exporter is not None:
+            try:
+                await metrics_exporter.start()
+            except OSError as exc:
+                logger.warning("Metrics exporter failed to start: %s", exc)
+                metrics_exporter = None
 
         if pairing_enabled:
-            await ensure_scanner_running()
-            logger.info("Scanner started (pairing enabled at startup)")
+            logger.info("Scanner starting (pairing enabled at startup)")
         else:
             logger.info("Scanner not started (pairing disabled at startup)")
 
+        tasks = [
+            asyncio.create_task(reconcile_scanner()),
+            asyncio.create_task(apply_state_changes()),
+        ]
+        state_watcher.start(loop)
+        if state_watcher.backend == "poll":
+            logger.info("inotify unavailable, polling state files every %.1fs", STATE_POLL_SECONDS)
+        threading.Thread(target=wait_for_stop, name="AggregatorStop", daemon=True).start()
+
         try:
-            while not stop_event.is_set():
-                # Process pending connects
-                for address in list(pending_connects):
-                    if address in connected_clients or address in connecting_addresses:
-                        pending_connects.discard(address)
-                        continue
-                    if time.monotonic() < retry_after.get(address, 0.0):
-                        continue
-
-                    pending_connects.discard(address)
-                    connecting_addresses.add(address)
-                    task = asyncio.create_task(connect_device(address))
-                    pending_tasks.add(task)
-                    task.add_done_callback(cleanup_task)
-
-                # Clean up completed tasks periodically
-                done_tasks = [t for t in pending_tasks if t.done()]
-                for t in done_tasks:
-                    pending_tasks.discard(t)
-                    if t.exception():
-                        logger.error("Connect task failed: %s", t.exception())
-
-                # Periodic cache refresh (non-blocking)
-                refresh_mapping_cache()
-                
-                # Check for mode changes
-                check_mode_change()
-
-                # Check for pairing mode changes
-                pairing_changed, now_enabled = check_pairing_change()
-                if pairing_changed:
-                    if not now_enabled:
-                        await stop_scanner()
-                        pending_connects.clear()
-                        retry_after.clear()
-                        logger.info(
-                            "Pairing disabled - scanner stopped, pending connects cleared. "
-                            f"Active connections preserved: {len(connected_clients)}"
-                        )
-                    else:
-                        extend_scan_window()
-                        logger.info("Pairing enabled - scanner will start")
-
-                # Keep scanning only while pairing is enabled and conditions are met.
-                if not stop_event.is_set():
-                    if should_scan():
-                        await ensure_scanner_running()
-                    else:
-                        await stop_scanner()
-
-                await asyncio.sleep(0.5)
+            await stopped.wait()
 
         finally:
             logger.info("Aggregator stopping...")
+            state_watcher.close()
+            for timer in known_retry_timers.values():
+                timer.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             await stop_scanner()
             
-            # Cancel any pending tasks
-            for task in pending_tasks:
-                task.cancel()
-            if pending_tasks:
-                await asyncio.gather(*pending_tasks, return_exceptions=True)
+            # Cancel queued and running connects
+            await connection_scheduler.stop()
             
             for client in list(connected_clients.values()):
                 try:
                     await client.disconnect()
                 except Exception as exc:
                     logger.warning("Disconnect cleanup failed: %s", exc)
+            if shard_coordinator is not None:
+                shard_coordinator.close()
 
             live_states.clear()
+            loop_lag_task.cancel()
+            await asyncio.gather(loop_lag_task, return_exceptions=True)
+            if metrics_exporter is not None:
+                await metrics_exporter.stop()
             await control_server.stop()
             if current_mode == "gamepad_switch_hori":
                 publish_report(build_gamepad_switch_hori_report([]))
@@ -588,4 +890,6 @@ def aggregator_process(
     except Exception:
         logger.exception("Aggregator crashed")
     finally:
+        if input_recorder is not None:
+            input_recorder.close()
         logger.info("Aggregator Process Exiting")
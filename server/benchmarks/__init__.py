@@ -0,0 +1 @@
+"""Micro-benchmarks for the OpenArcade runtime hot paths."""
@@ -0,0 +1,397 @@
+"""
+Aggregator load test against a simulated BLE fleet.
+
+Runs the real aggregator_process in a child process with a
+SimulatedTransport in its mailbox, waits for every simulated module to
+connect, then measures one window per module count:
+
+  - offered vs delivered notification rate and notifications the modules
+    dropped because the aggregator loop fell behind
+  - reports published to the ring, and ring overflow
+  - delivery lag (module due time -> notification callback) and
+    receive -> publish latency read back from the ring timestamps
+
+State files, the control socket and the state board live in a temporary
+directory so a running runtime is not disturbed.
+
+Run from the server directory:
+
+    python -m benchmarks.ble_load [--modules 1,4,8,16,32] [--rate-hz 1000]
+        [--duration 5] [--connect-latency 0.05] [--failure-rate 0.0]
+        [--max-concurrent-connects 4] [--adapter-connect-cap 2]
+        [--scan-blocks-connect] [--ingest-shards N] [--adapters 1]
+        [--adapter-slot-us 0] [--clock-skew-ppm 200]
+
+With --adapters N the fleet is spread over simulated adapters hci0..hciN-1
+and each window reports the aggregator's per-adapter placement. With
+--clock-skew-ppm the modules timestamp their notifications with a clock
+running that far off, and each window reports the aggregator's drift and
+radio latency estimate per module.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from typing import Any
+
+from aggregator import aggregator_process
+from device_state_table import DeviceStateTable
+from hid_mode_state import OPENARCADE_HID_MODE_PATH_ENV_VAR, HIDModeState
+from ingest_shard import ingest_shard_process
+from latency_trace import LatencyHistograms
+from pairing_mode_state import OPENARCADE_PAIRING_MODE_PATH_ENV_VAR, PairingModeState
+from report_channel import ReportRing
+from runtime.connection_scheduler import (
+    OPENARCADE_ADAPTER_CONNECT_CAP_ENV_VAR,
+    OPENARCADE_MAX_CONCURRENT_CONNECTS_ENV_VAR,
+)
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+from runtime.transport import DEFAULT_ADAPTER
+from runtime.state_reducer import HIDMode
+from runtime_ipc import OPENARCADE_RUNTIME_SOCKET_PATH_ENV_VAR, get_link_stats, get_pairing_status
+from state_board import OPENARCADE_STATE_BOARD_PATH_ENV_VAR
+from wakeup import Wakeup, wait_for_wakeups
+
+
+DEFAULT_MODULE_COUNTS = "1,4,8,16,32"
+MAX_MODULES = 32
+CONNECT_TIMEOUT_SECONDS = 60.0
+RING_CAPACITY = 4096
+SATURATION_DELIVERED_RATIO = 0.95
+LOAD_TEST_MODES: tuple[HIDMode, ...] = ("keyboard", "gamepad_pc", "gamepad_switch_hori")
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize_us(latencies: list[float]) -> dict[str, float]:
+    values = sorted(latency * 1_000_000.0 for latency in latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_us": statistics.fmean(values),
+        "p50_us": _percentile(values, 0.50),
+        "p99_us": _percentile(values, 0.99),
+        "max_us": values[-1],
+    }
+
+
+def isolated_environment(tmpdir: str) -> dict[str, str]:
+    """Environment that keeps runtime state files and sockets inside tmpdir."""
+    return {
+        OPENARCADE_HID_MODE_PATH_ENV_VAR: os.path.join(tmpdir, "hid_mode.json"),
+        OPENARCADE_PAIRING_MODE_PATH_ENV_VAR: os.path.join(tmpdir, "pairing_mode.json"),
+        OPENARCADE_STATE_BOARD_PATH_ENV_VAR: os.path.join(tmpdir, "state_board"),
+        OPENARCADE_RUNTIME_SOCKET_PATH_ENV_VAR: os.path.join(tmpdir, "runtime.sock"),
+    }
+
+
+def wait_for_fleet(transport: SimulatedTransport, processes: list[Any]) -> float:
+    """Block until every simulated module is connected; returns the time it took."""
+    modules = transport.config.device_count
+    started = time.monotonic()
+    deadline = started + CONNECT_TIMEOUT_SECONDS
+    while transport.stats.snapshot()["connected"] < modules:
+        if time.monotonic() >= deadline or not all(process.is_alive() for process in processes):
+            raise RuntimeError(f"only {transport.stats.snapshot()['connected']}/{modules} modules connected")
+        time.sleep(0.05)
+    return time.monotonic() - started
+
+
+def _ingest_shard(transport: SimulatedTransport, *args: Any) -> None:
+    # Row 0 is the aggregator's; shard N counts its notifications in row N + 1.
+    transport.stats.use_row(args[3] + 1)
+    ingest_shard_process(*args)
+
+
+def run_window(
+    modules: int,
+    rate_hz: float,
+    duration: float,
+    connect_latency: float = 0.05,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+    cpu_core: int = 0,
+    mode: HIDMode = "keyboard",
+    max_concurrent_connects: int | None = None,
+    adapter_connect_cap: int | None = None,
+    scan_blocks_connect: bool = False,
+    ingest_shards: int = 0,
+    adapters: int = 1,
+    adapter_slot_us: float = 0.0,
+    clock_skew_ppm: float | None = None,
+) -> dict[str, Any]:
+    transport = SimulatedTransport(
+        SimulatedFleetConfig(
+            device_count=modules,
+            notify_rate_hz=rate_hz,
+            connect_latency=connect_latency,
+            connect_failure_rate=failure_rate,
+            seed=seed,
+            scan_blocks_connect=scan_blocks_connect,
+            adapters=tuple(f"hci{index}" for index in range(adapters)) if adapters > 1 else (DEFAULT_ADAPTER,),
+            adapter_slot_seconds=adapter_slot_us / 1_000_000.0,
+            clock_skew_ppm=clock_skew_ppm,
+        ),
+        stats_rows=1 + ingest_shards,
+    )
+    context = multiprocessing.get_context("fork")
+    report_ring = ReportRing.create(RING_CAPACITY)
+    latency_histograms = LatencyHistograms.create()
+    report_wakeup = Wakeup()
+    stop_event = context.Event()
+    mailbox = {
+        "report_ring": report_ring,
+        "report_wakeup": report_wakeup,
+        "latency_histograms": latency_histograms,
+        "ble_transport": transport,
+    }
+    state_table: DeviceStateTable | None = None
+    merge_wakeup: Wakeup | None = None
+    shards: list[Any] = []
+    if ingest_shards:
+        state_table = DeviceStateTable.create()
+        merge_wakeup = Wakeup()
+        mailbox.update(state_table=state_table, merge_wakeup=merge_wakeup, shard_links=[])
+
+    previous_environment = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ.update(isolated_environment(tmpdir))
+        if max_concurrent_connects is not None:
+            os.environ[OPENARCADE_MAX_CONCURRENT_CONNECTS_ENV_VAR] = str(max_concurrent_connects)
+        if adapter_connect_cap is not None:
+            os.environ[OPENARCADE_ADAPTER_CONNECT_CAP_ENV_VAR] = str(adapter_connect_cap)
+        PairingModeState().save(True, source="ble_load")
+        HIDModeState().save(mode, source="ble_load")
+        process = context.Process(
+            target=aggregator_process,
+            args=(mailbox, stop_event, os.path.join(tmpdir, "config.json"), cpu_core),
+            name="Aggregator",
+        )
+        try:
+            for index in range(ingest_shards):
+                aggregator_end, shard_end = context.Pipe(duplex=True)
+                shard = context.Process(
+                    target=_ingest_shard,
+                    args=(transport, mailbox, shard_end, stop_event, index),
+                    name=f"IngestShard{index}",
+                )
+                shard.start()
+                shard_end.close()
+                mailbox["shard_links"].append(aggregator_end)
+                shards.append(shard)
+            process.start()
+            for link in mailbox.pop("shard_links", ()):
+                link.close()
+            time_to_all_connected = wait_for_fleet(transport, [process, *shards])
+
+            report_ring.drain()
+            ring_before = report_ring.stats()
+            transport.stats.reset_window()
+            latency_histograms.reset()
+
+            receive_to_publish: list[float] = []
+            reports = 0
+            window_started = time.perf_counter()
+            window_ends = window_started + duration
+            while (now := time.perf_counter()) < window_ends:
+                wait_for_wakeups((report_wakeup,), window_ends - now)
+                for snapshot in report_ring.drain():
+                    reports += 1
+                    if snapshot.input_at > 0.0:
+                        receive_to_publish.append(snapshot.published_at - snapshot.input_at)
+            elapsed = time.perf_counter() - window_started
+            fleet = transport.stats.snapshot()
+            ring_after = report_ring.stats()
+            aggregator_latency = latency_histograms.summary()
+            pairing = get_pairing_status(socket_path=os.path.join(tmpdir, "runtime.sock")) or {}
+            links = get_link_stats(socket_path=os.path.join(tmpdir, "runtime.sock")) or {}
+            connections = pairing.get("connections") or {}
+        finally:
+            stop_event.set()
+            for child in (process, *shards):
+                if child.pid is None:
+                    continue
+                child.join(timeout=10.0)
+                if child.is_alive():
+                    child.terminate()
+                    child.join()
+            os.environ.clear()
+            os.environ.update(previous_environment)
+            report_ring.close()
+            report_ring.unlink()
+            latency_histograms.close()
+            latency_histograms.unlink()
+            report_wakeup.close()
+            if state_table is not None:
+                state_table.close()
+                state_table.unlink()
+            if merge_wakeup is not None:
+                merge_wakeup.close()
+
+    delivery_lag = fleet.pop("delivery_lag")
+    publish = _summarize_us(receive_to_publish)
+    offered = modules * rate_hz
+    delivered_rate = fleet["delivered"] / elapsed
+    result: dict[str, Any] = {
+        "modules": modules,
+        "ingest_shards": ingest_shards,
+        "adapters": pairing.get("adapters"),
+        "mode": mode,
+        "rate_hz": rate_hz,
+        "seconds": elapsed,
+        "time_to_all_connected_s": time_to_all_connected,
+        "discovery_to_connect_start": connections.get("connect_start_delay", {"count": 0}),
+        "notifications": {
+            "scheduled": fleet["scheduled"],
+            "delivered": fleet["delivered"],
+            "dropped": fleet["dropped"],
+            "connect_failures": fleet["connect_failures"],
+            "disconnects": fleet["disconnects"],
+        },
+        "throughput": {
+            "offered_per_s": offered,
+            "delivered_per_s": delivered_rate,
+            "reports_per_s": reports / elapsed,
+            "delivered_ratio": delivered_rate / offered if offered else 0.0,
+        },
+        "ring": {
+            "overflow": ring_after["overflow"] - ring_before["overflow"],
+        },
+        "latency": {
+            "delivery_lag": delivery_lag,
+            "receive_to_publish": publish,
+            "input_to_publish_mean_us": delivery_lag.get("mean_us", 0.0) + publish.get("mean_us", 0.0),
+            "aggregator": aggregator_latency,
+        },
+    }
+    if clock_skew_ppm is not None:
+        result["radio_latency"] = {
+            address: link.get("radio_latency") for address, link in links.get("devices", {}).items()
+        }
+    return result
+
+
+def run(
+    module_counts: list[int],
+    rate_hz: float,
+    duration: float,
+    connect_latency: float = 0.05,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+    cpu_core: int = 0,
+    mode: HIDMode = "keyboard",
+    max_concurrent_connects: int | None = None,
+    adapter_connect_cap: int | None = None,
+    scan_blocks_connect: bool = False,
+    ingest_shards: int = 0,
+    adapters: int = 1,
+    adapter_slot_us: float = 0.0,
+    clock_skew_ppm: float | None = None,
+) -> dict[str, Any]:
+    windows = [
+        run_window(
+            modules,
+            rate_hz,
+            duration,
+            connect_latency,
+            failure_rate,
+            seed,
+            cpu_core,
+            mode,
+            max_concurrent_connects,
+            adapter_connect_cap,
+            scan_blocks_connect,
+            ingest_shards,
+            adapters,
+            adapter_slot_us,
+            clock_skew_ppm,
+        )
+        for modules in module_counts
+    ]
+    # Occasional drops come from timer jitter; saturation is a sustained shortfall.
+    saturated = [
+        window["modules"]
+        for window in windows
+        if window["throughput"]["delivered_ratio"] < SATURATION_DELIVERED_RATIO
+    ]
+    return {
+        "windows": windows,
+        "saturated_at_modules": saturated[0] if saturated else None,
+    }
+
+
+def _parse_module_counts(raw: str) -> list[int]:
+    counts = [int(part) for part in raw.split(",") if part.strip()]
+    for count in counts:
+        if not 1 <= count <= MAX_MODULES:
+            raise argparse.ArgumentTypeError(f"module count must be 1..{MAX_MODULES}: {count}")
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the aggregator with simulated BLE modules")
+    parser.add_argument("--modules", type=_parse_module_counts, default=_parse_module_counts(DEFAULT_MODULE_COUNTS))
+    parser.add_argument("--rate-hz", type=float, default=1000.0, help="notifications per module per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="measurement window per module count")
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=LOAD_TEST_MODES, default="keyboard")
+    parser.add_argument("--aggregator-core", type=int, default=0)
+    parser.add_argument("--max-concurrent-connects", type=int)
+    parser.add_argument("--adapter-connect-cap", type=int)
+    parser.add_argument(
+        "--scan-blocks-connect",
+        action="store_true",
+        help="simulate a controller that rejects connects while scanning",
+    )
+    parser.add_argument("--ingest-shards", type=int, default=0, help="BLE ingestion shard processes")
+    parser.add_argument("--adapters", type=int, default=1, help="simulated BLE adapters")
+    parser.add_argument(
+        "--adapter-slot-us",
+        type=float,
+        default=0.0,
+        help="notification delay per other link sharing an adapter, up to",
+    )
+    parser.add_argument(
+        "--clock-skew-ppm",
+        type=float,
+        help="send timestamped notifications from module clocks this far off",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.modules,
+        args.rate_hz,
+        args.duration,
+        args.connect_latency,
+        args.failure_rate,
+        args.seed,
+        args.aggregator_core,
+        args.mode,
+        args.max_concurrent_connects,
+        args.adapter_connect_cap,
+        args.scan_blocks_connect,
+        args.ingest_shards,
+        args.adapters,
+        args.adapter_slot_us,
+        args.clock_skew_ppm,
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
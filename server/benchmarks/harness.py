@@ -0,0 +1,115 @@
+"""
+Timing and baseline helpers shared by the benchmark modules.
+
+Results are nested dicts whose leaves are numbers. Timed cases report
+median and best nanoseconds per operation over several repeats, and
+compare_to_baseline() flags any "*_ns" leaf that grew by more than the
+regression threshold relative to a previously saved run.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any
+
+
+DEFAULT_REPEATS = 5
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+TIMED_SUFFIX = "_ns"
+
+
+def time_ns_per_op(
+    func: Callable[[], Any],
+    number: int,
+    repeats: int = DEFAULT_REPEATS,
+    ops_per_call: int = 1,
+) -> dict[str, float]:
+    """
+    Call func() number times per repeat and report median and best ns per
+    operation, where one call performs ops_per_call operations.
+    """
+    operations = max(1, number * ops_per_call)
+    samples: list[float] = []
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter_ns() - started) / operations)
+    return {
+        "median_ns": statistics.median(samples),
+        "best_ns": min(samples),
+    }
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": sys.platform,
+    }
+
+
+def _flatten(results: Mapping[str, Any], prefix: str = "") -> Iterator[tuple[str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, Mapping):
+            yield from _flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def compare_to_baseline(
+    results: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """
+    Return one entry per timed metric that is slower than the baseline by more
+    than threshold (a fraction, 0.10 = 10%). Metrics missing from either side
+    are ignored.
+    """
+    baseline_values = dict(_flatten(baseline))
+    regressions: list[dict[str, Any]] = []
+    for path, value in _flatten(results):
+        if not path.endswith(TIMED_SUFFIX):
+            continue
+        previous = baseline_values.get(path)
+        if not previous:
+            continue
+        change = (value - previous) / previous
+        if change > threshold:
+            regressions.append(
+                {
+                    "metric": path,
+                    "baseline": previous,
+                    "current": value,
+                    "change": change,
+                }
+            )
+    return regressions
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} does not contain a benchmark result object")
+    return data.get("results", data)
+
+
+def save_results(path: str, results: Mapping[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump({"environment": environment(), "results": results}, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,388 @@
+"""
+Report pipeline micro-benchmarks.
+
+Covers the hot and warm paths between a BLE notification and an HID report:
+mapping cache builds for 1/8/64 devices with many profiles, StateReducer
+updates in every HID mode driven by seeded press traces, the build_*_report
+functions, DeviceConfigStore load/save on a large config, INFO TLV
+parsing and compiled StateDecoder decodes of 4, 8 and 16 byte packed
+reports against the plain 4-byte state unpack.
+
+Results are printed (or written with --output) as JSON. With --baseline the
+run is compared to a saved result and the exit status is 1 when any timed
+metric regressed by more than --threshold.
+
+Run from the server directory:
+
+    python -m benchmarks.pipeline [--quick] [--output results.json]
+        [--baseline baseline.json] [--threshold 0.10] [--save-baseline baseline.json]
+        [--recording input.bin]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+from typing import Any
+
+from device_config_store import DEFAULT_UI_LAYOUT, DeviceConfigStore
+from device_descriptor import (
+    TLV_CONTROL_COUNT,
+    TLV_CONTROL_DESC,
+    TLV_CONTROL_LABEL,
+    TLV_FW_VER,
+    TLV_PROTO_VER,
+    TLV_REPORT_BYTES,
+    TLV_REPORT_FORMAT,
+    TLV_UNIQUE_ID,
+    ControlDescriptor,
+    ControlType,
+    DeviceDescriptor,
+    ReportFormat,
+    parse_info_tlv,
+)
+from input_recording import RECORD_STATE, Recording, read_recording
+from runtime.report_builder import (
+    DEFAULT_CONTROLS,
+    build_gamepad_pc_report,
+    build_gamepad_switch_hori_report,
+    build_keyboard_report,
+    build_mapping_cache,
+)
+from runtime.state_decoder import StateDecoder
+from runtime.state_reducer import HIDMode, StateReducer
+
+from .harness import (
+    DEFAULT_REGRESSION_THRESHOLD,
+    compare_to_baseline,
+    environment,
+    load_results,
+    save_results,
+    time_ns_per_op,
+)
+
+
+MAPPING_DEVICE_COUNTS: tuple[int, ...] = (1, 8, 64)
+PROFILES_PER_DEVICE = 8
+REDUCER_DEVICE_COUNT = 4
+TRACE_LENGTH = 4096
+TRACE_SEED = 0x0A4CADE
+REDUCER_MODES: tuple[HIDMode, ...] = ("keyboard", "gamepad_pc", "gamepad_switch_hori")
+STORE_DEVICE_COUNT = 64
+DECODER_REPORT_BYTES: tuple[int, ...] = (4, 8, 16)
+DECODER_PAYLOAD_COUNT = 256
+
+KEYBOARD_KEYCODES: tuple[str, ...] = (
+    "HID_KEY_A", "HID_KEY_S", "HID_KEY_D", "HID_KEY_F", "HID_KEY_J", "HID_KEY_K",
+    "HID_KEY_L", "HID_KEY_SPACE", "HID_KEY_LEFT_SHIFT", "HID_KEY_LEFT_CONTROL",
+    "HID_KEY_UP", "HID_KEY_DOWN", "HID_KEY_LEFT", "HID_KEY_RIGHT",
+    "HID_KEY_ENTER", "HID_KEY_ESCAPE", "HID_KEY_1", "HID_KEY_2",
+)
+GAMEPAD_INPUTS: tuple[str, ...] = (
+    "xb_button_a", "xb_button_b", "xb_button_x", "xb_button_y", "xb_left_bumper",
+    "xb_right_bumper", "xb_left_trigger", "xb_right_trigger", "xb_dpad_left",
+    "xb_dpad_right", "xb_dpad_up", "xb_dpad_down", "xb_view", "xb_menu",
+    "xb_home", "xb_left_stick_left", "xb_left_stick_up", "xb_right_stick_right",
+)
+
+
+def _device_id(index: int) -> str:
+    return ":".join(f"{byte:02X}" for byte in (0xAA, 0xBB, 0xCC, 0xDD, index >> 8, index & 0xFF))
+
+
+def _make_profile(profile_id: str, offset: int) -> dict[str, Any]:
+    keyboard_mapping: dict[str, Any] = {}
+    gamepad_mapping: dict[str, Any] = {}
+    for position, control in enumerate(DEFAULT_CONTROLS):
+        control_id = str(control["id"])
+        keyboard_mapping[control_id] = {
+            "keycode": KEYBOARD_KEYCODES[(position + offset) % len(KEYBOARD_KEYCODES)]
+        }
+        gamepad_mapping[control_id] = {
+            "gamepad_input": GAMEPAD_INPUTS[(position + offset) % len(GAMEPAD_INPUTS)]
+        }
+    return {
+        "id": profile_id,
+        "name": f"Profile {offset}",
+        "plate_id": "button-module-v1",
+        "active_mode": "keyboard",
+        "modes": {
+            "keyboard": {"output": "hid_keyboard", "mapping": keyboard_mapping},
+            "gamepad": {"output": "hid_gamepad", "mapping": dict(gamepad_mapping)},
+            "gamepad_pc": {"output": "hid_gamepad_pc", "mapping": dict(gamepad_mapping)},
+            "gamepad_switch_hori": {
+                "output": "hid_gamepad_switch_hori",
+                "mapping": dict(gamepad_mapping),
+            },
+        },
+        "ui": {"layout": dict(DEFAULT_UI_LAYOUT)},
+    }
+
+
+def make_config(device_count: int, profiles_per_device: int = PROFILES_PER_DEVICE) -> dict[str, Any]:
+    """A schema-2 config with fully mapped profiles for every device."""
+    devices: dict[str, Any] = {}
+    for device_index in range(device_count):
+        profiles = {
+            f"profile-{device_index}-{profile_index}": _make_profile(
+                f"profile-{device_index}-{profile_index}",
+                device_index + profile_index,
+            )
+            for profile_index in range(profiles_per_device)
+        }
+        devices[_device_id(device_index)] = {
+            "name": f"Module {device_index}",
+            "descriptor": None,
+            "last_seen": "2026-01-01T00:00:00+00:00",
+            "profiles": profiles,
+            "active_profile": f"profile-{device_index}-{device_index % profiles_per_device}",
+        }
+    return {"schema_version": 2, "devices": devices}
+
+
+def make_press_trace(
+    device_ids: list[str],
+    length: int = TRACE_LENGTH,
+    seed: int = TRACE_SEED,
+) -> list[tuple[str, int]]:
+    """
+    Seeded (device_id, state) notifications resembling play: mostly single
+    button edges, some chords and roughly one repeated state in six, which
+    the reducer must drop.
+    """
+    rng = random.Random(seed)
+    bit_indexes = [control["bit_index"] for control in DEFAULT_CONTROLS]
+    states = {device_id: 0 for device_id in device_ids}
+    trace: list[tuple[str, int]] = []
+    for _ in range(length):
+        device_id = rng.choice(device_ids)
+        state = states[device_id]
+        roll = rng.random()
+        if roll < 0.16:
+            pass
+        elif roll < 0.90:
+            state ^= 1 << rng.choice(bit_indexes)
+        else:
+            for bit_index in rng.sample(bit_indexes, 3):
+                state ^= 1 << bit_index
+        states[device_id] = state
+        trace.append((device_id, state))
+    return trace
+
+
+def make_info_payload(control_count: int = len(DEFAULT_CONTROLS)) -> bytes:
+    def tlv(tlv_type: int, value: bytes) -> bytes:
+        return bytes((tlv_type, len(value))) + value
+
+    payload = bytearray()
+    payload += tlv(TLV_PROTO_VER, b"\x01")
+    payload += tlv(TLV_REPORT_FORMAT, bytes((ReportFormat.BITFIELD,)))
+    payload += tlv(TLV_REPORT_BYTES, struct.pack("<H", 4))
+    payload += tlv(TLV_CONTROL_COUNT, bytes((control_count,)))
+    payload += tlv(TLV_UNIQUE_ID, struct.pack("<I", 0xC0FFEE01))
+    payload += tlv(TLV_FW_VER, struct.pack("<H", 0x0102))
+    for control_id in range(1, control_count + 1):
+        payload += tlv(
+            TLV_CONTROL_DESC,
+            bytes((control_id, ControlType.BUTTON, 0, ReportFormat.BITFIELD, control_id - 1, 1, 0)),
+        )
+        payload += tlv(TLV_CONTROL_LABEL, bytes((control_id,)) + f"BTN{control_id}".encode("ascii"))
+    return bytes(payload)
+
+
+def make_packed_descriptor(report_bytes: int) -> dict[str, Any]:
+    """
+    16 buttons, a 4-bit hat and as many of four axes as fit: 8-bit, or 16-bit
+    from 12 bytes. The hat takes payload bits 8-11, its joystick state bits.
+    """
+
+    def control(control_id: int, control_type: ControlType, bit: int, width: int) -> ControlDescriptor:
+        return ControlDescriptor(
+            control_id,
+            control_type,
+            ReportFormat.PACKED,
+            byte_offset=bit // 8,
+            bit_offset=bit % 8,
+            bit_width=width,
+        )
+
+    controls = [control(index + 1, ControlType.BUTTON, index if index < 8 else index + 4, 1) for index in range(16)]
+    controls.append(control(17, ControlType.HAT, 8, 4))
+    axis_width = 16 if report_bytes >= 12 else 8
+    first_axis_bit = 32 if axis_width == 16 else 24
+    axis_count = min(4, (report_bytes * 8 - first_axis_bit) // axis_width)
+    for slot in range(axis_count):
+        controls.append(control(18 + slot, ControlType.AXIS, first_axis_bit + slot * axis_width, axis_width))
+    return DeviceDescriptor(report_format=ReportFormat.PACKED, report_bytes=report_bytes, controls=controls).to_dict()
+
+
+def bench_mapping_cache(number: int, repeats: int) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for device_count in MAPPING_DEVICE_COUNTS:
+        config = make_config(device_count)
+        calls = max(1, number // device_count)
+        results[f"devices_{device_count}"] = {
+            mode: time_ns_per_op(lambda mode=mode: build_mapping_cache(config, mode=mode), calls, repeats)
+            for mode in REDUCER_MODES
+        }
+    return results
+
+
+def trace_from_recording(recording: Recording, device_ids: list[str]) -> list[tuple[str, int]]:
+    """Recorded states as a press trace, recorded devices mapped onto device_ids in order."""
+    return [
+        (device_ids[record.device_index % len(device_ids)], record.value)
+        for record in recording.records
+        if record.kind == RECORD_STATE
+    ]
+
+
+def bench_state_reducer(repeats: int, recording: Recording | None = None) -> dict[str, Any]:
+    config = make_config(REDUCER_DEVICE_COUNT)
+    device_ids = list(config["devices"])
+    trace = trace_from_recording(recording, device_ids) if recording is not None else make_press_trace(device_ids)
+    results: dict[str, Any] = {}
+    for mode in REDUCER_MODES:
+        reducer = StateReducer(build_mapping_cache(config, mode=mode), mode=mode)
+
+        def replay(reducer: StateReducer = reducer) -> None:
+            update = reducer.update_device_state
+            for device_id, state in trace:
+                update(device_id, state)
+            for device_id in device_ids:
+                update(device_id, 0)
+
+        results[mode] = time_ns_per_op(replay, 1, repeats, ops_per_call=len(trace) + len(device_ids))
+    return results
+
+
+def bench_report_builders(number: int, repeats: int) -> dict[str, Any]:
+    keyboard_keys = [0x04, 0x16, 0x07, 0xE1]
+    gamepad_inputs = ["xb_button_a", "xb_right_bumper", "xb_dpad_up", "xb_dpad_left", "xb_left_stick_up"]
+    return {
+        "keyboard": time_ns_per_op(lambda: build_keyboard_report(keyboard_keys), number, repeats),
+        "gamepad_pc": time_ns_per_op(lambda: build_gamepad_pc_report(gamepad_inputs), number, repeats),
+        "gamepad_switch_hori": time_ns_per_op(
+            lambda: build_gamepad_switch_hori_report(gamepad_inputs), number, repeats
+        ),
+    }
+
+
+def bench_config_store(number: int, repeats: int) -> dict[str, Any]:
+    config = make_config(STORE_DEVICE_COUNT)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "config.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(config, handle)
+        store = DeviceConfigStore(path=path)
+        calls = max(1, number // 1000)
+        load = time_ns_per_op(store.load, calls, repeats)
+        save = time_ns_per_op(store.save, calls, repeats)
+        size_bytes = os.path.getsize(path)
+    return {
+        "devices": STORE_DEVICE_COUNT,
+        "file_bytes": size_bytes,
+        "load": load,
+        "save": save,
+    }
+
+
+def bench_parse_info_tlv(number: int, repeats: int) -> dict[str, Any]:
+    payload = make_info_payload()
+    return {
+        "payload_bytes": len(payload),
+        "parse": time_ns_per_op(lambda: parse_info_tlv(payload), number, repeats),
+    }
+
+
+def bench_state_decoders(number: int, repeats: int) -> dict[str, Any]:
+    rng = random.Random(TRACE_SEED)
+    results: dict[str, Any] = {}
+    legacy_payloads = [rng.randbytes(4) for _ in range(DECODER_PAYLOAD_COUNT)]
+    unpack = struct.Struct("<I").unpack
+
+    def decode_legacy() -> None:
+        for payload in legacy_payloads:
+            unpack(payload[:4])[0]
+
+    calls = max(1, number // DECODER_PAYLOAD_COUNT)
+    results["legacy_4"] = time_ns_per_op(decode_legacy, calls, repeats, ops_per_call=DECODER_PAYLOAD_COUNT)
+    for report_bytes in DECODER_REPORT_BYTES:
+        decoder = StateDecoder(make_packed_descriptor(report_bytes))
+        payloads = [rng.randbytes(report_bytes) for _ in range(DECODER_PAYLOAD_COUNT)]
+
+        def decode_packed(decode: Any = decoder.decode, payloads: list[bytes] = payloads) -> None:
+            for payload in payloads:
+                decode(payload)
+
+        results[f"packed_{report_bytes}"] = time_ns_per_op(
+            decode_packed, calls, repeats, ops_per_call=DECODER_PAYLOAD_COUNT
+        )
+    return results
+
+
+def run(number: int = 2_000, repeats: int = 5, recording: Recording | None = None) -> dict[str, Any]:
+    results = {
+        "mapping_cache": bench_mapping_cache(number, repeats),
+        "state_reducer": bench_state_reducer(repeats),
+        "report_builders": bench_report_builders(number * 10, repeats),
+        "config_store": bench_config_store(number, repeats),
+        "parse_info_tlv": bench_parse_info_tlv(number, repeats),
+        "state_decoders": bench_state_decoders(number * 10, repeats),
+    }
+    if recording is not None:
+        # Kept apart from the seeded trace so baselines stay comparable.
+        results["state_reducer_recorded"] = bench_state_reducer(repeats, recording)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline hot paths")
+    parser.add_argument("--number", type=int, default=2_000, help="calls per repeat for the fast cases")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small run for smoke testing")
+    parser.add_argument("--output", help="write results JSON to this path")
+    parser.add_argument("--baseline", help="compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", help="write this run as the new baseline")
+    parser.add_argument("--recording", help="also replay this input recording through the reducer")
+    args = parser.parse_args()
+
+    number, repeats = (100, 3) if args.quick else (args.number, args.repeats)
+    recording = read_recording(args.recording) if args.recording else None
+    results = run(number, repeats, recording)
+    document: dict[str, Any] = {"environment": environment(), "results": results}
+
+    status = 0
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_results(args.baseline), args.threshold)
+        document["regressions"] = regressions
+        document["threshold"] = args.threshold
+        if regressions:
+            status = 1
+            for regression in regressions:
+                print(
+                    f"REGRESSION {regression['metric']}: "
+                    f"{regression['baseline']:.0f} -> {regression['current']:.0f} ns "
+                    f"(+{regression['change'] * 100:.1f}%)",
+                    file=sys.stderr,
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
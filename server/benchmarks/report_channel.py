@@ -0,0 +1,211 @@
+"""
+Report channel micro-benchmark.
+
+Measures single-process publish/read cost of the seqlock ReportChannel and
+the ReportRing, and runs a two-process stress test that counts reader
+retries and torn reads.
+The legacy byte-by-byte multiprocessing.Array mailbox is measured alongside
+for comparison.
+
+Run from the server directory:
+
+    python -m benchmarks.report_channel [--iterations N] [--stress-seconds S]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import time
+from typing import Any
+
+from report_channel import ReportChannel, ReportRing
+
+
+REPORT_LENGTH = 8
+
+
+def _pattern(version: int) -> bytes:
+    return bytes([version & 0xFF]) * REPORT_LENGTH
+
+
+def _time_per_call_ns(func, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def bench_channel_costs(iterations: int) -> dict[str, float]:
+    channel = ReportChannel.create()
+    try:
+        report = _pattern(1)
+        publish_ns = _time_per_call_ns(lambda: channel.publish(report, 1.0, 2.0), iterations)
+        read_ns = _time_per_call_ns(lambda: channel.read(-1), iterations)
+        unchanged_ns = _time_per_call_ns(
+            lambda: channel.read(channel.current_version()), iterations
+        )
+    finally:
+        channel.close()
+        channel.unlink()
+    return {
+        "publish_ns": publish_ns,
+        "read_ns": read_ns,
+        "read_unchanged_ns": unchanged_ns,
+    }
+
+
+def bench_ring_costs(iterations: int) -> dict[str, float]:
+    ring = ReportRing.create()
+    try:
+        report = _pattern(1)
+
+        def publish_and_drain() -> None:
+            ring.publish(report, 1.0, 2.0)
+            ring.drain()
+
+        publish_drain_ns = _time_per_call_ns(publish_and_drain, iterations)
+        empty_drain_ns = _time_per_call_ns(ring.drain, iterations)
+    finally:
+        ring.close()
+        ring.unlink()
+    return {
+        "publish_and_drain_ns": publish_drain_ns,
+        "drain_empty_ns": empty_drain_ns,
+    }
+
+
+def bench_legacy_costs(iterations: int) -> dict[str, float]:
+    report_array = multiprocessing.Array("B", 64, lock=False)
+    report_version = multiprocessing.Value("i", 0, lock=True)
+    report_published_at = multiprocessing.Value("d", 0.0, lock=True)
+    report = _pattern(1)
+
+    def publish() -> None:
+        for i in range(len(report_array)):
+            report_array[i] = report[i] if i < len(report) else 0
+        with report_published_at.get_lock():
+            report_published_at.value = 2.0
+        with report_version.get_lock():
+            report_version.value += 1
+
+    def read() -> None:
+        _version = report_version.value
+        bytes(report_array)
+        _published_at = report_published_at.value
+
+    return {
+        "publish_ns": _time_per_call_ns(publish, iterations),
+        "read_ns": _time_per_call_ns(read, iterations),
+    }
+
+
+def _channel_stress_writer(channel: ReportChannel, stop_event: Any, result: Any) -> None:
+    version = 0
+    while not stop_event.is_set():
+        version = channel.publish(_pattern(version + 1), float(version + 1), 0.0)
+    result.value = version
+
+
+def _legacy_stress_writer(report_array: Any, report_version: Any, stop_event: Any, result: Any) -> None:
+    version = 0
+    while not stop_event.is_set():
+        version += 1
+        report = _pattern(version)
+        for i in range(len(report_array)):
+            report_array[i] = report[i] if i < len(report) else 0
+        with report_version.get_lock():
+            report_version.value = version
+    result.value = version
+
+
+def stress_channel(seconds: float) -> dict[str, int]:
+    context = multiprocessing.get_context("fork")
+    channel = ReportChannel.create()
+    stop_event = context.Event()
+    published = context.Value("q", 0)
+    writer = context.Process(target=_channel_stress_writer, args=(channel, stop_event, published))
+    reads = 0
+    torn = 0
+    last_seen_version = 0
+    try:
+        writer.start()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            snapshot = channel.read(last_seen_version)
+            if snapshot is None:
+                continue
+            reads += 1
+            last_seen_version = snapshot.version
+            if snapshot.report != _pattern(snapshot.version) or snapshot.input_at != float(snapshot.version):
+                torn += 1
+        stop_event.set()
+        writer.join()
+        read_retries = channel.read_retries
+    finally:
+        channel.close()
+        channel.unlink()
+    return {
+        "published": published.value,
+        "reads": reads,
+        "read_retries": read_retries,
+        "torn_reads": torn,
+    }
+
+
+def stress_legacy(seconds: float) -> dict[str, int]:
+    context = multiprocessing.get_context("fork")
+    report_array = context.Array("B", 64, lock=False)
+    report_version = context.Value("i", 0, lock=True)
+    stop_event = context.Event()
+    published = context.Value("q", 0)
+    writer = context.Process(
+        target=_legacy_stress_writer,
+        args=(report_array, report_version, stop_event, published),
+    )
+    reads = 0
+    torn = 0
+    last_seen_version = 0
+    writer.start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        version = report_version.value
+        if version == last_seen_version:
+            continue
+        last_seen_version = version
+        report = bytes(report_array)[:REPORT_LENGTH]
+        reads += 1
+        if report != _pattern(version):
+            torn += 1
+    stop_event.set()
+    writer.join()
+    return {
+        "published": published.value,
+        "reads": reads,
+        "torn_reads": torn,
+    }
+
+
+def run(iterations: int = 100_000, stress_seconds: float = 2.0) -> dict[str, Any]:
+    return {
+        "channel": bench_channel_costs(iterations),
+        "ring": bench_ring_costs(iterations),
+        "legacy": bench_legacy_costs(iterations),
+        "channel_stress": stress_channel(stress_seconds),
+        "legacy_stress": stress_legacy(stress_seconds),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the HID report channel")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--stress-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.iterations, args.stress_seconds), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
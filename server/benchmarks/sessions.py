@@ -0,0 +1,180 @@
+"""
+Session engine benchmark.
+
+Runs a simulated fleet against the thread-per-device SessionSupervisor and
+the single-loop SessionEngine and reports, per module count:
+
+  - threads: OS threads in the process once every module is connected
+  - rss_kb: resident set size at the same point
+  - latency: transport notification callback to the application's
+    on_state_update, in microseconds
+
+Each run happens in its own forked process so thread counts and RSS are not
+carried over between runs.
+
+Run from the server directory:
+
+    python -m benchmarks.sessions [--modules 1,4,8,16] [--rate-hz HZ] [--duration S]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import statistics
+import time
+from typing import Any
+
+from runtime.session_engine import SessionEngine
+from runtime.sessions import SessionSupervisor
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+
+
+DEFAULT_MODULE_COUNTS = "1,4,8,16"
+CONNECT_TIMEOUT_SECONDS = 30.0
+SESSION_MANAGERS = {
+    "supervisor": SessionSupervisor,
+    "engine": SessionEngine,
+}
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize_us(latencies: list[float]) -> dict[str, float]:
+    values = sorted(latency * 1_000_000.0 for latency in latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_us": statistics.fmean(values),
+        "p50_us": _percentile(values, 0.50),
+        "p99_us": _percentile(values, 0.99),
+        "max_us": values[-1],
+    }
+
+
+def _process_status() -> dict[str, int]:
+    status: dict[str, int] = {}
+    with open("/proc/self/status", "r", encoding="utf-8") as handle:
+        for line in handle:
+            key, _, value = line.partition(":")
+            if key in ("Threads", "VmRSS"):
+                status[key] = int(value.split()[0])
+    return status
+
+
+class _StampedClient:
+    """Records when the transport delivered each (address, state) notification."""
+
+    def __init__(self, client: Any, stamps: dict[tuple[str, int], float]) -> None:
+        self._client = client
+        self._stamps = stamps
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    async def start_notify(self, char_specifier: Any, callback: Any) -> None:
+        address = str(self._client.address)
+        stamps = self._stamps
+
+        def stamped(sender: Any, data: bytearray) -> None:
+            stamps[(address, int.from_bytes(data[:4], "little"))] = time.perf_counter()
+            callback(sender, data)
+
+        await self._client.start_notify(char_specifier, stamped)
+
+
+def _measure(kind: str, modules: int, rate_hz: float, duration: float, seed: int) -> dict[str, Any]:
+    transport = SimulatedTransport(
+        SimulatedFleetConfig(device_count=modules, notify_rate_hz=rate_hz, seed=seed, advertise_interval=0.02)
+    )
+    stamps: dict[tuple[str, int], float] = {}
+    create_client = transport.create_client
+    transport.create_client = lambda *args, **kwargs: _StampedClient(create_client(*args, **kwargs), stamps)
+    latencies: list[float] = []
+
+    def on_state_update(address: str, state: int, _axes: Any) -> None:
+        stamped_at = stamps.pop((address, state), None)
+        if stamped_at is not None:
+            latencies.append(time.perf_counter() - stamped_at)
+
+    manager = SESSION_MANAGERS[kind](on_state_update, lambda _address: None, transport=transport)
+
+    async def scenario() -> dict[str, Any]:
+        manager.start(asyncio.get_running_loop())
+        started = time.monotonic()
+        try:
+            while len(manager.connected_addresses) < modules:
+                if time.monotonic() - started > CONNECT_TIMEOUT_SECONDS:
+                    raise RuntimeError(f"only {len(manager.connected_addresses)}/{modules} modules connected")
+                await asyncio.sleep(0.01)
+            connected_s = time.monotonic() - started
+            await asyncio.sleep(0.2)
+            latencies.clear()
+            await asyncio.sleep(duration)
+            status = _process_status()
+            return {
+                "time_to_all_connected_s": connected_s,
+                "threads": status["Threads"],
+                "rss_kb": status["VmRSS"],
+                "latency": _summarize_us(latencies),
+            }
+        finally:
+            manager.stop()
+            await manager.wait_closed()
+
+    return asyncio.run(scenario())
+
+
+def _measure_in_child(connection: Any, *args: Any) -> None:
+    logging.disable(logging.WARNING)
+    try:
+        connection.send(_measure(*args))
+    except Exception as exc:
+        connection.send({"error": str(exc)})
+    finally:
+        connection.close()
+
+
+def run(module_counts: list[int], rate_hz: float, duration: float, seed: int = 0) -> dict[str, Any]:
+    context = multiprocessing.get_context("fork")
+    results = []
+    for modules in module_counts:
+        row: dict[str, Any] = {"modules": modules}
+        for kind in SESSION_MANAGERS:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_measure_in_child,
+                args=(sender, kind, modules, rate_hz, duration, seed),
+            )
+            process.start()
+            sender.close()
+            row[kind] = receiver.recv()
+            process.join()
+        results.append(row)
+    return {"rate_hz": rate_hz, "duration_s": duration, "results": results}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the session engine with the thread-per-device supervisor")
+    parser.add_argument("--modules", default=DEFAULT_MODULE_COUNTS, help="comma-separated module counts")
+    parser.add_argument("--rate-hz", type=float, default=100.0, help="notifications per module per second")
+    parser.add_argument("--duration", type=float, default=3.0, help="measurement window per run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    module_counts = [int(value) for value in args.modules.split(",") if value]
+    print(json.dumps(run(module_counts, args.rate_hz, args.duration, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
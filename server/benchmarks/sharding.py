@@ -0,0 +1,91 @@
+"""
+Sharded ingestion scaling benchmark.
+
+Runs the ble_load window at one module count and notification rate once per
+ingestion shard count (0 keeps every BLE link in the aggregator) and reports
+per run:
+
+  - delivered_per_s and delivered_ratio: notifications the simulated modules
+    got out, which falls once the process owning their links saturates
+  - reports_per_s: reports the aggregator published after the merge
+  - receive_to_publish: shard receive timestamp -> report published, so the
+    cross-process merge hop is included in sharded runs
+  - speedup: delivered_per_s relative to the unsharded run
+
+Scaling needs a core per shard on top of the aggregator's; on a machine with
+fewer cores the shards only add handoff cost, which this also shows.
+
+Run from the server directory:
+
+    python -m benchmarks.sharding [--shards 0,1,2,3] [--modules 32] [--rate-hz 1000]
+        [--duration 5] [--mode keyboard]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Any
+
+from benchmarks.ble_load import LOAD_TEST_MODES, MAX_MODULES, run_window
+from runtime.state_reducer import HIDMode
+
+
+DEFAULT_SHARD_COUNTS = "0,1,2,3"
+
+
+def run(
+    shard_counts: list[int],
+    modules: int,
+    rate_hz: float,
+    duration: float,
+    seed: int = 0,
+    mode: HIDMode = "keyboard",
+) -> dict[str, Any]:
+    runs = []
+    baseline: float | None = None
+    for shards in shard_counts:
+        window = run_window(modules, rate_hz, duration, seed=seed, mode=mode, ingest_shards=shards)
+        throughput = window["throughput"]
+        delivered = throughput["delivered_per_s"]
+        if shards == 0:
+            baseline = delivered
+        runs.append(
+            {
+                "ingest_shards": shards,
+                "delivered_per_s": delivered,
+                "delivered_ratio": throughput["delivered_ratio"],
+                "reports_per_s": throughput["reports_per_s"],
+                "dropped": window["notifications"]["dropped"],
+                "receive_to_publish": window["latency"]["receive_to_publish"],
+                "speedup": delivered / baseline if baseline else None,
+            }
+        )
+    return {
+        "cpu_count": os.cpu_count(),
+        "modules": modules,
+        "rate_hz": rate_hz,
+        "offered_per_s": modules * rate_hz,
+        "duration_s": duration,
+        "runs": runs,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure ingestion throughput against shard count")
+    parser.add_argument("--shards", default=DEFAULT_SHARD_COUNTS, help="comma-separated shard counts")
+    parser.add_argument("--modules", type=int, default=MAX_MODULES)
+    parser.add_argument("--rate-hz", type=float, default=1000.0, help="notifications per module per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="measurement window per shard count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=LOAD_TEST_MODES, default="keyboard")
+    args = parser.parse_args()
+
+    shard_counts = [int(value) for value in args.shards.split(",") if value.strip()]
+    print(json.dumps(run(shard_counts, args.modules, args.rate_hz, args.duration, args.seed, args.mode), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""
+Writer wakeup latency benchmark.
+
+A publisher process pushes reports into a ReportRing and signals the writer;
+a waiter process blocks the way hid_writer does, drains the ring on wake and
+records publish-to-wake latency from the published_at timestamp. The legacy
+multiprocessing.Event (wait, then clear) is measured against the eventfd and
+pipe Wakeup backends.
+
+Run from the server directory:
+
+    python -m benchmarks.wakeup [--samples N] [--gap-ms MS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+from typing import Any
+
+from report_channel import ReportRing
+from wakeup import WAKEUP_BACKEND_EVENTFD, WAKEUP_BACKEND_PIPE, Wakeup, eventfd_available
+
+
+WAIT_TIMEOUT_SECONDS = 0.5
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize_us(latencies: list[float]) -> dict[str, float]:
+    values = sorted(latency * 1_000_000.0 for latency in latencies)
+    return {
+        "samples": len(values),
+        "p50_us": _percentile(values, 0.50),
+        "p99_us": _percentile(values, 0.99),
+        "mean_us": statistics.fmean(values) if values else 0.0,
+        "max_us": values[-1] if values else 0.0,
+    }
+
+
+def _event_waiter(ring, event, stop_event, latencies, samples) -> None:
+    while not stop_event.is_set():
+        event.wait(timeout=WAIT_TIMEOUT_SECONDS)
+        woke_at = time.perf_counter()
+        event.clear()
+        _record(ring, woke_at, latencies, samples)
+
+
+def _wakeup_waiter(ring, wakeup, stop_event, latencies, samples) -> None:
+    while not stop_event.is_set():
+        wakeup.wait(WAIT_TIMEOUT_SECONDS)
+        woke_at = time.perf_counter()
+        _record(ring, woke_at, latencies, samples)
+
+
+def _record(ring, woke_at: float, latencies, samples: int) -> None:
+    for snapshot in ring.drain():
+        index = snapshot.version - 1
+        if 0 <= index < samples:
+            latencies[index] = woke_at - snapshot.published_at
+
+
+def _measure(kind: str, samples: int, gap_seconds: float) -> dict[str, float]:
+    context = multiprocessing.get_context("fork")
+    ring = ReportRing.create()
+    stop_event = context.Event()
+    latencies = context.Array("d", samples, lock=False)
+    if kind == "event":
+        signal = context.Event()
+        target = _event_waiter
+    else:
+        signal = Wakeup(kind)
+        target = _wakeup_waiter
+    waiter = context.Process(target=target, args=(ring, signal, stop_event, latencies, samples))
+    try:
+        waiter.start()
+        time.sleep(0.1)
+        for version in range(1, samples + 1):
+            ring.publish(bytes([version & 0xFF]) * 8, 0.0, time.perf_counter())
+            signal.set()
+            time.sleep(gap_seconds)
+        time.sleep(0.05)
+        stop_event.set()
+        signal.set()
+        waiter.join()
+        result = _summarize_us([latency for latency in latencies if latency > 0.0])
+    finally:
+        if isinstance(signal, Wakeup):
+            signal.close()
+        ring.close()
+        ring.unlink()
+    return result
+
+
+def run(samples: int = 2000, gap_ms: float = 1.0) -> dict[str, Any]:
+    gap_seconds = gap_ms / 1000.0
+    results: dict[str, Any] = {"multiprocessing_event": _measure("event", samples, gap_seconds)}
+    if eventfd_available():
+        results["eventfd"] = _measure(WAKEUP_BACKEND_EVENTFD, samples, gap_seconds)
+    results["pipe"] = _measure(WAKEUP_BACKEND_PIPE, samples, gap_seconds)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark HID writer wakeup latency")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--gap-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.samples, args.gap_ms), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+"""
+End-to-end notification-to-write latency harness.
+
+Runs aggregator_process and hid_writer_process together, the way
+runtime_main does, against a simulated BLE fleet, with SimulatedHidGadget
+FIFOs standing in for /dev/hidg0 and /dev/hidg1 and a host thread polling
+each at a fixed interval. For every HID mode it reports the writer's
+receive -> hidg write latency (the "total" stage) and publish -> write
+latency from the shared latency histograms, jitter as p99 - p50, and how
+many reports the emulated host read.
+
+Run from the server directory:
+
+    python -m benchmarks.writer_latency [--modules 4] [--rate-hz 250]
+        [--duration 5] [--host-poll-ms 1] [--modes keyboard,gamepad_pc]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Any
+
+from aggregator import aggregator_process
+from gadget_state import OPENARCADE_GADGET_STATE_PATH_ENV_VAR, GadgetState
+from hid_mode_state import HIDModeState
+from hid_writer import MODE_DEVICE_NAMES, MODE_TO_REQUIRED_PERSONA, OPENARCADE_HID_DEVICE_DIR_ENV_VAR, hid_writer_process
+from latency_trace import LatencyHistograms
+from pairing_mode_state import PairingModeState
+from report_channel import ReportRing
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+from runtime.state_reducer import HIDMode
+from simulated_hidg import SimulatedHidGadget
+from wakeup import Wakeup
+
+from .ble_load import LOAD_TEST_MODES, isolated_environment, wait_for_fleet
+
+
+WRITER_SETTLE_SECONDS = 1.0
+
+
+def _stage_with_jitter(stats: dict[str, Any] | None) -> dict[str, Any]:
+    if not stats:
+        return {"count": 0}
+    result = dict(stats)
+    result["jitter_us"] = stats["p99_us"] - stats["p50_us"]
+    return result
+
+
+def run_mode(
+    mode: HIDMode,
+    modules: int,
+    rate_hz: float,
+    duration: float,
+    host_poll_interval: float,
+    seed: int = 0,
+    aggregator_core: int = 0,
+    writer_core: int = 1,
+) -> dict[str, Any]:
+    transport = SimulatedTransport(
+        SimulatedFleetConfig(device_count=modules, notify_rate_hz=rate_hz, connect_latency=0.01, seed=seed)
+    )
+    context = multiprocessing.get_context("fork")
+    report_ring = ReportRing.create()
+    latency_histograms = LatencyHistograms.create()
+    report_wakeup = Wakeup()
+    mode_wakeup = Wakeup()
+    stop_event = context.Event()
+    mailbox = {
+        "report_ring": report_ring,
+        "report_wakeup": report_wakeup,
+        "mode_wakeup": mode_wakeup,
+        "latency_histograms": latency_histograms,
+        "ble_transport": transport,
+    }
+
+    previous_environment = dict(os.environ)
+    gadgets: dict[str, SimulatedHidGadget] = {}
+    processes: list[Any] = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ.update(isolated_environment(tmpdir))
+        os.environ[OPENARCADE_GADGET_STATE_PATH_ENV_VAR] = os.path.join(tmpdir, "gadget_state.json")
+        os.environ[OPENARCADE_HID_DEVICE_DIR_ENV_VAR] = tmpdir
+        try:
+            for name in sorted({name for names in MODE_DEVICE_NAMES.values() for name in names}):
+                gadget = SimulatedHidGadget(os.path.join(tmpdir, name), poll_interval=host_poll_interval)
+                gadget.start()
+                gadgets[name] = gadget
+            PairingModeState().save(True, source="writer_latency")
+            mode_state = HIDModeState().save(mode, source="writer_latency")
+            GadgetState().save(MODE_TO_REQUIRED_PERSONA[mode], True, mode_state["sequence"])
+
+            processes = [
+                context.Process(
+                    target=aggregator_process,
+                    args=(mailbox, stop_event, os.path.join(tmpdir, "config.json"), aggregator_core),
+                    name="Aggregator",
+                ),
+                context.Process(target=hid_writer_process, args=(mailbox, stop_event, writer_core), name="HIDWriter"),
+            ]
+            for process in processes:
+                process.start()
+            time_to_all_connected = wait_for_fleet(transport, processes)
+            time.sleep(WRITER_SETTLE_SECONDS)
+
+            latency_histograms.reset()
+            coalesced_before = report_ring.stats()["coalesced"]
+            reads_before = {name: len(gadget.reads) for name, gadget in gadgets.items()}
+            window_started = time.perf_counter()
+            time.sleep(duration)
+            elapsed = time.perf_counter() - window_started
+            summary = latency_histograms.summary().get(mode, {})
+            coalesced = report_ring.stats()["coalesced"] - coalesced_before
+            host_reads = {name: len(gadget.reads) - reads_before[name] for name, gadget in gadgets.items()}
+        finally:
+            stop_event.set()
+            report_wakeup.set()
+            for process in processes:
+                process.join(timeout=10.0)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for gadget in gadgets.values():
+                gadget.close()
+            os.environ.clear()
+            os.environ.update(previous_environment)
+            report_ring.close()
+            report_ring.unlink()
+            latency_histograms.close()
+            latency_histograms.unlink()
+            report_wakeup.close()
+            mode_wakeup.close()
+
+    endpoint = MODE_DEVICE_NAMES[mode][0]
+    return {
+        "mode": mode,
+        "modules": modules,
+        "rate_hz": rate_hz,
+        "host_poll_ms": host_poll_interval * 1000.0,
+        "seconds": elapsed,
+        "time_to_all_connected_s": time_to_all_connected,
+        "notification_to_write": _stage_with_jitter(summary.get("total")),
+        "publish_to_write": _stage_with_jitter(summary.get("write")),
+        "reports_coalesced": coalesced,
+        "host_reads": host_reads[endpoint],
+        "host_reads_per_s": host_reads[endpoint] / elapsed,
+    }
+
+
+def run(
+    modes: list[HIDMode],
+    modules: int,
+    rate_hz: float,
+    duration: float,
+    host_poll_interval: float,
+    seed: int = 0,
+    aggregator_core: int = 0,
+    writer_core: int = 1,
+) -> dict[str, Any]:
+    return {
+        mode: run_mode(mode, modules, rate_hz, duration, host_poll_interval, seed, aggregator_core, writer_core)
+        for mode in modes
+    }
+
+
+def _parse_modes(raw: str) -> list[HIDMode]:
+    modes = [part.strip() for part in raw.split(",") if part.strip()]
+    for mode in modes:
+        if mode not in LOAD_TEST_MODES:
+            raise argparse.ArgumentTypeError(f"unknown mode: {mode}")
+    return modes  # type: ignore[return-value]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure notification-to-hidg-write latency per HID mode")
+    parser.add_argument("--modes", type=_parse_modes, default=list(LOAD_TEST_MODES))
+    parser.add_argument("--modules", type=int, default=4)
+    parser.add_argument("--rate-hz", type=float, default=250.0, help="notifications per module per second")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--host-poll-ms", type=float, default=1.0, help="emulated USB host polling interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--aggregator-core", type=int, default=0)
+    parser.add_argument("--writer-core", type=int, default=1)
+    args = parser.parse_args()
+
+    results = run(
+        args.modes,
+        args.modules,
+        args.rate_hz,
+        args.duration,
+        args.host_poll_ms / 1000.0,
+        args.seed,
+        args.aggregator_core,
+        args.writer_core,
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,6 +16,7 @@ from config_portal_service import (
     resolve_portal_static_dir,
 )
 from hotspot_manager import HotspotManager
+from state_watcher import StateWatcher
 
 
 logging.basicConfig(
@@ -75,6 +76,8 @@ class ConfigModeOrchestrator:
         self._lock = threading.RLock()
         self._active = False
         self._last_sequence = -1
+        self._enabled = False
+        self._watcher: StateWatcher | None = None
 
     @property
     def is_active(self) -> bool:
@@ -87,6 +90,7 @@ class ConfigModeOrchestrator:
         initial_state = self.config_mode_state.ensure_initialized()
         self._last_sequence = int(initial_state.get("sequence", 0))
         initial_enabled = bool(initial_state.get("enabled", False))
+        self._enabled = initial_enabled
 
         logger.info(
             "Config mode orchestrator initialized enabled=%s sequence=%s",
@@ -98,34 +102,37 @@ class ConfigModeOrchestrator:
         except Exception:
             logger.exception("Failed to apply initial config mode state")
 
-        while not local_stop_event.is_set():
-            try:
-                current_state = self.config_mode_state.load(use_cache=False)
-                sequence = int(current_state.get("sequence", 0))
-                enabled = bool(current_state.get("enabled", False))
-
-                if sequence != self._last_sequence:
-                    logger.info(
-                        "Config mode state changed enabled=%s sequence=%s source=%s",
-                        enabled,
-                        sequence,
-                        current_state.get("source", "unknown"),
-                    )
-                    self._last_sequence = sequence
-                    self.reconcile(enabled)
-                elif enabled and (
-                    not self.hotspot_manager.is_running or not self.portal_service.is_running
-                ):
-                    logger.warning(
-                        "Config mode stack degraded (hotspot_running=%s portal_running=%s), reapplying",
-                        self.hotspot_manager.is_running,
-                        self.portal_service.is_running,
-                    )
-                    self.reconcile(True)
-            except Exception:
-                logger.exception("Config mode orchestrator loop error")
-
-            local_stop_event.wait(self.poll_interval)
+        # State changes arrive as file notifications; poll_interval is the
+        # fallback poll and the health-check period while config mode is on.
+        watcher = StateWatcher(poll_interval=self.poll_interval)
+        self._watcher = watcher
+        watcher.watch(
+            getattr(self.config_mode_state, "path", None),
+            lambda: self.config_mode_state.load(use_cache=False),
+            self._on_state_changed,
+            initial_state=initial_state,
+        )
+
+        try:
+            while not local_stop_event.is_set():
+                try:
+                    watcher.wait(self.poll_interval if self._enabled else None)
+                    if local_stop_event.is_set():
+                        break
+                    if self._enabled and (
+                        not self.hotspot_manager.is_running or not self.portal_service.is_running
+                    ):
+                        logger.warning(
+                            "Config mode stack degraded (hotspot_running=%s portal_running=%s), reapplying",
+                            self.hotspot_manager.is_running,
+                            self.portal_service.is_running,
+                        )
+                        self.reconcile(True)
+                except Exception:
+                    logger.exception("Config mode orchestrator loop error")
+        finally:
+            self._watcher = None
+            watcher.close()
 
         try:
             self.reconcile(False)
@@ -135,6 +142,25 @@ class ConfigModeOrchestrator:
         logger.info("Config mode orchestrator exiting")
         return 0
 
+    def wake(self) -> None:
+        """Interrupt the run loop's wait, e.g. after setting its stop event."""
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.wake()
+
+    def _on_state_changed(self, state: dict[str, Any]) -> None:
+        sequence = int(state.get("sequence", 0))
+        enabled = bool(state.get("enabled", False))
+        logger.info(
+            "Config mode state changed enabled=%s sequence=%s source=%s",
+            enabled,
+            sequence,
+            state.get("source", "unknown"),
+        )
+        self._last_sequence = sequence
+        self._enabled = enabled
+        self.reconcile(enabled)
+
     def reconcile(self, enabled: bool) -> None:
         with self._lock:
             if enabled:
@@ -173,10 +199,12 @@ class ConfigModeOrchestrator:
 
 def run(poll_interval: float | None = None) -> int:
     stop_event = threading.Event()
+    orchestrator = ConfigModeOrchestrator(poll_interval=poll_interval)
 
     def _handle_signal(signum: int, _frame: Any) -> None:
         logger.info("Received signal %s, stopping config mode orchestrator", signum)
         stop_event.set()
+        orchestrator.wake()
 
     previous_sigterm = signal.getsignal(signal.SIGTERM)
     previous_sigint = signal.getsignal(signal.SIGINT)
@@ -184,8 +212,6 @@ def run(poll_interval: float | None = None) -> int:
     signal.signal(signal.SIGTERM, _handle_signal)
     signal.signal(signal.SIGINT, _handle_signal)
 
-    orchestrator = ConfigModeOrchestrator(poll_interval=poll_interval)
-
     try:
         return orchestrator.run(stop_event=stop_event)
     finally:
@@ -201,7 +227,7 @@ def main() -> int:
         "--poll-interval",
         type=float,
         default=resolve_poll_interval(),
-        help="State polling interval in seconds",
+        help="Fallback state polling interval in seconds (changes are file-notified)",
     )
     parser.add_argument(
         "--verbose",
@@ -6,6 +6,8 @@ import os
 # Characteristic: 666f7065-6e61-7263-6164-650000000002
 SERVICE_UUID = "666f7065-6e61-7263-6164-650000000001"
 CHAR_UUID = "666f7065-6e61-7263-6164-650000000002"
+# Read-only INFO TLV characteristic (see device_descriptor.parse_info_tlv)
+INFO_CHAR_UUID = "666f7065-6e61-7263-6164-650000000003"
 
 # HID Keycodes (USB HID Usage Tables)
 HID_KEY_A = 0x04
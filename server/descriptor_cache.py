@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from copy import deepcopy
+from typing import Any
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_DESCRIPTOR_CACHE_PATH_ENV_VAR = "OPENARCADE_DESCRIPTOR_CACHE_PATH"
+DESCRIPTOR_CACHE_FILENAME = "descriptor_cache.json"
+DESCRIPTOR_CACHE_SCHEMA_VERSION = 1
+
+
+def resolve_descriptor_cache_path(config_path: str) -> str:
+    """Next to the device config unless OPENARCADE_DESCRIPTOR_CACHE_PATH says otherwise."""
+    return os.environ.get(
+        OPENARCADE_DESCRIPTOR_CACHE_PATH_ENV_VAR,
+        os.path.join(os.path.dirname(os.path.abspath(config_path)), DESCRIPTOR_CACHE_FILENAME),
+    )
+
+
+def descriptor_key(descriptor: Mapping[str, Any] | None) -> str | None:
+    """"<unique_id>:<fw_ver>" of a descriptor dict, or None if it lacks either."""
+    if not isinstance(descriptor, Mapping):
+        return None
+    unique_id = descriptor.get("unique_id")
+    fw_ver = descriptor.get("fw_ver")
+    if not isinstance(unique_id, int) or not isinstance(fw_ver, int):
+        return None
+    return f"{unique_id:08x}:{fw_ver}"
+
+
+class DescriptorCache:
+    """
+    Parsed INFO TLV descriptors keyed by (unique_id, fw_ver), and the key
+    each module address last reported.
+
+    A module that reconnects from an address with a cached key gets that
+    descriptor without reading its INFO characteristic again. The binding
+    is replaced the next time the module is read, and forget() drops it so
+    the next connect reads the module again (e.g. after a firmware update).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict[str, Any] = self._default_state()
+        self._loaded = False
+
+    def _default_state(self) -> dict[str, Any]:
+        return {"schema_version": DESCRIPTOR_CACHE_SCHEMA_VERSION, "descriptors": {}, "devices": {}}
+
+    def key_of(self, address: str) -> str | None:
+        with self._lock:
+            self._load_locked()
+            return self._data["devices"].get(address)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._load_locked()
+            descriptor = self._data["descriptors"].get(key)
+            return deepcopy(descriptor) if descriptor is not None else None
+
+    def lookup(self, address: str) -> dict[str, Any] | None:
+        """The cached descriptor for the key the address last reported, if any."""
+        with self._lock:
+            self._load_locked()
+            key = self._data["devices"].get(address)
+            descriptor = self._data["descriptors"].get(key) if key is not None else None
+            return deepcopy(descriptor) if descriptor is not None else None
+
+    def store(self, address: str, descriptor: Mapping[str, Any]) -> str | None:
+        """Cache a freshly read descriptor; returns its key, or None if it has no unique_id/fw_ver."""
+        key = descriptor_key(descriptor)
+        if key is None:
+            return None
+        with self._lock:
+            self._load_locked()
+            self._data["descriptors"][key] = deepcopy(dict(descriptor))
+            self._data["devices"][address] = key
+            self._save_locked()
+        return key
+
+    def forget(self, address: str) -> bool:
+        with self._lock:
+            self._load_locked()
+            if self._data["devices"].pop(address, None) is None:
+                return False
+            self._save_locked()
+            return True
+
+    def _load_locked(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Ignoring unreadable descriptor cache %s: %s", self.path, exc)
+            return
+        if not isinstance(data, dict):
+            return
+        descriptors = data.get("descriptors")
+        devices = data.get("devices")
+        if isinstance(descriptors, dict):
+            self._data["descriptors"] = {
+                key: descriptor for key, descriptor in descriptors.items() if isinstance(descriptor, dict)
+            }
+        if isinstance(devices, dict):
+            self._data["devices"] = {
+                address: key
+                for address, key in devices.items()
+                if isinstance(key, str) and key in self._data["descriptors"]
+            }
+
+    def _save_locked(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self._data, handle, indent=2)
+            handle.write("\n")
+        os.replace(tmp_path, self.path)
@@ -40,6 +40,11 @@ class ControlDescriptor:
         }
 
 
+# DeviceDescriptor.flags: notifications append the module's 32-bit
+# microsecond clock after the report.
+DEVICE_FLAG_TIMESTAMP = 0x01
+
+
 @dataclass
 class DeviceDescriptor:
     protocol_version: int = 1
@@ -48,6 +53,7 @@ class DeviceDescriptor:
     control_count: int = 0
     unique_id: int | None = None
     fw_ver: int | None = None
+    flags: int = 0
     controls: list[ControlDescriptor] = field(default_factory=list)
 
     def to_dict(self) -> dict[str, object]:
@@ -58,6 +64,7 @@ class DeviceDescriptor:
             "control_count": self.control_count or len(self.controls),
             "unique_id": self.unique_id,
             "fw_ver": self.fw_ver,
+            "flags": self.flags,
             "controls": [control.to_dict() for control in self.controls],
         }
 
@@ -68,6 +75,7 @@ TLV_REPORT_BYTES = 0x03
 TLV_CONTROL_COUNT = 0x04
 TLV_UNIQUE_ID = 0x05
 TLV_FW_VER = 0x06
+TLV_DEVICE_FLAGS = 0x07
 TLV_CONTROL_DESC = 0x10
 TLV_CONTROL_LABEL = 0x11
 
@@ -137,6 +145,8 @@ def parse_info_tlv(payload: bytes) -> DeviceDescriptor | None:
             descriptor.unique_id = int.from_bytes(value[:4], "little")
         elif tlv_type == TLV_FW_VER and tlv_len >= 2:
             descriptor.fw_ver = int.from_bytes(value[:2], "little")
+        elif tlv_type == TLV_DEVICE_FLAGS and tlv_len >= 1:
+            descriptor.flags = value[0]
         elif tlv_type == TLV_CONTROL_DESC:
             control = _parse_control_desc(value)
             if control:
@@ -156,3 +166,34 @@ def parse_info_tlv(payload: bytes) -> DeviceDescriptor | None:
         descriptor.control_count = len(controls)
 
     return descriptor
+
+
+def _tlv(tlv_type: int, value: bytes) -> bytes:
+    return bytes((tlv_type, len(value))) + value
+
+
+def encode_info_tlv(descriptor: DeviceDescriptor) -> bytes:
+    """The INFO TLV payload parse_info_tlv reads back as descriptor."""
+    payload = bytearray()
+    payload += _tlv(TLV_PROTO_VER, bytes((descriptor.protocol_version,)))
+    payload += _tlv(TLV_REPORT_FORMAT, bytes((int(descriptor.report_format),)))
+    payload += _tlv(TLV_REPORT_BYTES, descriptor.report_bytes.to_bytes(2, "little"))
+    payload += _tlv(TLV_CONTROL_COUNT, bytes((descriptor.control_count or len(descriptor.controls),)))
+    if descriptor.unique_id is not None:
+        payload += _tlv(TLV_UNIQUE_ID, descriptor.unique_id.to_bytes(4, "little"))
+    if descriptor.fw_ver is not None:
+        payload += _tlv(TLV_FW_VER, descriptor.fw_ver.to_bytes(2, "little"))
+    if descriptor.flags:
+        payload += _tlv(TLV_DEVICE_FLAGS, bytes((descriptor.flags,)))
+    for control in descriptor.controls:
+        if control.fmt == ReportFormat.BITFIELD:
+            location = (control.bit_index or 0, control.bit_width or 1, 0)
+        else:
+            location = (control.byte_offset or 0, control.bit_offset or 0, control.bit_width or 1)
+        payload += _tlv(
+            TLV_CONTROL_DESC,
+            bytes((control.control_id, int(control.control_type), control.flags, int(control.fmt), *location)),
+        )
+        if control.label:
+            payload += _tlv(TLV_CONTROL_LABEL, bytes((control.control_id,)) + control.label.encode("ascii", "ignore"))
+    return bytes(payload)
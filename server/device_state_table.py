@@ -0,0 +1,159 @@
+"""
+Shared-memory table of per-module input states for sharded BLE ingestion.
+
+Each ingestion shard process writes the latest decoded state of the modules
+it owns into that module's slot: the 32-bit button state and, for modules
+with analog controls, their four axis bytes. The aggregator's merge stage
+reads back the slots whose sequence moved. Every slot has a single writer
+(the shard that owns the module), so a state write is a seqlock: the
+sequence word is odd while the state, axes and receive timestamp are stored. The notification
+counters sit outside the seqlock; they only grow, so a reader that catches
+one mid-update simply counts the difference on its next pass.
+
+Slots are a cache line each so shards writing neighbouring modules do not
+contend for the same line.
+"""
+
+from __future__ import annotations
+
+import struct
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+from report_channel import READ_RETRY_LIMIT, attach_shared_memory
+
+
+DEFAULT_STATE_TABLE_SLOTS = 64
+
+# Header: slot count | padding to one cache line
+_U64 = struct.Struct("<Q")
+_HEADER_SIZE = 64
+# Slot: sequence, input_at, state, notifications, duplicates, has_axes, lx, ly, rx, ry
+# | padding to one cache line
+_SLOT = struct.Struct("<QdIIIB4B")
+_SLOT_STATE = struct.Struct("<dI")
+_SLOT_STATE_OFFSET = 8
+_SLOT_COUNTERS = struct.Struct("<II")
+_SLOT_COUNTERS_OFFSET = 20
+_SLOT_AXES = struct.Struct("<B4B")
+_SLOT_AXES_OFFSET = 28
+_NO_AXES = (0, 0, 0, 0, 0)
+_SLOT_SIZE = 64
+_U32_MASK = 0xFFFFFFFF
+
+
+class DeviceStateSnapshot(NamedTuple):
+    sequence: int
+    input_at: float
+    state: int
+    notifications: int
+    duplicates: int
+    axes: tuple[int, int, int, int] | None
+
+
+def _snapshot(fields: tuple) -> DeviceStateSnapshot:
+    return DeviceStateSnapshot(*fields[:5], fields[6:] if fields[5] else None)
+
+
+class DeviceStateTable:
+    """Fixed-size table of per-module states; one writing process per slot."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._buffer = shm.buf
+        self.slot_count = _U64.unpack_from(self._buffer, 0)[0]
+
+    @classmethod
+    def create(cls, slots: int = DEFAULT_STATE_TABLE_SLOTS) -> DeviceStateTable:
+        if slots < 1:
+            raise ValueError("Device state table needs at least one slot")
+        size = _HEADER_SIZE + slots * _SLOT_SIZE
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        _U64.pack_into(shm.buf, 0, slots)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> DeviceStateTable:
+        return cls(attach_shared_memory(name))
+
+    def __reduce__(self):
+        return (DeviceStateTable.attach, (self.name,))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _offset(self, slot: int) -> int:
+        if not 0 <= slot < self.slot_count:
+            raise IndexError(f"device state slot {slot} out of range")
+        return _HEADER_SIZE + slot * _SLOT_SIZE
+
+    def reset(self, slot: int) -> None:
+        """Zero a slot before handing it to a new module; no shard may be writing it."""
+        offset = self._offset(slot)
+        self._buffer[offset : offset + _SLOT_SIZE] = bytes(_SLOT_SIZE)
+
+    def record(
+        self,
+        slot: int,
+        state: int,
+        input_at: float,
+        axes: tuple[int, int, int, int] | None = None,
+    ) -> bool:
+        """
+        Count one notification for the slot. Writer side only.
+
+        Returns True if the state or axes changed, in which case they were
+        stored with input_at and the merge stage should be woken.
+        """
+        buffer = self._buffer
+        offset = _HEADER_SIZE + slot * _SLOT_SIZE
+        fields = _SLOT.unpack_from(buffer, offset)
+        sequence, _input_at, current, notifications, duplicates, has_axes = fields[:6]
+        notifications = (notifications + 1) & _U32_MASK
+        if state == current and axes == (fields[6:] if has_axes else None):
+            _SLOT_COUNTERS.pack_into(
+                buffer, offset + _SLOT_COUNTERS_OFFSET, notifications, (duplicates + 1) & _U32_MASK
+            )
+            return False
+
+        sequence &= ~1
+        _U64.pack_into(buffer, offset, sequence + 1)
+        _SLOT_STATE.pack_into(buffer, offset + _SLOT_STATE_OFFSET, input_at, state)
+        if axes is None:
+            _SLOT_AXES.pack_into(buffer, offset + _SLOT_AXES_OFFSET, *_NO_AXES)
+        else:
+            _SLOT_AXES.pack_into(buffer, offset + _SLOT_AXES_OFFSET, 1, *axes)
+        _U64.pack_into(buffer, offset, sequence + 2)
+        _SLOT_COUNTERS.pack_into(buffer, offset + _SLOT_COUNTERS_OFFSET, notifications, duplicates)
+        return True
+
+    def read(self, slot: int) -> DeviceStateSnapshot | None:
+        """Consistent copy of a slot, or None if the writer kept it busy past the retry limit."""
+        buffer = self._buffer
+        offset = self._offset(slot)
+        for _attempt in range(READ_RETRY_LIMIT):
+            snapshot = _snapshot(_SLOT.unpack_from(buffer, offset))
+            if snapshot.sequence & 1:
+                continue
+            if _U64.unpack_from(buffer, offset)[0] != snapshot.sequence:
+                continue
+            return snapshot
+        return None
+
+    def close(self) -> None:
+        self._buffer = None  # type: ignore[assignment]
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        if not self._owner:
+            return
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
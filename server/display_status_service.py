@@ -9,11 +9,13 @@ import signal
 import subprocess
 import threading
 from dataclasses import dataclass
+from typing import Any
 
 from config_mode_state import ConfigModeState
 from config_network_status import get_config_network_status
 from hid_mode_state import HIDModeState
 from runtime_ipc import get_connected_devices, get_pairing_status
+from state_watcher import StateWatcher
 
 
 logging.basicConfig(
@@ -204,9 +206,12 @@ def run_service(config: DisplayConfig) -> None:
     temperature_available: bool | None = None
     hid_mode_state = HIDModeState()
     config_mode_state = ConfigModeState()
+    # HID/config mode changes redraw immediately; the rest refreshes on poll_interval.
+    watcher = StateWatcher(poll_interval=config.poll_interval)
 
     def _handle_signal(_signum: int, _frame: object) -> None:
         stop_event.set()
+        watcher.wake()
 
     signal.signal(signal.SIGINT, _handle_signal)
     signal.signal(signal.SIGTERM, _handle_signal)
@@ -217,18 +222,40 @@ def run_service(config: DisplayConfig) -> None:
         config.i2c_address,
     )
 
+    hid_mode = "unknown"
+    config_mode_enabled = False
+
+    def _on_hid_mode_changed(state: dict[str, Any]) -> None:
+        nonlocal hid_mode
+        hid_mode = str(state.get("active_mode", "unknown"))
+
+    def _on_config_mode_changed(state: dict[str, Any]) -> None:
+        nonlocal config_mode_enabled
+        config_mode_enabled = bool(state.get("enabled", False))
+
+    try:
+        _on_hid_mode_changed(
+            watcher.watch(hid_mode_state.path, hid_mode_state.load, _on_hid_mode_changed)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to read HID mode: {e}")
+    try:
+        _on_config_mode_changed(
+            watcher.watch(
+                config_mode_state.path,
+                lambda: config_mode_state.load(use_cache=False),
+                _on_config_mode_changed,
+            )
+        )
+    except Exception as e:
+        logger.warning(f"Failed to read config mode status: {e}")
+
     display = StatusDisplay(config)
     try:
         while not stop_event.is_set():
             module_count = len(get_connected_devices())
             temperature_c = read_pi_temperature_c()
 
-            try:
-                hid_mode = hid_mode_state.get_active_mode()
-            except Exception as e:
-                logger.warning(f"Failed to read HID mode: {e}")
-                hid_mode = "unknown"
-
             pairing_enabled = False
             scanner_running = False
             try:
@@ -239,18 +266,15 @@ def run_service(config: DisplayConfig) -> None:
             except Exception as e:
                 logger.warning(f"Failed to read pairing status: {e}")
 
-            config_mode_enabled = False
             config_ssid = None
             config_url = None
-            try:
-                config_mode = config_mode_state.load(use_cache=False)
-                config_mode_enabled = bool(config_mode.get("enabled", False))
-                if config_mode_enabled:
+            if config_mode_enabled:
+                try:
                     network_status = get_config_network_status()
                     config_ssid = network_status.get("ssid")
                     config_url = network_status.get("url")
-            except Exception as e:
-                logger.warning(f"Failed to read config mode status: {e}")
+                except Exception as e:
+                    logger.warning(f"Failed to read config mode status: {e}")
 
             display.render(
                 DisplayState(
@@ -273,8 +297,9 @@ def run_service(config: DisplayConfig) -> None:
                     logger.warning("Unable to read Pi temperature via vcgencmd")
                 temperature_available = is_available
 
-            stop_event.wait(config.poll_interval)
+            watcher.wait(config.poll_interval)
     finally:
+        watcher.close()
         display.close()
         logger.info("Display service stopped")
 
@@ -8,9 +8,11 @@ import sys
 import threading
 import time
 from pathlib import Path
+from typing import Any
 
 from gadget_state import GadgetState
 from hid_mode_state import HIDModeState
+from state_watcher import StateWatcher
 
 
 logging.basicConfig(
@@ -91,23 +93,32 @@ def gadget_mode_manager_main() -> int:
     hid_mode_state = HIDModeState()
     gadget_state = GadgetState()
     stop_event = threading.Event()
+    # Mode changes are file-notified; poll_interval is only the fallback poll.
+    watcher = StateWatcher(poll_interval=poll_interval)
 
     def _handle_signal(_signum: int, _frame: object) -> None:
         stop_event.set()
+        watcher.wake()
 
     signal.signal(signal.SIGINT, _handle_signal)
     signal.signal(signal.SIGTERM, _handle_signal)
 
     current_persona: str | None = None
     last_sequence = -1
-    hid_mode_state.ensure_initialized()
+    latest_state = hid_mode_state.ensure_initialized()
     gadget_state.ensure_initialized()
 
-    logger.info("Starting gadget mode manager with script %s", script_path)
+    def _on_mode_changed(state: dict[str, Any]) -> None:
+        nonlocal latest_state
+        latest_state = state
+
+    watcher.watch(hid_mode_state.path, hid_mode_state.load, _on_mode_changed, initial_state=latest_state)
+
+    logger.info("Starting gadget mode manager with script %s (%s)", script_path, watcher.backend)
 
     while not stop_event.is_set():
         try:
-            state = hid_mode_state.load()
+            state = latest_state
             active_mode = state["active_mode"]
             sequence = int(state.get("sequence", 0))
             target_persona = MODE_TO_PERSONA.get(active_mode, "pc")
@@ -156,13 +167,17 @@ def gadget_mode_manager_main() -> int:
                 last_sequence = sequence
         except subprocess.CalledProcessError as exc:
             logger.error("Gadget rebuild failed: %s", exc)
-            time.sleep(1.0)
+            # Retry the same state after a pause even if no new change arrives.
+            stop_event.wait(1.0)
+            continue
         except Exception as exc:
             logger.error("Gadget mode manager error: %s", exc, exc_info=True)
-            time.sleep(1.0)
+            stop_event.wait(1.0)
+            continue
 
-        stop_event.wait(poll_interval)
+        watcher.wait()
 
+    watcher.close()
     logger.info("Gadget mode manager exiting")
     return 0
 
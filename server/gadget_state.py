@@ -7,6 +7,8 @@ import threading
 from datetime import datetime, timezone
 from typing import Any, Literal, cast
 
+from state_board import StateBoard, get_state_board
+
 
 logger = logging.getLogger("OpenArcade")
 
@@ -25,11 +27,49 @@ def resolve_gadget_state_path() -> str:
 
 
 class GadgetState:
-    def __init__(self, path: str | None = None) -> None:
+    def __init__(self, path: str | None = None, state_board_path: str | None = None) -> None:
         self.path = path or resolve_gadget_state_path()
+        self.state_board_path = state_board_path
         self._lock = threading.RLock()
         self._cache: dict[str, Any] | None = None
 
+    @property
+    def state_board(self) -> StateBoard | None:
+        return get_state_board(self.state_board_path, os.path.dirname(os.path.abspath(self.path)))
+
+    def _sync_state_board(self, state: dict[str, Any], force: bool = False) -> None:
+        # Gadget mode_sequence is not monotonic, so only seed a missing section on load.
+        board = self.state_board
+        if board is None:
+            return
+        try:
+            snapshot = board.read()
+            if force or snapshot is None or snapshot.gadget_persona is None:
+                board.publish_gadget(state["persona"], state["ready"], state["mode_sequence"])
+        except Exception as exc:
+            logger.warning("Failed to update state board with gadget state: %s", exc)
+
+    def reconcile_state_board(self) -> dict[str, Any]:
+        """Load the file and republish it if the board's gadget section disagrees."""
+        with self._lock:
+            state = self.load()
+            board = self.state_board
+            if board is None:
+                return state
+            try:
+                snapshot = board.read()
+            except Exception as exc:
+                logger.warning("Failed to read state board: %s", exc)
+                return state
+            if snapshot is not None and (
+                snapshot.gadget_persona,
+                snapshot.gadget_ready,
+                snapshot.gadget_mode_sequence,
+            ) != (state["persona"], state["ready"], state["mode_sequence"]):
+                logger.info("State board gadget section disagrees with %s; republishing", self.path)
+                self._sync_state_board(state, force=True)
+            return state
+
     def _default_state(self) -> dict[str, Any]:
         return {
             "persona": "pc",
@@ -69,6 +109,7 @@ class GadgetState:
 
             state = self._normalize_state(raw_state)
             self._cache = state
+            self._sync_state_board(state)
             return dict(state)
 
     def save(
@@ -98,6 +139,7 @@ class GadgetState:
                     json.dump(state, handle, indent=2)
                     handle.write("\n")
                 os.replace(tmp_path, self.path)
+                self._sync_state_board(state, force=True)
             finally:
                 try:
                     if os.path.exists(tmp_path):
@@ -19,6 +19,8 @@ from typing import Any, Iterator, Literal, cast
 
 import fcntl
 
+from state_board import StateBoard, get_state_board
+
 
 logger = logging.getLogger("OpenArcade")
 
@@ -55,11 +57,33 @@ class HIDModeState:
     - updated_at: ISO timestamp of last change
     """
 
-    def __init__(self, path: str | None = None) -> None:
+    def __init__(self, path: str | None = None, state_board_path: str | None = None) -> None:
         self.path = path or resolve_hid_mode_path()
+        self.state_board_path = state_board_path
         self._lock = threading.RLock()
         self._cache: dict[str, Any] | None = None
 
+    @property
+    def state_board(self) -> StateBoard | None:
+        return get_state_board(self.state_board_path, os.path.dirname(os.path.abspath(self.path)))
+
+    def _sync_state_board(self, state: dict[str, Any], force: bool = False) -> None:
+        """Mirror state into the shared-memory board if it is missing or older."""
+        board = self.state_board
+        if board is None:
+            return
+        try:
+            snapshot = board.read()
+            if (
+                force
+                or snapshot is None
+                or snapshot.mode is None
+                or snapshot.mode_sequence < state["sequence"]
+            ):
+                board.publish_mode(state["active_mode"], state["sequence"])
+        except Exception as exc:
+            logger.warning("Failed to update state board with HID mode: %s", exc)
+
     def _default_state(self) -> dict[str, Any]:
         """Create default state when file doesn't exist."""
         return {
@@ -201,6 +225,7 @@ class HIDModeState:
 
             state, _changed = self._normalize_state(raw_state)
             self._cache = state
+            self._sync_state_board(state)
             return dict(state)
 
     def save(
@@ -234,6 +259,7 @@ class HIDModeState:
                 }
 
                 self._write_state_unlocked(new_state)
+                self._sync_state_board(new_state, force=True)
 
             # Update cache
             self._cache = new_state
@@ -5,19 +5,29 @@ import os
 import stat
 import sys
 import time
+from collections import deque
 from typing import Any
 
 from gadget_state import GadgetPersona, GadgetState
 from hid_mode_state import HIDMode, HIDModeState
+from latency_trace import STAGE_TOTAL, STAGE_WRITE, LatencyHistograms
+from report_channel import (
+    DEFAULT_REPORTS_PER_POLL,
+    REPORT_POLICY_PRESS_EDGES,
+    ReportPolicy,
+    ReportSnapshot,
+    coalesce_reports,
+)
 from runtime.report_builder import (
     build_gamepad_pc_report,
     build_gamepad_switch_hori_report,
     build_keyboard_report,
 )
+from state_board import STATE_BOARD_RECONCILE_SECONDS, StateBoardSnapshot
+from wakeup import wait_for_wakeups
 
 
 logger = logging.getLogger("OpenArcade")
-SWITCH_TIMING_DEBUG = os.environ.get("OPENARCADE_SWITCH_TIMING_DEBUG", "").lower() in {"1", "true", "yes", "on"}
 
 REPORT_LENGTH_BY_MODE: dict[HIDMode, int] = {
     "keyboard": 8,
@@ -25,10 +35,13 @@ REPORT_LENGTH_BY_MODE: dict[HIDMode, int] = {
     "gamepad_switch_hori": 8,  # 8-byte HID report (USB endpoint size is 64, but report is 8)
 }
 
-MODE_DEVICE_CANDIDATES: dict[HIDMode, tuple[str, ...]] = {
-    "keyboard": ("/dev/hidg0",),
-    "gamepad_pc": ("/dev/hidg1",),
-    "gamepad_switch_hori": ("/dev/hidg0",),
+OPENARCADE_HID_DEVICE_DIR_ENV_VAR = "OPENARCADE_HID_DEVICE_DIR"
+DEFAULT_HID_DEVICE_DIR = "/dev"
+
+MODE_DEVICE_NAMES: dict[HIDMode, tuple[str, ...]] = {
+    "keyboard": ("hidg0",),
+    "gamepad_pc": ("hidg1",),
+    "gamepad_switch_hori": ("hidg0",),
 }
 
 MODE_TAGS: dict[HIDMode, str] = {
@@ -40,6 +53,8 @@ MODE_TAGS: dict[HIDMode, str] = {
 REOPEN_SETTLE_SECONDS = 0.6
 SWITCH_REPORT_REFRESH_SECONDS = 0.005
 DEFAULT_REPORT_WAIT_SECONDS = 0.5
+PENDING_REPORT_RETRY_SECONDS = 0.001
+MAX_PENDING_REPORTS = 64
 MODE_STATE_POLL_SECONDS = 0.1
 GADGET_STATE_REFRESH_SECONDS = 0.25
 MODE_TO_REQUIRED_PERSONA: dict[HIDMode, GadgetPersona] = {
@@ -57,6 +72,23 @@ def set_cpu_affinity(core_id: int) -> None:
         logger.warning("Could not set CPU affinity: %s", exc)
 
 
+def resolve_hid_device_dir() -> str:
+    return os.environ.get(OPENARCADE_HID_DEVICE_DIR_ENV_VAR, DEFAULT_HID_DEVICE_DIR)
+
+
+def resolve_mode_device_candidates(device_dir: str | None = None) -> dict[HIDMode, tuple[str, ...]]:
+    directory = device_dir or resolve_hid_device_dir()
+    return {
+        mode: tuple(os.path.join(directory, name) for name in names)
+        for mode, names in MODE_DEVICE_NAMES.items()
+    }
+
+
+def is_hid_sink(st_mode: int) -> bool:
+    """Gadget endpoints are character devices; FIFOs stand in for them off-device."""
+    return stat.S_ISCHR(st_mode) or stat.S_ISFIFO(st_mode)
+
+
 def _neutral_report_for_mode(mode: HIDMode) -> bytes:
     if mode == "keyboard":
         return build_keyboard_report([])
@@ -78,14 +110,22 @@ def hid_writer_process(
     set_cpu_affinity(cpu_core)
     logger.info("HID Writer Process Started on core %d", cpu_core)
 
-    report_array = mailbox["report_array"]
-    report_version = mailbox["report_version"]
-    last_input_event_shared = mailbox["last_input_event_at"]
-    report_published_at = mailbox["report_published_at"]
-    report_event = mailbox["report_event"]
+    report_ring = mailbox["report_ring"]
+    report_wakeup = mailbox["report_wakeup"]
+    mode_wakeup = mailbox.get("mode_wakeup")
+    latency_histograms: LatencyHistograms | None = mailbox.get("latency_histograms")
+    report_policy: ReportPolicy = mailbox.get("report_policy", REPORT_POLICY_PRESS_EDGES)
+    reports_per_poll: int = mailbox.get("reports_per_poll", DEFAULT_REPORTS_PER_POLL)
+    mode_device_candidates = resolve_mode_device_candidates()
 
     hid_mode_state = HIDModeState()
     gadget_state = GadgetState()
+    # Mode and gadget readiness come from the shared-memory state board with a
+    # single sequence check per wake; JSON is re-read only to reconcile.
+    state_board = hid_mode_state.state_board
+    board_snapshot: StateBoardSnapshot | None = None
+    next_state_file_reconcile_at = time.monotonic() + STATE_BOARD_RECONCILE_SECONDS
+    next_gadget_file_reconcile_at = next_state_file_reconcile_at
     initial_mode_state = hid_mode_state.load()
     current_mode: HIDMode = initial_mode_state["active_mode"]
     last_mode_sequence = initial_mode_state["sequence"]
@@ -94,8 +134,8 @@ def hid_writer_process(
     opened_devices: dict[str, Any] = {}
     current_device = None
     current_device_path: str | None = None
-    last_seen_version = 0
-    pending_report: bytes | None = None
+    # Reports drained from the ring but not yet accepted by the host.
+    pending_reports: deque[ReportSnapshot] = deque(maxlen=MAX_PENDING_REPORTS)
     last_opened_mode: HIDMode | None = None
     current_report: bytes = _neutral_report_for_mode(current_mode)
     last_write_at = 0.0
@@ -104,15 +144,10 @@ def hid_writer_process(
     cached_gadget_ready = False
     cached_gadget_persona: GadgetPersona | None = None
     cached_gadget_mode_sequence = -1
-    writer_debug_last_log_at = time.monotonic()
-    writer_debug_samples = 0
-    writer_debug_publish_to_write_total_ms = 0.0
-    writer_debug_publish_to_write_max_ms = 0.0
-    writer_debug_input_to_write_total_ms = 0.0
-    writer_debug_input_to_write_max_ms = 0.0
-    current_report_version = 0
     last_written_report_version = 0
     next_switch_refresh_at = time.monotonic()
+    # The open endpoint refused the last write (EAGAIN): the host has not polled yet.
+    endpoint_busy = False
 
     def close_all_devices() -> None:
         nonlocal current_device, current_device_path
@@ -128,12 +163,12 @@ def hid_writer_process(
     def open_mode_device(mode: HIDMode):
         nonlocal use_mock, current_device, current_device_path, last_opened_mode
 
-        for path in MODE_DEVICE_CANDIDATES[mode]:
+        for path in mode_device_candidates[mode]:
             try:
                 path_stat = os.stat(path)
-                if not stat.S_ISCHR(path_stat.st_mode):
+                if not is_hid_sink(path_stat.st_mode):
                     logger.warning(
-                        "Refusing to open non-character HID path for %s mode: %s (mode=%o)",
+                        "Refusing to open non-device HID path for %s mode: %s (mode=%o)",
                         mode,
                         path,
                         path_stat.st_mode,
@@ -176,15 +211,37 @@ def hid_writer_process(
         current_device_path = None
         return None
 
+    def read_state_board() -> bool:
+        """Refresh board_snapshot; returns True if the board changed."""
+        nonlocal board_snapshot
+        if state_board is None:
+            return False
+        last_seen_version = board_snapshot.version if board_snapshot is not None else -1
+        snapshot = state_board.read(last_seen_version)
+        if snapshot is None:
+            return False
+        board_snapshot = snapshot
+        return True
+
     def refresh_gadget_state(force: bool = False) -> None:
-        nonlocal last_gadget_state_check_at
+        nonlocal last_gadget_state_check_at, next_gadget_file_reconcile_at
         nonlocal cached_gadget_ready, cached_gadget_persona, cached_gadget_mode_sequence
 
+        read_state_board()
         now = time.monotonic()
-        if not force and (now - last_gadget_state_check_at) < GADGET_STATE_REFRESH_SECONDS:
+        if board_snapshot is not None and board_snapshot.gadget_persona is not None:
+            if now < next_gadget_file_reconcile_at:
+                cached_gadget_ready = board_snapshot.gadget_ready
+                cached_gadget_persona = board_snapshot.gadget_persona  # type: ignore[assignment]
+                cached_gadget_mode_sequence = board_snapshot.gadget_mode_sequence
+                return
+            # The JSON file stays the source of truth; correct the board if something bypassed it.
+            next_gadget_file_reconcile_at = now + STATE_BOARD_RECONCILE_SECONDS
+            state = gadget_state.reconcile_state_board()
+        elif not force and (now - last_gadget_state_check_at) < GADGET_STATE_REFRESH_SECONDS:
             return
-
-        state = gadget_state.load()
+        else:
+            state = gadget_state.load()
         cached_gadget_ready = bool(state.get("ready"))
         persona = state.get("persona")
         cached_gadget_persona = persona if isinstance(persona, str) else None
@@ -216,7 +273,7 @@ def hid_writer_process(
             close_all_devices()
             return None
         if (
-            current_device_path in MODE_DEVICE_CANDIDATES[mode]
+            current_device_path in mode_device_candidates[mode]
             and current_device is not None
             and not current_device.closed
         ):
@@ -237,14 +294,19 @@ def hid_writer_process(
         return True
 
     def _write_to_current_device(mode: HIDMode, target_report: bytes) -> bool:
-        nonlocal current_device, current_device_path
+        nonlocal current_device, current_device_path, endpoint_busy
+        endpoint_busy = False
         if use_mock and current_device is None:
             return _emit_mock_report(mode, target_report)
         if current_device is None:
             logger.debug("No HID device open for %s mode; waiting for reopen", mode)
             return False
         try:
-            current_device.write(target_report)
+            if current_device.write(target_report) is None:
+                # Non-blocking endpoint still holds the previous report; the
+                # host has not polled yet, so keep this one pending.
+                endpoint_busy = True
+                return False
             logger.debug(
                 "HID write ok mode=%s path=%s bytes=%s",
                 mode,
@@ -252,6 +314,9 @@ def hid_writer_process(
                 target_report[:8].hex(),
             )
             return True
+        except BlockingIOError:
+            endpoint_busy = True
+            return False
         except Exception as exc:
             logger.warning("HID write error (%s @ %s): %s", mode, current_device_path, exc)
             if current_device_path is not None:
@@ -278,6 +343,13 @@ def hid_writer_process(
                 return False
         return _write_to_current_device(mode, target_report)
 
+    def record_write_latency(snapshot: ReportSnapshot) -> None:
+        if latency_histograms is None or not snapshot.trace_id:
+            return
+        wrote_at = time.perf_counter()
+        latency_histograms.record(current_mode, STAGE_WRITE, wrote_at - snapshot.published_at, snapshot.trace_id)
+        latency_histograms.record(current_mode, STAGE_TOTAL, wrote_at - snapshot.input_at, snapshot.trace_id)
+
     # Best-effort initial open, but only after gadget manager has marked the persona ready.
     refresh_gadget_state(force=True)
     if gadget_ready_for_mode(current_mode):
@@ -286,27 +358,43 @@ def hid_writer_process(
         logger.warning("No HID interfaces available on startup. Writer will retry dynamically.")
 
     while not stop_event.is_set():
-        wait_timeout = (
-            SWITCH_REPORT_REFRESH_SECONDS
-            if current_mode == "gamepad_switch_hori"
-            else DEFAULT_REPORT_WAIT_SECONDS
-        )
-        report_event.wait(timeout=wait_timeout)
+        now = time.monotonic()
+        # Fast retry only while an open endpoint is waiting for the host to poll;
+        # without one, a pending report waits for a mode wakeup or the default timeout.
+        if pending_reports and endpoint_busy:
+            wait_timeout = PENDING_REPORT_RETRY_SECONDS
+        elif current_mode == "gamepad_switch_hori" and (current_device is not None or use_mock):
+            wait_timeout = next_switch_refresh_at - now
+        else:
+            wait_timeout = DEFAULT_REPORT_WAIT_SECONDS
+        # Wait on "new report" and "mode changed" together; the timeout is the
+        # refresh/retry deadline. Signalled wakeups are drained before we read
+        # the ring, so a publish racing with the drain only re-wakes us once.
+        woken = wait_for_wakeups((report_wakeup, mode_wakeup), wait_timeout)
         if stop_event.is_set():
             break
-
-        # Clear event BEFORE reading version/report to avoid race condition.
-        # If aggregator sets event while we're processing, we'll catch it on
-        # the next iteration because the event will be set again.
-        report_event.clear()
+        mode_signalled = mode_wakeup is not None and mode_wakeup in woken
 
         try:
             now = time.monotonic()
-            if (now - last_mode_check_at) >= MODE_STATE_POLL_SECONDS:
+            board_changed = read_state_board()
+            board_has_mode = board_snapshot is not None and board_snapshot.mode is not None
+            from_file = now >= next_state_file_reconcile_at or (
+                not board_has_mode and (mode_signalled or (now - last_mode_check_at) >= MODE_STATE_POLL_SECONDS)
+            )
+            if from_file or (board_has_mode and (board_changed or mode_signalled)):
                 last_mode_check_at = now
-                mode_state = hid_mode_state.load()
-                mode_sequence = mode_state["sequence"]
-                new_mode: HIDMode = mode_state["active_mode"]
+                new_mode: HIDMode
+                if from_file:
+                    next_state_file_reconcile_at = now + STATE_BOARD_RECONCILE_SECONDS
+                    refresh_gadget_state()  # reconciles the board's gadget section when due
+                    mode_state = hid_mode_state.load()
+                    mode_sequence = mode_state["sequence"]
+                    new_mode = mode_state["active_mode"]
+                else:
+                    assert board_snapshot is not None
+                    mode_sequence = board_snapshot.mode_sequence
+                    new_mode = board_snapshot.mode  # type: ignore[assignment]
                 if mode_sequence < last_mode_sequence:
                     logger.warning(
                         "Ignoring stale HID mode state in writer: %s -> %s (seq: %s -> %s)",
@@ -326,8 +414,8 @@ def hid_writer_process(
                     close_all_devices()
                     current_mode = new_mode
                     current_report = _neutral_report_for_mode(current_mode)
-                    pending_report = current_report
-                    current_report_version = 0
+                    pending_reports.clear()
+                    pending_reports.append(ReportSnapshot(0, current_report, 0.0, 0.0))
                     last_written_report_version = 0
                     last_write_at = 0.0
                     next_switch_refresh_at = time.monotonic()
@@ -341,92 +429,52 @@ def hid_writer_process(
         except Exception as exc:
             logger.error("Error checking HID mode: %s", exc, exc_info=True)
 
-        current_version = report_version.value
-        new_report_available = current_version != last_seen_version
-        if new_report_available:
-            last_seen_version = current_version
-            current_report = bytes(report_array)
-            current_report_version = current_version
-            pending_report = current_report
+        drained = report_ring.drain()
+        if drained:
+            previous_report = pending_reports[-1].report if pending_reports else current_report
+            kept = coalesce_reports(
+                drained,
+                report_policy,
+                current_mode,
+                previous_report,
+                max_per_poll=reports_per_poll,
+            )
+            # A full pending queue drops its oldest entries; count them as coalesced.
+            displaced = max(0, len(pending_reports) + len(kept) - MAX_PENDING_REPORTS)
+            report_ring.record_coalesced(len(drained) - len(kept) + displaced)
+            pending_reports.extend(kept)
 
         now = time.monotonic()
         if current_mode == "gamepad_switch_hori":
             if current_device is None or current_device.closed:
                 ensure_mode_device(current_mode)
 
-            should_write_changed_report = pending_report is not None
+            pending = pending_reports[0] if pending_reports else None
             should_refresh_switch_report = now >= next_switch_refresh_at
-            if not should_write_changed_report and not should_refresh_switch_report:
+            if pending is None and not should_refresh_switch_report:
                 continue
 
-            report_to_write = pending_report if pending_report is not None else current_report
-            write_version = current_report_version if pending_report is not None else last_written_report_version
+            report_to_write = pending.report if pending is not None else current_report
+            write_version = pending.version if pending is not None else last_written_report_version
             wrote = _write_to_current_device(current_mode, _trim_report_for_mode(current_mode, report_to_write))
             if wrote:
                 last_write_at = time.monotonic()
                 next_switch_refresh_at = last_write_at + SWITCH_REPORT_REFRESH_SECONDS
-                if pending_report is not None:
-                    pending_report = None
+                if pending is not None:
+                    pending_reports.popleft()
+                    current_report = pending.report
                     last_written_report_version = write_version
-                    if SWITCH_TIMING_DEBUG and write_version > 0:
-                        published_at = report_published_at.value
-                        input_event_at = last_input_event_shared.value
-                        wrote_at = time.perf_counter()
-                        publish_to_write_ms = 0.0
-                        input_to_write_ms = 0.0
-                        if published_at > 0:
-                            publish_to_write_ms = (wrote_at - published_at) * 1000.0
-                        if input_event_at > 0:
-                            input_to_write_ms = (wrote_at - input_event_at) * 1000.0
-                        writer_debug_samples += 1
-                        writer_debug_publish_to_write_total_ms += publish_to_write_ms
-                        writer_debug_publish_to_write_max_ms = max(
-                            writer_debug_publish_to_write_max_ms,
-                            publish_to_write_ms,
-                        )
-                        writer_debug_input_to_write_total_ms += input_to_write_ms
-                        writer_debug_input_to_write_max_ms = max(
-                            writer_debug_input_to_write_max_ms,
-                            input_to_write_ms,
-                        )
-                        if (now - writer_debug_last_log_at) >= 1.0:
-                            avg_publish_to_write_ms = (
-                                writer_debug_publish_to_write_total_ms / writer_debug_samples
-                                if writer_debug_samples else 0.0
-                            )
-                            avg_input_to_write_ms = (
-                                writer_debug_input_to_write_total_ms / writer_debug_samples
-                                if writer_debug_samples else 0.0
-                            )
-                            logger.info(
-                                "[SWITCH_TIMING][WRITER] samples=%s avg_publish_to_write_ms=%.3f max_publish_to_write_ms=%.3f avg_input_to_write_ms=%.3f max_input_to_write_ms=%.3f last_version=%s last_report=%s",
-                                writer_debug_samples,
-                                avg_publish_to_write_ms,
-                                writer_debug_publish_to_write_max_ms,
-                                avg_input_to_write_ms,
-                                writer_debug_input_to_write_max_ms,
-                                write_version,
-                                report_to_write[:8].hex(),
-                            )
-                            writer_debug_last_log_at = now
-                            writer_debug_samples = 0
-                            writer_debug_publish_to_write_total_ms = 0.0
-                            writer_debug_publish_to_write_max_ms = 0.0
-                            writer_debug_input_to_write_total_ms = 0.0
-                            writer_debug_input_to_write_max_ms = 0.0
-            else:
-                pending_report = report_to_write
+                    record_write_latency(pending)
             continue
 
-        report_to_write = pending_report
-        if report_to_write is None:
-            continue
-
-        if write_report(current_mode, report_to_write):
-            pending_report = None
+        while pending_reports:
+            pending = pending_reports[0]
+            if not write_report(current_mode, pending.report):
+                break
+            pending_reports.popleft()
+            record_write_latency(pending)
+            current_report = pending.report
             last_write_at = time.monotonic()
-        else:
-            pending_report = report_to_write
 
     try:
         write_report(current_mode, _neutral_report_for_mode(current_mode))
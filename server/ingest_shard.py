@@ -0,0 +1,226 @@
+"""
+BLE ingestion shard process for sharded mode (runtime_main --ingest-shards N).
+
+Each shard owns the BLE connections of the modules the aggregator's
+ShardCoordinator places on it. Notifications are decoded and deduplicated
+here and the latest state and axes of each module go into its
+DeviceStateTable slot; only a change signals the merge wakeup, so repeated
+states never wake the aggregator. Modules whose descriptor needs one are
+decoded with the StateDecoder the aggregator sent along, the rest as the
+plain 4-byte state.
+
+The coordinator drives the shard over a duplex pipe of tuples:
+
+  aggregator -> shard: ("connect", address, slot, adapter, decoder),
+                       ("decoder", address, decoder), ("disconnect", address)
+  shard -> aggregator: ("connected", address, ok, error), ("disconnected", address)
+
+A shard reports "disconnected" for every module it loses, whether the
+aggregator asked for it or the link dropped, and exits when stop_event is
+set or the aggregator's end of the pipe closes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Any
+
+from constants import CHAR_UUID
+from device_state_table import DeviceStateTable
+from runtime.state_decoder import AnalogAxes, StateDecoder
+from runtime.transport import BleClient, BleTransport, create_ble_transport
+from wakeup import Wakeup
+
+
+logger = logging.getLogger("OpenArcade")
+
+CONNECT_TIMEOUT_SECONDS = 10.0
+_STATE = struct.Struct("<I")
+
+
+def set_cpu_affinity(core_id: int) -> None:
+    try:
+        os.sched_setaffinity(0, {core_id})
+        logger.info("Pinned to CPU core %d", core_id)
+    except Exception as exc:
+        logger.warning("Could not set CPU affinity: %s", exc)
+
+
+def ingest_shard_process(
+    mailbox: dict[str, Any],
+    link: Any,
+    stop_event: Any,
+    shard_index: int = 0,
+    cpu_core: int | None = None,
+):
+    """Own a subset of BLE connections and feed their states into the shared table."""
+    if cpu_core is not None:
+        set_cpu_affinity(cpu_core)
+    # Drop inherited aggregator ends of earlier shards' pipes so their EOFs still arrive.
+    for other in mailbox.get("shard_links", ()):
+        if other is not link:
+            other.close()
+
+    table: DeviceStateTable = mailbox["state_table"]
+    merge_wakeup: Wakeup = mailbox["merge_wakeup"]
+    transport: BleTransport = mailbox.get("ble_transport") or create_ble_transport()
+    logger.info("Ingestion shard %d started", shard_index)
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        clients: dict[str, BleClient] = {}
+        connecting: dict[str, asyncio.Task] = {}
+        decoders: dict[str, StateDecoder] = {}
+        tasks: set[asyncio.Task] = set()
+
+        def send(*message: Any) -> None:
+            try:
+                link.send(message)
+            except (BrokenPipeError, EOFError, OSError):
+                stopped.set()  # the aggregator is gone
+
+        def make_handler(address: str, slot: int):
+            record = table.record
+
+            def handler(_sender: Any, data: bytearray) -> None:
+                decoder = decoders.get(address)
+                axes: AnalogAxes | None = None
+                if decoder is None:
+                    if len(data) < 4:
+                        return
+                    state = _STATE.unpack_from(data)[0]
+                else:
+                    decoded = decoder.decode(data)
+                    if decoded is None:
+                        return
+                    state, axes = decoded
+                if record(slot, state, time.perf_counter(), axes):
+                    merge_wakeup.set()
+            return handler
+
+        def set_decoder(address: str, decoder: StateDecoder | None) -> None:
+            if decoder is None:
+                decoders.pop(address, None)
+            else:
+                decoders[address] = decoder
+
+        async def connect(address: str, slot: int, adapter: str | None) -> None:
+            def on_disconnect(client: BleClient) -> None:
+                if clients.get(address) is client:
+                    del clients[address]
+                    send("disconnected", address)
+
+            client = transport.create_client(
+                address,
+                disconnected_callback=on_disconnect,
+                timeout=CONNECT_TIMEOUT_SECONDS,
+                adapter=adapter,
+            )
+            try:
+                await client.connect()
+                await client.start_notify(CHAR_UUID, make_handler(address, slot))
+                if not client.is_connected:
+                    raise ConnectionError(f"{address} dropped during setup")
+            except asyncio.CancelledError:
+                # The coordinator gave up on this connect; it expects no reply.
+                await _disconnect_quietly(client)
+                raise
+            except Exception as exc:
+                await _disconnect_quietly(client)
+                send("connected", address, False, str(exc) or type(exc).__name__)
+                return
+            finally:
+                connecting.pop(address, None)
+            clients[address] = client
+            send("connected", address, True, None)
+
+        async def disconnect(address: str) -> None:
+            task = connecting.get(address)
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            client = clients.get(address)
+            if client is None:
+                send("disconnected", address)
+                return
+            await _disconnect_quietly(client)
+            # Not every transport calls the disconnect callback for a local disconnect.
+            if clients.get(address) is client:
+                del clients[address]
+                send("disconnected", address)
+
+        def spawn(coroutine: Any) -> asyncio.Task:
+            task = loop.create_task(coroutine)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            return task
+
+        def read_link() -> None:
+            while True:
+                try:
+                    if not link.poll():
+                        return
+                    message = link.recv()
+                except (EOFError, OSError):
+                    loop.remove_reader(link.fileno())
+                    stopped.set()
+                    return
+                command = message[0]
+                if command == "connect":
+                    _command, address, slot, adapter, decoder = message
+                    set_decoder(address, decoder)
+                    connecting[address] = spawn(connect(address, slot, adapter))
+                elif command == "decoder":
+                    set_decoder(message[1], message[2])
+                elif command == "disconnect":
+                    spawn(disconnect(message[1]))
+                else:
+                    logger.warning("Unknown shard command: %s", command)
+
+        def wait_for_stop() -> None:
+            stop_event.wait()
+            try:
+                loop.call_soon_threadsafe(stopped.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+        loop.add_reader(link.fileno(), read_link)
+        threading.Thread(target=wait_for_stop, name=f"IngestShard{shard_index}Stop", daemon=True).start()
+        try:
+            await stopped.wait()
+        finally:
+            try:
+                loop.remove_reader(link.fileno())
+            except (OSError, ValueError):
+                pass
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(
+                *(disconnect(address) for address in list(clients)),
+                return_exceptions=True,
+            )
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        logger.exception("Ingestion shard %d crashed", shard_index)
+    finally:
+        link.close()
+        logger.info("Ingestion shard %d exiting", shard_index)
+
+
+async def _disconnect_quietly(client: BleClient) -> None:
+    try:
+        if client.is_connected:
+            await client.disconnect()
+    except Exception as exc:
+        logger.warning("Disconnect cleanup failed for %s: %s", client.address, exc)
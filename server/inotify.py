@@ -0,0 +1,88 @@
+"""
+Minimal Linux inotify binding through ctypes.
+
+Used by StateWatcher, which watches the directories holding state files
+rather than the files themselves, because writers replace files
+atomically and the watched inode changes on every save.
+
+Inotify() raises OSError where inotify cannot be used; callers fall back
+to polling.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+_INOTIFY_READ_BYTES = 64 * 1024
+
+InotifyEvent = tuple[int, int, str]  # wd, mask, name
+
+
+def inotify_available() -> bool:
+    return hasattr(ctypes, "CDLL") and os.path.isdir("/proc/sys/fs/inotify")
+
+
+class Inotify:
+    """A non-blocking inotify fd; select on fd, then drain with read_events()."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify not supported by libc")
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.fd = fd
+
+    def add_watch(self, directory: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), directory)
+        return wd
+
+    def read_events(self) -> list[InotifyEvent]:
+        """Every queued event; an IN_Q_OVERFLOW event means some were lost."""
+        events: list[InotifyEvent] = []
+        while True:
+            try:
+                data = os.read(self.fd, _INOTIFY_READ_BYTES)
+            except BlockingIOError:
+                return events
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                return events
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                wd, mask, _cookie, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset : offset + name_length].rstrip(b"\0"))
+                offset += name_length
+                events.append((wd, mask, name))
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
@@ -0,0 +1,336 @@
+"""
+Binary recording of the raw BLE input stream, for reproducing field reports.
+
+InputRecorder sits in the aggregator's notification handler. Each record is
+a fixed 16-byte struct: monotonic timestamp in ns, device index, record
+kind and the 32-bit state word (or the HID mode index for mode switches).
+The handler only appends a tuple to a deque; a background thread packs
+pending records and writes them into a ring file, so a long session keeps
+the most recent `capacity` records in bounded space.
+
+File layout: header | device address table | record ring. The header's
+`written` counter is updated after the records it covers, so a recording
+can be read while the aggregator is still writing it.
+
+replay_reports() feeds a recording through a StateReducer, optionally at
+the recorded pace, and diff_reports() compares two replays.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any, NamedTuple
+
+from hid_mode_state import VALID_HID_MODES
+from runtime.report_builder import build_mapping_cache
+from runtime.state_reducer import HIDMode, StateReducer
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_INPUT_RECORDING_PATH_ENV_VAR = "OPENARCADE_INPUT_RECORDING_PATH"
+OPENARCADE_INPUT_RECORDING_CAPACITY_ENV_VAR = "OPENARCADE_INPUT_RECORDING_CAPACITY"
+DEFAULT_RECORDING_CAPACITY = 1 << 18  # records; 4 MiB of ring
+RECORDING_FLUSH_INTERVAL_SECONDS = 0.05
+MAX_PENDING_RECORDS = 1 << 16
+
+RECORDING_MAGIC = b"OAIR"
+RECORDING_VERSION = 1
+
+RECORD_STATE = 0
+RECORD_MODE = 1
+
+# Header: magic, version, record size, capacity, device count, written
+_HEADER = struct.Struct("<4sHHIIQ")
+_RECORD = struct.Struct("<QHHI")
+_DEVICE_SLOT_SIZE = 32
+MAX_RECORDED_DEVICES = 64
+_DEVICE_TABLE_OFFSET = _HEADER.size
+_RECORDS_OFFSET = 4096
+
+RECORD_SIZE = _RECORD.size
+
+
+class InputRecord(NamedTuple):
+    timestamp_ns: int
+    device_index: int
+    kind: int
+    value: int
+
+
+class Recording(NamedTuple):
+    devices: tuple[str, ...]
+    records: list[InputRecord]
+
+    def initial_mode(self) -> HIDMode | None:
+        """Mode recorded before the first state, if the recording starts with one."""
+        for record in self.records:
+            if record.kind != RECORD_MODE:
+                return None
+            if record.value < len(VALID_HID_MODES):
+                return VALID_HID_MODES[record.value]
+        return None
+
+    def device_traces(self) -> list[list[int]]:
+        """Per-device state sequences, in device index order."""
+        traces: list[list[int]] = [[] for _ in self.devices]
+        for record in self.records:
+            if record.kind == RECORD_STATE and record.device_index < len(traces):
+                traces[record.device_index].append(record.value)
+        return traces
+
+
+class ReplayedReport(NamedTuple):
+    offset_ns: int  # from the first record
+    address: str
+    report: bytes
+
+
+class ReportDifference(NamedTuple):
+    index: int
+    expected: ReplayedReport | None
+    actual: ReplayedReport | None
+
+
+def resolve_input_recording_path() -> str | None:
+    """Recording is off unless OPENARCADE_INPUT_RECORDING_PATH names a file."""
+    return os.environ.get(OPENARCADE_INPUT_RECORDING_PATH_ENV_VAR) or None
+
+
+def resolve_input_recording_capacity() -> int:
+    raw = os.environ.get(OPENARCADE_INPUT_RECORDING_CAPACITY_ENV_VAR)
+    if not raw:
+        return DEFAULT_RECORDING_CAPACITY
+    try:
+        capacity = int(raw)
+    except ValueError:
+        logger.warning(
+            "Invalid %s='%s', using %d",
+            OPENARCADE_INPUT_RECORDING_CAPACITY_ENV_VAR,
+            raw,
+            DEFAULT_RECORDING_CAPACITY,
+        )
+        return DEFAULT_RECORDING_CAPACITY
+    return max(capacity, 1)
+
+
+class InputRecorder:
+    """Appends input records to a ring file from a background thread."""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_RECORDING_CAPACITY) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.dropped = 0
+        self._device_indexes: dict[str, int] = {}
+        self._devices: list[str] = []
+        self._pending: deque[tuple[int, int, int, int]] = deque()
+        self._written = 0
+        self._flushed_devices = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, _RECORDS_OFFSET + capacity * RECORD_SIZE)
+        self._write_header()
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="InputRecorder", daemon=True)
+        self._thread.start()
+
+    def record_state(self, address: str, state: int) -> None:
+        index = self._device_indexes.get(address)
+        if index is None:
+            index = self._add_device(address)
+            if index is None:
+                self.dropped += 1
+                return
+        if len(self._pending) >= MAX_PENDING_RECORDS:
+            self.dropped += 1
+            return
+        self._pending.append((time.monotonic_ns(), index, RECORD_STATE, state))
+
+    def record_mode(self, mode: HIDMode) -> None:
+        self._pending.append((time.monotonic_ns(), 0, RECORD_MODE, VALID_HID_MODES.index(mode)))
+
+    def flush(self) -> int:
+        """Write pending records to the ring file; returns how many were written."""
+        pending = self._pending
+        count = len(pending)
+        if not count:
+            return 0
+        buffer = bytearray(count * RECORD_SIZE)
+        pack_into = _RECORD.pack_into
+        for offset in range(0, count * RECORD_SIZE, RECORD_SIZE):
+            pack_into(buffer, offset, *pending.popleft())
+        if count > self.capacity:
+            buffer = buffer[-self.capacity * RECORD_SIZE :]
+        position = self._written + count - len(buffer) // RECORD_SIZE
+        view = memoryview(buffer)
+        while view:
+            slot = position % self.capacity
+            chunk = view[: (self.capacity - slot) * RECORD_SIZE]
+            os.pwrite(self._fd, chunk, _RECORDS_OFFSET + slot * RECORD_SIZE)
+            position += len(chunk) // RECORD_SIZE
+            view = view[len(chunk) :]
+        self._written += count
+        self._write_header()
+        return count
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.flush()
+        os.close(self._fd)
+
+    def _add_device(self, address: str) -> int | None:
+        if len(self._devices) >= MAX_RECORDED_DEVICES:
+            return None
+        index = len(self._devices)
+        self._devices.append(address)
+        self._device_indexes[address] = index
+        return index
+
+    def _write_header(self) -> None:
+        devices = self._devices[self._flushed_devices :]
+        for index, address in enumerate(devices, start=self._flushed_devices):
+            slot = address.encode("utf-8")[:_DEVICE_SLOT_SIZE].ljust(_DEVICE_SLOT_SIZE, b"\0")
+            os.pwrite(self._fd, slot, _DEVICE_TABLE_OFFSET + index * _DEVICE_SLOT_SIZE)
+        self._flushed_devices += len(devices)
+        header = _HEADER.pack(
+            RECORDING_MAGIC,
+            RECORDING_VERSION,
+            RECORD_SIZE,
+            self.capacity,
+            self._flushed_devices,
+            self._written,
+        )
+        os.pwrite(self._fd, header, 0)
+
+    def _run(self) -> None:
+        while not self._stop.wait(RECORDING_FLUSH_INTERVAL_SECONDS):
+            try:
+                self.flush()
+            except OSError as exc:
+                logger.error("Input recording flush failed: %s", exc)
+                return
+
+
+def read_recording(path: str) -> Recording:
+    """Load a recording, oldest record first."""
+    with open(path, "rb") as handle:
+        data = handle.read()
+    if len(data) < _RECORDS_OFFSET:
+        raise ValueError(f"{path} is too short to be an input recording")
+    magic, version, record_size, capacity, device_count, written = _HEADER.unpack_from(data, 0)
+    if magic != RECORDING_MAGIC:
+        raise ValueError(f"{path} is not an input recording")
+    if version != RECORDING_VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"Unsupported input recording version {version} (record size {record_size})")
+    devices = tuple(
+        data[offset : offset + _DEVICE_SLOT_SIZE].rstrip(b"\0").decode("utf-8")
+        for offset in range(
+            _DEVICE_TABLE_OFFSET,
+            _DEVICE_TABLE_OFFSET + device_count * _DEVICE_SLOT_SIZE,
+            _DEVICE_SLOT_SIZE,
+        )
+    )
+    count = min(written, capacity)
+    first = written % capacity if written > capacity else 0
+    records = [
+        InputRecord(*_RECORD.unpack_from(data, _RECORDS_OFFSET + ((first + index) % capacity) * RECORD_SIZE))
+        for index in range(count)
+    ]
+    return Recording(devices, records)
+
+
+def iter_paced(records: Sequence[InputRecord], speed: float | None = None) -> Iterator[InputRecord]:
+    """Yield records, sleeping to keep the recorded spacing divided by speed."""
+    if not records:
+        return
+    if not speed:
+        yield from records
+        return
+    first_ns = records[0].timestamp_ns
+    started_ns = time.monotonic_ns()
+    for record in records:
+        due_ns = started_ns + int((record.timestamp_ns - first_ns) / speed)
+        delay_ns = due_ns - time.monotonic_ns()
+        if delay_ns > 0:
+            time.sleep(delay_ns / 1_000_000_000)
+        yield record
+
+
+def replay_reports(
+    recording: Recording,
+    config_snapshot: Mapping[str, Any],
+    mode: HIDMode = "keyboard",
+    speed: float | None = None,
+    follow_mode_changes: bool = True,
+) -> list[ReplayedReport]:
+    """Run a recording through a fresh StateReducer and collect the changed reports.
+
+    Duplicate states and unchanged reports are dropped exactly as the
+    aggregator drops them. Recorded mode switches rebuild the mapping cache
+    and switch the reducer, as the aggregator does, unless
+    follow_mode_changes is False.
+    """
+    reducer = StateReducer(build_mapping_cache(config_snapshot, mode=mode), mode=mode)
+    device_states: dict[str, int] = {}
+    last_report = reducer.build_report()
+    reports: list[ReplayedReport] = []
+    if not recording.records:
+        return reports
+    first_ns = recording.records[0].timestamp_ns
+    devices = recording.devices
+    for record in iter_paced(recording.records, speed):
+        if record.kind == RECORD_MODE:
+            if not follow_mode_changes or record.value >= len(VALID_HID_MODES):
+                continue
+            mode = VALID_HID_MODES[record.value]
+            reducer.set_mapping_cache(build_mapping_cache(config_snapshot, mode=mode))
+            report = reducer.set_mode(mode)
+            address = ""
+        else:
+            address = devices[record.device_index]
+            if device_states.get(address) == record.value:
+                continue
+            device_states[address] = record.value
+            report = reducer.update_device_state(address, record.value)
+        if report is not None and report != last_report:
+            last_report = report
+            reports.append(ReplayedReport(record.timestamp_ns - first_ns, address, report))
+    return reports
+
+
+def diff_reports(
+    expected: Sequence[ReplayedReport],
+    actual: Sequence[ReplayedReport],
+    limit: int | None = None,
+) -> list[ReportDifference]:
+    """Position-by-position differences in address or report bytes."""
+    differences: list[ReportDifference] = []
+    for index in range(max(len(expected), len(actual))):
+        left = expected[index] if index < len(expected) else None
+        right = actual[index] if index < len(actual) else None
+        if (
+            left is not None
+            and right is not None
+            and left.report == right.report
+            and left.address == right.address
+        ):
+            continue
+        differences.append(ReportDifference(index, left, right))
+        if limit is not None and len(differences) >= limit:
+            break
+    return differences
@@ -0,0 +1,228 @@
+"""
+Replay an input recording made with OPENARCADE_INPUT_RECORDING_PATH.
+
+By default the recording is run through a StateReducer built from a config
+file and the produced reports are printed, saved (--save) or diffed against
+a previous replay (--expect); the exit status is 1 when they differ.
+
+With --pipeline the reports are also published, at the recorded pace
+scaled by --speed, to a forked hid_writer_process writing into a
+SimulatedHidGadget, and the writer's latency histograms and the reports
+the emulated host actually read are printed.
+
+Run from the server directory:
+
+    python -m input_replay recording.bin [--config config.json]
+        [--mode keyboard] [--speed 1.0] [--save reports.jsonl]
+        [--expect reports.jsonl] [--pipeline] [--host-poll-ms 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from device_config_store import DeviceConfigStore
+from gadget_state import OPENARCADE_GADGET_STATE_PATH_ENV_VAR, GadgetState
+from hid_mode_state import OPENARCADE_HID_MODE_PATH_ENV_VAR, VALID_HID_MODES, HIDModeState
+from hid_writer import (
+    MODE_DEVICE_NAMES,
+    MODE_TO_REQUIRED_PERSONA,
+    OPENARCADE_HID_DEVICE_DIR_ENV_VAR,
+    hid_writer_process,
+)
+from input_recording import ReplayedReport, diff_reports, read_recording, replay_reports
+from latency_trace import LatencyHistograms, next_trace_id
+from report_channel import ReportRing
+from runtime.state_reducer import HIDMode
+from simulated_hidg import SimulatedHidGadget
+from state_board import OPENARCADE_STATE_BOARD_PATH_ENV_VAR
+from wakeup import Wakeup
+
+
+MAX_PRINTED_DIFFERENCES = 20
+WRITER_START_TIMEOUT_SECONDS = 5.0
+WRITER_DRAIN_SECONDS = 0.5
+
+
+def save_reports(path: str, reports: Sequence[ReplayedReport]) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        for report in reports:
+            handle.write(
+                json.dumps({"offset_ns": report.offset_ns, "address": report.address, "report": report.report.hex()})
+            )
+            handle.write("\n")
+
+
+def load_reports(path: str) -> list[ReplayedReport]:
+    with open(path, encoding="utf-8") as handle:
+        return [
+            ReplayedReport(entry["offset_ns"], entry["address"], bytes.fromhex(entry["report"]))
+            for entry in map(json.loads, filter(str.strip, handle))
+        ]
+
+
+def replay_through_writer(
+    reports: Sequence[ReplayedReport],
+    mode: HIDMode,
+    speed: float | None = None,
+    host_poll_interval: float = 0.001,
+) -> dict[str, Any]:
+    """Publish replayed reports to a real HID writer process feeding an emulated gadget."""
+    context = multiprocessing.get_context("fork")
+    report_ring = ReportRing.create()
+    latency_histograms = LatencyHistograms.create()
+    report_wakeup = Wakeup()
+    stop_event = context.Event()
+    mailbox = {
+        "report_ring": report_ring,
+        "report_wakeup": report_wakeup,
+        "latency_histograms": latency_histograms,
+    }
+    endpoint = MODE_DEVICE_NAMES[mode][0]
+    previous_environment = dict(os.environ)
+    writer = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ.update(
+            {
+                OPENARCADE_HID_DEVICE_DIR_ENV_VAR: tmpdir,
+                OPENARCADE_HID_MODE_PATH_ENV_VAR: os.path.join(tmpdir, "hid_mode.json"),
+                OPENARCADE_GADGET_STATE_PATH_ENV_VAR: os.path.join(tmpdir, "gadget_state.json"),
+                OPENARCADE_STATE_BOARD_PATH_ENV_VAR: os.path.join(tmpdir, "state_board"),
+            }
+        )
+        gadget = SimulatedHidGadget(os.path.join(tmpdir, endpoint), poll_interval=host_poll_interval)
+        try:
+            gadget.start()
+            mode_state = HIDModeState().save(mode, source="input_replay")
+            GadgetState().save(MODE_TO_REQUIRED_PERSONA[mode], True, mode_state["sequence"])
+            writer = context.Process(target=hid_writer_process, args=(mailbox, stop_event, 0), name="HIDWriter")
+            writer.start()
+            # The writer's neutral report shows it has the endpoint open.
+            if not gadget.wait_for_reads(1, timeout=WRITER_START_TIMEOUT_SECONDS):
+                raise RuntimeError("HID writer did not open the simulated gadget")
+            reads_before = len(gadget.reads)
+
+            trace_id = 0
+            started = time.perf_counter()
+            for report in reports:
+                if speed:
+                    delay = started + report.offset_ns / 1_000_000_000 / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                published_at = time.perf_counter()
+                trace_id = next_trace_id(trace_id)
+                report_ring.publish(report.report, input_at=published_at, published_at=published_at, trace_id=trace_id)
+                report_wakeup.set()
+            time.sleep(WRITER_DRAIN_SECONDS)
+            host_reads = gadget.reads[reads_before:]
+            summary = latency_histograms.summary().get(mode, {})
+            ring_stats = report_ring.stats()
+        finally:
+            stop_event.set()
+            report_wakeup.set()
+            if writer is not None:
+                writer.join(timeout=5.0)
+                if writer.is_alive():
+                    writer.terminate()
+                    writer.join()
+            gadget.close()
+            os.environ.clear()
+            os.environ.update(previous_environment)
+            report_ring.close()
+            report_ring.unlink()
+            latency_histograms.close()
+            latency_histograms.unlink()
+            report_wakeup.close()
+
+    # Reports the host never saw, matching host reads in order against what was published.
+    skipped = 0
+    read_index = 0
+    for report in reports:
+        if read_index < len(host_reads) and host_reads[read_index].report == report.report:
+            read_index += 1
+        else:
+            skipped += 1
+    return {
+        "published": len(reports),
+        "host_reads": len(host_reads),
+        "coalesced": ring_stats["coalesced"],
+        "overflow": ring_stats["overflow"],
+        "skipped": skipped,
+        "final_report_delivered": bool(host_reads) and bool(reports) and host_reads[-1].report == reports[-1].report,
+        "latency": summary,
+    }
+
+
+def _describe(report: ReplayedReport | None) -> str:
+    if report is None:
+        return "-"
+    return f"{report.offset_ns / 1_000_000:.3f}ms {report.address or '<mode>'} {report.report.hex()}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded BLE input stream")
+    parser.add_argument("recording")
+    parser.add_argument("--config", help="device config used to build the mapping (default: runtime config)")
+    parser.add_argument("--mode", choices=VALID_HID_MODES, help="replay in this mode instead of the recorded one(s)")
+    parser.add_argument("--speed", type=float, default=0.0, help="1.0 = recorded pace, 0 = as fast as possible")
+    parser.add_argument("--save", help="write the produced reports as JSON lines")
+    parser.add_argument("--expect", help="diff against reports saved by an earlier --save")
+    parser.add_argument("--pipeline", action="store_true", help="also drive the HID writer with a simulated gadget")
+    parser.add_argument("--host-poll-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    recording = read_recording(args.recording)
+    mode: HIDMode = args.mode or recording.initial_mode() or "keyboard"
+    config_snapshot = DeviceConfigStore(path=args.config).load()
+    reports = replay_reports(
+        recording,
+        config_snapshot,
+        mode=mode,
+        speed=None if args.pipeline else args.speed,
+        # An explicit --mode holds for the whole replay, and the pipeline
+        # writer stays on one endpoint.
+        follow_mode_changes=args.mode is None and not args.pipeline,
+    )
+    result: dict[str, Any] = {
+        "devices": len(recording.devices),
+        "records": len(recording.records),
+        "duration_s": (
+            (recording.records[-1].timestamp_ns - recording.records[0].timestamp_ns) / 1_000_000_000
+            if recording.records
+            else 0.0
+        ),
+        "mode": mode,
+        "reports": len(reports),
+    }
+    if args.save:
+        save_reports(args.save, reports)
+
+    status = 0
+    if args.expect:
+        differences = diff_reports(load_reports(args.expect), reports)
+        result["differences"] = len(differences)
+        for difference in differences[:MAX_PRINTED_DIFFERENCES]:
+            print(
+                f"#{difference.index}: expected {_describe(difference.expected)}"
+                f" | got {_describe(difference.actual)}",
+                file=sys.stderr,
+            )
+        status = 1 if differences else 0
+
+    if args.pipeline:
+        result["pipeline"] = replay_through_writer(reports, mode, args.speed, args.host_poll_ms / 1000.0)
+
+    print(json.dumps(result, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
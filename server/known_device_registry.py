@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from copy import deepcopy
+from datetime import datetime, timezone
+from typing import Any
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_KNOWN_DEVICES_PATH_ENV_VAR = "OPENARCADE_KNOWN_DEVICES_PATH"
+KNOWN_DEVICES_FILENAME = "known_devices.json"
+KNOWN_DEVICES_SCHEMA_VERSION = 1
+
+
+def resolve_known_devices_path(config_path: str) -> str:
+    """Next to the device config unless OPENARCADE_KNOWN_DEVICES_PATH says otherwise."""
+    return os.environ.get(
+        OPENARCADE_KNOWN_DEVICES_PATH_ENV_VAR,
+        os.path.join(os.path.dirname(os.path.abspath(config_path)), KNOWN_DEVICES_FILENAME),
+    )
+
+
+class KnownDeviceRegistry:
+    """
+    Modules that have connected before, with their last successful connect parameters.
+
+    Kept in its own file beside the device config so recording a connect
+    does not touch the config mtime and trigger a mapping cache rebuild.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict[str, Any] = self._default_state()
+        self._loaded = False
+
+    def _default_state(self) -> dict[str, Any]:
+        return {"schema_version": KNOWN_DEVICES_SCHEMA_VERSION, "devices": {}}
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            self._load_locked()
+            return deepcopy(self._data["devices"])
+
+    def addresses(self) -> list[str]:
+        """Known addresses, most recently connected first."""
+        with self._lock:
+            self._load_locked()
+            devices = self._data["devices"]
+            return sorted(devices, key=lambda address: devices[address].get("last_connected_at", ""), reverse=True)
+
+    def get(self, address: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._load_locked()
+            entry = self._data["devices"].get(address)
+            return dict(entry) if entry is not None else None
+
+    def record_connect(
+        self,
+        address: str,
+        name: str | None = None,
+        rssi: int | None = None,
+        adapter: str | None = None,
+        connect_seconds: float | None = None,
+    ) -> dict[str, Any]:
+        with self._lock:
+            self._load_locked()
+            entry = dict(self._data["devices"].get(address, {}))
+            entry["address"] = address
+            if name:
+                entry["name"] = name
+            if rssi is not None:
+                entry["rssi"] = rssi
+            if adapter:
+                entry["adapter"] = adapter
+            if connect_seconds is not None:
+                entry["connect_seconds"] = round(connect_seconds, 4)
+            entry["connect_count"] = int(entry.get("connect_count", 0)) + 1
+            entry["last_connected_at"] = datetime.now(timezone.utc).isoformat()
+            self._data["devices"][address] = entry
+            self._save_locked()
+            return dict(entry)
+
+    def forget(self, address: str) -> bool:
+        with self._lock:
+            self._load_locked()
+            if self._data["devices"].pop(address, None) is None:
+                return False
+            self._save_locked()
+            return True
+
+    def _load_locked(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Ignoring unreadable known device registry %s: %s", self.path, exc)
+            return
+        if isinstance(data, dict) and isinstance(data.get("devices"), dict):
+            self._data = {
+                "schema_version": KNOWN_DEVICES_SCHEMA_VERSION,
+                "devices": {
+                    address: entry for address, entry in data["devices"].items() if isinstance(entry, dict)
+                },
+            }
+
+    def _save_locked(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self._data, handle, indent=2)
+            handle.write("\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,183 @@
+"""
+End-to-end input latency histograms shared by the aggregator and HID writer.
+
+Every BLE notification gets a trace ID and perf_counter timestamps at
+receive, reduce-complete, publish and hidg-write-complete. Stage durations
+land in fixed-bucket log-linear (HDR-style) histograms, one per mode and
+stage, kept in shared memory so both processes contribute to the same
+table. Each histogram has a single writing process, so recording is a few
+plain array updates with no locking; readers may see a sample counted in a
+bucket before the total moves, which percentiles tolerate.
+
+Buckets are exact below 16 us and then split every power of two into 16
+linear sub-buckets, so any recorded value is within ~6% of its bucket.
+"""
+
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Any
+
+from report_channel import attach_shared_memory
+
+
+LATENCY_MODES: tuple[str, ...] = ("keyboard", "gamepad_pc", "gamepad_switch_hori")
+
+STAGE_REDUCE = 0  # receive -> reduce complete
+STAGE_PUBLISH = 1  # reduce complete -> published to the report ring
+STAGE_WRITE = 2  # published -> hidg write complete
+STAGE_TOTAL = 3  # receive -> hidg write complete
+LATENCY_STAGES: tuple[str, ...] = ("reduce", "publish", "write", "total")
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+MAX_TRACKED_US = (1 << 27) - 1  # ~134 s; larger samples clamp into the top bucket
+BUCKET_COUNT = (MAX_TRACKED_US.bit_length() - SUB_BUCKET_BITS + 1) * SUB_BUCKET_COUNT
+
+# Per histogram: count, sum_us, max_us, max_trace_id | buckets
+_COUNT = 0
+_SUM = 1
+_MAX = 2
+_MAX_TRACE = 3
+_HEADER_WORDS = 4
+_HISTOGRAM_WORDS = _HEADER_WORDS + BUCKET_COUNT
+_HISTOGRAM_COUNT = len(LATENCY_MODES) * len(LATENCY_STAGES)
+_TABLE_SIZE = _HISTOGRAM_COUNT * _HISTOGRAM_WORDS * 8
+
+REPORTED_PERCENTILES: tuple[tuple[str, float], ...] = (
+    ("p50", 0.50),
+    ("p90", 0.90),
+    ("p99", 0.99),
+    ("p999", 0.999),
+)
+
+_MODE_INDEX = {mode: index for index, mode in enumerate(LATENCY_MODES)}
+
+
+def bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKET_COUNT:
+        return max(value_us, 0)
+    if value_us > MAX_TRACKED_US:
+        value_us = MAX_TRACKED_US
+    shift = value_us.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKET_COUNT + (value_us >> shift) - SUB_BUCKET_COUNT
+
+
+def bucket_upper_bound(index: int) -> int:
+    """Largest value in microseconds that maps to the bucket."""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    sub_bucket = index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT
+    return ((sub_bucket + 1) << shift) - 1
+
+
+def next_trace_id(trace_id: int) -> int:
+    """Advance a 32-bit trace ID, skipping 0 which means "untraced"."""
+    return trace_id + 1 if trace_id < 0xFFFFFFFF else 1
+
+
+class LatencyHistograms:
+    """Per-mode, per-stage latency histograms in shared memory."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._words = shm.buf[:_TABLE_SIZE].cast("Q")
+
+    @classmethod
+    def create(cls) -> LatencyHistograms:
+        shm = shared_memory.SharedMemory(create=True, size=_TABLE_SIZE)
+        shm.buf[:_TABLE_SIZE] = bytes(_TABLE_SIZE)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> LatencyHistograms:
+        return cls(attach_shared_memory(name))
+
+    def __reduce__(self):
+        return (LatencyHistograms.attach, (self.name,))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def record(self, mode: str, stage: int, seconds: float, trace_id: int = 0) -> None:
+        """Record one stage duration. Each stage must have a single writing process."""
+        mode_index = _MODE_INDEX.get(mode)
+        if mode_index is None:
+            return
+        value_us = int(seconds * 1_000_000.0)
+        if value_us < 0:
+            value_us = 0
+        words = self._words
+        base = (mode_index * len(LATENCY_STAGES) + stage) * _HISTOGRAM_WORDS
+        words[base + _HEADER_WORDS + bucket_index(value_us)] += 1
+        words[base + _COUNT] += 1
+        words[base + _SUM] += value_us
+        if value_us >= words[base + _MAX]:
+            words[base + _MAX] = value_us
+            words[base + _MAX_TRACE] = trace_id
+
+    def summary(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Percentiles in microseconds for every mode/stage with samples."""
+        words = self._words
+        result: dict[str, dict[str, dict[str, Any]]] = {}
+        for mode_index, mode in enumerate(LATENCY_MODES):
+            stages: dict[str, dict[str, Any]] = {}
+            for stage, stage_name in enumerate(LATENCY_STAGES):
+                base = (mode_index * len(LATENCY_STAGES) + stage) * _HISTOGRAM_WORDS
+                buckets = words[base + _HEADER_WORDS : base + _HISTOGRAM_WORDS].tolist()
+                count = sum(buckets)
+                if count == 0:
+                    continue
+                maximum = words[base + _MAX]
+                stats: dict[str, Any] = {
+                    "count": count,
+                    "mean_us": words[base + _SUM] / max(words[base + _COUNT], 1),
+                }
+                stats.update(bucket_percentiles(buckets, count, maximum))
+                stats["max_us"] = maximum
+                stats["max_trace_id"] = words[base + _MAX_TRACE]
+                stages[stage_name] = stats
+            if stages:
+                result[mode] = stages
+        return result
+
+    def reset(self) -> None:
+        self._shm.buf[:_TABLE_SIZE] = bytes(_TABLE_SIZE)
+
+    def close(self) -> None:
+        if self._words is not None:
+            self._words.release()
+            self._words = None  # type: ignore[assignment]
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        if not self._owner:
+            return
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def bucket_percentiles(buckets: list[int], count: int, maximum: int) -> dict[str, int]:
+    """Reported percentiles (as "<name>_us" keys) from bucket counts, capped at maximum."""
+    targets = [(name, max(1, int(fraction * count + 0.5))) for name, fraction in REPORTED_PERCENTILES]
+    result: dict[str, int] = {}
+    seen = 0
+    target_index = 0
+    for index, bucket_count in enumerate(buckets):
+        if not bucket_count:
+            continue
+        seen += bucket_count
+        while target_index < len(targets) and seen >= targets[target_index][1]:
+            result[f"{targets[target_index][0]}_us"] = min(bucket_upper_bound(index), maximum)
+            target_index += 1
+        if target_index == len(targets):
+            break
+    return result
@@ -19,6 +19,8 @@ from typing import Any, Iterator
 
 import fcntl
 
+from state_board import StateBoard, get_state_board
+
 
 logger = logging.getLogger("OpenArcade")
 
@@ -52,11 +54,32 @@ class PairingModeState:
     - updated_at: ISO timestamp of last change
     """
 
-    def __init__(self, path: str | None = None) -> None:
+    def __init__(self, path: str | None = None, state_board_path: str | None = None) -> None:
         self.path = path or resolve_pairing_mode_path()
+        self.state_board_path = state_board_path
         self._lock = threading.RLock()
         self._cache: dict[str, Any] | None = None
 
+    @property
+    def state_board(self) -> StateBoard | None:
+        return get_state_board(self.state_board_path, os.path.dirname(os.path.abspath(self.path)))
+
+    def _sync_state_board(self, state: dict[str, Any], force: bool = False) -> None:
+        board = self.state_board
+        if board is None:
+            return
+        try:
+            snapshot = board.read()
+            if (
+                force
+                or snapshot is None
+                or snapshot.pairing_enabled is None
+                or snapshot.pairing_sequence < state["sequence"]
+            ):
+                board.publish_pairing(state["enabled"], state["sequence"])
+        except Exception as exc:
+            logger.warning("Failed to update state board with pairing mode: %s", exc)
+
     def _default_state(self) -> dict[str, Any]:
         return {
             "enabled": _get_default_enabled(),
@@ -170,6 +193,7 @@ class PairingModeState:
 
             state, _changed = self._normalize_state(raw_state)
             self._cache = state
+            self._sync_state_board(state)
             return dict(state)
 
     def save(self, enabled: bool, source: str = "api") -> dict[str, Any]:
@@ -183,6 +207,7 @@ class PairingModeState:
                     "updated_at": datetime.now(timezone.utc).isoformat(),
                 }
                 self._write_state_unlocked(new_state)
+                self._sync_state_board(new_state, force=True)
 
             self._cache = new_state
             return dict(new_state)
@@ -0,0 +1,363 @@
+"""
+Shared-memory report transport between the aggregator and the HID writer.
+
+ReportChannel is a single-writer/single-reader seqlock holding the latest
+HID report plus its timing metadata. The sequence word is odd while a
+publish is in progress, so the reader retries whenever it observes an odd
+sequence or the sequence moved while it was copying.
+
+ReportRing adds a bounded SPSC ring of timestamped reports in front of a
+seqlock latest slot, so reports published faster than the writer wakes
+(a press and release landing together) are still delivered in order. If
+the ring overflows, the latest slot still carries the final state.
+"""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+from typing import Literal, NamedTuple
+
+from runtime.report_builder import report_has_press_edge
+
+
+REPORT_CAPACITY = 64
+DEFAULT_RING_CAPACITY = 64
+
+ReportPolicy = Literal["press_edges", "latest", "max_per_poll"]
+REPORT_POLICY_PRESS_EDGES: ReportPolicy = "press_edges"
+REPORT_POLICY_LATEST: ReportPolicy = "latest"
+REPORT_POLICY_MAX_PER_POLL: ReportPolicy = "max_per_poll"
+VALID_REPORT_POLICIES: tuple[ReportPolicy, ...] = (
+    REPORT_POLICY_PRESS_EDGES,
+    REPORT_POLICY_LATEST,
+    REPORT_POLICY_MAX_PER_POLL,
+)
+DEFAULT_REPORTS_PER_POLL = 4
+
+# Slot layout: version, input_at, published_at, length, trace_id | report bytes
+_U64 = struct.Struct("<Q")
+_SLOT_METADATA = struct.Struct("<QddHI")
+_SLOT_REPORT_OFFSET = 32
+_SLOT_SIZE = _SLOT_REPORT_OFFSET + REPORT_CAPACITY
+
+# Seqlock block: sequence | slot
+_SEQLOCK_SIZE = 8 + _SLOT_SIZE
+
+# Ring layout: head, tail, overflow, coalesced, capacity | latest seqlock | slots
+_RING_HEAD = 0
+_RING_TAIL = 8
+_RING_OVERFLOW = 16
+_RING_COALESCED = 24
+_RING_CAPACITY = 32
+_RING_LATEST_OFFSET = 40
+_RING_SLOTS_OFFSET = _RING_LATEST_OFFSET + _SEQLOCK_SIZE
+
+READ_RETRY_LIMIT = 1000
+
+
+class ReportSnapshot(NamedTuple):
+    version: int
+    report: bytes
+    input_at: float
+    published_at: float
+    trace_id: int = 0
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Only the creating process should unlink the block on exit.
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _write_slot(
+    buffer: memoryview,
+    offset: int,
+    version: int,
+    report: bytes,
+    input_at: float,
+    published_at: float,
+    trace_id: int,
+) -> None:
+    length = min(len(report), REPORT_CAPACITY)
+    _SLOT_METADATA.pack_into(buffer, offset, version, input_at, published_at, length, trace_id)
+    report_offset = offset + _SLOT_REPORT_OFFSET
+    buffer[report_offset : report_offset + length] = report[:length]
+
+
+def _read_slot(buffer: memoryview, offset: int) -> ReportSnapshot:
+    version, input_at, published_at, length, trace_id = _SLOT_METADATA.unpack_from(buffer, offset)
+    report_offset = offset + _SLOT_REPORT_OFFSET
+    report = bytes(buffer[report_offset : report_offset + length])
+    return ReportSnapshot(version, report, input_at, published_at, trace_id)
+
+
+class _SeqlockSlot:
+    def __init__(self, buffer: memoryview, offset: int) -> None:
+        self._buffer = buffer
+        self._offset = offset
+        self._sequence = _U64.unpack_from(buffer, offset)[0] & ~1
+        self.read_retries = 0
+
+    def publish(self, report: bytes, input_at: float, published_at: float, trace_id: int = 0) -> int:
+        buffer = self._buffer
+        offset = self._offset
+        sequence = self._sequence + 1
+        version = (sequence + 1) >> 1
+
+        _U64.pack_into(buffer, offset, sequence)
+        _write_slot(buffer, offset + 8, version, report, input_at, published_at, trace_id)
+        _U64.pack_into(buffer, offset, sequence + 1)
+
+        self._sequence = sequence + 1
+        return version
+
+    def current_version(self) -> int:
+        return _U64.unpack_from(self._buffer, self._offset)[0] >> 1
+
+    def read(self, last_seen_version: int) -> ReportSnapshot | None:
+        buffer = self._buffer
+        offset = self._offset
+        for _attempt in range(READ_RETRY_LIMIT):
+            start_sequence = _U64.unpack_from(buffer, offset)[0]
+            if start_sequence & 1:
+                self.read_retries += 1
+                continue
+            if start_sequence >> 1 == last_seen_version:
+                return None
+
+            snapshot = _read_slot(buffer, offset + 8)
+
+            if _U64.unpack_from(buffer, offset)[0] != start_sequence:
+                self.read_retries += 1
+                continue
+            return snapshot
+        return None
+
+
+class _SharedBlock:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._buffer = shm.buf
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self) -> None:
+        # Drop our views before closing; SharedMemory refuses to close with exports.
+        self._release_views()
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        if not self._owner:
+            return
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _release_views(self) -> None:
+        self._buffer = None  # type: ignore[assignment]
+
+
+class ReportChannel(_SharedBlock):
+    """Single-writer/single-reader latest-report channel in shared memory."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False) -> None:
+        super().__init__(shm, owner)
+        self._slot = _SeqlockSlot(self._buffer, 0)
+
+    @classmethod
+    def create(cls) -> ReportChannel:
+        shm = shared_memory.SharedMemory(create=True, size=_SEQLOCK_SIZE)
+        shm.buf[:_SEQLOCK_SIZE] = bytes(_SEQLOCK_SIZE)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> ReportChannel:
+        return cls(attach_shared_memory(name))
+
+    def __reduce__(self):
+        return (ReportChannel.attach, (self.name,))
+
+    @property
+    def read_retries(self) -> int:
+        return self._slot.read_retries
+
+    def publish(
+        self,
+        report: bytes,
+        input_at: float = 0.0,
+        published_at: float = 0.0,
+        trace_id: int = 0,
+    ) -> int:
+        """Publish a report and return its version. Writer side only."""
+        return self._slot.publish(report, input_at, published_at, trace_id)
+
+    def current_version(self) -> int:
+        """Version of the last completed publish, without copying the report."""
+        return self._slot.current_version()
+
+    def read(self, last_seen_version: int = -1) -> ReportSnapshot | None:
+        """Return the latest snapshot, or None if it is still last_seen_version."""
+        return self._slot.read(last_seen_version)
+
+    def _release_views(self) -> None:
+        self._slot = None  # type: ignore[assignment]
+        super()._release_views()
+
+
+class ReportRing(_SharedBlock):
+    """Bounded SPSC ring of timestamped reports backed by a latest-report seqlock."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False) -> None:
+        super().__init__(shm, owner)
+        buffer = self._buffer
+        self.capacity = _U64.unpack_from(buffer, _RING_CAPACITY)[0]
+        self._latest = _SeqlockSlot(buffer, _RING_LATEST_OFFSET)
+        self._head = _U64.unpack_from(buffer, _RING_HEAD)[0]
+        self._tail = _U64.unpack_from(buffer, _RING_TAIL)[0]
+        self._overflow = _U64.unpack_from(buffer, _RING_OVERFLOW)[0]
+        self._coalesced = _U64.unpack_from(buffer, _RING_COALESCED)[0]
+        self._last_version = self._latest.current_version()
+
+    @classmethod
+    def create(cls, capacity: int = DEFAULT_RING_CAPACITY) -> ReportRing:
+        if capacity < 1:
+            raise ValueError("Report ring capacity must be positive")
+        size = _RING_SLOTS_OFFSET + capacity * _SLOT_SIZE
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        _U64.pack_into(shm.buf, _RING_CAPACITY, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> ReportRing:
+        return cls(attach_shared_memory(name))
+
+    def __reduce__(self):
+        return (ReportRing.attach, (self.name,))
+
+    def publish(
+        self,
+        report: bytes,
+        input_at: float = 0.0,
+        published_at: float = 0.0,
+        trace_id: int = 0,
+    ) -> int:
+        """Publish a report and return its version. Writer side only."""
+        buffer = self._buffer
+        version = self._latest.publish(report, input_at, published_at, trace_id)
+
+        head = self._head
+        if head - _U64.unpack_from(buffer, _RING_TAIL)[0] >= self.capacity:
+            # The latest slot still carries this report; only history is lost.
+            self._overflow += 1
+            _U64.pack_into(buffer, _RING_OVERFLOW, self._overflow)
+            return version
+
+        slot_offset = _RING_SLOTS_OFFSET + (head % self.capacity) * _SLOT_SIZE
+        _write_slot(buffer, slot_offset, version, report, input_at, published_at, trace_id)
+        self._head = head + 1
+        _U64.pack_into(buffer, _RING_HEAD, self._head)
+        return version
+
+    def drain(self) -> list[ReportSnapshot]:
+        """Return every report published since the last drain, oldest first. Reader side only."""
+        buffer = self._buffer
+        head = _U64.unpack_from(buffer, _RING_HEAD)[0]
+        last_version = self._last_version
+        snapshots: list[ReportSnapshot] = []
+
+        tail = self._tail
+        while tail < head:
+            snapshot = _read_slot(buffer, _RING_SLOTS_OFFSET + (tail % self.capacity) * _SLOT_SIZE)
+            tail += 1
+            # The latest slot may already have delivered this report last drain.
+            if snapshot.version > last_version:
+                snapshots.append(snapshot)
+                last_version = snapshot.version
+        if tail != self._tail:
+            self._tail = tail
+            _U64.pack_into(buffer, _RING_TAIL, tail)
+
+        latest = self._latest.read(last_version)
+        if latest is not None and latest.version > last_version:
+            snapshots.append(latest)
+            last_version = latest.version
+
+        self._last_version = last_version
+        return snapshots
+
+    def current_version(self) -> int:
+        return self._latest.current_version()
+
+    def record_coalesced(self, count: int) -> None:
+        """Account for drained reports the reader chose not to write. Reader side only."""
+        if count <= 0:
+            return
+        self._coalesced += count
+        _U64.pack_into(self._buffer, _RING_COALESCED, self._coalesced)
+
+    def stats(self) -> dict[str, int]:
+        buffer = self._buffer
+        head = _U64.unpack_from(buffer, _RING_HEAD)[0]
+        tail = _U64.unpack_from(buffer, _RING_TAIL)[0]
+        return {
+            "capacity": self.capacity,
+            "published": self._latest.current_version(),
+            "pending": head - tail,
+            "overflow": _U64.unpack_from(buffer, _RING_OVERFLOW)[0],
+            "coalesced": _U64.unpack_from(buffer, _RING_COALESCED)[0],
+        }
+
+    def _release_views(self) -> None:
+        self._latest = None  # type: ignore[assignment]
+        super()._release_views()
+
+
+def coalesce_reports(
+    snapshots: Sequence[ReportSnapshot],
+    policy: ReportPolicy,
+    mode: str,
+    previous_report: bytes,
+    max_per_poll: int = DEFAULT_REPORTS_PER_POLL,
+) -> list[ReportSnapshot]:
+    """
+    Pick which drained reports to write.
+
+    - latest: only the newest report.
+    - press_edges: every report that engages a new input, plus the report
+      just before it so a release/press pair of the same input stays
+      visible, plus the newest report.
+    - max_per_poll: press_edges, then capped to the newest max_per_poll.
+    """
+    if not snapshots:
+        return []
+    if policy == REPORT_POLICY_LATEST:
+        return [snapshots[-1]]
+
+    kept: list[ReportSnapshot] = []
+    last_index = len(snapshots) - 1
+    previous = previous_report
+    for index, snapshot in enumerate(snapshots):
+        has_press_edge = len(previous) != len(snapshot.report) or report_has_press_edge(
+            mode, previous, snapshot.report
+        )
+        if has_press_edge and index > 0 and (not kept or kept[-1] is not snapshots[index - 1]):
+            kept.append(snapshots[index - 1])
+        if has_press_edge or index == last_index:
+            kept.append(snapshot)
+        previous = snapshot.report
+
+    if policy == REPORT_POLICY_MAX_PER_POLL and len(kept) > max_per_poll > 0:
+        kept = kept[-max_per_poll:]
+    return kept
@@ -0,0 +1,166 @@
+"""
+Placement of BLE connections across HCI adapters.
+
+With several adapters configured (OPENARCADE_BLE_ADAPTERS) the aggregator
+scans on all of them and the connection scheduler asks AdapterBalancer
+for an adapter as each connect starts. The pick is the available adapter
+with the lowest score among those that heard the module advertise
+recently; a direct reconnect by address, or a module heard only on full
+adapters, may go to any of them:
+
+    score = links (connected or connecting) + jitter_us / JITTER_PER_LINK_US
+
+jitter_us is a moving average of how much consecutive notification
+intervals differ on the adapter's links. A radio that is struggling to
+serve its connection events shows it there before its link count does.
+
+An adapter whose scanner fails to start, or that fails
+ADAPTER_FAILURE_LIMIT connects in a row, is skipped for
+ADAPTER_RETRY_SECONDS so new connections fail over to the others. Ties go
+to the adapter the module last used, then to configuration order.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from .connection_scheduler import ConnectCandidate
+from .scan_scheduler import JITTER_MAX_INTERVAL_SECONDS
+from .transport import DEFAULT_ADAPTER
+
+
+logger = logging.getLogger("OpenArcade")
+
+# One millisecond of average interval jitter weighs as much as one more link.
+JITTER_PER_LINK_US = 1000.0
+JITTER_EWMA_ALPHA = 0.05
+ADVERTISEMENT_TTL_SECONDS = 10.0
+ADAPTER_FAILURE_LIMIT = 3
+ADAPTER_RETRY_SECONDS = 30.0
+
+
+class AdapterBalancer:
+    """Tracks links and notification jitter per adapter and picks the least loaded."""
+
+    def __init__(self, adapters: Sequence[str]) -> None:
+        self.adapters: tuple[str, ...] = tuple(adapters) or (DEFAULT_ADAPTER,)
+        self._placements: dict[str, str] = {}
+        self._connected: set[str] = set()
+        self._heard: dict[str, dict[str, float]] = {}
+        self._jitter_us: dict[str, float] = {adapter: 0.0 for adapter in self.adapters}
+        self._last_arrival: dict[str, float] = {}
+        self._last_interval: dict[str, float] = {}
+        self._failures: dict[str, int] = {adapter: 0 for adapter in self.adapters}
+        self._unavailable_until: dict[str, float] = {}
+
+    def adapter_of(self, address: str) -> str | None:
+        return self._placements.get(address)
+
+    def available(self, adapter: str) -> bool:
+        return time.monotonic() >= self._unavailable_until.get(adapter, 0.0)
+
+    def links(self, adapter: str) -> int:
+        return sum(1 for placed in self._placements.values() if placed == adapter)
+
+    def score(self, adapter: str) -> float:
+        return self.links(adapter) + self._jitter_us[adapter] / JITTER_PER_LINK_US
+
+    def note_advertisement(self, address: str, adapter: str) -> None:
+        if adapter in self._jitter_us:
+            self._heard.setdefault(address, {})[adapter] = time.monotonic()
+
+    def place(self, candidate: ConnectCandidate, full: set[str]) -> str | None:
+        """ConnectionScheduler place callback: pick an adapter and count the link on it."""
+        if candidate.address in self._connected:
+            return self._placements[candidate.address]  # already up; connect_device returns at once
+        available = [adapter for adapter in self.adapters if adapter not in full and self.available(adapter)]
+        if not available:
+            # Every adapter is out of service: keep trying them rather than stall.
+            available = [adapter for adapter in self.adapters if adapter not in full]
+        if not available:
+            return None
+        now = time.monotonic()
+        heard = self._heard.get(candidate.address, {})
+        in_range = [
+            adapter for adapter in available
+            if now - heard.get(adapter, float("-inf")) <= ADVERTISEMENT_TTL_SECONDS
+        ]
+        preferred = candidate.adapter
+        adapter = min(
+            in_range or available,
+            key=lambda name: (self.score(name), name != preferred, self.adapters.index(name)),
+        )
+        self._placements[candidate.address] = adapter
+        return adapter
+
+    def connected(self, address: str) -> None:
+        adapter = self._placements.get(address)
+        if adapter is None:
+            return
+        self._connected.add(address)
+        self._failures[adapter] = 0
+        self._heard.pop(address, None)
+
+    def connect_failed(self, address: str) -> None:
+        adapter = self._placements.pop(address, None)
+        if adapter is None:
+            return
+        self._failures[adapter] += 1
+        if self._failures[adapter] >= ADAPTER_FAILURE_LIMIT:
+            self.adapter_failed(adapter, f"{self._failures[adapter]} connects failed in a row")
+
+    def adapter_failed(self, adapter: str, reason: str) -> None:
+        if adapter not in self._failures:
+            return
+        self._failures[adapter] = 0
+        self._unavailable_until[adapter] = time.monotonic() + ADAPTER_RETRY_SECONDS
+        if len(self.adapters) > 1:
+            logger.warning("Adapter %s out of rotation for %.0fs: %s", adapter, ADAPTER_RETRY_SECONDS, reason)
+
+    def released(self, address: str) -> None:
+        """The module is gone, or its connect was abandoned without a verdict."""
+        adapter = self._placements.pop(address, None)
+        if adapter is not None and not self.links(adapter):
+            self._jitter_us[adapter] = 0.0  # nothing left to measure it on
+        self._connected.discard(address)
+        self._last_arrival.pop(address, None)
+        self._last_interval.pop(address, None)
+
+    def note_notification(self, address: str, received_at: float) -> None:
+        """Every notification on a placed link; received_at is perf_counter."""
+        adapter = self._placements.get(address)
+        if adapter is None:
+            return
+        previous = self._last_arrival.get(address)
+        self._last_arrival[address] = received_at
+        if previous is None:
+            return
+        interval = received_at - previous
+        if interval > JITTER_MAX_INTERVAL_SECONDS:
+            self._last_interval.pop(address, None)
+            return
+        previous_interval = self._last_interval.get(address)
+        self._last_interval[address] = interval
+        if previous_interval is not None:
+            sample_us = abs(interval - previous_interval) * 1_000_000.0
+            self._jitter_us[adapter] += JITTER_EWMA_ALPHA * (sample_us - self._jitter_us[adapter])
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": adapter,
+                "links": self.links(adapter),
+                "connected": sum(
+                    1 for address in self._connected if self._placements.get(address) == adapter
+                ),
+                "jitter_us": self._jitter_us[adapter],
+                "score": self.score(adapter),
+                "available": self.available(adapter),
+                "retry_in_s": max(0.0, self._unavailable_until.get(adapter, 0.0) - now),
+            }
+            for adapter in self.adapters
+        ]
@@ -9,7 +9,8 @@ from device_config_store import DeviceConfigStore
 
 from .control_server import RuntimeControlServer
 from .report_builder import build_mapping_cache, build_keyboard_report
-from .sessions import SessionSupervisor
+from .session_engine import SessionEngine
+from .state_decoder import AnalogAxes, StateDecoder, build_decoder_cache
 from .state_reducer import StateReducer
 
 
@@ -25,6 +26,8 @@ class RuntimeApplication:
         self._config_store = DeviceConfigStore(path=config_path)
         initial_config = self._config_store.load()
         self._state_reducer = StateReducer(build_mapping_cache(initial_config))
+        # Shared with the sessions and updated in place on config reload.
+        self._decoders: dict[str, StateDecoder] = build_decoder_cache(initial_config)
         self._report_sink = report_sink
         self._shutdown_event = asyncio.Event()
         self._loop: asyncio.AbstractEventLoop | None = None
@@ -32,14 +35,16 @@ class RuntimeApplication:
         self._publish_scheduled = False
         self._live_states: dict[str, dict[str, Any]] = {}
         self._state_sequence = 0
-        self._sessions = SessionSupervisor(
+        self._sessions = SessionEngine(
             on_state_update=self._handle_state_update,
             on_session_stopped=self._handle_session_stopped,
+            decoders=self._decoders,
         )
         self._control_server = RuntimeControlServer(
             on_config_updated=self._reload_config,
             get_connected_devices=self._get_connected_devices,
             get_device_states=self._get_device_states,
+            get_reconnect_stats=lambda: self._sessions.reconnect_stats,
         )
 
     async def run(self, shutdown_signal: asyncio.Event) -> None:
@@ -66,16 +71,20 @@ class RuntimeApplication:
         report = self._state_reducer.set_mapping_cache(
             build_mapping_cache(config_snapshot)
         )
+        self._decoders.clear()
+        self._decoders.update(build_decoder_cache(config_snapshot))
         self._schedule_report_publish(report)
 
-    def _handle_state_update(self, device_id: str, state: int) -> None:
+    def _handle_state_update(self, device_id: str, state: int, axes: AnalogAxes | None = None) -> None:
         self._state_sequence += 1
         self._live_states[device_id] = {
             "state": state,
             "seq": self._state_sequence,
             "updated_at": time.time(),
         }
-        report = self._state_reducer.update_device_state(device_id, state)
+        if axes is not None:
+            self._live_states[device_id]["axes"] = list(axes)
+        report = self._state_reducer.update_device_state(device_id, state, axes)
         self._schedule_report_publish(report)
 
     def _handle_session_stopped(self, device_id: str) -> None:
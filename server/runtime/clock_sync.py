@@ -0,0 +1,141 @@
+"""
+Module clock estimation from notification timestamps.
+
+Firmware may append a 32-bit little-endian microsecond timestamp, taken at
+the input edge, after a notification's report (after the 4-byte state on
+the default descriptor). The time between that edge and the aggregator's
+notification callback is what the input spends in the module's BLE stack
+and on air. The two clocks have an unknown offset and drift apart by up to
+a few hundred ppm, so DeviceClock estimates both online.
+
+For every timestamped notification, y = host time - device time is the
+clock offset at that moment plus the sample's latency. Latency never drops
+below the fastest delivery the link allows, so the smallest y in each
+CLOCK_WINDOW_SECONDS of device time sits on the offset line. A least
+squares line through the last CLOCK_FIT_WINDOWS window minima gives the
+offset and the drift (the min-filtered linear fit), and each sample's
+latency is its y above that line. The constant floor (at best part of one
+connection event) is folded into the offset, so latencies are measured
+from the fastest deliveries seen rather than from zero.
+
+Device time wraps every ~71.6 minutes and is unwrapped here; any other
+step backwards (a module reboot) restarts the fit.
+"""
+
+from __future__ import annotations
+
+import struct
+from array import array
+from collections import deque
+from typing import Any
+
+from latency_trace import BUCKET_COUNT, bucket_index, bucket_percentiles
+
+
+# Follows the report in an extended notification payload.
+DEVICE_TIME = struct.Struct("<I")
+DEVICE_CLOCK_WRAP = 1 << 32
+CLOCK_WINDOW_SECONDS = 1.0
+CLOCK_FIT_WINDOWS = 16
+
+
+class DeviceClock:
+    """Offset and drift of one module's clock, and the latency histogram they give."""
+
+    def __init__(
+        self,
+        window_seconds: float = CLOCK_WINDOW_SECONDS,
+        fit_windows: int = CLOCK_FIT_WINDOWS,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self._minima: deque[tuple[float, float]] = deque(maxlen=fit_windows)
+        self.latency = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+        self.restarts = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the fit, e.g. when the module disconnects and may reboot."""
+        self._last_raw: int | None = None
+        self._epoch = 0
+        self._device_origin = 0.0
+        self._host_origin: float | None = None
+        self._window_end = 0.0
+        self._window_min = float("inf")
+        self._window_at = 0.0
+        self._minima.clear()
+        self.offset: float | None = None  # seconds, host minus device, from the origins
+        self.slope = 0.0
+
+    @property
+    def drift_ppm(self) -> float:
+        """How fast the module clock runs against the host clock."""
+        return -self.slope / (1.0 + self.slope) * 1_000_000.0
+
+    def note(self, device_us: int, received_at: float) -> float | None:
+        """A timestamped notification received at perf_counter received_at; returns its latency in seconds."""
+        raw = device_us % DEVICE_CLOCK_WRAP
+        last = self._last_raw
+        if last is not None and raw < last:
+            if last - raw > DEVICE_CLOCK_WRAP // 2:
+                self._epoch += DEVICE_CLOCK_WRAP
+            else:
+                self.restarts += 1
+                self.reset()
+        self._last_raw = raw
+        device_time = (self._epoch + raw) / 1_000_000.0
+        if self._host_origin is None:
+            self._host_origin = received_at
+            self._device_origin = device_time
+            self._window_end = self.window_seconds
+        device_elapsed = device_time - self._device_origin
+        y = (received_at - self._host_origin) - device_elapsed
+
+        if device_elapsed >= self._window_end:
+            self._minima.append((self._window_at, self._window_min))
+            self._fit()
+            self._window_end = device_elapsed + self.window_seconds
+            self._window_min = float("inf")
+        if y < self._window_min:
+            self._window_min = y
+            self._window_at = device_elapsed
+
+        if self.offset is None:
+            return None
+        latency = y - (self.offset + self.slope * device_elapsed)
+        if latency < 0.0:
+            latency = 0.0
+        latency_us = int(latency * 1_000_000.0)
+        self.latency[bucket_index(latency_us)] += 1
+        self.count += 1
+        self.sum_us += latency_us
+        if latency_us > self.max_us:
+            self.max_us = latency_us
+        return latency
+
+    def _fit(self) -> None:
+        points = self._minima
+        count = len(points)
+        mean_x = sum(x for x, _y in points) / count
+        mean_y = sum(y for _x, y in points) / count
+        spread = sum((x - mean_x) ** 2 for x, _y in points)
+        if count < 2 or spread <= 0.0:
+            self.slope = 0.0
+        else:
+            self.slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+        self.offset = mean_y - self.slope * mean_x
+
+    def summary(self) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "samples": self.count,
+            "drift_ppm": self.drift_ppm,
+            "fit_windows": len(self._minima),
+            "restarts": self.restarts,
+        }
+        if self.count:
+            result["mean_us"] = self.sum_us / self.count
+            result.update(bucket_percentiles(self.latency, self.count, self.max_us))
+            result["max_us"] = self.max_us
+        return result
@@ -0,0 +1,291 @@
+"""
+Bounded-concurrency BLE connection scheduler.
+
+Discovered devices are submitted as candidates; the scheduler runs up to
+max_concurrent connect attempts at once, at most per_adapter_cap of them on
+any one adapter, and always starts the best waiting candidate first:
+higher priority, then stronger last-seen RSSI, then earliest submitted.
+With a place callback the adapter is picked when the attempt starts, from
+the adapters still under their cap, rather than fixed at submit.
+
+Scanning is only paused around connects when the controller needs it
+(BleTransport.scan_blocks_connect): stop_scanning is awaited before each
+attempt and resume_scanning once nothing is queued or in flight.
+
+A burst runs from the first submit while idle until the scheduler is idle
+again; its duration is reported as time-to-all-connected. The time from a
+candidate's first submit to its connect call (after any scan stop) is kept
+as a histogram, discovery-to-connect-start.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from latency_trace import BUCKET_COUNT, bucket_index, bucket_percentiles
+
+from .metrics import RuntimeMetrics
+from .transport import DEFAULT_ADAPTER
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_MAX_CONCURRENT_CONNECTS_ENV_VAR = "OPENARCADE_MAX_CONCURRENT_CONNECTS"
+OPENARCADE_ADAPTER_CONNECT_CAP_ENV_VAR = "OPENARCADE_ADAPTER_CONNECT_CAP"
+DEFAULT_MAX_CONCURRENT_CONNECTS = 4
+DEFAULT_ADAPTER_CONNECT_CAP = 2
+
+
+def _resolve_positive_int(env_var: str, default: int) -> int:
+    raw = os.environ.get(env_var)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        logger.warning("Invalid %s='%s', using %d", env_var, raw, default)
+        return default
+    return max(value, 1)
+
+
+def resolve_max_concurrent_connects() -> int:
+    return _resolve_positive_int(OPENARCADE_MAX_CONCURRENT_CONNECTS_ENV_VAR, DEFAULT_MAX_CONCURRENT_CONNECTS)
+
+
+def resolve_adapter_connect_cap() -> int:
+    return _resolve_positive_int(OPENARCADE_ADAPTER_CONNECT_CAP_ENV_VAR, DEFAULT_ADAPTER_CONNECT_CAP)
+
+
+@dataclass
+class ConnectCandidate:
+    address: str
+    device: Any
+    rssi: int | None = None
+    priority: int = 0
+    adapter: str = DEFAULT_ADAPTER
+    submitted_at: float = field(default_factory=time.monotonic)
+
+    def sort_key(self) -> tuple[int, float, float]:
+        rssi = float(self.rssi) if self.rssi is not None else float("-inf")
+        return (-self.priority, -rssi, self.submitted_at)
+
+
+ConnectCallback = Callable[[ConnectCandidate], Awaitable[bool]]
+# Picks an adapter for a candidate, avoiding the given full ones; None if none fits.
+PlaceCallback = Callable[[ConnectCandidate, set[str]], str | None]
+ScanCallback = Callable[[], Awaitable[None]]
+AttemptFinishedCallback = Callable[[], None]
+
+
+class ConnectionScheduler:
+    """Runs connect attempts with global and per-adapter concurrency caps."""
+
+    def __init__(
+        self,
+        connect: ConnectCallback,
+        max_concurrent: int | None = None,
+        per_adapter_cap: int | None = None,
+        stop_scanning: ScanCallback | None = None,
+        resume_scanning: ScanCallback | None = None,
+        metrics: RuntimeMetrics | None = None,
+        place: PlaceCallback | None = None,
+        on_attempt_finished: AttemptFinishedCallback | None = None,
+    ) -> None:
+        self._connect = connect
+        self._on_attempt_finished = on_attempt_finished
+        self._place = place
+        self.max_concurrent = max_concurrent or resolve_max_concurrent_connects()
+        self.per_adapter_cap = per_adapter_cap or resolve_adapter_connect_cap()
+        self._stop_scanning = stop_scanning
+        self._resume_scanning = resume_scanning
+        self._metrics = metrics
+        self._pending: dict[str, ConnectCandidate] = {}
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._adapter_load: dict[str, int] = {}
+        self._burst_started_at: float | None = None
+        self._burst_attempts = 0
+        self._burst_failures = 0
+        self._resume_task: asyncio.Task | None = None
+        self._closed = False
+        self.last_burst: dict[str, Any] | None = None
+        self._start_delay_buckets = [0] * BUCKET_COUNT
+        self._start_delay_count = 0
+        self._start_delay_sum_us = 0
+        self._start_delay_max_us = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight_count(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def idle(self) -> bool:
+        return not self._pending and not self._in_flight
+
+    def is_scheduled(self, address: str) -> bool:
+        return address in self._pending or address in self._in_flight
+
+    def submit(
+        self,
+        address: str,
+        device: Any,
+        rssi: int | None = None,
+        priority: int = 0,
+        adapter: str = DEFAULT_ADAPTER,
+    ) -> bool:
+        """Queue a connect; a repeat submit refreshes a waiting candidate. Returns True if newly queued."""
+        if self._closed or address in self._in_flight:
+            return False
+        waiting = self._pending.get(address)
+        if waiting is not None:
+            waiting.device = device
+            if rssi is not None:
+                waiting.rssi = rssi
+            waiting.priority = max(waiting.priority, priority)
+            return False
+        if self.idle:
+            self._burst_started_at = time.monotonic()
+            self._burst_attempts = 0
+            self._burst_failures = 0
+        self._pending[address] = ConnectCandidate(address, device, rssi, priority, adapter)
+        self._update_gauges()
+        self._dispatch()
+        return True
+
+    def cancel_pending(self) -> None:
+        """Drop waiting candidates; attempts already running finish normally."""
+        self._pending.clear()
+        self._update_gauges()
+        self._finish_burst_if_idle()
+
+    async def stop(self) -> None:
+        self._closed = True
+        self._pending.clear()
+        tasks = list(self._in_flight.values())
+        if self._resume_task is not None:
+            tasks.append(self._resume_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._update_gauges()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_adapter_cap": self.per_adapter_cap,
+            "pending": sorted(self._pending),
+            "in_flight": sorted(self._in_flight),
+            "last_burst": dict(self.last_burst) if self.last_burst is not None else None,
+            "connect_start_delay": self.connect_start_delay(),
+        }
+
+    def connect_start_delay(self) -> dict[str, Any]:
+        """Discovery (first submit) to connect start, in microseconds."""
+        if not self._start_delay_count:
+            return {"count": 0}
+        result: dict[str, Any] = {
+            "count": self._start_delay_count,
+            "mean_us": self._start_delay_sum_us / self._start_delay_count,
+        }
+        result.update(bucket_percentiles(self._start_delay_buckets, self._start_delay_count, self._start_delay_max_us))
+        result["max_us"] = self._start_delay_max_us
+        return result
+
+    def _record_start_delay(self, seconds: float) -> None:
+        value_us = int(seconds * 1_000_000.0)
+        self._start_delay_buckets[bucket_index(value_us)] += 1
+        self._start_delay_count += 1
+        self._start_delay_sum_us += value_us
+        self._start_delay_max_us = max(self._start_delay_max_us, value_us)
+        if self._metrics is not None:
+            self._metrics.set_gauge("connect_start_delay_seconds", seconds)
+
+    def _dispatch(self) -> None:
+        while self._pending and len(self._in_flight) < self.max_concurrent:
+            candidate = self._next_candidate()
+            if candidate is None:
+                return
+            del self._pending[candidate.address]
+            self._adapter_load[candidate.adapter] = self._adapter_load.get(candidate.adapter, 0) + 1
+            self._burst_attempts += 1
+            self._in_flight[candidate.address] = asyncio.create_task(self._attempt(candidate))
+        self._update_gauges()
+
+    def _next_candidate(self) -> ConnectCandidate | None:
+        if self._place is not None:
+            return self._place_next_candidate()
+        best: ConnectCandidate | None = None
+        for candidate in self._pending.values():
+            if self._adapter_load.get(candidate.adapter, 0) >= self.per_adapter_cap:
+                continue
+            if best is None or candidate.sort_key() < best.sort_key():
+                best = candidate
+        return best
+
+    def _place_next_candidate(self) -> ConnectCandidate | None:
+        assert self._place is not None
+        best = min(self._pending.values(), key=ConnectCandidate.sort_key)
+        full = {adapter for adapter, load in self._adapter_load.items() if load >= self.per_adapter_cap}
+        adapter = self._place(best, full)
+        if adapter is None:
+            return None
+        best.adapter = adapter
+        return best
+
+    async def _attempt(self, candidate: ConnectCandidate) -> None:
+        connected = False
+        try:
+            if self._stop_scanning is not None:
+                await self._stop_scanning()
+            self._record_start_delay(time.monotonic() - candidate.submitted_at)
+            connected = await self._connect(candidate)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("Connect attempt for %s failed: %s", candidate.address, exc)
+        finally:
+            self._in_flight.pop(candidate.address, None)
+            self._adapter_load[candidate.adapter] -= 1
+            if not connected:
+                self._burst_failures += 1
+            if self._on_attempt_finished is not None:
+                self._on_attempt_finished()
+            if not self._closed:
+                self._dispatch()
+                self._finish_burst_if_idle()
+
+    def _finish_burst_if_idle(self) -> None:
+        if not self.idle or self._burst_started_at is None:
+            return
+        seconds = time.monotonic() - self._burst_started_at
+        self._burst_started_at = None
+        self.last_burst = {
+            "seconds": seconds,
+            "attempts": self._burst_attempts,
+            "failures": self._burst_failures,
+        }
+        if self._metrics is not None:
+            self._metrics.set_gauge("time_to_all_connected_seconds", seconds)
+        logger.info(
+            "Connect burst finished in %.2fs (%d attempts, %d failed)",
+            seconds,
+            self._burst_attempts,
+            self._burst_failures,
+        )
+        if self._resume_scanning is not None and not self._closed:
+            self._resume_task = asyncio.create_task(self._resume_scanning())
+
+    def _update_gauges(self) -> None:
+        if self._metrics is None:
+            return
+        self._metrics.set_gauge("connects_in_flight", len(self._in_flight))
+        self._metrics.set_gauge("connect_queue_depth", len(self._pending))
@@ -11,10 +11,20 @@ from runtime_ipc import (
     MESSAGE_TYPE_CONFIG_UPDATED,
     MESSAGE_TYPE_GET_DEVICE_STATES,
     MESSAGE_TYPE_GET_CONNECTED_DEVICES,
+    MESSAGE_TYPE_GET_LATENCY_STATS,
+    MESSAGE_TYPE_GET_LINK_STATS,
+    MESSAGE_TYPE_GET_METRICS,
     MESSAGE_TYPE_GET_PAIRING_STATUS,
+    MESSAGE_TYPE_GET_RECONNECT_STATS,
+    MESSAGE_TYPE_GET_REPORT_STATS,
+    MESSAGE_TYPE_GET_SCAN_STATS,
+    MESSAGE_TYPE_GET_SHARD_STATS,
+    METRICS_FORMAT_PROMETHEUS,
     resolve_runtime_socket_path,
 )
 
+from .metrics import render_prometheus
+
 
 logger = logging.getLogger("OpenArcade")
 
@@ -22,6 +32,13 @@ ConfigUpdatedHandler = Callable[[], Awaitable[None]]
 ConnectedDevicesProvider = Callable[[], set[str]]
 DeviceStatesProvider = Callable[[], dict[str, dict[str, Any]]]
 PairingStatusProvider = Callable[[], dict[str, Any]]
+ReportStatsProvider = Callable[[], dict[str, int]]
+LatencyStatsProvider = Callable[[], dict[str, dict[str, dict[str, Any]]]]
+MetricsProvider = Callable[[], dict[str, Any]]
+ScanStatsProvider = Callable[[], dict[str, Any]]
+ShardStatsProvider = Callable[[], dict[str, Any]]
+LinkStatsProvider = Callable[[], dict[str, Any]]
+ReconnectStatsProvider = Callable[[], dict[str, dict[str, Any]]]
 
 
 class RuntimeControlServer:
@@ -31,12 +48,26 @@ class RuntimeControlServer:
         get_connected_devices: ConnectedDevicesProvider,
         get_device_states: DeviceStatesProvider,
         get_pairing_status: PairingStatusProvider | None = None,
+        get_report_stats: ReportStatsProvider | None = None,
+        get_latency_stats: LatencyStatsProvider | None = None,
+        get_metrics: MetricsProvider | None = None,
+        get_scan_stats: ScanStatsProvider | None = None,
+        get_shard_stats: ShardStatsProvider | None = None,
+        get_link_stats: LinkStatsProvider | None = None,
+        get_reconnect_stats: ReconnectStatsProvider | None = None,
         socket_path: str | None = None,
     ) -> None:
         self._on_config_updated = on_config_updated
         self._get_connected_devices = get_connected_devices
         self._get_device_states = get_device_states
         self._get_pairing_status = get_pairing_status
+        self._get_report_stats = get_report_stats
+        self._get_latency_stats = get_latency_stats
+        self._get_metrics = get_metrics
+        self._get_scan_stats = get_scan_stats
+        self._get_shard_stats = get_shard_stats
+        self._get_link_stats = get_link_stats
+        self._get_reconnect_stats = get_reconnect_stats
         self._socket_path = socket_path or resolve_runtime_socket_path()
         self._server: asyncio.AbstractServer | None = None
 
@@ -121,5 +152,72 @@ class RuntimeControlServer:
                 "pairing": pairing_status,
             }
 
+        if message_type == MESSAGE_TYPE_GET_REPORT_STATS:
+            if self._get_report_stats is None:
+                return {"ok": False, "error": "report_stats_not_available"}
+            return {
+                "ok": True,
+                "report_stats": self._get_report_stats(),
+            }
+
+        if message_type == MESSAGE_TYPE_GET_LATENCY_STATS:
+            if self._get_latency_stats is None:
+                return {"ok": False, "error": "latency_stats_not_available"}
+            return {
+                "ok": True,
+                "latency": self._get_latency_stats(),
+            }
+
+        if message_type == MESSAGE_TYPE_GET_METRICS:
+            if self._get_metrics is None:
+                return {"ok": False, "error": "metrics_not_available"}
+            metrics = self._get_metrics()
+            if message.get("format") == METRICS_FORMAT_PROMETHEUS:
+                return {
+                    "ok": True,
+                    "prometheus": render_prometheus(metrics),
+                }
+            return {
+                "ok": True,
+                "metrics": metrics,
+            }
+
+        if message_type == MESSAGE_TYPE_GET_SCAN_STATS:
+            if self._get_scan_stats is None:
+                return {"ok": False, "error": "scan_stats_not_available"}
+            return {
+                "ok": True,
+                "scan": self._get_scan_stats(),
+            }
+
+        if message_type == MESSAGE_TYPE_GET_SHARD_STATS:
+            if self._get_shard_stats is None:
+                return {"ok": False, "error": "shard_stats_not_available"}
+            return {
+                "ok": True,
+                "shards": self._get_shard_stats(),
+            }
+
+        if message_type == MESSAGE_TYPE_GET_LINK_STATS:
+            if self._get_link_stats is None:
+                return {"ok": False, "error": "link_stats_not_available"}
+            links = self._get_link_stats()
+            device_id = message.get("device_id")
+            if isinstance(device_id, str):
+                device = links.get("devices", {}).get(device_id)
+                links = {"devices": {device_id: device} if device else {}, "by_jitter": []}
+            return {
+                "ok": True,
+                "links": links,
+            }
+
+        if message_type == MESSAGE_TYPE_GET_RECONNECT_STATS:
+            if self._get_reconnect_stats is None:
+                return {"ok": False, "error": "reconnect_stats_not_available"}
+            return {
+                "ok": True,
+                "reconnects": self._get_reconnect_stats(),
+            }
+
         logger.warning("Unknown runtime control message: %s", message_type)
         return {"ok": False, "error": "unknown_message_type"}
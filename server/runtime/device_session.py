@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import asyncio
 import struct
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from typing import Any
 
-from bleak import BleakClient
-
 from constants import CHAR_UUID
 
+from .state_decoder import AnalogAxes, StateDecoder
+from .transport import BleClient, BleTransport, create_ble_transport
+
 
-StateUpdateCallback = Callable[[str, int], None]
+# address, state, analog axes (None unless the device's descriptor has axes)
+StateUpdateCallback = Callable[[str, int, AnalogAxes | None], None]
 
 
 class DeviceSession:
@@ -20,16 +22,20 @@ class DeviceSession:
         stop_event: asyncio.Event,
         on_state_update: StateUpdateCallback,
         connect_timeout: float = 30.0,
+        transport: BleTransport | None = None,
+        decoders: Mapping[str, StateDecoder] | None = None,
     ) -> None:
         self.device = device
         self.address = str(getattr(device, "address", device))
         self._stop_event = stop_event
         self._on_state_update = on_state_update
         self._connect_timeout = connect_timeout
-        self._client: BleakClient | None = None
+        self._transport = transport or create_ble_transport()
+        self._client: BleClient | None = None
         self._disconnect_event = asyncio.Event()
         self._loop: asyncio.AbstractEventLoop | None = None
-        self._last_state: int | None = None
+        self._decoders = decoders if decoders is not None else {}
+        self._last_state: tuple[int, AnalogAxes | None] | None = None
 
     @property
     def is_connected(self) -> bool:
@@ -39,7 +45,7 @@ class DeviceSession:
         self._loop = asyncio.get_running_loop()
         self._disconnect_event.clear()
         self._last_state = None
-        self._client = BleakClient(
+        self._client = self._transport.create_client(
             self.device,
             disconnected_callback=self._handle_disconnect,
             timeout=self._connect_timeout,
@@ -69,17 +75,27 @@ class DeviceSession:
         if self._client.is_connected:
             await self._client.disconnect()
 
-    def _handle_disconnect(self, _client: BleakClient) -> None:
+    def _handle_disconnect(self, _client: BleClient) -> None:
         if self._loop is not None:
             self._loop.call_soon_threadsafe(self._disconnect_event.set)
 
     def _handle_notification(self, _sender: Any, data: bytearray) -> None:
-        if len(data) < 4 or self._loop is None:
+        if self._loop is None:
             return
 
-        state = struct.unpack("<I", data[:4])[0]
-        if state == self._last_state:
+        # Looked up per notification so a descriptor change applies to a live session.
+        decoder = self._decoders.get(self.address)
+        if decoder is None:
+            if len(data) < 4:
+                return
+            decoded = (struct.unpack("<I", data[:4])[0], None)
+        else:
+            decoded = decoder.decode(data)
+            if decoded is None:
+                return
+        if decoded == self._last_state:
             return
 
-        self._last_state = state
-        self._loop.call_soon_threadsafe(self._on_state_update, self.address, state)
+        self._last_state = decoded
+        # Transports deliver notifications on the loop that connected the client.
+        self._on_state_update(self.address, *decoded)
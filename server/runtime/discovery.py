@@ -4,7 +4,7 @@ import asyncio
 import logging
 from typing import Any
 
-from bleak import BleakScanner
+from .transport import BleScanner, BleTransport, create_ble_transport
 
 
 TARGET_DEVICE_NAME = "NimBLE_GATT"
@@ -13,19 +13,22 @@ logger = logging.getLogger("OpenArcade")
 
 
 class DiscoveryService:
-    def __init__(self, discovered_devices: asyncio.Queue[Any]) -> None:
+    def __init__(
+        self,
+        discovered_devices: asyncio.Queue[tuple[Any, int | None]],
+        transport: BleTransport | None = None,
+    ) -> None:
         self._discovered_devices = discovered_devices
+        self._transport = transport or create_ble_transport()
         self._loop: asyncio.AbstractEventLoop | None = None
-        self._scanner: BleakScanner | None = None
+        self._scanner: BleScanner | None = None
         self._is_scanning = False
 
     async def start(self) -> None:
         self._loop = asyncio.get_running_loop()
         try:
             if self._scanner is None:
-                self._scanner = BleakScanner(
-                    detection_callback=self._handle_detection,
-                )
+                self._scanner = self._transport.create_scanner(self._handle_detection)
             if self._is_scanning:
                 return
             await self._scanner.start()
@@ -53,4 +56,5 @@ class DiscoveryService:
         name = device.name or getattr(advertisement_data, "local_name", None)
         if name != TARGET_DEVICE_NAME or self._loop is None:
             return
-        self._loop.call_soon_threadsafe(self._discovered_devices.put_nowait, device)
+        rssi = getattr(advertisement_data, "rssi", None)
+        self._loop.call_soon_threadsafe(self._discovered_devices.put_nowait, (device, rssi))
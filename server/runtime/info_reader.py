@@ -0,0 +1,113 @@
+"""
+Descriptors for connecting modules, from the cache or the INFO characteristic.
+
+Right after connect, before notifications start, the aggregator asks
+InfoReader for the module's descriptor. A module whose address already has a
+cached (unique_id, fw_ver) key is answered from DescriptorCache without any
+GATT traffic. Otherwise the INFO TLV characteristic is read, parsed with
+parse_info_tlv and cached under its key.
+
+Either way the descriptor goes into the device config when the config does
+not already hold one with the same key, so the mapping cache and the state
+decoders pick it up through the usual config watch. A module without the
+characteristic keeps whatever descriptor the config has, or DEFAULT_CONTROLS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from constants import INFO_CHAR_UUID
+from descriptor_cache import DescriptorCache, descriptor_key
+from device_config_store import DeviceConfigStore
+from device_descriptor import parse_info_tlv
+
+from .metrics import RuntimeMetrics
+from .transport import BleClient
+
+
+logger = logging.getLogger("OpenArcade")
+
+INFO_READ_TIMEOUT_SECONDS = 5.0
+
+
+class InfoReader:
+    """Fetches each connecting module's descriptor and keeps the device config in step."""
+
+    def __init__(
+        self,
+        cache: DescriptorCache,
+        config_store: DeviceConfigStore,
+        metrics: RuntimeMetrics | None = None,
+        read_timeout: float = INFO_READ_TIMEOUT_SECONDS,
+    ) -> None:
+        self._cache = cache
+        self._config_store = config_store
+        self._metrics = metrics
+        self._read_timeout = read_timeout
+
+    async def sync(self, address: str, client: BleClient, read: bool = True) -> dict[str, Any] | None:
+        """
+        The module's descriptor, or None if it has none. read=False only
+        consults the cache, for clients that cannot issue GATT reads.
+        """
+        descriptor = await asyncio.to_thread(self._cache.lookup, address)
+        if descriptor is not None:
+            self._increment("descriptor_cache_hits")
+        else:
+            self._increment("descriptor_cache_misses")
+            if not read:
+                return None
+            descriptor = await self._read(address, client)
+            if descriptor is None:
+                return None
+            try:
+                await asyncio.to_thread(self._cache.store, address, descriptor)
+            except OSError as exc:
+                logger.warning("Failed to update descriptor cache: %s", exc)
+
+        try:
+            if await asyncio.to_thread(self._apply, address, descriptor):
+                logger.info("Descriptor of %s updated (%s)", address, descriptor_key(descriptor) or "no key")
+        except OSError as exc:
+            logger.warning("Failed to save descriptor of %s: %s", address, exc)
+        return descriptor
+
+    async def _read(self, address: str, client: BleClient) -> dict[str, Any] | None:
+        started_at = time.perf_counter()
+        try:
+            payload = await asyncio.wait_for(client.read_gatt_char(INFO_CHAR_UUID), self._read_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._increment("descriptor_read_failures")
+            logger.info("No INFO descriptor from %s: %s", address, exc)
+            return None
+        if self._metrics is not None:
+            self._metrics.record_descriptor_read(time.perf_counter() - started_at)
+
+        parsed = parse_info_tlv(bytes(payload))
+        if parsed is None:
+            self._increment("descriptor_read_failures")
+            logger.info("Empty INFO descriptor from %s", address)
+            return None
+        return parsed.to_dict()
+
+    def _apply(self, address: str, descriptor: dict[str, Any]) -> bool:
+        """Write the descriptor to the device config unless an equivalent one is there."""
+        snapshot = self._config_store.load()
+        device = snapshot.get("devices", {}).get(address) or {}
+        current = device.get("descriptor")
+        key = descriptor_key(descriptor)
+        if current == descriptor or (key is not None and descriptor_key(current) == key):
+            return False
+        self._config_store.set_descriptor(address, descriptor)
+        self._config_store.save()
+        return True
+
+    def _increment(self, name: str) -> None:
+        if self._metrics is not None:
+            self._metrics.increment(name)
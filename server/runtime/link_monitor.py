@@ -0,0 +1,234 @@
+"""
+Per-module BLE link quality.
+
+LinkMonitor keeps one fixed-size record per module the aggregator has seen,
+for the life of the process, so one module degrading a whole cabinet shows
+up in its own numbers:
+
+  - notification inter-arrival times in a log-linear histogram (the
+    latency_trace buckets), with idle gaps longer than
+    JITTER_MAX_INTERVAL_SECONDS counted apart, and a moving average of
+    |interval - previous interval| as jitter
+  - notifications and duplicate-state suppressions
+  - connects and disconnects, with the current uptime and the last and
+    total time spent disconnected since the first connect
+  - the last RSSI_SAMPLE_COUNT advertisement RSSI readings, in a ring
+  - for firmware that numbers its notifications, notifications missing
+    from the sequence
+  - for firmware that timestamps its notifications, the module clock's
+    drift and the estimated air-plus-stack latency (see clock_sync)
+
+All recording is a few array updates; the percentiles and ranking are
+computed only when stats are requested.
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Any
+
+from latency_trace import BUCKET_COUNT, bucket_index, bucket_percentiles
+
+from .clock_sync import DeviceClock
+from .scan_scheduler import JITTER_MAX_INTERVAL_SECONDS
+
+
+RSSI_SAMPLE_COUNT = 32
+JITTER_EWMA_ALPHA = 0.05
+
+
+class _LinkRecord:
+    __slots__ = (
+        "intervals",
+        "interval_count",
+        "interval_sum_us",
+        "interval_max_us",
+        "idle_gaps",
+        "last_arrival",
+        "last_interval",
+        "jitter_us",
+        "notifications",
+        "duplicates",
+        "connects",
+        "disconnects",
+        "connected_at",
+        "disconnected_at",
+        "last_downtime",
+        "downtime_total",
+        "rssi",
+        "rssi_count",
+        "last_sequence",
+        "sequence_gaps",
+        "clock",
+    )
+
+    def __init__(self) -> None:
+        self.intervals = array("Q", bytes(8 * BUCKET_COUNT))
+        self.interval_count = 0
+        self.interval_sum_us = 0
+        self.interval_max_us = 0
+        self.idle_gaps = 0
+        self.last_arrival: float | None = None
+        self.last_interval: float | None = None
+        self.jitter_us = 0.0
+        self.notifications = 0
+        self.duplicates = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.connected_at: float | None = None  # monotonic
+        self.disconnected_at: float | None = None
+        self.last_downtime: float | None = None
+        self.downtime_total = 0.0
+        self.rssi = array("b", bytes(RSSI_SAMPLE_COUNT))
+        self.rssi_count = 0
+        self.last_sequence: int | None = None
+        self.sequence_gaps = 0
+        self.clock: DeviceClock | None = None
+
+
+class LinkMonitor:
+    """Radio health per module address; see the module docstring."""
+
+    def __init__(self) -> None:
+        self._links: dict[str, _LinkRecord] = {}
+
+    def _link(self, address: str) -> _LinkRecord:
+        link = self._links.get(address)
+        if link is None:
+            link = self._links[address] = _LinkRecord()
+        return link
+
+    def note_notification(self, address: str, received_at: float, duplicate: bool = False) -> None:
+        """Every notification; received_at is perf_counter."""
+        link = self._link(address)
+        link.notifications += 1
+        if duplicate:
+            link.duplicates += 1
+        previous = link.last_arrival
+        link.last_arrival = received_at
+        if previous is None:
+            return
+        interval = received_at - previous
+        if interval > JITTER_MAX_INTERVAL_SECONDS:
+            link.idle_gaps += 1
+            link.last_interval = None
+            return
+        interval_us = int(interval * 1_000_000.0)
+        link.intervals[bucket_index(interval_us)] += 1
+        link.interval_count += 1
+        link.interval_sum_us += interval_us
+        if interval_us > link.interval_max_us:
+            link.interval_max_us = interval_us
+        if link.last_interval is not None:
+            sample_us = abs(interval - link.last_interval) * 1_000_000.0
+            link.jitter_us += JITTER_EWMA_ALPHA * (sample_us - link.jitter_us)
+        link.last_interval = interval
+
+    def note_merged(self, address: str, notifications: int, duplicates: int) -> None:
+        """Counts from a sharded merge pass, which carries no arrival times."""
+        link = self._link(address)
+        link.notifications += notifications
+        link.duplicates += duplicates
+
+    def note_sequence(self, address: str, sequence: int, bits: int = 8) -> None:
+        """A firmware notification counter of the given width; counts notifications skipped."""
+        link = self._link(address)
+        previous = link.last_sequence
+        link.last_sequence = sequence
+        if previous is not None:
+            link.sequence_gaps += (sequence - previous - 1) % (1 << bits)
+
+    def note_device_time(self, address: str, device_us: int, received_at: float) -> None:
+        """A notification's module timestamp; received_at is perf_counter."""
+        link = self._link(address)
+        if link.clock is None:
+            link.clock = DeviceClock()
+        link.clock.note(device_us, received_at)
+
+    def note_rssi(self, address: str, rssi: int) -> None:
+        link = self._link(address)
+        link.rssi[link.rssi_count % RSSI_SAMPLE_COUNT] = max(-128, min(127, rssi))
+        link.rssi_count += 1
+
+    def connected(self, address: str) -> None:
+        link = self._link(address)
+        now = time.monotonic()
+        link.connects += 1
+        link.connected_at = now
+        if link.disconnected_at is not None:
+            link.last_downtime = now - link.disconnected_at
+            link.downtime_total += link.last_downtime
+            link.disconnected_at = None
+
+    def disconnected(self, address: str) -> None:
+        link = self._links.get(address)
+        if link is None or link.connected_at is None:
+            return
+        link.disconnects += 1
+        link.connected_at = None
+        link.disconnected_at = time.monotonic()
+        # The next arrival gap spans the outage, not the radio.
+        link.last_arrival = None
+        link.last_interval = None
+        link.last_sequence = None
+        if link.clock is not None:
+            link.clock.reset()
+
+    def summary(self, address: str) -> dict[str, Any] | None:
+        link = self._links.get(address)
+        if link is None:
+            return None
+        now = time.monotonic()
+        intervals: dict[str, Any] = {"count": link.interval_count, "idle_gaps": link.idle_gaps}
+        if link.interval_count:
+            intervals["mean_us"] = link.interval_sum_us / link.interval_count
+            intervals.update(bucket_percentiles(link.intervals, link.interval_count, link.interval_max_us))
+            intervals["max_us"] = link.interval_max_us
+        samples = list(link.rssi[: min(link.rssi_count, RSSI_SAMPLE_COUNT)])
+        rssi: dict[str, Any] = {"samples": link.rssi_count}
+        if samples:
+            rssi.update(
+                last=link.rssi[(link.rssi_count - 1) % RSSI_SAMPLE_COUNT],
+                min=min(samples),
+                max=max(samples),
+                mean=sum(samples) / len(samples),
+            )
+        return {
+            "connected": link.connected_at is not None,
+            "connects": link.connects,
+            "disconnects": link.disconnects,
+            "uptime_s": now - link.connected_at if link.connected_at is not None else 0.0,
+            "last_downtime_s": link.last_downtime,
+            "downtime_total_s": link.downtime_total
+            + (now - link.disconnected_at if link.disconnected_at is not None else 0.0),
+            "notifications": link.notifications,
+            "duplicates": link.duplicates,
+            "intervals": intervals,
+            "jitter_us": link.jitter_us,
+            "rssi": rssi,
+            "sequence_gaps": link.sequence_gaps,
+            "radio_latency": link.clock.summary() if link.clock is not None else None,
+        }
+
+    def brief(self, address: str) -> dict[str, Any] | None:
+        """The few numbers worth showing next to a device's live state."""
+        summary = self.summary(address)
+        if summary is None:
+            return None
+        return {
+            "jitter_us": summary["jitter_us"],
+            "rssi": summary["rssi"].get("last"),
+            "disconnects": summary["disconnects"],
+            "sequence_gaps": summary["sequence_gaps"],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Every module's summary, and connected modules ranked worst jitter first."""
+        devices = {address: self.summary(address) for address in sorted(self._links)}
+        ranked = sorted(
+            (address for address, summary in devices.items() if summary and summary["connected"]),
+            key=lambda address: devices[address]["jitter_us"],
+            reverse=True,
+        )
+        return {"devices": devices, "by_jitter": ranked}
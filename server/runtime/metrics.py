@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_METRICS_PORT_ENV_VAR = "OPENARCADE_METRICS_PORT"
+METRICS_EXPORTER_HOST = "127.0.0.1"
+METRICS_PREFIX = "openarcade_"
+LOOP_LAG_SAMPLE_SECONDS = 0.1
+
+# Counters and gauges the aggregator reports; listed so a fresh process still
+# exposes every series at zero.
+COUNTER_NAMES: tuple[str, ...] = (
+    "notifications_received",
+    "duplicate_notifications_suppressed",
+    "reports_published",
+    "publish_dedup_hits",
+    "connect_attempts",
+    "connect_failures",
+    "direct_connect_attempts",
+    "mapping_cache_rebuilds",
+    "scans_deferred",
+    "scans_interrupted",
+    "shard_merges",
+    "shard_migrations",
+    "descriptor_cache_hits",
+    "descriptor_cache_misses",
+    "descriptor_reads",
+    "descriptor_read_failures",
+)
+GAUGE_NAMES: tuple[str, ...] = (
+    "scanner_on_seconds",
+    "loop_lag_seconds",
+    "loop_lag_max_seconds",
+    "mapping_cache_rebuild_seconds",
+    "mapping_cache_rebuild_seconds_total",
+    "connects_in_flight",
+    "connect_queue_depth",
+    "time_to_all_connected_seconds",
+    "connect_start_delay_seconds",
+    "reconnect_seconds",
+    "scan_duty_cycle",
+    "descriptor_read_seconds",
+    "descriptor_read_seconds_total",
+)
+PER_DEVICE_COUNTER_NAMES: tuple[str, ...] = (
+    "notifications_received",
+    "duplicate_notifications_suppressed",
+)
+
+_HELP: dict[str, str] = {
+    "notifications_received": "BLE input notifications received.",
+    "duplicate_notifications_suppressed": "Notifications dropped because the device state did not change.",
+    "reports_published": "HID reports published to the writer.",
+    "publish_dedup_hits": "Reports not published because they matched the previous report.",
+    "connect_attempts": "BLE connection attempts.",
+    "connect_failures": "Failed BLE connection attempts.",
+    "direct_connect_attempts": "Connects to known modules queued by address, without a scan hit.",
+    "mapping_cache_rebuilds": "Mapping cache rebuilds.",
+    "scans_deferred": "Scans held back by recent input or the duty cycle cap.",
+    "scans_interrupted": "Scans cut short by new input.",
+    "shard_merges": "Merge passes over the sharded ingestion state table.",
+    "shard_migrations": "Idle modules moved between ingestion shards to rebalance.",
+    "descriptor_cache_hits": "Connects whose descriptor came from the descriptor cache.",
+    "descriptor_cache_misses": "Connects with no cached descriptor for the module.",
+    "descriptor_reads": "INFO TLV descriptors read and parsed.",
+    "descriptor_read_failures": "INFO TLV reads that failed or did not parse.",
+    "scanner_on_seconds": "Cumulative time the BLE scanner has been running.",
+    "loop_lag_seconds": "Most recent asyncio loop wake-up lag.",
+    "loop_lag_max_seconds": "Largest asyncio loop wake-up lag observed.",
+    "mapping_cache_rebuild_seconds": "Duration of the last mapping cache rebuild.",
+    "mapping_cache_rebuild_seconds_total": "Cumulative mapping cache rebuild time.",
+    "connects_in_flight": "BLE connect attempts currently running.",
+    "connect_queue_depth": "Discovered devices waiting for a connect slot.",
+    "time_to_all_connected_seconds": "Duration of the last connect burst, first discovery to all attempts done.",
+    "connect_start_delay_seconds": "Discovery to connect start of the last connect attempt.",
+    "reconnect_seconds": "Disconnect to reconnected time of the last known module that came back.",
+    "scan_duty_cycle": "Fraction of the last minute spent scanning, as of the last scan stop.",
+    "descriptor_read_seconds": "Duration of the last INFO TLV read.",
+    "descriptor_read_seconds_total": "Cumulative INFO TLV read time.",
+}
+
+
+def resolve_metrics_port() -> int | None:
+    raw = os.environ.get(OPENARCADE_METRICS_PORT_ENV_VAR)
+    if not raw:
+        return None
+    try:
+        port = int(raw)
+    except ValueError:
+        logger.warning("Invalid %s='%s', metrics exporter disabled", OPENARCADE_METRICS_PORT_ENV_VAR, raw)
+        return None
+    return port if 0 < port < 65536 else None
+
+
+class RuntimeMetrics:
+    """Monotonic counters and gauges for a single runtime process."""
+
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = {name: 0 for name in COUNTER_NAMES}
+        self.gauges: dict[str, float] = {name: 0.0 for name in GAUGE_NAMES}
+        self.device_counters: dict[str, defaultdict[str, int]] = {
+            name: defaultdict(int) for name in PER_DEVICE_COUNTER_NAMES
+        }
+        self._scanner_started_at: float | None = None
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def increment_device(self, name: str, device_id: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+        self.device_counters[name][device_id] += amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def scanner_started(self) -> None:
+        if self._scanner_started_at is None:
+            self._scanner_started_at = time.monotonic()
+
+    def scanner_stopped(self) -> None:
+        if self._scanner_started_at is not None:
+            self.gauges["scanner_on_seconds"] += time.monotonic() - self._scanner_started_at
+            self._scanner_started_at = None
+
+    def record_mapping_cache_rebuild(self, seconds: float) -> None:
+        self.counters["mapping_cache_rebuilds"] += 1
+        self.gauges["mapping_cache_rebuild_seconds"] = seconds
+        self.gauges["mapping_cache_rebuild_seconds_total"] += seconds
+
+    def record_descriptor_read(self, seconds: float) -> None:
+        self.counters["descriptor_reads"] += 1
+        self.gauges["descriptor_read_seconds"] = seconds
+        self.gauges["descriptor_read_seconds_total"] += seconds
+
+    def record_loop_lag(self, seconds: float) -> None:
+        self.gauges["loop_lag_seconds"] = seconds
+        if seconds > self.gauges["loop_lag_max_seconds"]:
+            self.gauges["loop_lag_max_seconds"] = seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        gauges = dict(self.gauges)
+        if self._scanner_started_at is not None:
+            gauges["scanner_on_seconds"] += time.monotonic() - self._scanner_started_at
+        return {
+            "counters": dict(self.counters),
+            "gauges": gauges,
+            "devices": {
+                name: dict(per_device)
+                for name, per_device in self.device_counters.items()
+            },
+        }
+
+    async def monitor_loop_lag(
+        self,
+        interval: float = LOOP_LAG_SAMPLE_SECONDS,
+        active: asyncio.Event | None = None,
+    ) -> None:
+        """Sleep in a loop and record how late each wake-up is; only while active is set, if given."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if active is not None:
+                await active.wait()
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.record_loop_lag(max(0.0, loop.time() - expected))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snapshot: dict[str, Any]) -> str:
+    """Render a RuntimeMetrics snapshot in Prometheus text exposition format."""
+    lines: list[str] = []
+    devices: dict[str, dict[str, int]] = snapshot.get("devices", {})
+    for name, value in snapshot.get("counters", {}).items():
+        metric = f"{METRICS_PREFIX}{name}_total"
+        lines.append(f"# HELP {metric} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {metric} counter")
+        per_device = devices.get(name)
+        if per_device:
+            for device_id, device_value in sorted(per_device.items()):
+                lines.append(f'{metric}{{device="{_escape_label(device_id)}"}} {device_value}')
+        else:
+            lines.append(f"{metric} {value}")
+    for name, value in snapshot.get("gauges", {}).items():
+        metric = f"{METRICS_PREFIX}{name}"
+        lines.append(f"# HELP {metric} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {float(value):.6f}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Minimal HTTP server that serves render_prometheus() on a local port."""
+
+    def __init__(self, metrics: RuntimeMetrics, port: int, host: str = METRICS_EXPORTER_HOST) -> None:
+        self._metrics = metrics
+        self._host = host
+        self._port = port
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def port(self) -> int:
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_client, self._host, self._port)
+        logger.info("Metrics exporter listening on http://%s:%s/metrics", self._host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            # Drain headers; the exporter ignores them.
+            while True:
+                line = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] in ("/metrics", "/"):
+                status = "200 OK"
+                body = render_prometheus(self._metrics.snapshot()).encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+                content_type = "text/plain; charset=utf-8"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
@@ -0,0 +1,139 @@
+"""
+Per-module reconnect backoff.
+
+After a failed connect or a lost link the runtime waits before trying a
+module again. ReconnectBackoff picks that wait from the module's history
+instead of a flat SCANNER_DELAY:
+
+  - a link that stayed up for HEALTHY_LINK_SECONDS and then dropped is
+    retried after RECONNECT_FIRST_DELAY_SECONDS, since it is most likely
+    a transient drop of a module that is still in range
+  - each failed connect, and each link that drops before it was healthy,
+    doubles the wait from BACKOFF_BASE_SECONDS up to BACKOFF_MAX_SECONDS,
+    so a module that is powered off or flapping costs less and less
+  - a link that becomes healthy resets the streak
+
+Every wait is spread by +/- BACKOFF_JITTER so modules that failed together
+(a cabinet power blip) do not all retry in the same instant.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+
+
+RECONNECT_FIRST_DELAY_SECONDS = 0.2
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+BACKOFF_JITTER = 0.2
+HEALTHY_LINK_SECONDS = 30.0
+
+
+@dataclass
+class _DeviceBackoff:
+    failures: int = 0  # current streak
+    connects: int = 0
+    connect_failures: int = 0
+    disconnects: int = 0
+    connected_at: float | None = None  # monotonic
+    last_uptime: float | None = None
+    last_delay: float = 0.0
+    next_attempt_at: float = 0.0
+
+
+class ReconnectBackoff:
+    """When each module may be tried again; every call comes from one thread or loop."""
+
+    def __init__(
+        self,
+        first_delay: float = RECONNECT_FIRST_DELAY_SECONDS,
+        base_delay: float = BACKOFF_BASE_SECONDS,
+        max_delay: float = BACKOFF_MAX_SECONDS,
+        healthy_seconds: float = HEALTHY_LINK_SECONDS,
+        jitter: float = BACKOFF_JITTER,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.first_delay = first_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.healthy_seconds = healthy_seconds
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+        self._devices: dict[str, _DeviceBackoff] = {}
+
+    def _device(self, address: str) -> _DeviceBackoff:
+        device = self._devices.get(address)
+        if device is None:
+            device = self._devices[address] = _DeviceBackoff()
+        return device
+
+    def ready(self, address: str, now: float | None = None) -> bool:
+        device = self._devices.get(address)
+        if device is None:
+            return True
+        return (time.monotonic() if now is None else now) >= device.next_attempt_at
+
+    def connected(self, address: str) -> None:
+        device = self._device(address)
+        device.connects += 1
+        device.connected_at = time.monotonic()
+        device.next_attempt_at = 0.0
+
+    def connect_failed(self, address: str) -> float:
+        """Returns the wait before the next attempt."""
+        device = self._device(address)
+        device.connect_failures += 1
+        device.connected_at = None
+        device.failures += 1
+        return self._schedule(device, self._growing_delay(device.failures))
+
+    def disconnected(self, address: str) -> float | None:
+        """Returns the wait before the next attempt, or None if the module was not marked connected."""
+        device = self._devices.get(address)
+        if device is None or device.connected_at is None:
+            return None
+        now = time.monotonic()
+        device.disconnects += 1
+        device.last_uptime = now - device.connected_at
+        device.connected_at = None
+        if device.last_uptime >= self.healthy_seconds:
+            device.failures = 0
+            return self._schedule(device, self.first_delay, now)
+        device.failures += 1
+        return self._schedule(device, self._growing_delay(device.failures), now)
+
+    def clear(self) -> None:
+        """Let every module be tried at once (e.g. pairing was toggled); streaks are kept."""
+        for device in self._devices.values():
+            device.next_attempt_at = 0.0
+
+    def forget(self, address: str) -> None:
+        self._devices.pop(address, None)
+
+    def _growing_delay(self, failures: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** min(failures - 1, 30)))
+
+    def _schedule(self, device: _DeviceBackoff, delay: float, now: float | None = None) -> float:
+        delay *= 1.0 + self.jitter * (2.0 * self._rng.random() - 1.0)
+        device.last_delay = delay
+        device.next_attempt_at = (time.monotonic() if now is None else now) + delay
+        return delay
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            address: {
+                "connected": device.connected_at is not None,
+                "failure_streak": device.failures,
+                "connects": device.connects,
+                "connect_failures": device.connect_failures,
+                "disconnects": device.disconnects,
+                "last_uptime_s": device.last_uptime,
+                "last_delay_s": device.last_delay,
+                "next_attempt_in_s": max(0.0, device.next_attempt_at - now),
+            }
+            for address, device in sorted(self._devices.items())
+        }
@@ -11,6 +11,7 @@ from constants import (
     SWITCH_HORI_INPUT_MAP,
 )
 from default_descriptor import default_descriptor
+from device_descriptor import ControlType, ReportFormat
 
 
 KEYCODES = {
@@ -45,6 +46,22 @@ def get_device_controls(
     return [control for control in controls if isinstance(control, Mapping)]
 
 
+def control_state_bit(control: Mapping[str, Any]) -> int | None:
+    """State bit a button control reports on: its bit_index, or its payload bit if packed."""
+    bit_index = control.get("bit_index")
+    if isinstance(bit_index, int):
+        return bit_index
+    if control.get("type") != ControlType.BUTTON or control.get("format") == ReportFormat.BITFIELD:
+        return None
+    if (control.get("bit_width") or 1) != 1:
+        return None
+    byte_offset = control.get("byte_offset")
+    bit_offset = control.get("bit_offset") or 0
+    if not isinstance(byte_offset, int) or not isinstance(bit_offset, int):
+        return None
+    return byte_offset * 8 + bit_offset
+
+
 def build_control_maps(
     device_config: Mapping[str, Any],
     default_controls: Sequence[Mapping[str, Any]] | None = None,
@@ -53,8 +70,8 @@ def build_control_maps(
     controls_by_id: dict[str, Mapping[str, Any]] = {}
 
     for control in get_device_controls(device_config, default_controls):
-        bit_index = control.get("bit_index")
-        if isinstance(bit_index, int):
+        bit_index = control_state_bit(control)
+        if bit_index is not None:
             controls_by_bit_index[bit_index] = control
 
         control_id = control.get("id")
@@ -162,8 +179,8 @@ def build_mapping(
 
     mapping: dict[int, int | str] = {}
     for control in controls:
-        bit_index = control.get("bit_index")
-        if not isinstance(bit_index, int):
+        bit_index = control_state_bit(control)
+        if bit_index is None:
             continue
 
         control_id = control.get("id")
@@ -255,13 +272,12 @@ def _apply_axis_inputs(
     neutral: int,
     minimum: int,
     maximum: int,
+    analog_axes: Sequence[int] | None = None,
 ) -> dict[str, int]:
-    axes = {
-        "lx": neutral,
-        "ly": neutral,
-        "rx": neutral,
-        "ry": neutral,
-    }
+    """Axis bytes from digital directions; an axis with none pressed takes its analog value."""
+    if analog_axes is None:
+        analog_axes = (neutral,) * len(ANALOG_AXIS_NAMES)
+    axes = dict(zip(ANALOG_AXIS_NAMES, analog_axes))
     directions: dict[str, set[int]] = {axis: set() for axis in axes}
 
     for input_name in active_inputs:
@@ -325,7 +341,96 @@ def _resolve_hat_value(
     return centered
 
 
-def build_gamepad_pc_report(active_inputs: Iterable[str]) -> bytes:
+HAT_DIRECTION_UP = 0x1
+HAT_DIRECTION_RIGHT = 0x2
+HAT_DIRECTION_DOWN = 0x4
+HAT_DIRECTION_LEFT = 0x8
+AXIS_REPORT_OFFSETS = {"lx": 3, "ly": 4, "rx": 5, "ry": 6}
+# Order of analog axis values, as decoded by runtime.state_decoder.
+ANALOG_AXIS_NAMES = ("lx", "ly", "rx", "ry")
+
+
+def build_hat_table(
+    up: int,
+    right: int,
+    down: int,
+    left: int,
+    up_right: int,
+    down_right: int,
+    down_left: int,
+    up_left: int,
+    centered: int,
+) -> tuple[int, ...]:
+    """Resolve every 4-bit HAT_DIRECTION_* mask to its hat value up front."""
+    table: list[int] = []
+    for direction_mask in range(16):
+        directions: set[int] = set()
+        if direction_mask & HAT_DIRECTION_UP:
+            directions.add(up)
+        if direction_mask & HAT_DIRECTION_RIGHT:
+            directions.add(right)
+        if direction_mask & HAT_DIRECTION_DOWN:
+            directions.add(down)
+        if direction_mask & HAT_DIRECTION_LEFT:
+            directions.add(left)
+        table.append(
+            _resolve_hat_value(
+                directions,
+                up=up,
+                right=right,
+                down=down,
+                left=left,
+                up_right=up_right,
+                down_right=down_right,
+                down_left=down_left,
+                up_left=up_left,
+                centered=centered,
+            )
+        )
+    return tuple(table)
+
+
+def hat_direction_bit(value: int, up: int, right: int, down: int, left: int) -> int:
+    if value == up:
+        return HAT_DIRECTION_UP
+    if value == right:
+        return HAT_DIRECTION_RIGHT
+    if value == down:
+        return HAT_DIRECTION_DOWN
+    if value == left:
+        return HAT_DIRECTION_LEFT
+    return 0
+
+
+GAMEPAD_PC_HAT_TABLE = build_hat_table(
+    up=const.GP_DPAD_UP,
+    right=const.GP_DPAD_RIGHT,
+    down=const.GP_DPAD_DOWN,
+    left=const.GP_DPAD_LEFT,
+    up_right=const.GP_DPAD_UP_RIGHT,
+    down_right=const.GP_DPAD_DOWN_RIGHT,
+    down_left=const.GP_DPAD_DOWN_LEFT,
+    up_left=const.GP_DPAD_UP_LEFT,
+    centered=const.GP_DPAD_CENTER,
+)
+
+SWITCH_HORI_HAT_TABLE = build_hat_table(
+    up=const.SW_HORI_HAT_UP,
+    right=const.SW_HORI_HAT_RIGHT,
+    down=const.SW_HORI_HAT_DOWN,
+    left=const.SW_HORI_HAT_LEFT,
+    up_right=const.SW_HORI_HAT_UP_RIGHT,
+    down_right=const.SW_HORI_HAT_DOWN_RIGHT,
+    down_left=const.SW_HORI_HAT_DOWN_LEFT,
+    up_left=const.SW_HORI_HAT_UP_LEFT,
+    centered=const.SW_HORI_HAT_CENTER,
+)
+
+
+def build_gamepad_pc_report(
+    active_inputs: Iterable[str],
+    analog_axes: Sequence[int] | None = None,
+) -> bytes:
     report = bytearray(8)
     normalized_inputs = {input_name for input_name in active_inputs if isinstance(input_name, str)}
 
@@ -337,6 +442,7 @@ def build_gamepad_pc_report(active_inputs: Iterable[str]) -> bytes:
         neutral=const.GP_AXIS_NEUTRAL,
         minimum=const.GP_AXIS_MIN,
         maximum=const.GP_AXIS_MAX,
+        analog_axes=analog_axes,
     )
 
     for input_name in normalized_inputs:
@@ -373,7 +479,10 @@ def build_gamepad_pc_report(active_inputs: Iterable[str]) -> bytes:
     return bytes(report)
 
 
-def build_gamepad_switch_hori_report(active_inputs: Iterable[str]) -> bytes:
+def build_gamepad_switch_hori_report(
+    active_inputs: Iterable[str],
+    analog_axes: Sequence[int] | None = None,
+) -> bytes:
     report = bytearray(8)
     normalized_inputs = {input_name for input_name in active_inputs if isinstance(input_name, str)}
 
@@ -385,6 +494,7 @@ def build_gamepad_switch_hori_report(active_inputs: Iterable[str]) -> bytes:
         neutral=const.SW_HORI_AXIS_NEUTRAL,
         minimum=const.SW_HORI_AXIS_MIN,
         maximum=const.SW_HORI_AXIS_MAX,
+        analog_axes=analog_axes,
     )
 
     for input_name in normalized_inputs:
@@ -424,3 +534,28 @@ def build_gamepad_switch_hori_report(active_inputs: Iterable[str]) -> bytes:
 def build_gamepad_report(active_inputs: Iterable[str]) -> bytes:
     """Backward-compatible alias for the PC gamepad report builder."""
     return build_gamepad_pc_report(active_inputs)
+
+
+def report_has_press_edge(mode: str, previous: bytes, report: bytes) -> bool:
+    """Whether report engages any input that was not engaged in previous."""
+    if mode == "keyboard":
+        if report[0] & ~previous[0]:
+            return True
+        previous_keys = set(previous[2:8])
+        return any(key and key not in previous_keys for key in report[2:8])
+
+    if mode == "gamepad_switch_hori":
+        hat_center = const.SW_HORI_HAT_CENTER
+        axis_neutral = const.SW_HORI_AXIS_NEUTRAL
+    else:
+        hat_center = const.GP_DPAD_CENTER
+        axis_neutral = const.GP_AXIS_NEUTRAL
+
+    if (report[0] & ~previous[0]) or (report[1] & ~previous[1]):
+        return True
+    if report[2] != previous[2] and report[2] != hat_center:
+        return True
+    return any(
+        report[index] != previous[index] and report[index] != axis_neutral
+        for index in range(3, 7)
+    )
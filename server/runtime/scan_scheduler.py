@@ -0,0 +1,312 @@
+"""
+Activity-aware BLE scan scheduling.
+
+On the Pi's combo radio a running scan competes with connection events, so
+notifications arrive late and bunched while scanning. ScanScheduler keeps
+scans out of gameplay:
+
+  - while any module is connected, no scan runs if an input changed within
+    activity_window seconds, and a running scan is cut short by new input
+  - settle windows after connects/disconnects and the periodic background
+    scan are deferred into the next idle gap instead of being skipped; a
+    discovery scan, or a connect that keeps the radio from scanning, moves
+    the background scan a full interval on
+  - total scan time over the last DUTY_WINDOW_SECONDS is capped at
+    max_duty_cycle
+
+With nothing connected there is no gameplay to protect and scanning follows
+pairing mode alone.
+
+Every scan is kept as a window (reason, duration, interrupted), and
+notification inter-arrival jitter, |interval - previous interval| for
+back-to-back notifications from one module, is histogrammed separately
+for notifications received while scanning and while not scanning.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Any
+
+from latency_trace import BUCKET_COUNT, bucket_index, bucket_percentiles
+
+from .metrics import RuntimeMetrics
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_SCAN_ACTIVITY_WINDOW_ENV_VAR = "OPENARCADE_SCAN_ACTIVITY_WINDOW"
+OPENARCADE_SCAN_MAX_DUTY_CYCLE_ENV_VAR = "OPENARCADE_SCAN_MAX_DUTY_CYCLE"
+DEFAULT_SCAN_ACTIVITY_WINDOW_SECONDS = 3.0
+DEFAULT_SCAN_MAX_DUTY_CYCLE = 0.1
+DUTY_WINDOW_SECONDS = 60.0
+CONNECTED_SCAN_SETTLE_SECONDS = 5.0
+BACKGROUND_SCAN_INTERVAL_SECONDS = 15.0
+BACKGROUND_SCAN_DURATION_SECONDS = 1.0
+SCAN_WINDOW_HISTORY = 32
+# Longer gaps are idle time between presses, not radio jitter.
+JITTER_MAX_INTERVAL_SECONDS = 0.1
+
+SCAN_REASON_NO_DEVICES = "no_devices"
+SCAN_REASON_DISCOVERY = "discovery"
+SCAN_REASON_SETTLE = "settle"
+SCAN_REASON_BACKGROUND = "background"
+
+
+def _resolve_float(env_var: str, default: float, minimum: float, maximum: float) -> float:
+    raw = os.environ.get(env_var)
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.warning("Invalid %s='%s', using %s", env_var, raw, default)
+        return default
+    return min(max(value, minimum), maximum)
+
+
+def resolve_scan_activity_window() -> float:
+    return _resolve_float(OPENARCADE_SCAN_ACTIVITY_WINDOW_ENV_VAR, DEFAULT_SCAN_ACTIVITY_WINDOW_SECONDS, 0.0, 3600.0)
+
+
+def resolve_scan_max_duty_cycle() -> float:
+    return _resolve_float(OPENARCADE_SCAN_MAX_DUTY_CYCLE_ENV_VAR, DEFAULT_SCAN_MAX_DUTY_CYCLE, 0.0, 1.0)
+
+
+class _JitterHistogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        value_us = int(seconds * 1_000_000.0)
+        self.buckets[bucket_index(value_us)] += 1
+        self.count += 1
+        self.sum_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def summary(self) -> dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        result: dict[str, Any] = {"count": self.count, "mean_us": self.sum_us / self.count}
+        result.update(bucket_percentiles(self.buckets, self.count, self.max_us))
+        result["max_us"] = self.max_us
+        return result
+
+
+class ScanScheduler:
+    """Decides when the aggregator may scan, and measures what scanning costs."""
+
+    def __init__(
+        self,
+        activity_window: float | None = None,
+        max_duty_cycle: float | None = None,
+        settle_seconds: float = CONNECTED_SCAN_SETTLE_SECONDS,
+        background_interval: float = BACKGROUND_SCAN_INTERVAL_SECONDS,
+        background_duration: float = BACKGROUND_SCAN_DURATION_SECONDS,
+        metrics: RuntimeMetrics | None = None,
+    ) -> None:
+        self.activity_window = (
+            activity_window if activity_window is not None else resolve_scan_activity_window()
+        )
+        self.max_duty_cycle = max_duty_cycle if max_duty_cycle is not None else resolve_scan_max_duty_cycle()
+        self.settle_seconds = settle_seconds
+        self.background_interval = background_interval
+        self.background_duration = background_duration
+        self._metrics = metrics
+        now = time.monotonic()
+        self.last_input_at = float("-inf")
+        self.scan_until = now + settle_seconds
+        self.next_background_at = self.scan_until + background_interval
+        self.scanning = False
+        self.deferred_scans = 0
+        self.interrupted_scans = 0
+        self._reason = SCAN_REASON_SETTLE
+        self._deferring = False
+        self._interrupt_requested = False
+        self._scan_started_at = 0.0
+        self._scan_started_wall = 0.0
+        self._recent_scans: deque[tuple[float, float]] = deque()  # (start, end), monotonic
+        self._windows: deque[dict[str, Any]] = deque(maxlen=SCAN_WINDOW_HISTORY)
+        self._last_arrival: dict[str, float] = {}
+        self._last_interval: dict[str, float] = {}
+        self._jitter_scanning = _JitterHistogram()
+        self._jitter_idle = _JitterHistogram()
+
+    def note_notification(self, address: str, received_at: float) -> None:
+        """Every notification, for jitter; received_at is perf_counter."""
+        previous = self._last_arrival.get(address)
+        self._last_arrival[address] = received_at
+        if previous is None:
+            return
+        interval = received_at - previous
+        if interval > JITTER_MAX_INTERVAL_SECONDS:
+            self._last_interval.pop(address, None)
+            return
+        previous_interval = self._last_interval.get(address)
+        self._last_interval[address] = interval
+        if previous_interval is not None:
+            histogram = self._jitter_scanning if self.scanning else self._jitter_idle
+            histogram.record(abs(interval - previous_interval))
+
+    def note_input(self) -> bool:
+        """A module's state changed; returns True once per scan that should now be cut short."""
+        self.last_input_at = time.monotonic()
+        if self.scanning and self.activity_window > 0.0 and not self._interrupt_requested:
+            self._interrupt_requested = True
+            return True
+        return False
+
+    def forget_device(self, address: str) -> None:
+        self._last_arrival.pop(address, None)
+        self._last_interval.pop(address, None)
+
+    def extend_window(self, duration: float | None = None) -> None:
+        """Ask for a scan window (after a connect or disconnect); it waits for an idle gap."""
+        now = time.monotonic()
+        self.scan_until = max(self.scan_until, now + (duration if duration is not None else self.settle_seconds))
+        self.next_background_at = self.scan_until + self.background_interval
+
+    def input_active(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now - self.last_input_at < self.activity_window
+
+    def duty_cycle(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        horizon = now - DUTY_WINDOW_SECONDS
+        while self._recent_scans and self._recent_scans[0][1] < horizon:
+            self._recent_scans.popleft()
+        scanned = sum(end - max(start, horizon) for start, end in self._recent_scans)
+        if self.scanning:
+            scanned += now - max(self._scan_started_at, horizon)
+        return scanned / DUTY_WINDOW_SECONDS
+
+    def should_scan(
+        self,
+        pairing_enabled: bool,
+        connected_count: int,
+        discovery_pending: bool = False,
+        connect_in_flight: bool = False,
+    ) -> bool:
+        """connect_in_flight: a connect is running on a radio that cannot scan meanwhile."""
+        if not pairing_enabled:
+            return False
+        now = time.monotonic()
+        if connect_in_flight:
+            self._postpone_background(now)
+            return False
+        if connected_count == 0:
+            self._reason = SCAN_REASON_NO_DEVICES
+            return True
+
+        wanted = discovery_pending or now < self.scan_until or now >= self.next_background_at
+        if self.input_active(now) or self.duty_cycle(now) >= self.max_duty_cycle:
+            if wanted and not self.scanning and not self._deferring:
+                self._deferring = True
+                self.deferred_scans += 1
+                if self._metrics is not None:
+                    self._metrics.increment("scans_deferred")
+            if now >= self.next_background_at:
+                # Keep the background scan due so it runs in the next idle gap.
+                self.next_background_at = now
+            return False
+        self._deferring = False
+
+        if discovery_pending:
+            self._postpone_background(now)
+            self._reason = SCAN_REASON_DISCOVERY
+            return True
+        if now < self.scan_until:
+            if not self.scanning:
+                self._reason = SCAN_REASON_SETTLE
+            return True
+        if now >= self.next_background_at:
+            self.scan_until = now + self.background_duration
+            self.next_background_at = self.scan_until + self.background_interval
+            self._reason = SCAN_REASON_BACKGROUND
+            return True
+        return False
+
+    def _postpone_background(self, now: float) -> None:
+        """Discovery scans anyway, and a connect blocks scanning; either way skip a due background scan."""
+        if now >= self.next_background_at:
+            self.next_background_at = now + self.background_interval
+
+    def next_change_in(self, pairing_enabled: bool, connected_count: int) -> float | None:
+        """Seconds until should_scan may answer differently with no new event; None if only an event can change it."""
+        if not pairing_enabled or connected_count == 0:
+            return None
+        now = time.monotonic()
+        deadlines = [
+            deadline - now
+            for deadline in (self.scan_until, self.next_background_at, self.last_input_at + self.activity_window)
+            if deadline > now
+        ]
+        excess = self.duty_cycle(now) - self.max_duty_cycle
+        if excess >= 0.0:
+            # Scan time leaves the window at most one second per second.
+            deadlines.append(max(excess * DUTY_WINDOW_SECONDS, 0.05))
+        return min(deadlines) if deadlines else None
+
+    def scan_started(self) -> None:
+        self.scanning = True
+        self._interrupt_requested = False
+        self._scan_started_at = time.monotonic()
+        self._scan_started_wall = time.time()
+
+    def scan_stopped(self) -> None:
+        if not self.scanning:
+            return
+        now = time.monotonic()
+        self.scanning = False
+        self._recent_scans.append((self._scan_started_at, now))
+        interrupted = self._interrupt_requested
+        if interrupted:
+            self.interrupted_scans += 1
+        if self._metrics is not None:
+            if interrupted:
+                self._metrics.increment("scans_interrupted")
+            self._metrics.set_gauge("scan_duty_cycle", self.duty_cycle(now))
+        self._windows.append(
+            {
+                "reason": self._reason,
+                "started_at": self._scan_started_wall,
+                "duration_s": now - self._scan_started_at,
+                "interrupted": interrupted,
+            }
+        )
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        windows = list(self._windows)
+        if self.scanning:
+            windows.append(
+                {
+                    "reason": self._reason,
+                    "started_at": self._scan_started_wall,
+                    "duration_s": now - self._scan_started_at,
+                    "interrupted": False,
+                    "running": True,
+                }
+            )
+        return {
+            "scanning": self.scanning,
+            "input_active": self.input_active(now),
+            "last_input_age_s": now - self.last_input_at if self.last_input_at > float("-inf") else None,
+            "activity_window_s": self.activity_window,
+            "max_duty_cycle": self.max_duty_cycle,
+            "duty_cycle": self.duty_cycle(now),
+            "deferred_scans": self.deferred_scans,
+            "interrupted_scans": self.interrupted_scans,
+            "windows": windows,
+            "notification_jitter": {
+                "scanning": self._jitter_scanning.summary(),
+                "idle": self._jitter_idle.summary(),
+            },
+        }
@@ -0,0 +1,209 @@
+"""
+Single-event-loop device session engine.
+
+SessionEngine runs discovery, the connection scheduler and every
+DeviceSession as tasks on the application's own loop, owned by one
+asyncio.TaskGroup. It replaces SessionSupervisor's control-plane thread
+and its thread plus event loop per module. Notifications reach the
+on_state_update callback synchronously from the transport callback, with
+no call_soon_threadsafe handoff.
+
+Failures stay per session:
+- A connect error, a disconnect or a raising state callback ends or logs
+  that one session.
+- The TaskGroup only sees session tasks that have already handled their
+  own errors, so one module can never cancel the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from .connection_scheduler import ConnectCandidate, ConnectionScheduler
+from .device_session import DeviceSession, StateUpdateCallback
+from .discovery import DiscoveryService
+from .reconnect_backoff import ReconnectBackoff
+from .state_decoder import AnalogAxes, StateDecoder
+from .transport import BleTransport, create_ble_transport
+
+
+logger = logging.getLogger("OpenArcade")
+
+SessionStoppedCallback = Callable[[str], None]
+
+
+class SessionEngine:
+    """Same interface as SessionSupervisor; start, stop and callbacks all run on the app loop."""
+
+    def __init__(
+        self,
+        on_state_update: StateUpdateCallback,
+        on_session_stopped: SessionStoppedCallback,
+        transport: BleTransport | None = None,
+        decoders: Mapping[str, StateDecoder] | None = None,
+    ) -> None:
+        self._on_state_update = on_state_update
+        self._on_session_stopped = on_session_stopped
+        self._transport = transport or create_ble_transport()
+        self._decoders = decoders
+        self._task: asyncio.Task | None = None
+        self._task_group: asyncio.TaskGroup | None = None
+        self._discovered: asyncio.Queue[tuple[Any, int | None] | None] = asyncio.Queue()
+        self._stopping = False
+        self._sessions: dict[str, asyncio.Event] = {}
+        self._connected_addresses: set[str] = set()
+        self._backoff = ReconnectBackoff()
+        self._scheduler: ConnectionScheduler | None = None
+
+    @property
+    def connected_addresses(self) -> set[str]:
+        return set(self._connected_addresses)
+
+    @property
+    def connection_stats(self) -> dict[str, Any] | None:
+        scheduler = self._scheduler
+        return scheduler.stats() if scheduler is not None else None
+
+    @property
+    def reconnect_stats(self) -> dict[str, dict[str, Any]]:
+        return self._backoff.stats()
+
+    def start(self, app_loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._task = app_loop.create_task(self._main(), name="session-engine")
+
+    def stop(self) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        self._discovered.put_nowait(None)  # wakes the discovery loop
+        for stop_event in self._sessions.values():
+            stop_event.set()
+
+    async def wait_closed(self) -> None:
+        task = self._task
+        if task is None:
+            return
+        await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+
+    async def _main(self) -> None:
+        discovery = DiscoveryService(self._discovered, self._transport)
+
+        async def resume_scanning() -> None:
+            if self._stopping:
+                return
+            try:
+                await discovery.resume()
+            except Exception:
+                pass  # DiscoveryService already logged it
+
+        blocks = self._transport.scan_blocks_connect
+        self._scheduler = ConnectionScheduler(
+            self._connect_session,
+            stop_scanning=discovery.pause if blocks else None,
+            resume_scanning=resume_scanning if blocks else None,
+        )
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                self._task_group = task_group
+                try:
+                    await discovery.start()
+                    logger.info("BLE session engine started")
+                    while (item := await self._discovered.get()) is not None:
+                        device, rssi = item
+                        self._schedule_session(device, rssi)
+                finally:
+                    self.stop()
+                    await self._scheduler.stop()
+                    await discovery.stop()
+                # Leaving the group waits for every session to disconnect.
+        except Exception:
+            logger.exception("BLE session engine crashed")
+        finally:
+            self._task_group = None
+            logger.info("BLE session engine stopped")
+
+    def _schedule_session(self, device: Any, rssi: int | None = None) -> None:
+        address = str(getattr(device, "address", device))
+        if self._stopping or address in self._sessions:
+            return
+        if not self._backoff.ready(address):
+            return
+        self._sessions[address] = asyncio.Event()
+        logger.info("Discovered target device %s", address)
+        if self._scheduler is not None:
+            self._scheduler.submit(address, address, rssi=rssi)
+
+    async def _connect_session(self, candidate: ConnectCandidate) -> bool:
+        address = candidate.address
+        stop_event = self._sessions.get(address)
+        if stop_event is None or self._stopping or self._task_group is None:
+            self._sessions.pop(address, None)
+            return False
+
+        session = DeviceSession(
+            device=address,
+            stop_event=stop_event,
+            on_state_update=self._deliver_state,
+            transport=self._transport,
+            decoders=self._decoders,
+        )
+        logger.info("Connecting to %s", address)
+        try:
+            await session.connect()
+        except asyncio.CancelledError:
+            await self._close_session(session, connected=False)  # shutdown during connect
+            raise
+        except Exception as exc:
+            logger.error("Device session error for %s: %s", address, exc)
+            await self._close_session(session, connected=False)
+            return False
+
+        self._connected_addresses.add(address)
+        self._backoff.connected(address)
+        logger.info("Connected to %s", address)
+        self._task_group.create_task(self._run_session(session), name=f"device-session:{address}")
+        return True
+
+    async def _run_session(self, session: DeviceSession) -> None:
+        try:
+            await session.wait_closed()
+        except Exception:
+            logger.exception("Device session failed for %s", session.address)
+        finally:
+            await self._close_session(session, connected=True)
+
+    async def _close_session(self, session: DeviceSession, connected: bool) -> None:
+        address = session.address
+        try:
+            await session.disconnect()
+        except Exception as exc:
+            logger.warning("Disconnect cleanup failed for %s: %s", address, exc)
+        self._sessions.pop(address, None)
+        self._connected_addresses.discard(address)
+        if not self._stopping:
+            if connected:
+                logger.warning("Disconnected from %s", address)
+                retry_delay = self._backoff.disconnected(address)
+            else:
+                retry_delay = self._backoff.connect_failed(address)
+            if retry_delay is not None:
+                logger.info("Retrying %s after %.1fs", address, retry_delay)
+        try:
+            self._on_session_stopped(address)
+        except Exception:
+            logger.exception("Session stopped callback failed for %s", address)
+
+    def _deliver_state(self, address: str, state: int, axes: AnalogAxes | None) -> None:
+        # Called straight from the transport's notification callback on this loop.
+        try:
+            self._on_state_update(address, state, axes)
+        except Exception:
+            logger.exception("State update callback failed for %s", address)
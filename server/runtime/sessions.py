@@ -4,13 +4,15 @@ import asyncio
 import logging
 import threading
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from typing import Any
 
-from constants import SCANNER_DELAY
-
+from .connection_scheduler import ConnectCandidate, ConnectionScheduler
 from .device_session import DeviceSession, StateUpdateCallback
 from .discovery import DiscoveryService
+from .reconnect_backoff import ReconnectBackoff
+from .state_decoder import AnalogAxes, StateDecoder
+from .transport import BleTransport, create_ble_transport
 
 
 logger = logging.getLogger("OpenArcade")
@@ -23,20 +25,26 @@ class DeviceSessionWorker(threading.Thread):
         self,
         device: Any,
         shutdown_event: threading.Event,
-        connect_gate: threading.Semaphore,
+        connect_grant: threading.Event,
+        on_connect_finished: Callable[[str, bool], None],
         on_state_update: StateUpdateCallback,
         on_connected: Callable[[str], None],
         on_stopped: Callable[[str, bool], None],
+        transport: BleTransport,
+        decoders: Mapping[str, StateDecoder] | None = None,
     ) -> None:
         address = str(getattr(device, "address", device))
         super().__init__(name=f"device-session:{address}", daemon=True)
         self.device = device
         self.address = address
         self._shutdown_event = shutdown_event
-        self._connect_gate = connect_gate
+        self._connect_grant = connect_grant
+        self._on_connect_finished = on_connect_finished
         self._on_state_update = on_state_update
         self._on_connected = on_connected
         self._on_stopped = on_stopped
+        self._transport = transport
+        self._decoders = decoders
         self._connected = False
 
     def run(self) -> None:
@@ -51,6 +59,8 @@ class DeviceSessionWorker(threading.Thread):
             device=self.address,
             stop_event=session_stop_event,
             on_state_update=self._on_state_update,
+            transport=self._transport,
+            decoders=self._decoders,
         )
 
         async def bridge_shutdown() -> None:
@@ -58,27 +68,22 @@ class DeviceSessionWorker(threading.Thread):
             session_stop_event.set()
 
         shutdown_bridge_task = asyncio.create_task(bridge_shutdown())
-        connect_gate_acquired = False
 
         try:
             try:
-                await asyncio.to_thread(self._connect_gate.acquire)
-                connect_gate_acquired = True
+                # The supervisor's connection scheduler decides when this worker may connect.
+                await asyncio.to_thread(self._connect_grant.wait)
+                if self._shutdown_event.is_set():
+                    return
                 logger.info("Connecting to %s", self.address)
                 await session.connect()
+                self._connected = True
             except Exception as exc:
-                logger.error(
-                    "Device session error for %s: %s. Retrying after %ss",
-                    self.address,
-                    exc,
-                    SCANNER_DELAY,
-                )
+                logger.error("Device session error for %s: %s", self.address, exc)
                 return
             finally:
-                if connect_gate_acquired:
-                    self._connect_gate.release()
+                self._on_connect_finished(self.address, self._connected)
 
-            self._connected = True
             self._on_connected(self.address)
             logger.info("Connected to %s", self.address)
             await session.wait_closed()
@@ -97,18 +102,25 @@ class SessionSupervisor:
         self,
         on_state_update: StateUpdateCallback,
         on_session_stopped: SessionStoppedCallback,
+        transport: BleTransport | None = None,
+        decoders: Mapping[str, StateDecoder] | None = None,
     ) -> None:
         self._on_state_update = on_state_update
+        self._transport = transport or create_ble_transport()
+        self._decoders = decoders
         self._on_session_stopped = on_session_stopped
         self._app_loop: asyncio.AbstractEventLoop | None = None
+        self._control_loop: asyncio.AbstractEventLoop | None = None
         self._shutdown_event = threading.Event()
         self._thread: threading.Thread | None = None
         self._state_lock = threading.Lock()
         self._known_devices: dict[str, Any] = {}
         self._session_workers: dict[str, DeviceSessionWorker] = {}
         self._connected_addresses: set[str] = set()
-        self._retry_after: dict[str, float] = {}
-        self._connect_gate = threading.Semaphore(1)
+        self._backoff = ReconnectBackoff()
+        self._connect_grants: dict[str, threading.Event] = {}
+        self._connect_results: dict[str, asyncio.Future[bool]] = {}
+        self._scheduler: ConnectionScheduler | None = None
 
     @property
     def connected_addresses(self) -> set[str]:
@@ -145,9 +157,35 @@ class SessionSupervisor:
         except Exception:
             logger.exception("BLE control plane crashed")
 
+    @property
+    def connection_stats(self) -> dict[str, Any] | None:
+        scheduler = self._scheduler
+        return scheduler.stats() if scheduler is not None else None
+
+    @property
+    def reconnect_stats(self) -> dict[str, dict[str, Any]]:
+        with self._state_lock:
+            return self._backoff.stats()
+
     async def _control_plane_main(self) -> None:
-        discovered_devices: asyncio.Queue[Any] = asyncio.Queue()
-        discovery = DiscoveryService(discovered_devices)
+        self._control_loop = asyncio.get_running_loop()
+        discovered_devices: asyncio.Queue[tuple[Any, int | None]] = asyncio.Queue()
+        discovery = DiscoveryService(discovered_devices, self._transport)
+
+        async def resume_scanning() -> None:
+            if self._shutdown_event.is_set():
+                return
+            try:
+                await discovery.resume()
+            except Exception:
+                pass  # DiscoveryService already logged it
+
+        blocks = self._transport.scan_blocks_connect
+        self._scheduler = ConnectionScheduler(
+            self._run_granted_connect,
+            stop_scanning=discovery.pause if blocks else None,
+            resume_scanning=resume_scanning if blocks else None,
+        )
 
         try:
             await discovery.start()
@@ -155,19 +193,24 @@ class SessionSupervisor:
 
             while not self._shutdown_event.is_set():
                 try:
-                    device = await asyncio.wait_for(discovered_devices.get(), timeout=0.5)
+                    device, rssi = await asyncio.wait_for(discovered_devices.get(), timeout=0.5)
                 except TimeoutError:
                     continue
-                self._schedule_session(device)
+                self._schedule_session(device, rssi)
         finally:
             self._shutdown_event.set()
+            await self._scheduler.stop()
+            with self._state_lock:
+                grants = list(self._connect_grants.values())
+            for grant in grants:
+                grant.set()  # workers still waiting see the shutdown and exit
             await discovery.stop()
             workers = self._current_workers()
             for worker in workers:
                 worker.join(timeout=5.0)
             logger.info("BLE control plane stopped")
 
-    def _schedule_session(self, device: Any) -> None:
+    def _schedule_session(self, device: Any, rssi: int | None = None) -> None:
         address = str(getattr(device, "address", device))
         now = time.monotonic()
 
@@ -176,43 +219,86 @@ class SessionSupervisor:
 
             if address in self._session_workers:
                 return
-            if now < self._retry_after.get(address, 0.0):
+            if not self._backoff.ready(address, now):
                 return
 
+            connect_grant = threading.Event()
             worker = DeviceSessionWorker(
                 device=address,
                 shutdown_event=self._shutdown_event,
-                connect_gate=self._connect_gate,
+                connect_grant=connect_grant,
+                on_connect_finished=self._handle_connect_finished,
                 on_state_update=self._forward_state_update,
                 on_connected=self._handle_worker_connected,
                 on_stopped=self._handle_worker_stopped,
+                transport=self._transport,
+                decoders=self._decoders,
             )
             self._session_workers[address] = worker
+            self._connect_grants[address] = connect_grant
 
         logger.info("Discovered target device %s", address)
         worker.start()
+        if self._scheduler is not None:
+            self._scheduler.submit(address, address, rssi=rssi)
+
+    async def _run_granted_connect(self, candidate: ConnectCandidate) -> bool:
+        """Let the worker connect and wait for its result, holding a scheduler slot meanwhile."""
+        with self._state_lock:
+            grant = self._connect_grants.get(candidate.address)
+        if grant is None:
+            return False
+        result: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        self._connect_results[candidate.address] = result
+        grant.set()
+        try:
+            return await result
+        finally:
+            self._connect_results.pop(candidate.address, None)
+
+    def _handle_connect_finished(self, address: str, connected: bool) -> None:
+        loop = self._control_loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._resolve_connect, address, connected)
+        except RuntimeError:
+            pass  # control plane loop already closed
+
+    def _resolve_connect(self, address: str, connected: bool) -> None:
+        result = self._connect_results.get(address)
+        if result is not None and not result.done():
+            result.set_result(connected)
 
-    def _forward_state_update(self, address: str, state: int) -> None:
+    def _forward_state_update(self, address: str, state: int, axes: AnalogAxes | None) -> None:
         loop = self._app_loop
         if loop is None or loop.is_closed():
             return
 
-        loop.call_soon_threadsafe(self._on_state_update, address, state)
+        loop.call_soon_threadsafe(self._on_state_update, address, state, axes)
 
     def _handle_worker_connected(self, address: str) -> None:
         with self._state_lock:
             self._connected_addresses.add(address)
+            self._backoff.connected(address)
 
     def _handle_worker_stopped(self, address: str, connected: bool) -> None:
+        retry_delay: float | None = None
         with self._state_lock:
             self._connected_addresses.discard(address)
             self._session_workers.pop(address, None)
+            self._connect_grants.pop(address, None)
             self._known_devices.pop(address, None)
             if not self._shutdown_event.is_set():
-                self._retry_after[address] = time.monotonic() + SCANNER_DELAY
+                if connected:
+                    retry_delay = self._backoff.disconnected(address)
+                else:
+                    retry_delay = self._backoff.connect_failed(address)
 
         if connected and not self._shutdown_event.is_set():
             logger.warning("Disconnected from %s", address)
+        if retry_delay is not None:
+            logger.info("Retrying %s after %.1fs", address, retry_delay)
 
         loop = self._app_loop
         if loop is None or loop.is_closed():
@@ -0,0 +1,429 @@
+"""
+Placement and merge for sharded BLE ingestion.
+
+With runtime_main --ingest-shards N the BLE connections live in N
+ingest_shard processes instead of the aggregator. ShardCoordinator runs on
+the aggregator loop and:
+
+- places each connecting module on the shard with the fewest modules and
+  hands it a DeviceStateTable slot and the module's StateDecoder, if its
+  descriptor needs one; refresh_decoders() resends them after the device
+  config changes;
+- gives the aggregator a ShardClient for every module, a BleClient
+  stand-in whose connect and disconnect are carried out by the shard, so
+  the connection scheduler, known-device reconnects and disconnect
+  handling stay the same as in single-process mode;
+- merges on the shared wakeup: slots whose sequence moved are passed to
+  the on_state callback, which reduces and publishes them. Each pass sees
+  the latest state per module, so a press and release that both land
+  between two passes collapse into one change;
+- rebalances on connect and disconnect: when shard loads differ by two or
+  more, the module on the busiest shard that has been idle longest is
+  disconnected and the aggregator's reconnect path places it on the
+  lightest shard. Modules with recent input are never moved.
+
+A shard whose pipe closes is treated as having dropped all of its modules.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from device_state_table import DeviceStateTable
+from wakeup import Wakeup
+
+from .metrics import RuntimeMetrics
+from .state_decoder import AnalogAxes, StateDecoder
+from .transport import DisconnectedCallback, NotificationCallback
+
+
+logger = logging.getLogger("OpenArcade")
+
+# Only modules without input for this long are moved between shards.
+REBALANCE_IDLE_SECONDS = 5.0
+DISCONNECT_TIMEOUT_SECONDS = 5.0
+_U32_MODULUS = 1 << 32
+
+# address, state, input_at, notifications and duplicates since the last call, axes
+ShardStateCallback = Callable[[str, int, float, int, int, AnalogAxes | None], None]
+DecoderLookup = Callable[[str], StateDecoder | None]
+
+
+class ShardConnectError(Exception):
+    """A module could not be connected through an ingestion shard."""
+
+
+@dataclass
+class _Assignment:
+    address: str
+    shard: int
+    slot: int
+    client: ShardClient
+    connected: bool = False
+    armed: bool = False
+    moving: bool = False
+    sequence: int = 0
+    notifications: int = 0
+    duplicates: int = 0
+    input_at: float = 0.0
+    decoder: StateDecoder | None = None  # as last sent to the shard
+    # Pending (kind, ok, error) reply from the shard to a connect or disconnect.
+    reply: asyncio.Future | None = None
+
+
+class ShardClient:
+    """BleClient for a module whose connection is owned by an ingestion shard."""
+
+    def __init__(
+        self,
+        coordinator: ShardCoordinator,
+        address: str,
+        disconnected_callback: DisconnectedCallback | None,
+        adapter: str | None = None,
+    ) -> None:
+        self._coordinator = coordinator
+        self._address = address
+        self.disconnected_callback = disconnected_callback
+        self.adapter = adapter
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def is_connected(self) -> bool:
+        return self._coordinator._is_connected(self)
+
+    async def connect(self) -> bool:
+        await self._coordinator._connect(self)
+        return True
+
+    async def disconnect(self) -> bool:
+        await self._coordinator._disconnect(self)
+        return True
+
+    async def start_notify(self, char_specifier: Any, callback: NotificationCallback) -> None:
+        # The shard is already subscribed; states arrive through the merge, not callback.
+        self._coordinator._arm(self)
+
+    async def read_gatt_char(self, char_specifier: Any) -> bytearray:
+        raise ShardConnectError(f"{self._address}: GATT reads are not forwarded to ingestion shards")
+
+
+class ShardCoordinator:
+    """Aggregator side of sharded ingestion: placement, merge and rebalancing."""
+
+    def __init__(
+        self,
+        links: Sequence[Any],
+        table: DeviceStateTable,
+        merge_wakeup: Wakeup,
+        on_state: ShardStateCallback,
+        metrics: RuntimeMetrics | None = None,
+        decoder_of: DecoderLookup | None = None,
+    ) -> None:
+        if not links:
+            raise ValueError("Sharded ingestion needs at least one shard")
+        self._links = list(links)
+        self._alive = [True] * len(self._links)
+        self._table = table
+        self._merge_wakeup = merge_wakeup
+        self._on_state = on_state
+        self._metrics = metrics
+        self._decoder_of = decoder_of
+        self._assignments: dict[str, _Assignment] = {}
+        self._free_slots = list(range(table.slot_count - 1, -1, -1))
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.merges = 0
+        self.migrations = 0
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._links)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        for shard, link in enumerate(self._links):
+            loop.add_reader(link.fileno(), self._read_link, shard)
+        loop.add_reader(self._merge_wakeup.fileno(), self.merge)
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        for shard, link in enumerate(self._links):
+            if self._alive[shard]:
+                loop.remove_reader(link.fileno())
+        loop.remove_reader(self._merge_wakeup.fileno())
+        for assignment in self._assignments.values():
+            if assignment.reply is not None and not assignment.reply.done():
+                assignment.reply.set_result(("closed", False, "ingestion shards stopped"))
+        self._loop = None
+
+    def create_client(
+        self,
+        device: Any,
+        disconnected_callback: DisconnectedCallback | None = None,
+        timeout: float = 10.0,
+        adapter: str | None = None,
+    ) -> ShardClient:
+        """Same shape as BleTransport.create_client; the shard applies its own connect timeout."""
+        return ShardClient(self, str(getattr(device, "address", device)), disconnected_callback, adapter)
+
+    def shard_of(self, address: str) -> int | None:
+        assignment = self._assignments.get(address)
+        return assignment.shard if assignment is not None else None
+
+    def loads(self) -> list[int]:
+        loads = [0] * len(self._links)
+        for assignment in self._assignments.values():
+            loads[assignment.shard] += 1
+        return loads
+
+    def stats(self) -> dict[str, Any]:
+        devices: list[list[str]] = [[] for _ in self._links]
+        for address, assignment in self._assignments.items():
+            devices[assignment.shard].append(address)
+        return {
+            "shards": [
+                {"index": shard, "alive": self._alive[shard], "devices": sorted(devices[shard])}
+                for shard in range(len(self._links))
+            ],
+            "slots": {
+                "capacity": self._table.slot_count,
+                "in_use": self._table.slot_count - len(self._free_slots),
+            },
+            "merges": self.merges,
+            "migrations": self.migrations,
+        }
+
+    def merge(self) -> None:
+        """Hand every slot that changed since the last pass to on_state."""
+        self._merge_wakeup.clear()
+        self.merges += 1
+        if self._metrics is not None:
+            self._metrics.increment("shard_merges")
+        read = self._table.read
+        for assignment in list(self._assignments.values()):
+            if not assignment.armed:
+                continue
+            snapshot = read(assignment.slot)
+            if snapshot is None:
+                continue  # still being written; its wakeup brings us back
+            notifications = (snapshot.notifications - assignment.notifications) % _U32_MODULUS
+            duplicates = (snapshot.duplicates - assignment.duplicates) % _U32_MODULUS
+            if snapshot.sequence == assignment.sequence and not notifications:
+                continue
+            assignment.notifications = snapshot.notifications
+            assignment.duplicates = snapshot.duplicates
+            if snapshot.sequence != assignment.sequence:
+                assignment.sequence = snapshot.sequence
+                assignment.input_at = snapshot.input_at
+            try:
+                self._on_state(
+                    assignment.address,
+                    snapshot.state,
+                    snapshot.input_at,
+                    notifications,
+                    duplicates,
+                    snapshot.axes,
+                )
+            except Exception:
+                logger.exception("Merged state callback failed for %s", assignment.address)
+
+    def refresh_decoders(self) -> None:
+        """Send each shard the current decoders of its modules, e.g. after a config reload."""
+        if self._decoder_of is None:
+            return
+        for assignment in list(self._assignments.values()):
+            decoder = self._decoder_of(assignment.address)
+            if _same_layout(decoder, assignment.decoder):
+                continue
+            assignment.decoder = decoder
+            self._send(assignment.shard, ("decoder", assignment.address, decoder))
+
+    def _least_loaded_shard(self) -> int | None:
+        loads = self.loads()
+        candidates = [shard for shard in range(len(self._links)) if self._alive[shard]]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda shard: (loads[shard], shard))
+
+    def _send(self, shard: int, message: tuple[Any, ...]) -> bool:
+        if not self._alive[shard]:
+            return False
+        try:
+            self._links[shard].send(message)
+            return True
+        except (BrokenPipeError, EOFError, OSError):
+            self._shard_lost(shard)
+            return False
+
+    def _is_connected(self, client: ShardClient) -> bool:
+        assignment = self._assignments.get(client.address)
+        return assignment is not None and assignment.client is client and assignment.connected
+
+    async def _connect(self, client: ShardClient) -> None:
+        address = client.address
+        loop = asyncio.get_running_loop()
+        if address in self._assignments:
+            raise ShardConnectError(f"{address} is already on shard {self._assignments[address].shard}")
+        shard = self._least_loaded_shard()
+        if shard is None:
+            raise ShardConnectError("no ingestion shard is running")
+        if not self._free_slots:
+            raise ShardConnectError("device state table is full")
+
+        slot = self._free_slots.pop()
+        self._table.reset(slot)
+        decoder = self._decoder_of(address) if self._decoder_of is not None else None
+        assignment = _Assignment(address, shard, slot, client, decoder=decoder, reply=loop.create_future())
+        self._assignments[address] = assignment
+        reply = assignment.reply
+        if not self._send(shard, ("connect", address, slot, client.adapter, decoder)):
+            self._release(assignment)
+            raise ShardConnectError(f"ingestion shard {shard} is not running")
+        try:
+            kind, ok, error = await reply
+        except asyncio.CancelledError:
+            if self._assignments.get(address) is assignment:
+                self._send(shard, ("disconnect", address))
+                self._release(assignment)
+            raise
+        if kind != "connected" or not ok:
+            if self._assignments.get(address) is assignment:
+                self._release(assignment)
+            raise ShardConnectError(error or f"connect to {address} failed on shard {shard}")
+        assignment.reply = None
+        assignment.connected = True
+        logger.info("Placed %s on ingestion shard %d (loads %s)", address, shard, self.loads())
+        self._rebalance()
+
+    async def _disconnect(self, client: ShardClient) -> None:
+        assignment = self._assignments.get(client.address)
+        if assignment is None or assignment.client is not client or not assignment.connected:
+            return
+        if assignment.reply is None:
+            assignment.reply = asyncio.get_running_loop().create_future()
+            if not self._send(assignment.shard, ("disconnect", client.address)):
+                return
+        try:
+            await asyncio.wait_for(asyncio.shield(assignment.reply), DISCONNECT_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning("Shard %d did not confirm disconnect of %s", assignment.shard, client.address)
+            if self._assignments.get(client.address) is assignment:
+                self._dropped(assignment)
+
+    def _arm(self, client: ShardClient) -> None:
+        assignment = self._assignments.get(client.address)
+        if assignment is None or assignment.client is not client:
+            return
+        assignment.armed = True
+        # Input that arrived while the aggregator was finishing the connect.
+        if self._loop is not None:
+            self._loop.call_soon(self.merge)
+
+    def _read_link(self, shard: int) -> None:
+        link = self._links[shard]
+        while self._alive[shard]:
+            try:
+                if not link.poll():
+                    return
+                message = link.recv()
+            except (EOFError, OSError):
+                self._shard_lost(shard)
+                return
+            kind, address = message[0], message[1]
+            assignment = self._assignments.get(address)
+            if assignment is None or assignment.shard != shard:
+                continue  # reply for a connect we already gave up on
+            if kind == "connected":
+                if assignment.reply is not None and not assignment.reply.done():
+                    assignment.reply.set_result(message[0:1] + message[2:4])
+            elif kind == "disconnected":
+                self._dropped(assignment)
+            else:
+                logger.warning("Unknown message from ingestion shard %d: %s", shard, kind)
+
+    def _release(self, assignment: _Assignment) -> None:
+        if self._assignments.get(assignment.address) is assignment:
+            del self._assignments[assignment.address]
+            self._free_slots.append(assignment.slot)
+
+    def _dropped(self, assignment: _Assignment) -> None:
+        was_connected = assignment.connected
+        assignment.connected = False
+        self._release(assignment)
+        if assignment.reply is not None and not assignment.reply.done():
+            assignment.reply.set_result(("disconnected", False, "disconnected by shard"))
+        if was_connected and assignment.client.disconnected_callback is not None:
+            try:
+                assignment.client.disconnected_callback(assignment.client)
+            except Exception:
+                logger.exception("Disconnect callback failed for %s", assignment.address)
+        self._rebalance()
+
+    def _shard_lost(self, shard: int) -> None:
+        if not self._alive[shard]:
+            return
+        self._alive[shard] = False
+        if self._loop is not None:
+            self._loop.remove_reader(self._links[shard].fileno())
+        lost = [assignment for assignment in self._assignments.values() if assignment.shard == shard]
+        if not lost:
+            logger.info("Ingestion shard %d closed", shard)
+            return
+        logger.error("Ingestion shard %d stopped with %d modules; they will reconnect elsewhere", shard, len(lost))
+        for assignment in lost:
+            self._dropped(assignment)
+
+    def _rebalance(self) -> None:
+        alive = [shard for shard in range(len(self._links)) if self._alive[shard]]
+        if len(alive) < 2:
+            return
+        loads = self.loads()
+        busiest = max(alive, key=lambda shard: (loads[shard], -shard))
+        lightest = min(alive, key=lambda shard: (loads[shard], shard))
+        if loads[busiest] - loads[lightest] < 2:
+            return
+        if any(assignment.moving for assignment in self._assignments.values()):
+            return  # one move at a time; its disconnect triggers the next check
+        idle_before = time.perf_counter() - REBALANCE_IDLE_SECONDS
+        candidates = [
+            assignment
+            for assignment in self._assignments.values()
+            if assignment.shard == busiest
+            and assignment.connected
+            and assignment.reply is None
+            and assignment.input_at <= idle_before
+        ]
+        if not candidates:
+            return
+        assignment = min(candidates, key=lambda candidate: candidate.input_at)
+        loop = self._loop
+        if loop is None:
+            return
+        assignment.moving = True
+        assignment.reply = loop.create_future()
+        if not self._send(busiest, ("disconnect", assignment.address)):
+            return
+        self.migrations += 1
+        if self._metrics is not None:
+            self._metrics.increment("shard_migrations")
+        logger.info(
+            "Moving idle %s off ingestion shard %d to rebalance (loads %s)",
+            assignment.address,
+            busiest,
+            loads,
+        )
+
+
+def _same_layout(decoder: StateDecoder | None, sent: StateDecoder | None) -> bool:
+    if decoder is None or sent is None:
+        return decoder is sent
+    return decoder is sent or decoder.descriptor == sent.descriptor
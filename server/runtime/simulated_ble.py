@@ -0,0 +1,552 @@
+"""
+Simulated BLE controller fleet.
+
+SimulatedTransport implements the BleTransport seam with N fake
+"NimBLE_GATT" modules. Modules advertise while disconnected, accept
+connects after a configurable latency with a configurable failure rate, and
+once notifications are enabled on CHAR_UUID push 4-byte little-endian state
+words at a fixed rate from a scripted or seeded random press trace. Each
+module serves the default descriptor as an INFO TLV on INFO_CHAR_UUID, with
+its own unique_id, after info_read_latency. With clock_skew_ppm set, the
+descriptor carries DEVICE_FLAG_TIMESTAMP and notifications the extended
+payload: the state followed by the module's microsecond clock at the
+notification's due time, running clock_skew_ppm fast (negative: slow) from
+a per-module offset.
+Advertisements carry a fixed per-module RSSI, and scan_blocks_connect makes
+connects fail while a scanner runs, like controllers that cannot scan and
+initiate at the same time.
+
+A fleet can span several simulated adapters. Each adapter's scanner hears
+every module, a little weaker on each further adapter. Links sharing an
+adapter delay each other's notifications by up to adapter_slot_seconds per
+extra link, which shows up as jitter. fail_adapter() drops an adapter's
+links and refuses its scans and connects until restore_adapter().
+
+Notifications are paced against perf_counter. When the event loop falls
+behind, a module delivers the backlog in a burst of at most queue_depth
+notifications and drops the rest, the way a peripheral with a small
+notification buffer does. Scheduling counts, drops and delivery lag (due
+time to callback) live in shared memory so a load test can read them from
+outside the process running the transport.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import struct
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from multiprocessing import sharedctypes
+from typing import Any
+
+from constants import CHAR_UUID, INFO_CHAR_UUID
+from default_descriptor import default_descriptor
+from device_descriptor import DEVICE_FLAG_TIMESTAMP, encode_info_tlv
+from latency_trace import BUCKET_COUNT, bucket_index, bucket_percentiles
+
+from .discovery import TARGET_DEVICE_NAME
+from .transport import (
+    BLE_TRANSPORT_SIMULATED,
+    DEFAULT_ADAPTER,
+    DetectionCallback,
+    DisconnectedCallback,
+    NotificationCallback,
+    resolve_ble_adapters,
+)
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_SIM_DEVICES_ENV_VAR = "OPENARCADE_SIM_DEVICES"
+OPENARCADE_SIM_RATE_HZ_ENV_VAR = "OPENARCADE_SIM_RATE_HZ"
+OPENARCADE_SIM_CONNECT_LATENCY_ENV_VAR = "OPENARCADE_SIM_CONNECT_LATENCY"
+OPENARCADE_SIM_FAILURE_RATE_ENV_VAR = "OPENARCADE_SIM_FAILURE_RATE"
+OPENARCADE_SIM_SEED_ENV_VAR = "OPENARCADE_SIM_SEED"
+
+DEFAULT_SIM_DEVICES = 4
+DEFAULT_SIM_RATE_HZ = 100.0
+DEFAULT_SIM_CONNECT_LATENCY = 0.05
+DEFAULT_SIM_INFO_READ_LATENCY = 0.03
+SIM_UNIQUE_ID_BASE = 0x5A1D0000
+SIM_FW_VER = 1
+DEFAULT_ADVERTISE_INTERVAL = 0.1
+DEFAULT_QUEUE_DEPTH = 8
+SIM_ADAPTER_RSSI_STEP = 6  # each further adapter hears a module this much weaker
+SIM_STATE_BITS = 18  # the default descriptor's bit range
+SIM_MAX_HELD_BUTTONS = 3
+
+_STATE = struct.Struct("<I")
+_STATE_WITH_TIME = struct.Struct("<II")
+SIM_CLOCK_OFFSET_STEP_US = 1_234_567  # per module index
+
+# Shared counters: scheduled, delivered, dropped, connects, connect failures,
+# disconnects, connected, lag sum us, lag max us | lag buckets
+_SCHEDULED = 0
+_DELIVERED = 1
+_DROPPED = 2
+_CONNECTS = 3
+_CONNECT_FAILURES = 4
+_DISCONNECTS = 5
+_CONNECTED = 6
+_LAG_SUM = 7
+_LAG_MAX = 8
+_HEADER_WORDS = 9
+_COUNTER_NAMES: tuple[str, ...] = (
+    "scheduled",
+    "delivered",
+    "dropped",
+    "connects",
+    "connect_failures",
+    "disconnects",
+    "connected",
+)
+
+
+class SimulatedBleError(Exception):
+    """Raised for simulated connect and GATT failures."""
+
+
+def _env_number(name: str, default: float, cast: type = float) -> Any:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        logger.warning("Invalid %s='%s', using %s", name, raw, default)
+        return default
+
+
+@dataclass
+class SimulatedFleetConfig:
+    device_count: int = DEFAULT_SIM_DEVICES
+    notify_rate_hz: float = DEFAULT_SIM_RATE_HZ
+    connect_latency: float = DEFAULT_SIM_CONNECT_LATENCY
+    info_read_latency: float = DEFAULT_SIM_INFO_READ_LATENCY
+    connect_failure_rate: float = 0.0
+    advertise_interval: float = DEFAULT_ADVERTISE_INTERVAL
+    queue_depth: int = DEFAULT_QUEUE_DEPTH
+    seed: int = 0
+    # Model a controller that rejects connects while a scan is running.
+    scan_blocks_connect: bool = False
+    # Scripted state words per module, replayed in a loop; modules without a
+    # script (or all of them when None) use a seeded random press trace.
+    traces: Sequence[Sequence[int]] | None = None
+    adapters: tuple[str, ...] = (DEFAULT_ADAPTER,)
+    # Extra notification delay, up to this per other link on the same adapter.
+    adapter_slot_seconds: float = 0.0
+    # Module clock rate error; None sends plain 4-byte states.
+    clock_skew_ppm: float | None = None
+
+    @classmethod
+    def from_env(cls) -> SimulatedFleetConfig:
+        return cls(
+            device_count=_env_number(OPENARCADE_SIM_DEVICES_ENV_VAR, DEFAULT_SIM_DEVICES, int),
+            notify_rate_hz=_env_number(OPENARCADE_SIM_RATE_HZ_ENV_VAR, DEFAULT_SIM_RATE_HZ),
+            connect_latency=_env_number(OPENARCADE_SIM_CONNECT_LATENCY_ENV_VAR, DEFAULT_SIM_CONNECT_LATENCY),
+            connect_failure_rate=_env_number(OPENARCADE_SIM_FAILURE_RATE_ENV_VAR, 0.0),
+            seed=_env_number(OPENARCADE_SIM_SEED_ENV_VAR, 0, int),
+            adapters=resolve_ble_adapters(),
+        )
+
+
+class SimulatedDevice:
+    """Stands in for bleak's BLEDevice."""
+
+    def __init__(self, index: int, name: str = TARGET_DEVICE_NAME, timestamped: bool = False) -> None:
+        self.index = index
+        self.address = f"5A:1D:00:00:{index >> 8:02X}:{index & 0xFF:02X}"
+        self.name = name
+        self.connected = False
+        # Fixed per module so candidate ordering is reproducible.
+        self.rssi = -40 - (index * 7) % 50
+        self.fw_ver = SIM_FW_VER
+        self.timestamped = timestamped
+        self.info_reads = 0
+
+    def info_payload(self) -> bytes:
+        descriptor = default_descriptor()
+        descriptor.unique_id = SIM_UNIQUE_ID_BASE | self.index
+        descriptor.fw_ver = self.fw_ver
+        if self.timestamped:
+            descriptor.flags = DEVICE_FLAG_TIMESTAMP
+        return encode_info_tlv(descriptor)
+
+    def __repr__(self) -> str:
+        return f"SimulatedDevice({self.address}, {self.name})"
+
+
+class SimulatedAdvertisement:
+    def __init__(self, local_name: str, rssi: int) -> None:
+        self.local_name = local_name
+        self.rssi = rssi
+
+
+_ROW_WORDS = _HEADER_WORDS + BUCKET_COUNT
+
+
+class SimulatedFleetStats:
+    """
+    Fleet counters and a delivery-lag histogram in fork-shared memory.
+
+    Each process driving simulated clients writes its own row (see use_row),
+    so sharded ingestion processes never race on a counter; snapshot() sums
+    the rows.
+    """
+
+    def __init__(self, rows: int = 1) -> None:
+        self._rows = max(1, rows)
+        self._all_words = sharedctypes.RawArray("Q", self._rows * _ROW_WORDS)
+        self._words = self._row(0)
+
+    def use_row(self, row: int) -> None:
+        """Record this process's counters in row; call once after fork."""
+        if not 0 <= row < self._rows:
+            raise ValueError(f"stats row {row} out of range")
+        self._words = self._row(row)
+
+    def _row(self, row: int) -> Any:
+        # A writable view onto one row of the shared array.
+        return memoryview(self._all_words).cast("B").cast("Q")[row * _ROW_WORDS : (row + 1) * _ROW_WORDS]
+
+    def increment(self, index: int, amount: int = 1) -> None:
+        self._words[index] += amount
+
+    def set_connected(self, count: int) -> None:
+        self._words[_CONNECTED] = count
+
+    def record_lag(self, seconds: float) -> None:
+        value_us = max(0, int(seconds * 1_000_000.0))
+        words = self._words
+        words[_HEADER_WORDS + bucket_index(value_us)] += 1
+        words[_LAG_SUM] += value_us
+        if value_us > words[_LAG_MAX]:
+            words[_LAG_MAX] = value_us
+
+    def snapshot(self) -> dict[str, Any]:
+        words = [0] * _ROW_WORDS
+        for row in range(self._rows):
+            for index, value in enumerate(self._row(row).tolist()):
+                words[index] = max(words[index], value) if index == _LAG_MAX else words[index] + value
+        result: dict[str, Any] = {name: words[index] for index, name in enumerate(_COUNTER_NAMES)}
+        buckets = words[_HEADER_WORDS:]
+        count = sum(buckets)
+        lag: dict[str, Any] = {"count": count}
+        if count:
+            lag["mean_us"] = words[_LAG_SUM] / count
+            lag.update(bucket_percentiles(buckets, count, words[_LAG_MAX]))
+            lag["max_us"] = words[_LAG_MAX]
+        result["delivery_lag"] = lag
+        return result
+
+    def reset_window(self) -> None:
+        """Zero everything except the live connection counts."""
+        for row in range(self._rows):
+            words = self._row(row)
+            connected = words[_CONNECTED]
+            for index in range(_ROW_WORDS):
+                words[index] = 0
+            words[_CONNECTED] = connected
+
+
+def random_press_states(
+    seed: int,
+    bit_count: int = SIM_STATE_BITS,
+    max_held: int = SIM_MAX_HELD_BUTTONS,
+) -> Iterator[int]:
+    """Endless seeded press trace: one button edge per state, a few buttons held at most."""
+    rng = random.Random(seed)
+    held: list[int] = []
+    state = 0
+    while True:
+        if held and (len(held) >= max_held or rng.random() < 0.5):
+            bit = held.pop(rng.randrange(len(held)))
+        else:
+            bit = rng.choice([candidate for candidate in range(bit_count) if candidate not in held])
+            held.append(bit)
+        state ^= 1 << bit
+        yield state
+
+
+def _scripted_states(trace: Sequence[int]) -> Iterator[int]:
+    while True:
+        yield from trace
+
+
+class SimulatedScanner:
+    def __init__(
+        self,
+        transport: SimulatedTransport,
+        detection_callback: DetectionCallback,
+        adapter: str = DEFAULT_ADAPTER,
+    ) -> None:
+        self._transport = transport
+        self._detection_callback = detection_callback
+        self.adapter = adapter
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        self._transport.check_adapter(self.adapter)
+        if not self.running:
+            self._task = asyncio.create_task(self._advertise())
+
+    async def stop(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _advertise(self) -> None:
+        transport = self._transport
+        interval = transport.config.advertise_interval
+        rssi_offset = SIM_ADAPTER_RSSI_STEP * transport.adapter_index(self.adapter)
+        while True:
+            if self.adapter not in transport.failed_adapters:
+                for device in transport.devices:
+                    if not device.connected:
+                        advertisement = SimulatedAdvertisement(device.name, device.rssi - rssi_offset)
+                        self._detection_callback(device, advertisement)
+            await asyncio.sleep(interval)
+
+
+class SimulatedClient:
+    def __init__(
+        self,
+        transport: SimulatedTransport,
+        device: SimulatedDevice,
+        disconnected_callback: DisconnectedCallback | None,
+        timeout: float,
+        adapter: str = DEFAULT_ADAPTER,
+    ) -> None:
+        self._transport = transport
+        self._device = device
+        self._disconnected_callback = disconnected_callback
+        self._timeout = timeout
+        self.adapter = adapter
+        self._connected = False
+        self._notify_task: asyncio.Task | None = None
+
+    @property
+    def address(self) -> str:
+        return self._device.address
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> bool:
+        config = self._transport.config
+        stats = self._transport.stats
+        if self._device.connected:
+            raise SimulatedBleError(f"{self.address} is already connected")
+        if config.connect_latency > self._timeout:
+            await asyncio.sleep(self._timeout)
+            stats.increment(_CONNECT_FAILURES)
+            raise TimeoutError(f"simulated connect to {self.address} timed out")
+        await asyncio.sleep(config.connect_latency)
+        try:
+            self._transport.check_adapter(self.adapter)
+        except SimulatedBleError:
+            stats.increment(_CONNECT_FAILURES)
+            raise
+        if config.scan_blocks_connect and self._transport.scanning:
+            stats.increment(_CONNECT_FAILURES)
+            raise SimulatedBleError(f"controller busy scanning, connect to {self.address} rejected")
+        if self._transport.rng.random() < config.connect_failure_rate:
+            stats.increment(_CONNECT_FAILURES)
+            raise SimulatedBleError(f"simulated connect failure for {self.address}")
+        self._connected = True
+        self._device.connected = True
+        self._transport.client_connected(self)
+        return True
+
+    async def disconnect(self) -> bool:
+        if not self._connected:
+            return True
+        self._drop()
+        task = self._notify_task
+        self._notify_task = None
+        if task is not None and task is not asyncio.current_task():
+            await asyncio.gather(task, return_exceptions=True)
+        return True
+
+    def drop(self) -> None:
+        """Simulate a link loss initiated by the peripheral."""
+        if self._connected:
+            self._drop()
+
+    def _drop(self) -> None:
+        self._connected = False
+        self._device.connected = False
+        if self._notify_task is not None:
+            self._notify_task.cancel()
+        self._transport.client_disconnected(self)
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    async def start_notify(self, char_specifier: Any, callback: NotificationCallback) -> None:
+        if not self._connected:
+            raise SimulatedBleError(f"{self.address} is not connected")
+        if str(char_specifier) != CHAR_UUID:
+            raise SimulatedBleError(f"characteristic {char_specifier} not found")
+        if self._notify_task is None:
+            states = self._transport.states_for(self._device)
+            self._notify_task = asyncio.create_task(self._notify(callback, states))
+
+    async def read_gatt_char(self, char_specifier: Any) -> bytearray:
+        if not self._connected:
+            raise SimulatedBleError(f"{self.address} is not connected")
+        if str(char_specifier) != INFO_CHAR_UUID:
+            raise SimulatedBleError(f"characteristic {char_specifier} not readable")
+        await asyncio.sleep(self._transport.config.info_read_latency + self._transport.link_delay(self.adapter))
+        if not self._connected:
+            raise SimulatedBleError(f"{self.address} disconnected during read")
+        self._device.info_reads += 1
+        return bytearray(self._device.info_payload())
+
+    async def _notify(self, callback: NotificationCallback, states: Iterator[int]) -> None:
+        config = self._transport.config
+        stats = self._transport.stats
+        period = 1.0 / config.notify_rate_hz if config.notify_rate_hz > 0 else 0.0
+        if period <= 0.0:
+            return
+        depth = max(1, config.queue_depth)
+        clock_rate = None if config.clock_skew_ppm is None else 1_000_000.0 + config.clock_skew_ppm
+        clock_offset_us = self._device.index * SIM_CLOCK_OFFSET_STEP_US
+        next_due = time.perf_counter() + period
+        while self._connected:
+            now = time.perf_counter()
+            if now < next_due:
+                await asyncio.sleep(next_due - now + self._transport.link_delay(self.adapter))
+                continue
+            due = int((now - next_due) / period) + 1
+            stats.increment(_SCHEDULED, due)
+            if due > depth:
+                stats.increment(_DROPPED, due - depth)
+                next_due += (due - depth) * period
+                due = depth
+            for _ in range(due):
+                if not self._connected:
+                    return
+                if clock_rate is None:
+                    payload = _STATE.pack(next(states))
+                else:
+                    device_us = int(next_due * clock_rate) + clock_offset_us
+                    payload = _STATE_WITH_TIME.pack(next(states), device_us & 0xFFFFFFFF)
+                callback(CHAR_UUID, bytearray(payload))
+                stats.increment(_DELIVERED)
+                stats.record_lag(time.perf_counter() - next_due)
+                next_due += period
+            # Let the rest of the loop run between bursts, as the radio would.
+            await asyncio.sleep(0)
+
+
+class SimulatedTransport:
+    """BleTransport backed by a fleet of simulated modules."""
+
+    name = BLE_TRANSPORT_SIMULATED
+
+    def __init__(self, config: SimulatedFleetConfig | None = None, stats_rows: int = 1) -> None:
+        self.config = config or SimulatedFleetConfig()
+        timestamped = self.config.clock_skew_ppm is not None
+        self.devices = [
+            SimulatedDevice(index, timestamped=timestamped) for index in range(self.config.device_count)
+        ]
+        # One stats row per process that will connect clients (see SimulatedFleetStats.use_row).
+        self.stats = SimulatedFleetStats(stats_rows)
+        self.rng = random.Random(self.config.seed)
+        self._by_address = {device.address: device for device in self.devices}
+        self._clients: dict[str, SimulatedClient] = {}
+        self._scanners: list[SimulatedScanner] = []
+        self.failed_adapters: set[str] = set()
+
+    @property
+    def scan_blocks_connect(self) -> bool:
+        return self.config.scan_blocks_connect
+
+    @property
+    def scanning(self) -> bool:
+        return any(scanner.running for scanner in self._scanners)
+
+    @property
+    def adapters(self) -> tuple[str, ...]:
+        return self.config.adapters
+
+    def adapter_index(self, adapter: str) -> int:
+        return self.config.adapters.index(adapter) if adapter in self.config.adapters else 0
+
+    def check_adapter(self, adapter: str) -> None:
+        if adapter not in self.config.adapters:
+            raise SimulatedBleError(f"no such adapter {adapter}")
+        if adapter in self.failed_adapters:
+            raise SimulatedBleError(f"adapter {adapter} is not responding")
+
+    def create_scanner(self, detection_callback: DetectionCallback, adapter: str | None = None) -> SimulatedScanner:
+        scanner = SimulatedScanner(self, detection_callback, adapter or self.config.adapters[0])
+        self._scanners.append(scanner)
+        return scanner
+
+    def create_client(
+        self,
+        device: Any,
+        disconnected_callback: DisconnectedCallback | None,
+        timeout: float,
+        adapter: str | None = None,
+    ) -> SimulatedClient:
+        address = str(getattr(device, "address", device))
+        simulated = self._by_address.get(address)
+        if simulated is None:
+            raise SimulatedBleError(f"unknown simulated device {address}")
+        return SimulatedClient(self, simulated, disconnected_callback, timeout, adapter or self.config.adapters[0])
+
+    def adapter_links(self, adapter: str) -> int:
+        return sum(1 for client in self._clients.values() if client.adapter == adapter)
+
+    def link_delay(self, adapter: str) -> float:
+        """Extra notification delay from other links sharing the adapter."""
+        slot = self.config.adapter_slot_seconds
+        if slot <= 0.0:
+            return 0.0
+        others = self.adapter_links(adapter) - 1
+        return self.rng.uniform(0.0, slot * others) if others > 0 else 0.0
+
+    def fail_adapter(self, adapter: str) -> None:
+        """Simulate an adapter going away: its links drop and it refuses scans and connects."""
+        self.failed_adapters.add(adapter)
+        for client in [client for client in self._clients.values() if client.adapter == adapter]:
+            client.drop()
+
+    def restore_adapter(self, adapter: str) -> None:
+        self.failed_adapters.discard(adapter)
+
+    def states_for(self, device: SimulatedDevice) -> Iterator[int]:
+        traces = self.config.traces
+        if traces is not None and device.index < len(traces) and traces[device.index]:
+            return _scripted_states(traces[device.index])
+        return random_press_states(self.config.seed * 7919 + device.index)
+
+    def client_connected(self, client: SimulatedClient) -> None:
+        self._clients[client.address] = client
+        self.stats.increment(_CONNECTS)
+        self.stats.set_connected(len(self._clients))
+
+    def client_disconnected(self, client: SimulatedClient) -> None:
+        if self._clients.pop(client.address, None) is not None:
+            self.stats.increment(_DISCONNECTS)
+        self.stats.set_connected(len(self._clients))
+
+    def drop_connection(self, address: str) -> bool:
+        client = self._clients.get(address)
+        if client is None:
+            return False
+        client.drop()
+        return True
@@ -0,0 +1,375 @@
+"""
+Compiled notification decoders for descriptor-defined report layouts.
+
+Modules that send the default 4-byte BITFIELD report keep the plain
+little-endian 32-bit state path. A module whose descriptor (the device
+config's "descriptor", as parsed by parse_info_tlv) has PACKED or AXIS
+controls, a hat, or a report longer than four bytes gets a StateDecoder,
+compiled once per descriptor into:
+
+- one struct.Struct that splits the report into little-endian 8, 4, 2 and
+  1 byte fields, chosen so that no control straddles two fields;
+- per field, one mask for its buttons. A button's state bit is its bit in
+  the payload (control_state_bit), so the buttons of a field reach the
+  state with one AND and one shift;
+- per hat, a shift, a mask and a table from hat switch value to the
+  joystick direction bits, so a hat maps like the digital joystick;
+- per axis, a shift, a mask and a scale to a report byte (0x80 neutral),
+  filled in lx, ly, rx, ry order. Byte-aligned 8, 16, 24 and 32-bit axes
+  unpack only their most significant byte, which is already the report
+  byte, and are picked out with one itemgetter call.
+
+decode() turns a payload into (state, axes) in one pass; axes is None when
+the descriptor has no axis controls. Buttons at payload bits above the
+reducer's 32 state bits and axes beyond the fourth are not decoded. A hat
+sets the joystick state bits 8-11, so buttons at those payload bits, or a
+second hat, cannot be told apart from it. build_decoder_cache warns about
+both, as listed in the decoder's conflicts.
+
+A descriptor with DEVICE_FLAG_TIMESTAMP also gets a decoder: its
+notifications are the report followed by the module's microsecond clock,
+which device_time() returns for payloads of exactly that length.
+
+A StateDecoder pickles as its descriptor, so the aggregator can hand it to
+an ingestion shard, which compiles its own copy.
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Any
+
+from constants import GP_AXIS_NEUTRAL
+from device_descriptor import DEVICE_FLAG_TIMESTAMP, ControlType, ReportFormat
+
+from .clock_sync import DEVICE_TIME
+from .report_builder import HAT_DIRECTION_DOWN, HAT_DIRECTION_LEFT, HAT_DIRECTION_RIGHT, HAT_DIRECTION_UP
+
+
+logger = logging.getLogger("OpenArcade")
+
+# Axis values in report bytes, lx, ly, rx, ry.
+AnalogAxes = tuple[int, int, int, int]
+DecodedState = tuple[int, AnalogAxes | None]
+
+ANALOG_AXIS_COUNT = 4
+STATE_BIT_LIMIT = 32
+LEGACY_REPORT_BYTES = 4
+MAX_HAT_BITS = 8
+MAX_AXIS_BITS = 32
+_FIELD_FORMATS = ((8, "Q"), (4, "I"), (2, "H"), (1, "B"))
+
+# State bits of the default descriptor's Joystick Left/Right/Up/Down buttons.
+HAT_STATE_BITS = {
+    HAT_DIRECTION_LEFT: 8,
+    HAT_DIRECTION_RIGHT: 9,
+    HAT_DIRECTION_UP: 10,
+    HAT_DIRECTION_DOWN: 11,
+}
+# HID hat switch values 0-7 run clockwise from up; anything else is centered.
+HAT_SWITCH_DIRECTIONS = (
+    HAT_DIRECTION_UP,
+    HAT_DIRECTION_UP | HAT_DIRECTION_RIGHT,
+    HAT_DIRECTION_RIGHT,
+    HAT_DIRECTION_DOWN | HAT_DIRECTION_RIGHT,
+    HAT_DIRECTION_DOWN,
+    HAT_DIRECTION_DOWN | HAT_DIRECTION_LEFT,
+    HAT_DIRECTION_LEFT,
+    HAT_DIRECTION_UP | HAT_DIRECTION_LEFT,
+)
+
+
+def _hat_state_mask(direction_mask: int) -> int:
+    state = 0
+    for direction, bit in HAT_STATE_BITS.items():
+        if direction_mask & direction:
+            state |= 1 << bit
+    return state
+
+
+def _control_span(control: Mapping[str, Any]) -> tuple[int, int] | None:
+    """Payload bit position and width of a control, or None if it has no valid location."""
+    width = control.get("bit_width") or 1
+    if control.get("format") == ReportFormat.BITFIELD:
+        position = control.get("bit_index")
+    else:
+        byte_offset = control.get("byte_offset")
+        bit_offset = control.get("bit_offset") or 0
+        if not isinstance(byte_offset, int) or not isinstance(bit_offset, int):
+            return None
+        position = byte_offset * 8 + bit_offset
+    if not isinstance(position, int) or not isinstance(width, int) or position < 0 or width < 1:
+        return None
+    return position, width
+
+
+def needs_decoder(descriptor: Mapping[str, Any] | None) -> bool:
+    """Whether a descriptor's reports need more than the 4-byte bitfield state path."""
+    if not isinstance(descriptor, Mapping):
+        return False
+    if descriptor.get("report_format", ReportFormat.BITFIELD) != ReportFormat.BITFIELD:
+        return True
+    if is_timestamped(descriptor):
+        return True
+    report_bytes = descriptor.get("report_bytes")
+    if isinstance(report_bytes, int) and report_bytes > LEGACY_REPORT_BYTES:
+        return True
+    return any(
+        isinstance(control, Mapping)
+        and (
+            control.get("type") != ControlType.BUTTON
+            or control.get("format", ReportFormat.BITFIELD) != ReportFormat.BITFIELD
+        )
+        for control in descriptor.get("controls") or ()
+    )
+
+
+def is_timestamped(descriptor: Mapping[str, Any]) -> bool:
+    """Whether the descriptor flags a device timestamp after each report."""
+    flags = descriptor.get("flags")
+    return isinstance(flags, int) and bool(flags & DEVICE_FLAG_TIMESTAMP)
+
+
+def _is_direct_axis(control_type: Any, position: int, width: int) -> bool:
+    """Byte-aligned whole-byte axes are read as their most significant byte alone."""
+    return control_type == ControlType.AXIS and position % 8 == 0 and width % 8 == 0 and 8 <= width <= MAX_AXIS_BITS
+
+
+def _struct_layout(
+    report_bytes: int,
+    located: list[tuple[Any, int, int]],
+) -> tuple[str, list[tuple[int, int]], dict[int, int]]:
+    """
+    Struct format for a report, the (byte offset, size) of each unpacked
+    field, and the field of each direct axis by its most significant byte.
+
+    Direct axes unpack as one "B" with the rest of their bytes skipped.
+    Other controls share 8, 4, 2 or 1 byte fields whose ends never fall
+    inside one of them; bytes no control uses are skipped.
+    """
+    axis_bytes: dict[int, bool] = {}  # byte -> whether it is the axis' most significant byte
+    bit_spans: list[tuple[int, int]] = []
+    for control_type, position, width in located:
+        first_byte = position // 8
+        last_byte = (position + width - 1) // 8
+        if _is_direct_axis(control_type, position, width) and not any(
+            byte in axis_bytes for byte in range(first_byte, last_byte + 1)
+        ):
+            for byte in range(first_byte, last_byte + 1):
+                axis_bytes[byte] = byte == last_byte
+        else:
+            bit_spans.append((position, width))
+
+    used: set[int] = set()
+    blocked: set[int] = set()
+    for position, width in bit_spans:
+        first_byte = position // 8
+        last_byte = (position + width - 1) // 8
+        used.update(range(first_byte, last_byte + 1))
+        blocked.update(range(first_byte + 1, last_byte + 1))
+
+    codes = ["<"]
+    fields: list[tuple[int, int]] = []
+    direct_axes: dict[int, int] = {}
+    offset = 0
+    while offset < report_bytes:
+        if offset in axis_bytes:
+            if axis_bytes[offset]:
+                direct_axes[offset] = len(fields)
+                fields.append((offset, 1))
+                codes.append("B")
+            else:
+                codes.append("x")
+            offset += 1
+            continue
+        if offset not in used:
+            codes.append("x")
+            offset += 1
+            continue
+        free_end = offset
+        while free_end < report_bytes and free_end not in axis_bytes:
+            free_end += 1
+        for size, code in _FIELD_FORMATS:
+            end = offset + size
+            if end <= free_end and end not in blocked:
+                break
+        else:
+            raise ValueError(f"no struct field layout keeps the control at byte {offset} whole")
+        fields.append((offset, size))
+        codes.append(code)
+        offset = end
+    return "".join(codes), fields, direct_axes
+
+
+def _axis_scale(width: int) -> tuple[int, int]:
+    """(multiplier, right shift) taking a width-bit value to a report byte."""
+    if width >= 8:
+        return 1, width - 8
+    return (0xFF << 8) // ((1 << width) - 1), 8
+
+
+class StateDecoder:
+    """One descriptor's report layout, compiled for decoding notifications."""
+
+    __slots__ = (
+        "descriptor",
+        "report_bytes",
+        "axis_count",
+        "conflicts",
+        "_timestamped_bytes",
+        "_unpack_from",
+        "_buttons",
+        "_hats",
+        "_axes",
+        "_direct_axes",
+        "_axis_padding",
+    )
+
+    def __init__(self, descriptor: Mapping[str, Any]) -> None:
+        self.descriptor = descriptor
+        located: list[tuple[Any, int, int]] = []
+        for control in descriptor.get("controls") or ():
+            if not isinstance(control, Mapping):
+                continue
+            span = _control_span(control)
+            if span is not None:
+                located.append((control.get("type"), *span))
+
+        report_bytes = descriptor.get("report_bytes")
+        if not isinstance(report_bytes, int) or report_bytes < 1:
+            report_bytes = LEGACY_REPORT_BYTES
+        needed = max(((position + width + 7) // 8 for _type, position, width in located), default=0)
+        self.report_bytes: int = max(report_bytes, needed)
+        # Payload length that carries a timestamp; 0 when the descriptor has none.
+        self._timestamped_bytes = self.report_bytes + DEVICE_TIME.size if is_timestamped(descriptor) else 0
+
+        layout, fields, direct_axes = _struct_layout(self.report_bytes, located)
+        self._unpack_from = struct.Struct(layout).unpack_from
+
+        def locate(position: int) -> tuple[int, int]:
+            for index, (offset, size) in enumerate(fields):
+                if offset * 8 <= position < (offset + size) * 8:
+                    return index, position - offset * 8
+            raise ValueError(f"bit {position} is not in any field")
+
+        button_masks = [0] * len(fields)
+        dropped_buttons: list[int] = []
+        button_bits: list[int] = []
+        hats: list[tuple[int, int, int, tuple[int, ...]]] = []
+        axes: list[tuple[int, int, int, int, int]] = []
+        all_direct = True
+        for control_type, position, width in located:
+            if control_type == ControlType.AXIS:
+                if width > MAX_AXIS_BITS or len(axes) == ANALOG_AXIS_COUNT:
+                    continue
+                msb_field = direct_axes.get((position + width - 1) // 8)
+                if _is_direct_axis(control_type, position, width) and msb_field is not None:
+                    axes.append((msb_field, 0, 0xFF, 1, 0))
+                else:
+                    all_direct = False
+                    axes.append((*locate(position), (1 << width) - 1, *_axis_scale(width)))
+                continue
+            field, shift = locate(position)
+            if control_type == ControlType.BUTTON:
+                # Its state bit is its payload bit, as in control_state_bit().
+                if width == 1 and position < STATE_BIT_LIMIT:
+                    button_masks[field] |= 1 << shift
+                    button_bits.append(position)
+                elif width == 1:
+                    dropped_buttons.append(position)
+            elif control_type == ControlType.HAT and width <= MAX_HAT_BITS:
+                table = tuple(
+                    _hat_state_mask(HAT_SWITCH_DIRECTIONS[value]) if value < len(HAT_SWITCH_DIRECTIONS) else 0
+                    for value in range(1 << width)
+                )
+                hats.append((field, shift, (1 << width) - 1, table))
+
+        self._buttons = tuple(
+            (field, mask, fields[field][0] * 8) for field, mask in enumerate(button_masks) if mask
+        )
+        self._hats = tuple(hats)
+        conflicts: list[str] = []
+        if dropped_buttons:
+            bits = ", ".join(str(bit) for bit in sorted(dropped_buttons))
+            conflicts.append(f"buttons at payload bits {bits} are past the {STATE_BIT_LIMIT} state bits")
+        if hats:
+            hat_bits = set(HAT_STATE_BITS.values())
+            shared = sorted(bit for bit in button_bits if bit in hat_bits)
+            if shared:
+                bits = ", ".join(str(bit) for bit in shared)
+                conflicts.append(f"buttons at payload bits {bits} share the hat's joystick state bits")
+            if len(hats) > 1:
+                conflicts.append(f"{len(hats)} hats share the joystick state bits")
+        # Controls decode() cannot keep apart or cannot place in the state.
+        self.conflicts: tuple[str, ...] = tuple(conflicts)
+        self._axes = tuple(axes) if axes else None
+        # All axes direct: one itemgetter call picks them out of the unpacked fields.
+        self._direct_axes = None
+        if axes and all_direct:
+            indexes = [field for field, *_scale in axes]
+            self._direct_axes = itemgetter(*indexes) if len(indexes) > 1 else (lambda words: (words[indexes[0]],))
+        self.axis_count = len(axes)
+        self._axis_padding = (GP_AXIS_NEUTRAL,) * (ANALOG_AXIS_COUNT - len(axes))
+
+    def __reduce__(self):
+        # Compiled fields do not pickle; an ingestion shard recompiles from the descriptor.
+        return (StateDecoder, (self.descriptor,))
+
+    def device_time(self, data: bytes | bytearray) -> int | None:
+        """The module clock after the report, or None unless flagged and exactly that long."""
+        if len(data) != self._timestamped_bytes:
+            return None
+        return DEVICE_TIME.unpack_from(data, self.report_bytes)[0]
+
+    def decode(self, data: bytes | bytearray) -> DecodedState | None:
+        """(state, axes) for a notification payload, or None if it is shorter than the report."""
+        if len(data) < self.report_bytes:
+            return None
+        words = self._unpack_from(data)
+        state = 0
+        for field, mask, shift in self._buttons:
+            state |= (words[field] & mask) << shift
+        for field, shift, mask, table in self._hats:
+            state |= table[(words[field] >> shift) & mask]
+        if self._direct_axes is not None:
+            return state, self._direct_axes(words) + self._axis_padding
+        axes = self._axes
+        if axes is None:
+            return state, None
+        values = tuple([
+            (((words[field] >> shift) & mask) * multiplier) >> down
+            for field, shift, mask, multiplier, down in axes
+        ])
+        return state, values + self._axis_padding  # type: ignore[return-value]
+
+
+def build_decoder_cache(config_snapshot: Mapping[str, Any]) -> dict[str, StateDecoder]:
+    """A StateDecoder for every configured device whose descriptor needs one."""
+    devices = config_snapshot.get("devices", {})
+    if not isinstance(devices, Mapping):
+        return {}
+
+    decoders: dict[str, StateDecoder] = {}
+    for device_id, device_config in devices.items():
+        if not isinstance(device_id, str) or not isinstance(device_config, Mapping):
+            continue
+        descriptor = device_config.get("descriptor")
+        if not needs_decoder(descriptor):
+            continue
+        try:
+            decoder = StateDecoder(descriptor)
+        except ValueError as exc:
+            logger.warning("Cannot decode reports of %s, using the 4-byte state: %s", device_id, exc)
+            continue
+        if decoder.conflicts:
+            logger.warning(
+                "Reports of %s do not fit the %d-bit state: %s",
+                device_id,
+                STATE_BIT_LIMIT,
+                "; ".join(decoder.conflicts),
+            )
+        decoders[device_id] = decoder
+    return decoders
@@ -1,26 +1,118 @@
 from __future__ import annotations
 
-from collections.abc import Mapping
-from typing import Literal
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Mapping, Sequence
+from typing import Any, Literal
 
-from constants import DEFAULT_GAMEPAD_MAPPING, DEFAULT_MAPPING
+import constants as const
+from constants import (
+    DEFAULT_GAMEPAD_MAPPING,
+    DEFAULT_MAPPING,
+    GAMEPAD_INPUT_MAP,
+    SWITCH_HORI_INPUT_MAP,
+)
 
 from .report_builder import (
+    ANALOG_AXIS_NAMES,
+    AXIS_REPORT_OFFSETS,
+    GAMEPAD_PC_HAT_TABLE,
+    MODIFIER_KEYCODES,
+    SWITCH_HORI_HAT_TABLE,
     build_gamepad_pc_report,
     build_gamepad_switch_hori_report,
     build_keyboard_report,
+    hat_direction_bit,
 )
 
 
 HIDMode = Literal["keyboard", "gamepad_pc", "gamepad_switch_hori"]
+Output = int | str
+
+# Device states arrive as little-endian 32-bit words, resolved one byte at a time.
+STATE_CHUNK_BITS = 8
+STATE_CHUNK_COUNT = 4
+STATE_CHUNK_MASK = (1 << STATE_CHUNK_BITS) - 1
+STATE_BIT_COUNT = STATE_CHUNK_BITS * STATE_CHUNK_COUNT
+
+# One 256-entry table per state byte: table[byte_value] -> interned output mask.
+StateTables = tuple[list[int], list[int], list[int], list[int]]
+
+# How an interned output touches the live report: (effect, argument).
+EFFECT_NONE = 0
+EFFECT_MODIFIER = 1  # argument: modifier bit in report byte 0
+EFFECT_KEY = 2  # argument: keycode in the 6-key array
+EFFECT_BUTTON = 3  # argument: bit in the 16-bit button field
+EFFECT_HAT = 4  # argument: HAT_DIRECTION_* bit
+EFFECT_AXIS = 5  # argument: axis slot, report offset * 2 + (1 if positive)
+OutputEffect = tuple[int, int]
+
+KEYBOARD_KEY_SLOTS = 6
+GAMEPAD_BUTTON_COUNT = 16
+HAT_MASK_COUNT = 16
+AXIS_SLOT_COUNT = 16
+ANALOG_AXIS_OFFSETS = tuple(AXIS_REPORT_OFFSETS[name] for name in ANALOG_AXIS_NAMES)
+ANALOG_NEUTRAL = const.GP_AXIS_NEUTRAL
+
+
+def _iter_mask_bits(mask: int):
+    while mask:
+        lowest = mask & -mask
+        mask ^= lowest
+        yield lowest.bit_length() - 1
+
+
+def _gamepad_layout(mode: HIDMode) -> dict[str, Any]:
+    if mode == "gamepad_switch_hori":
+        return {
+            "input_map": SWITCH_HORI_INPUT_MAP,
+            "hat_table": SWITCH_HORI_HAT_TABLE,
+            "hat_directions": (
+                const.SW_HORI_HAT_UP,
+                const.SW_HORI_HAT_RIGHT,
+                const.SW_HORI_HAT_DOWN,
+                const.SW_HORI_HAT_LEFT,
+            ),
+            "axis_values": (
+                const.SW_HORI_AXIS_NEUTRAL,
+                const.SW_HORI_AXIS_MIN,
+                const.SW_HORI_AXIS_MAX,
+            ),
+        }
+    return {
+        "input_map": GAMEPAD_INPUT_MAP,
+        "hat_table": GAMEPAD_PC_HAT_TABLE,
+        "hat_directions": (
+            const.GP_DPAD_UP,
+            const.GP_DPAD_RIGHT,
+            const.GP_DPAD_DOWN,
+            const.GP_DPAD_LEFT,
+        ),
+        "axis_values": (
+            const.GP_AXIS_NEUTRAL,
+            const.GP_AXIS_MIN,
+            const.GP_AXIS_MAX,
+        ),
+    }
 
 
 class StateReducer:
-    """Aggregates device states and builds HID reports for the active mode."""
+    """Aggregates device states and builds HID reports for the active mode.
+
+    Mappings are compiled into per-device byte lookup tables whenever the
+    mapping cache or mode changes, so a state update only costs four table
+    lookups and a refcount update for the outputs that actually changed.
+    The live report is kept in a buffer and patched from that output delta
+    instead of being rebuilt from every active output.
+
+    Devices with analog axes (see runtime.state_decoder) pass them with
+    their state. In gamepad modes an axis with no digital direction held
+    takes the analog value furthest from neutral across devices.
+    """
 
     def __init__(
         self,
-        mapping_cache: Mapping[str, Mapping[int, int | str]] | None = None,
+        mapping_cache: Mapping[str, Mapping[int, Output]] | None = None,
         mode: HIDMode = "keyboard",
     ) -> None:
         self._mapping_cache = {
@@ -28,14 +120,33 @@ class StateReducer:
             for device_id, device_mapping in (mapping_cache or {}).items()
         }
         self._device_states: dict[str, int] = {}
-        self._device_active_outputs: dict[str, set[int | str]] = {}
-        self._active_counts: dict[int | str, int] = {}
+        self._device_axes: dict[str, Sequence[int]] = {}
+        self._analog_axes: list[int] = [ANALOG_NEUTRAL] * len(ANALOG_AXIS_OFFSETS)
+        self._device_active_masks: dict[str, int] = {}
         self._mode: HIDMode = mode
+        self._outputs: list[Output] = []
+        self._output_ids: dict[Output, int] = {}
+        self._device_tables: dict[str, StateTables] = {}
+        self._default_tables: StateTables
+        self._active_counts = array("I")
+        self._active_mask = 0
+        self._output_effects: list[OutputEffect] = []
+        self._report = bytearray(8)
+        self._active_keys: list[int] = []
+        self._button_counts = [0] * GAMEPAD_BUTTON_COUNT
+        self._hat_counts = [0] * HAT_MASK_COUNT
+        self._hat_mask = 0
+        self._axis_counts = [0] * AXIS_SLOT_COUNT
+        self._hat_table: tuple[int, ...] = ()
+        self._axis_values: tuple[int, int, int] = (0, 0, 0)
+        self._compile_mapping_cache()
+        self._rebuild_active_outputs()
 
     def set_mode(self, mode: HIDMode) -> bytes:
         if mode == self._mode:
             return self.build_report()
         self._mode = mode
+        self._compile_mapping_cache()
         self._rebuild_active_outputs()
         return self.build_report()
 
@@ -43,105 +154,302 @@ class StateReducer:
         return self._mode
 
     def set_mapping_cache(
-        self, mapping_cache: Mapping[str, Mapping[int, int | str]]
+        self, mapping_cache: Mapping[str, Mapping[int, Output]]
     ) -> bytes:
         self._mapping_cache = {
             device_id: dict(device_mapping)
             for device_id, device_mapping in mapping_cache.items()
         }
+        self._compile_mapping_cache()
         self._rebuild_active_outputs()
         return self.build_report()
 
-    def update_device_state(self, device_id: str, state: int) -> bytes | None:
-        if self._device_states.get(device_id) == state:
+    def update_device_state(
+        self,
+        device_id: str,
+        state: int,
+        axes: Sequence[int] | None = None,
+    ) -> bytes | None:
+        changed = False
+        if (
+            (axes is not None or device_id in self._device_axes)
+            and self._device_axes.get(device_id) != axes
+        ):
+            changed = self._update_device_axes(device_id, axes)
+        if self._device_states.get(device_id) != state:
+            self._device_states[device_id] = state
+            changed = self._update_device_active_outputs(device_id, state) or changed
+        if not changed:
             return None
-        self._device_states[device_id] = state
-        self._update_device_active_outputs(device_id)
-        return self.build_report()
+        return bytes(self._report)
 
     def remove_device_state(self, device_id: str) -> bytes | None:
         if device_id not in self._device_states:
             return None
         self._device_states.pop(device_id, None)
-        self._remove_device_active_outputs(device_id)
-        return self.build_report()
+        changed = device_id in self._device_axes and self._update_device_axes(device_id, None)
+        changed = self._remove_device_active_outputs(device_id) or changed
+        if not changed:
+            return None
+        return bytes(self._report)
 
     def build_report(self) -> bytes:
+        return bytes(self._report)
+
+    def _intern_output(self, output: Output) -> int:
+        output_id = self._output_ids.get(output)
+        if output_id is None:
+            output_id = len(self._outputs)
+            self._output_ids[output] = output_id
+            self._outputs.append(output)
+            self._output_effects.append(self._compile_output_effect(output))
+        return output_id
+
+    def _compile_output_effect(self, output: Output) -> OutputEffect:
         if self._mode == "keyboard":
-            return self._build_keyboard_report()
-        if self._mode == "gamepad_switch_hori":
-            return self._build_switch_hori_report()
-        return self._build_gamepad_pc_report()
+            if not isinstance(output, int):
+                return EFFECT_NONE, 0
+            modifier_bit = MODIFIER_KEYCODES.get(output)
+            if modifier_bit is not None:
+                return EFFECT_MODIFIER, modifier_bit
+            return EFFECT_KEY, output
+
+        layout = _gamepad_layout(self._mode)
+        mapping = layout["input_map"].get(output)
+        if mapping is None:
+            return EFFECT_NONE, 0
+        input_type, value = mapping
+        if input_type == "button" and 0 <= value < GAMEPAD_BUTTON_COUNT:
+            return EFFECT_BUTTON, value
+        if input_type == "dpad":
+            direction_bit = hat_direction_bit(value, *layout["hat_directions"])
+            if direction_bit:
+                return EFFECT_HAT, direction_bit
+        if input_type == "axis":
+            axis_name, direction = value
+            offset = AXIS_REPORT_OFFSETS.get(axis_name)
+            if offset is not None and direction in (-1, 1):
+                return EFFECT_AXIS, offset * 2 + (1 if direction == 1 else 0)
+        return EFFECT_NONE, 0
+
+    def _accepts_output(self, output: Output) -> bool:
+        if self._mode == "keyboard":
+            return isinstance(output, int)
+        return isinstance(output, str)
+
+    def _compile_tables(self, mapping: Mapping[int, Output]) -> StateTables:
+        bit_masks = [0] * STATE_BIT_COUNT
+        for bit_index, output in mapping.items():
+            if not 0 <= bit_index < STATE_BIT_COUNT:
+                continue
+            if not self._accepts_output(output):
+                continue
+            bit_masks[bit_index] |= 1 << self._intern_output(output)
 
-    def _outputs_for_device_state(self, device_id: str, state: int) -> set[int | str]:
-        outputs: set[int | str] = set()
-        default_mapping: Mapping[int, int | str]
+        tables: list[list[int]] = []
+        for chunk_index in range(STATE_CHUNK_COUNT):
+            chunk_masks = bit_masks[
+                chunk_index * STATE_CHUNK_BITS : (chunk_index + 1) * STATE_CHUNK_BITS
+            ]
+            table = [0] * (STATE_CHUNK_MASK + 1)
+            for value in range(1, STATE_CHUNK_MASK + 1):
+                lowest = value & -value
+                table[value] = table[value ^ lowest] | chunk_masks[lowest.bit_length() - 1]
+            tables.append(table)
+        return tables[0], tables[1], tables[2], tables[3]
+
+    def _compile_mapping_cache(self) -> None:
+        self._outputs = []
+        self._output_ids = {}
+        self._output_effects = []
+        default_mapping: Mapping[int, Output]
         if self._mode == "keyboard":
             default_mapping = DEFAULT_MAPPING
+            self._hat_table = ()
         else:
             default_mapping = DEFAULT_GAMEPAD_MAPPING
+            layout = _gamepad_layout(self._mode)
+            self._hat_table = layout["hat_table"]
+            self._axis_values = layout["axis_values"]
+        self._default_tables = self._compile_tables(default_mapping)
 
-        mapping = self._mapping_cache.get(device_id, default_mapping)
-        for bit_index, output in mapping.items():
-            if (state >> bit_index) & 1:
-                if self._mode == "keyboard" and isinstance(output, int):
-                    outputs.add(output)
-                elif self._mode != "keyboard" and isinstance(output, str):
-                    outputs.add(output)
-        return outputs
-
-    def _apply_output_delta(
-        self,
-        previous_outputs: set[int | str],
-        new_outputs: set[int | str],
-    ) -> None:
-        for output in previous_outputs - new_outputs:
-            count = self._active_counts.get(output, 0)
-            if count <= 1:
-                self._active_counts.pop(output, None)
-            else:
-                self._active_counts[output] = count - 1
-
-        for output in new_outputs - previous_outputs:
-            self._active_counts[output] = self._active_counts.get(output, 0) + 1
-
-    def _update_device_active_outputs(self, device_id: str) -> None:
-        state = self._device_states.get(device_id, 0)
-        previous_outputs = self._device_active_outputs.get(device_id, set())
-        new_outputs = self._outputs_for_device_state(device_id, state)
-        self._apply_output_delta(previous_outputs, new_outputs)
-        if new_outputs:
-            self._device_active_outputs[device_id] = new_outputs
+        # Most devices share the default or an identical profile mapping, so
+        # compile each distinct mapping once and share the tables.
+        compiled: dict[tuple[tuple[int, Output], ...], StateTables] = {}
+        self._device_tables = {}
+        for device_id, mapping in self._mapping_cache.items():
+            key = tuple(sorted(mapping.items(), key=lambda item: item[0]))
+            tables = compiled.get(key)
+            if tables is None:
+                tables = self._compile_tables(mapping)
+                compiled[key] = tables
+            self._device_tables[device_id] = tables
+
+    def _mask_for_device_state(self, device_id: str, state: int) -> int:
+        table0, table1, table2, table3 = self._device_tables.get(
+            device_id, self._default_tables
+        )
+        return (
+            table0[state & STATE_CHUNK_MASK]
+            | table1[(state >> 8) & STATE_CHUNK_MASK]
+            | table2[(state >> 16) & STATE_CHUNK_MASK]
+            | table3[(state >> 24) & STATE_CHUNK_MASK]
+        )
+
+    def _apply_output_delta(self, previous_mask: int, new_mask: int) -> bool:
+        """Refcount the output delta and patch the live report.
+
+        Returns whether the set of active outputs changed.
+        """
+        counts = self._active_counts
+        active_mask = self._active_mask
+
+        for output_id in _iter_mask_bits(previous_mask & ~new_mask):
+            count = counts[output_id] - 1
+            counts[output_id] = count
+            if count == 0:
+                active_mask &= ~(1 << output_id)
+                self._release_output(output_id)
+
+        for output_id in _iter_mask_bits(new_mask & ~previous_mask):
+            count = counts[output_id]
+            counts[output_id] = count + 1
+            if count == 0:
+                active_mask |= 1 << output_id
+                self._press_output(output_id)
+
+        changed = active_mask != self._active_mask
+        self._active_mask = active_mask
+        return changed
+
+    def _press_output(self, output_id: int) -> None:
+        effect, argument = self._output_effects[output_id]
+        report = self._report
+        if effect == EFFECT_BUTTON:
+            count = self._button_counts[argument]
+            self._button_counts[argument] = count + 1
+            if count == 0:
+                if argument < 8:
+                    report[0] |= 1 << argument
+                else:
+                    report[1] |= 1 << (argument - 8)
+        elif effect == EFFECT_HAT:
+            count = self._hat_counts[argument]
+            self._hat_counts[argument] = count + 1
+            if count == 0:
+                self._hat_mask |= argument
+                report[2] = self._hat_table[self._hat_mask]
+        elif effect == EFFECT_AXIS:
+            self._axis_counts[argument] += 1
+            self._write_axis(argument >> 1)
+        elif effect == EFFECT_MODIFIER:
+            report[0] |= argument
+        elif effect == EFFECT_KEY:
+            insort(self._active_keys, argument)
+            self._write_keys()
+
+    def _release_output(self, output_id: int) -> None:
+        effect, argument = self._output_effects[output_id]
+        report = self._report
+        if effect == EFFECT_BUTTON:
+            count = self._button_counts[argument] - 1
+            self._button_counts[argument] = count
+            if count == 0:
+                if argument < 8:
+                    report[0] &= ~(1 << argument) & 0xFF
+                else:
+                    report[1] &= ~(1 << (argument - 8)) & 0xFF
+        elif effect == EFFECT_HAT:
+            count = self._hat_counts[argument] - 1
+            self._hat_counts[argument] = count
+            if count == 0:
+                self._hat_mask &= ~argument
+                report[2] = self._hat_table[self._hat_mask]
+        elif effect == EFFECT_AXIS:
+            self._axis_counts[argument] -= 1
+            self._write_axis(argument >> 1)
+        elif effect == EFFECT_MODIFIER:
+            report[0] &= ~argument & 0xFF
+        elif effect == EFFECT_KEY:
+            keys = self._active_keys
+            del keys[bisect_left(keys, argument)]
+            self._write_keys()
+
+    def _update_device_axes(self, device_id: str, axes: Sequence[int] | None) -> bool:
+        """Store a device's analog axes; returns whether the report changed."""
+        if axes is None:
+            self._device_axes.pop(device_id, None)
         else:
-            self._device_active_outputs.pop(device_id, None)
+            self._device_axes[device_id] = axes
+        previous = self._analog_axes
+        self._analog_axes = self._combine_analog_axes()
+        if self._mode == "keyboard" or previous == self._analog_axes:
+            return False
+        report = self._report
+        before = bytes(report)
+        for offset in ANALOG_AXIS_OFFSETS:
+            self._write_axis(offset)
+        return report != before
 
-    def _remove_device_active_outputs(self, device_id: str) -> None:
-        previous_outputs = self._device_active_outputs.pop(device_id, set())
-        self._apply_output_delta(previous_outputs, set())
+    def _combine_analog_axes(self) -> list[int]:
+        combined = [ANALOG_NEUTRAL] * len(ANALOG_AXIS_OFFSETS)
+        for axes in self._device_axes.values():
+            for slot, value in enumerate(axes[: len(combined)]):
+                if abs(value - ANALOG_NEUTRAL) > abs(combined[slot] - ANALOG_NEUTRAL):
+                    combined[slot] = value
+        return combined
 
-    def _rebuild_active_outputs(self) -> None:
-        self._device_active_outputs = {}
-        self._active_counts = {}
-        for device_id, state in self._device_states.items():
-            outputs = self._outputs_for_device_state(device_id, state)
-            if outputs:
-                self._device_active_outputs[device_id] = outputs
-                for output in outputs:
-                    self._active_counts[output] = self._active_counts.get(output, 0) + 1
-
-    def _build_keyboard_report(self) -> bytes:
-        active_keys = {
-            output for output in self._active_counts if isinstance(output, int)
-        }
-        return build_keyboard_report(active_keys)
+    def _write_axis(self, offset: int) -> None:
+        negative = self._axis_counts[offset * 2] > 0
+        positive = self._axis_counts[offset * 2 + 1] > 0
+        neutral, minimum, maximum = self._axis_values
+        if negative == positive:
+            self._report[offset] = (
+                neutral if negative else self._analog_axes[offset - ANALOG_AXIS_OFFSETS[0]]
+            )
+        elif negative:
+            self._report[offset] = minimum
+        else:
+            self._report[offset] = maximum
 
-    def _collect_active_inputs(self) -> set[str]:
-        return {
-            output for output in self._active_counts if isinstance(output, str)
-        }
+    def _write_keys(self) -> None:
+        keys = self._active_keys[:KEYBOARD_KEY_SLOTS]
+        self._report[2 : 2 + KEYBOARD_KEY_SLOTS] = bytes(keys).ljust(KEYBOARD_KEY_SLOTS, b"\x00")
 
-    def _build_gamepad_pc_report(self) -> bytes:
-        return build_gamepad_pc_report(self._collect_active_inputs())
+    def _update_device_active_outputs(self, device_id: str, state: int) -> bool:
+        previous_mask = self._device_active_masks.get(device_id, 0)
+        new_mask = self._mask_for_device_state(device_id, state)
+        if new_mask == previous_mask:
+            return False
+        if new_mask:
+            self._device_active_masks[device_id] = new_mask
+        else:
+            self._device_active_masks.pop(device_id, None)
+        return self._apply_output_delta(previous_mask, new_mask)
 
-    def _build_switch_hori_report(self) -> bytes:
-        return build_gamepad_switch_hori_report(self._collect_active_inputs())
+    def _remove_device_active_outputs(self, device_id: str) -> bool:
+        previous_mask = self._device_active_masks.pop(device_id, 0)
+        return self._apply_output_delta(previous_mask, 0)
+
+    def _neutral_report(self) -> bytes:
+        if self._mode == "keyboard":
+            return build_keyboard_report([])
+        if self._mode == "gamepad_switch_hori":
+            return build_gamepad_switch_hori_report([])
+        return build_gamepad_pc_report([])
+
+    def _rebuild_active_outputs(self) -> None:
+        self._device_active_masks = {}
+        self._active_counts = array("I", bytes(self._active_counts.itemsize * len(self._outputs)))
+        self._active_mask = 0
+        self._report = bytearray(self._neutral_report())
+        self._active_keys = []
+        self._button_counts = [0] * GAMEPAD_BUTTON_COUNT
+        self._hat_counts = [0] * HAT_MASK_COUNT
+        self._hat_mask = 0
+        self._axis_counts = [0] * AXIS_SLOT_COUNT
+        for device_id, state in self._device_states.items():
+            self._update_device_active_outputs(device_id, state)
+        if self._mode != "keyboard" and self._device_axes:
+            for offset in ANALOG_AXIS_OFFSETS:
+                self._write_axis(offset)
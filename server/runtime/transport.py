@@ -0,0 +1,168 @@
+"""
+BLE transport seam for the aggregator and session supervisor.
+
+Both runtimes create scanners and clients through a BleTransport instead of
+constructing BleakScanner/BleakClient directly, so a simulated backend can
+stand in for the radio. The scanner and client objects only need the
+subset of the bleak API the runtime uses: scanner start/stop, client
+connect/disconnect/start_notify, address and is_connected.
+
+The backend is chosen with OPENARCADE_BLE_TRANSPORT ("bleak" or
+"simulated"); bleak is the default.
+
+scan_blocks_connect tells the connection scheduler whether the controller
+needs scanning stopped while a connection is being set up. Many Pi
+controllers do, so bleak defaults to True; set
+OPENARCADE_BLE_SCAN_BLOCKS_CONNECT=0 for controllers that can do both.
+
+OPENARCADE_BLE_ADAPTERS lists the HCI adapters to use ("hci0,hci1");
+unset means bleak's default adapter only. Scanners and clients are created
+for a named adapter, and the aggregator spreads connections across them.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections.abc import Callable
+from typing import Any, Protocol
+
+from bleak import BleakClient, BleakScanner
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_BLE_TRANSPORT_ENV_VAR = "OPENARCADE_BLE_TRANSPORT"
+OPENARCADE_BLE_SCAN_BLOCKS_CONNECT_ENV_VAR = "OPENARCADE_BLE_SCAN_BLOCKS_CONNECT"
+OPENARCADE_BLE_ADAPTERS_ENV_VAR = "OPENARCADE_BLE_ADAPTERS"
+# Stands for "whatever adapter the backend picks" when no list is configured.
+DEFAULT_ADAPTER = "default"
+_ADAPTER_NAME = re.compile(r"^hci\d+$")
+BLE_TRANSPORT_BLEAK = "bleak"
+BLE_TRANSPORT_SIMULATED = "simulated"
+VALID_BLE_TRANSPORTS: tuple[str, ...] = (BLE_TRANSPORT_BLEAK, BLE_TRANSPORT_SIMULATED)
+
+DetectionCallback = Callable[[Any, Any], None]
+DisconnectedCallback = Callable[[Any], None]
+NotificationCallback = Callable[[Any, bytearray], None]
+
+
+class BleScanner(Protocol):
+    async def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class BleClient(Protocol):
+    @property
+    def address(self) -> str: ...
+
+    @property
+    def is_connected(self) -> bool: ...
+
+    async def connect(self) -> Any: ...
+
+    async def disconnect(self) -> Any: ...
+
+    async def start_notify(self, char_specifier: Any, callback: NotificationCallback) -> None: ...
+
+    async def read_gatt_char(self, char_specifier: Any) -> bytearray: ...
+
+
+class BleTransport(Protocol):
+    name: str
+    scan_blocks_connect: bool
+    adapters: tuple[str, ...]
+
+    def create_scanner(self, detection_callback: DetectionCallback, adapter: str | None = None) -> BleScanner: ...
+
+    def create_client(
+        self,
+        device: Any,
+        disconnected_callback: DisconnectedCallback,
+        timeout: float,
+        adapter: str | None = None,
+    ) -> BleClient: ...
+
+
+class BleakTransport:
+    """The real radio, through bleak."""
+
+    name = BLE_TRANSPORT_BLEAK
+
+    def __init__(
+        self,
+        scan_blocks_connect: bool | None = None,
+        adapters: tuple[str, ...] | None = None,
+    ) -> None:
+        if scan_blocks_connect is None:
+            scan_blocks_connect = resolve_scan_blocks_connect()
+        self.scan_blocks_connect = scan_blocks_connect
+        self.adapters = adapters or resolve_ble_adapters()
+
+    def create_scanner(self, detection_callback: DetectionCallback, adapter: str | None = None) -> BleScanner:
+        return BleakScanner(detection_callback=detection_callback, bluez=_bluez_args(adapter))
+
+    def create_client(
+        self,
+        device: Any,
+        disconnected_callback: DisconnectedCallback,
+        timeout: float,
+        adapter: str | None = None,
+    ) -> BleClient:
+        return BleakClient(
+            device,
+            disconnected_callback=disconnected_callback,
+            timeout=timeout,
+            bluez=_bluez_args(adapter),
+        )
+
+
+def _bluez_args(adapter: str | None) -> dict[str, Any]:
+    if adapter is None or adapter == DEFAULT_ADAPTER:
+        return {}
+    return {"adapter": adapter}
+
+
+def resolve_ble_adapters() -> tuple[str, ...]:
+    raw = os.environ.get(OPENARCADE_BLE_ADAPTERS_ENV_VAR, "")
+    adapters: list[str] = []
+    for name in (part.strip() for part in raw.split(",")):
+        if not name or name in adapters:
+            continue
+        if not _ADAPTER_NAME.match(name):
+            logger.warning("Ignoring invalid adapter '%s' in %s", name, OPENARCADE_BLE_ADAPTERS_ENV_VAR)
+            continue
+        adapters.append(name)
+    return tuple(adapters) or (DEFAULT_ADAPTER,)
+
+
+def resolve_scan_blocks_connect() -> bool:
+    raw = os.environ.get(OPENARCADE_BLE_SCAN_BLOCKS_CONNECT_ENV_VAR, "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def resolve_ble_transport_name() -> str:
+    raw = os.environ.get(OPENARCADE_BLE_TRANSPORT_ENV_VAR, BLE_TRANSPORT_BLEAK).strip().lower()
+    if raw not in VALID_BLE_TRANSPORTS:
+        logger.warning(
+            "Invalid %s='%s', using %s",
+            OPENARCADE_BLE_TRANSPORT_ENV_VAR,
+            raw,
+            BLE_TRANSPORT_BLEAK,
+        )
+        return BLE_TRANSPORT_BLEAK
+    return raw
+
+
+def create_ble_transport(name: str | None = None) -> BleTransport:
+    name = name or resolve_ble_transport_name()
+    if name == BLE_TRANSPORT_SIMULATED:
+        from .simulated_ble import SimulatedFleetConfig, SimulatedTransport
+
+        logger.warning("Using simulated BLE transport")
+        return SimulatedTransport(SimulatedFleetConfig.from_env())
+    if name == BLE_TRANSPORT_BLEAK:
+        return BleakTransport()
+    raise ValueError(f"Unknown BLE transport: {name}")
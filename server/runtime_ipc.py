@@ -13,6 +13,15 @@ MESSAGE_TYPE_CONFIG_UPDATED = "config_updated"
 MESSAGE_TYPE_GET_CONNECTED_DEVICES = "get_connected_devices"
 MESSAGE_TYPE_GET_DEVICE_STATES = "get_device_states"
 MESSAGE_TYPE_GET_PAIRING_STATUS = "get_pairing_status"
+MESSAGE_TYPE_GET_REPORT_STATS = "get_report_stats"
+MESSAGE_TYPE_GET_LATENCY_STATS = "get_latency_stats"
+MESSAGE_TYPE_GET_METRICS = "get_metrics"
+MESSAGE_TYPE_GET_SCAN_STATS = "get_scan_stats"
+MESSAGE_TYPE_GET_SHARD_STATS = "get_shard_stats"
+MESSAGE_TYPE_GET_LINK_STATS = "get_link_stats"
+MESSAGE_TYPE_GET_RECONNECT_STATS = "get_reconnect_stats"
+
+METRICS_FORMAT_PROMETHEUS = "prometheus"
 
 
 def resolve_runtime_socket_path() -> str:
@@ -116,9 +125,133 @@ def get_pairing_status(socket_path: str | None = None) -> dict[str, Any] | None:
         "source": pairing.get("source", "unknown"),
         "sequence": pairing.get("sequence", 0),
         "updated_at": pairing.get("updated_at", ""),
+        "connections": pairing.get("connections"),
+        "adapters": pairing.get("adapters"),
+    }
+
+
+def get_report_stats(socket_path: str | None = None) -> dict[str, int] | None:
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_REPORT_STATS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    report_stats = response.get("report_stats")
+    if not isinstance(report_stats, dict):
+        return None
+
+    return {
+        key: value
+        for key, value in report_stats.items()
+        if isinstance(key, str) and isinstance(value, int)
+    }
+
+
+def get_latency_stats(
+    socket_path: str | None = None,
+) -> dict[str, dict[str, dict[str, Any]]] | None:
+    """Per-mode, per-stage latency percentiles in microseconds."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_LATENCY_STATS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    latency = response.get("latency")
+    if not isinstance(latency, dict):
+        return None
+
+    return {
+        mode: stages
+        for mode, stages in latency.items()
+        if isinstance(mode, str) and isinstance(stages, dict)
     }
 
 
+def get_metrics(socket_path: str | None = None) -> dict[str, Any] | None:
+    """Runtime counters, gauges and per-device counters."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_METRICS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    metrics = response.get("metrics")
+    if not isinstance(metrics, dict):
+        return None
+
+    return metrics
+
+
+def get_metrics_prometheus(socket_path: str | None = None) -> str | None:
+    """Runtime metrics rendered in Prometheus text exposition format."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_METRICS, "format": METRICS_FORMAT_PROMETHEUS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    text = response.get("prometheus")
+    return text if isinstance(text, str) else None
+
+
+def get_scan_stats(socket_path: str | None = None) -> dict[str, Any] | None:
+    """Scan scheduler state, recent scan windows and notification jitter while scanning vs idle."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_SCAN_STATS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    scan = response.get("scan")
+    return scan if isinstance(scan, dict) else None
+
+
+def get_shard_stats(socket_path: str | None = None) -> dict[str, Any] | None:
+    """Ingestion shard assignments, state table use, merge passes and migrations; None unless sharded."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_SHARD_STATS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    shards = response.get("shards")
+    return shards if isinstance(shards, dict) else None
+
+
+def get_link_stats(device_id: str | None = None, socket_path: str | None = None) -> dict[str, Any] | None:
+    """Per-module link quality (intervals, jitter, RSSI, disconnects), all modules or one."""
+    message: dict[str, Any] = {"type": MESSAGE_TYPE_GET_LINK_STATS}
+    if device_id:
+        message["device_id"] = device_id
+    response = send_runtime_message(message, socket_path=socket_path)
+    if not response or response.get("ok") is not True:
+        return None
+
+    links = response.get("links")
+    return links if isinstance(links, dict) else None
+
+
+def get_reconnect_stats(socket_path: str | None = None) -> dict[str, Any] | None:
+    """Per-module reconnect backoff: failure streaks, attempt counts and the wait before the next attempt."""
+    response = send_runtime_message(
+        {"type": MESSAGE_TYPE_GET_RECONNECT_STATS},
+        socket_path=socket_path,
+    )
+    if not response or response.get("ok") is not True:
+        return None
+
+    reconnects = response.get("reconnects")
+    return reconnects if isinstance(reconnects, dict) else None
+
+
 def _read_line(client: socket.socket) -> bytes | None:
     chunks: list[bytes] = []
     while True:
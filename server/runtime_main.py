@@ -7,7 +7,18 @@ import signal
 import time
 
 from aggregator import aggregator_process
+from device_state_table import DeviceStateTable
 from hid_writer import hid_writer_process
+from ingest_shard import ingest_shard_process
+from latency_trace import LatencyHistograms
+from report_channel import (
+    DEFAULT_REPORTS_PER_POLL,
+    DEFAULT_RING_CAPACITY,
+    REPORT_POLICY_PRESS_EDGES,
+    VALID_REPORT_POLICIES,
+    ReportRing,
+)
+from wakeup import Wakeup
 
 
 logging.basicConfig(
@@ -36,19 +47,51 @@ def main() -> int:
         default=1,
         help="CPU core for HID writer process (default: 1)",
     )
+    parser.add_argument(
+        "--report-policy",
+        choices=VALID_REPORT_POLICIES,
+        default=REPORT_POLICY_PRESS_EDGES,
+        help="How the HID writer coalesces queued reports (default: press_edges)",
+    )
+    parser.add_argument(
+        "--reports-per-poll",
+        type=int,
+        default=DEFAULT_REPORTS_PER_POLL,
+        help="Report cap per writer wake for the max_per_poll policy (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--report-ring-capacity",
+        type=int,
+        default=DEFAULT_RING_CAPACITY,
+        help="Number of queued reports between aggregator and writer (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--ingest-shards",
+        type=int,
+        default=0,
+        help="BLE ingestion processes; 0 keeps all BLE work in the aggregator (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--shard-cores",
+        default="2,3",
+        help="Comma-separated CPU cores for ingestion shards, assigned round-robin (default: %(default)s)",
+    )
     args = parser.parse_args()
+    shard_cores = [int(core) for core in args.shard_cores.split(",") if core.strip()]
+    if args.ingest_shards < 0 or (args.ingest_shards and not shard_cores):
+        parser.error("--ingest-shards needs a non-negative count and at least one shard core")
 
     logger.info("Initializing OpenArcade Subscriber...")
     logger.info("Aggregator on CPU core %d, HID writer on CPU core %d", 
                 args.aggregator_core, args.writer_core)
 
-    # Shared memory mailbox for latest HID report (replaces Queue).
-    # Use a 64-byte buffer so Switch-mode gadget transport can share the same mailbox.
-    report_array = multiprocessing.Array("B", 64, lock=False)
-    report_version = multiprocessing.Value("i", 0, lock=True)  # Version counter
-    last_input_event_at = multiprocessing.Value("d", 0.0, lock=True)
-    report_published_at = multiprocessing.Value("d", 0.0, lock=True)
-    report_event = multiprocessing.Event()  # Signals new data available
+    # Shared-memory ring of timestamped HID reports plus a seqlock latest slot.
+    # Reports up to 64 bytes fit so Switch-mode gadget transport can share it.
+    report_ring = ReportRing.create(args.report_ring_capacity)
+    # Per-mode, per-stage input latency histograms; both processes record into them.
+    latency_histograms = LatencyHistograms.create()
+    report_wakeup = Wakeup()  # Signals new data available (eventfd, pipe fallback)
+    mode_wakeup = Wakeup()  # Signals the aggregator switched HID mode
     
     stop_event = multiprocessing.Event()
     shutdown_requested = False
@@ -57,17 +100,18 @@ def main() -> int:
         nonlocal shutdown_requested
         shutdown_requested = True
         stop_event.set()
-        report_event.set()  # Wake up writer so it can exit
+        report_wakeup.set()  # Wake up writer so it can exit
 
     for signum in (signal.SIGINT, signal.SIGTERM):
         signal.signal(signum, request_shutdown)
 
     shared_mailbox = {
-        "report_array": report_array,
-        "report_version": report_version,
-        "last_input_event_at": last_input_event_at,
-        "report_published_at": report_published_at,
-        "report_event": report_event,
+        "report_ring": report_ring,
+        "report_wakeup": report_wakeup,
+        "mode_wakeup": mode_wakeup,
+        "latency_histograms": latency_histograms,
+        "report_policy": args.report_policy,
+        "reports_per_poll": args.reports_per_poll,
     }
 
     aggregator = multiprocessing.Process(
@@ -81,10 +125,36 @@ def main() -> int:
         name="HIDWriter",
     )
 
-    processes = [aggregator, writer]
-
-    for process in processes:
-        process.start()
+    # Sharded mode: shard processes own the BLE links and write states into a
+    # shared table; the aggregator merges changed slots on merge_wakeup.
+    state_table: DeviceStateTable | None = None
+    merge_wakeup: Wakeup | None = None
+    shards: list[multiprocessing.Process] = []
+    if args.ingest_shards:
+        state_table = DeviceStateTable.create()
+        merge_wakeup = Wakeup()
+        shared_mailbox["state_table"] = state_table
+        shared_mailbox["merge_wakeup"] = merge_wakeup
+        shared_mailbox["shard_links"] = []
+        for index in range(args.ingest_shards):
+            aggregator_end, shard_end = multiprocessing.Pipe(duplex=True)
+            shard = multiprocessing.Process(
+                target=ingest_shard_process,
+                args=(shared_mailbox, shard_end, stop_event, index, shard_cores[index % len(shard_cores)]),
+                name=f"IngestShard{index}",
+            )
+            shard.start()
+            # Only the shard keeps its end, so the aggregator sees EOF if it dies.
+            shard_end.close()
+            shared_mailbox["shard_links"].append(aggregator_end)
+            shards.append(shard)
+        logger.info("Sharded BLE ingestion: %d shards on cores %s", args.ingest_shards, shard_cores)
+
+    aggregator.start()
+    for link in shared_mailbox.pop("shard_links", ()):
+        link.close()  # the aggregator holds its own copies now
+    writer.start()
+    processes = [*shards, aggregator, writer]
 
     logger.info("All processes started")
 
@@ -98,22 +168,33 @@ def main() -> int:
                 logger.error("Process %s exited unexpectedly with code %s", process.name, process.exitcode)
                 shutdown_requested = True
                 stop_event.set()
-                report_event.set()
+                report_wakeup.set()
                 return_code = 1
                 break
             time.sleep(1.0)
     except KeyboardInterrupt:
         logger.info("Shutdown signal received")
         stop_event.set()
-        report_event.set()
+        report_wakeup.set()
     finally:
         stop_event.set()
-        report_event.set()
+        report_wakeup.set()
         for process in processes:
             process.join(timeout=5.0)
             if process.is_alive():
                 logger.warning("Process %s did not exit cleanly, terminating...", process.name)
                 process.terminate()
+        report_ring.close()
+        report_ring.unlink()
+        latency_histograms.close()
+        latency_histograms.unlink()
+        if state_table is not None:
+            state_table.close()
+            state_table.unlink()
+        if merge_wakeup is not None:
+            merge_wakeup.close()
+        report_wakeup.close()
+        mode_wakeup.close()
 
     logger.info("System Shutdown Complete.")
     return return_code
@@ -12,6 +12,15 @@ from config_command_service import handle_command
 from device_config_store import DeviceConfigStore
 from gadget_state import GadgetState
 from runtime_ipc import notify_runtime_config_updated
+from state_watcher import StateWatcher
+
+
+def gadget_serial_enabled(state: dict[str, Any]) -> bool:
+    return state.get("persona") == "pc" and bool(state.get("ready"))
+
+
+def _gadget_state_key(state: dict[str, Any]) -> tuple[Any, ...]:
+    return (state.get("persona"), state.get("ready"), state.get("mode_sequence"))
 
 
 def read_line(fd: int) -> str | None:
@@ -39,13 +48,26 @@ def run(
     store = DeviceConfigStore(path=config_path)
     store.load()
     gadget_state = GadgetState()
+    # Gadget persona changes are file-notified instead of polled every 0.25 s.
+    watcher = StateWatcher(poll_interval=0.25)
+    serial_enabled = False
+
+    def on_gadget_state_changed(state: dict[str, Any]) -> None:
+        nonlocal serial_enabled
+        serial_enabled = gadget_serial_enabled(state)
+
+    initial_state = watcher.watch(
+        gadget_state.path,
+        gadget_state.load,
+        on_gadget_state_changed,
+        change_key=_gadget_state_key,
+    )
+    serial_enabled = gadget_serial_enabled(initial_state)
 
     while True:
         try:
-            state = gadget_state.load()
-            serial_enabled = state.get("persona") == "pc" and bool(state.get("ready"))
             if not serial_enabled:
-                time.sleep(0.25)
+                watcher.wait()
                 continue
 
             try:
@@ -58,16 +80,12 @@ def run(
 
             try:
                 while True:
-                    state = gadget_state.load()
-                    serial_enabled = (
-                        state.get("persona") == "pc" and bool(state.get("ready"))
-                    )
                     if not serial_enabled:
                         if verbose:
                             print("Serial persona disabled; closing serial device")
                         break
 
-                    readable, _, _ = select.select([fd], [], [], 0.25)
+                    readable = watcher.wait(extra_fds=(fd,))
                     if not readable:
                         continue
 
@@ -108,6 +126,7 @@ def run(
             if verbose:
                 print(f"Reopening serial device {device_path}")
         except KeyboardInterrupt:
+            watcher.close()
             return 0
 
     return 0
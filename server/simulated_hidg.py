@@ -0,0 +1,165 @@
+"""
+FIFO stand-in for a /dev/hidgN gadget endpoint.
+
+A real f_hid endpoint holds one report: a non-blocking write succeeds once,
+then fails with EAGAIN until the USB host polls the interrupt endpoint.
+SimulatedHidGadget recreates that on a named pipe. The pipe is shrunk to a
+single page and kept filled with padding except for room for exactly one
+report, so the HID writer's second write before the next "host poll" gets
+EAGAIN. A host thread polls at a fixed interval, takes the report (if any)
+and restores the padding. pause() stops polling, which is what a host that
+stopped reading looks like.
+
+Each refill is a single atomic write, so the pipe holds either
+padding+report or report+padding; a report equal to the padding pattern
+parses the same both ways.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import threading
+import time
+from typing import NamedTuple
+
+
+DEFAULT_HOST_POLL_INTERVAL = 0.001  # bInterval 1 on a full-speed interrupt endpoint
+DEFAULT_REPORT_LENGTH = 8
+_PAD_BYTE = 0xA5
+
+
+class HostRead(NamedTuple):
+    read_at: float  # perf_counter
+    report: bytes
+
+
+class SimulatedHidGadget:
+    """Named pipe that behaves like a one-report HID gadget endpoint."""
+
+    def __init__(
+        self,
+        path: str,
+        report_length: int = DEFAULT_REPORT_LENGTH,
+        poll_interval: float = DEFAULT_HOST_POLL_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.report_length = report_length
+        self.poll_interval = poll_interval
+        self.reads: list[HostRead] = []
+        self.polls = 0
+        self._read_fd: int | None = None
+        self._pad_fd: int | None = None
+        self._padding = b""
+        self._padded = 0
+        self._polling = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def capacity(self) -> int:
+        assert self._read_fd is not None
+        return fcntl.fcntl(self._read_fd, fcntl.F_GETPIPE_SZ)
+
+    def start(self) -> None:
+        if os.path.lexists(self.path):
+            os.unlink(self.path)
+        os.mkfifo(self.path, 0o600)
+        # The read end must exist first or the writers' non-blocking opens fail with ENXIO.
+        self._read_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self._pad_fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        fcntl.fcntl(self._read_fd, fcntl.F_SETPIPE_SZ, os.sysconf("SC_PAGE_SIZE"))
+        self._padding = bytes((_PAD_BYTE,)) * (self.capacity - self.report_length)
+        self._refill()
+        self._polling.set()
+        self._thread = threading.Thread(target=self._host_loop, name=f"host:{self.path}", daemon=True)
+        self._thread.start()
+
+    def pause(self) -> None:
+        """Stop host polling; writers see EAGAIN once the endpoint holds a report."""
+        self._polling.clear()
+
+    def resume(self) -> None:
+        self._polling.set()
+
+    def poll(self) -> bytes | None:
+        """One host poll: take the queued report, if any, and re-arm the endpoint."""
+        with self._lock:
+            padded = self._padded
+            data = self._drain()
+            self._padded = 0
+            self._refill()
+            self.polls += 1
+        report: bytes | None = None
+        if not padded:
+            report = data[-self.report_length :] if data else None
+        elif len(data) > padded:
+            if data[:padded] == self._padding:
+                report = data[padded:]
+            else:
+                report = data[: len(data) - padded]
+        if report is not None:
+            self.reads.append(HostRead(time.perf_counter(), report))
+        return report
+
+    def wait_for_reads(self, count: int, timeout: float = 2.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while len(self.reads) < count:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def close(self) -> None:
+        self._stop.set()
+        self._polling.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for fd in (self._pad_fd, self._read_fd):
+            if fd is not None:
+                os.close(fd)
+        self._pad_fd = None
+        self._read_fd = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _drain(self) -> bytes:
+        assert self._read_fd is not None
+        chunks: list[bytes] = []
+        while True:
+            try:
+                chunk = os.read(self._read_fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _refill(self) -> None:
+        assert self._pad_fd is not None
+        if self._padded:
+            return
+        try:
+            os.write(self._pad_fd, self._padding)
+            self._padded = len(self._padding)
+        except BlockingIOError:
+            # A report landed first and the page could not take the padding;
+            # the next poll takes that report and pads again.
+            pass
+
+    def _host_loop(self) -> None:
+        next_poll = time.perf_counter() + self.poll_interval
+        while not self._stop.is_set():
+            self._polling.wait()
+            if self._stop.is_set():
+                break
+            now = time.perf_counter()
+            if now < next_poll:
+                time.sleep(next_poll - now)
+            next_poll = max(next_poll + self.poll_interval, time.perf_counter())
+            self.poll()
@@ -0,0 +1,283 @@
+"""
+Shared-memory system state board.
+
+A small fixed-layout block in /dev/shm that mirrors the HID mode, pairing
+mode and gadget state JSON files. HIDModeState, PairingModeState and
+GadgetState publish into it on save, so hot processes can detect a change
+with one sequence-word read instead of parsing JSON on a timer. The JSON
+files stay the persistent source of truth; the board is rebuilt from them
+whenever a section is missing or older than the file.
+
+Writers serialize on an flock of the board file and bump a seqlock word
+around each update. Readers never lock: they retry while the word is odd or
+moved during the copy.
+
+Each state directory has its own board: the default /var/lib/openarcade
+uses DEFAULT_STATE_BOARD_PATH and any other directory (tests, tools,
+benchmarks) a name suffixed with a hash of its resolved path, so state
+files written elsewhere never reach the live board.
+
+Hot readers trust the board ahead of the JSON files, so it gets the owner
+and group of the state file directory and mode 0660, never world access. A
+board that cannot be brought to that is refused and callers read JSON.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+import fcntl
+
+
+logger = logging.getLogger("OpenArcade")
+
+OPENARCADE_STATE_BOARD_PATH_ENV_VAR = "OPENARCADE_STATE_BOARD_PATH"
+DEFAULT_STATE_BOARD_PATH = "/dev/shm/openarcade_state_board"
+DEFAULT_STATE_DIR = "/var/lib/openarcade"
+STATE_BOARD_MODE = 0o660
+
+# How often hot readers re-read the JSON files in case something bypassed the board.
+STATE_BOARD_RECONCILE_SECONDS = 5.0
+
+BOARD_MODES: tuple[str, ...] = ("keyboard", "gamepad_pc", "gamepad_switch_hori")
+BOARD_PERSONAS: tuple[str, ...] = ("pc", "switch-hori")
+
+SECTION_MODE = 1
+SECTION_PAIRING = 2
+SECTION_GADGET = 4
+
+# Layout: sequence | magic, sections, mode_seq, pairing_seq, gadget_mode_seq,
+#         mode, pairing_enabled, persona, gadget_ready
+_MAGIC = b"OASB"
+_SEQUENCE = struct.Struct("<Q")
+_FIELDS = struct.Struct("<4sIqqqBBBB")
+_FIELDS_OFFSET = 8
+BOARD_SIZE = 64
+
+READ_RETRY_LIMIT = 1000
+
+
+def resolve_state_board_path(state_dir: str | None = None) -> str:
+    """The board for the state files in state_dir; the environment overrides it."""
+    override = os.environ.get(OPENARCADE_STATE_BOARD_PATH_ENV_VAR)
+    if override:
+        return override
+    if state_dir is None:
+        return DEFAULT_STATE_BOARD_PATH
+    resolved = os.path.realpath(state_dir)
+    if resolved == os.path.realpath(DEFAULT_STATE_DIR):
+        return DEFAULT_STATE_BOARD_PATH
+    digest = hashlib.sha256(os.fsencode(resolved)).hexdigest()[:16]
+    return f"{DEFAULT_STATE_BOARD_PATH}-{digest}"
+
+
+class StateBoardSnapshot(NamedTuple):
+    version: int
+    mode: str | None
+    mode_sequence: int
+    pairing_enabled: bool | None
+    pairing_sequence: int
+    gadget_persona: str | None
+    gadget_ready: bool
+    gadget_mode_sequence: int
+
+
+_EMPTY_FIELDS = (_MAGIC, 0, 0, 0, -1, 0, 0, 0, 0)
+
+
+class StateBoard:
+    """Versioned mirror of mode/pairing/gadget state in shared memory."""
+
+    def __init__(self, path: str, owner_path: str | None = None) -> None:
+        """owner_path (the state file directory) supplies the board's owner and group."""
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC | os.O_NOFOLLOW, STATE_BOARD_MODE)
+        try:
+            _restrict_access(self._fd, path, owner_path)
+            with self._file_lock():
+                if os.fstat(self._fd).st_size < BOARD_SIZE:
+                    os.ftruncate(self._fd, BOARD_SIZE)
+            self._map = mmap.mmap(self._fd, BOARD_SIZE)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self.read_retries = 0
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def version(self) -> int:
+        return _SEQUENCE.unpack_from(self._map, 0)[0] >> 1
+
+    def read(self, last_seen_version: int = -1) -> StateBoardSnapshot | None:
+        """Return a consistent snapshot, or None if the version is unchanged."""
+        buffer = self._map
+        for _attempt in range(READ_RETRY_LIMIT):
+            start_sequence = _SEQUENCE.unpack_from(buffer, 0)[0]
+            if start_sequence & 1:
+                self.read_retries += 1
+                continue
+            version = start_sequence >> 1
+            if version == last_seen_version:
+                return None
+            fields = _FIELDS.unpack_from(buffer, _FIELDS_OFFSET)
+            if _SEQUENCE.unpack_from(buffer, 0)[0] != start_sequence:
+                self.read_retries += 1
+                continue
+            return _decode(version, fields)
+        return None
+
+    def _update(self, section: int, **values: int) -> None:
+        with self._file_lock():
+            buffer = self._map
+            fields = _FIELDS.unpack_from(buffer, _FIELDS_OFFSET)
+            if fields[0] != _MAGIC:
+                fields = _EMPTY_FIELDS
+            (
+                _magic,
+                sections,
+                mode_sequence,
+                pairing_sequence,
+                gadget_mode_sequence,
+                mode_index,
+                pairing_enabled,
+                persona_index,
+                gadget_ready,
+            ) = fields
+            current = {
+                "mode_sequence": mode_sequence,
+                "pairing_sequence": pairing_sequence,
+                "gadget_mode_sequence": gadget_mode_sequence,
+                "mode_index": mode_index,
+                "pairing_enabled": pairing_enabled,
+                "persona_index": persona_index,
+                "gadget_ready": gadget_ready,
+            }
+            current.update(values)
+
+            sequence = _SEQUENCE.unpack_from(buffer, 0)[0] & ~1
+            _SEQUENCE.pack_into(buffer, 0, sequence + 1)
+            _FIELDS.pack_into(
+                buffer,
+                _FIELDS_OFFSET,
+                _MAGIC,
+                sections | section,
+                current["mode_sequence"],
+                current["pairing_sequence"],
+                current["gadget_mode_sequence"],
+                current["mode_index"],
+                current["pairing_enabled"],
+                current["persona_index"],
+                current["gadget_ready"],
+            )
+            _SEQUENCE.pack_into(buffer, 0, sequence + 2)
+
+    def publish_mode(self, mode: str, sequence: int) -> None:
+        self._update(SECTION_MODE, mode_index=BOARD_MODES.index(mode), mode_sequence=sequence)
+
+    def publish_pairing(self, enabled: bool, sequence: int) -> None:
+        self._update(SECTION_PAIRING, pairing_enabled=int(enabled), pairing_sequence=sequence)
+
+    def publish_gadget(self, persona: str, ready: bool, mode_sequence: int) -> None:
+        self._update(
+            SECTION_GADGET,
+            persona_index=BOARD_PERSONAS.index(persona),
+            gadget_ready=int(ready),
+            gadget_mode_sequence=mode_sequence,
+        )
+
+    def close(self) -> None:
+        try:
+            self._map.close()
+        except (BufferError, ValueError):
+            pass
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+def _restrict_access(fd: int, path: str, owner_path: str | None) -> None:
+    info = os.fstat(fd)
+    owner = None
+    if owner_path is not None:
+        try:
+            owner = os.stat(owner_path)
+        except OSError:
+            pass
+    if owner is not None and (info.st_uid, info.st_gid) != (owner.st_uid, owner.st_gid):
+        try:
+            os.fchown(fd, owner.st_uid, owner.st_gid)
+            info = os.fstat(fd)
+        except PermissionError:
+            pass  # not root: the board keeps this process's owner and group
+    euid = os.geteuid()
+    if info.st_uid not in (euid, 0) and (owner is None or info.st_uid != owner.st_uid):
+        raise PermissionError(errno.EPERM, f"state board is owned by uid {info.st_uid}", path)
+    if info.st_mode & 0o777 != STATE_BOARD_MODE:
+        if info.st_uid == euid or euid == 0:
+            os.fchmod(fd, STATE_BOARD_MODE)
+        elif info.st_mode & 0o002:
+            raise PermissionError(errno.EPERM, "state board is world-writable", path)
+
+
+def _decode(version: int, fields: tuple) -> StateBoardSnapshot:
+    (
+        magic,
+        sections,
+        mode_sequence,
+        pairing_sequence,
+        gadget_mode_sequence,
+        mode_index,
+        pairing_enabled,
+        persona_index,
+        gadget_ready,
+    ) = fields
+    if magic != _MAGIC:
+        sections = 0
+    has_mode = bool(sections & SECTION_MODE) and mode_index < len(BOARD_MODES)
+    has_pairing = bool(sections & SECTION_PAIRING)
+    has_gadget = bool(sections & SECTION_GADGET) and persona_index < len(BOARD_PERSONAS)
+    return StateBoardSnapshot(
+        version=version,
+        mode=BOARD_MODES[mode_index] if has_mode else None,
+        mode_sequence=mode_sequence if has_mode else -1,
+        pairing_enabled=bool(pairing_enabled) if has_pairing else None,
+        pairing_sequence=pairing_sequence if has_pairing else -1,
+        gadget_persona=BOARD_PERSONAS[persona_index] if has_gadget else None,
+        gadget_ready=bool(gadget_ready) if has_gadget else False,
+        gadget_mode_sequence=gadget_mode_sequence if has_gadget else -1,
+    )
+
+
+_boards: dict[tuple[int, str], StateBoard | None] = {}
+
+
+def get_state_board(path: str | None = None, state_dir: str | None = None) -> StateBoard | None:
+    """
+    Return this process's handle on the board for state_dir, or None if unavailable.
+
+    Handles are per process: flock locks belong to the open file description,
+    so a forked child must not reuse its parent's descriptor.
+    """
+    board_path = path or resolve_state_board_path(state_dir)
+    key = (os.getpid(), board_path)
+    if key not in _boards:
+        try:
+            _boards[key] = StateBoard(board_path, owner_path=state_dir)
+        except OSError as exc:
+            logger.warning("State board unavailable at %s: %s", board_path, exc)
+            _boards[key] = None
+    return _boards[key]
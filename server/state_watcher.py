@@ -0,0 +1,275 @@
+"""
+State file change notifications for the services and the aggregator.
+
+StateWatcher watches the JSON files written by HIDModeState,
+PairingModeState, ConfigModeState and GadgetState and calls back with the
+freshly loaded state whenever its change key (the sequence number by
+default) moves; watch_file() instead calls back whenever a file's stat
+signature moves, for files without a sequence such as the device config.
+On Linux it uses inotify (the inotify module) on the parent directory,
+because writers replace files atomically and the watched inode changes on
+every save. Where inotify is unavailable, or a directory cannot be
+watched, it falls back to stat polling.
+
+Inotify-backed watches are still reloaded every safety interval in case an
+event was missed; the change key keeps those reloads from re-firing
+callbacks.
+
+There are two front ends over the same dispatch: the services block in
+wait(), a select() over the inotify fd and their own fds, and the
+aggregator calls start(loop), which reads the inotify fd with add_reader
+and runs the poll and safety deadlines as loop timers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import select
+import time
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from inotify import IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_TO, IN_Q_OVERFLOW, Inotify, inotify_available
+from wakeup import Wakeup
+
+
+logger = logging.getLogger("OpenArcade")
+
+WatcherBackend = Literal["inotify", "poll"]
+
+DEFAULT_WATCH_POLL_SECONDS = 0.5
+DEFAULT_SAFETY_POLL_SECONDS = 5.0
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+StateLoader = Callable[[], dict[str, Any]]
+StateCallback = Callable[[dict[str, Any]], None]
+ChangeKey = Callable[[dict[str, Any]], Hashable]
+ChangeCallback = Callable[[], None]
+
+
+def sequence_key(state: dict[str, Any]) -> Hashable:
+    return state.get("sequence")
+
+
+def signature_key(state: dict[str, Any]) -> Hashable:
+    return state.get("signature")
+
+
+@dataclass
+class _Watch:
+    path: str | None
+    load: StateLoader
+    callback: StateCallback
+    change_key: ChangeKey
+    last_key: Hashable = None
+    signature: tuple[int, int, int] | None = None
+    notified: bool = False
+
+
+def _stat_signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_ino, info.st_size)
+
+
+class StateWatcher:
+    """Deliver sequence-checked callbacks when watched state files change."""
+
+    def __init__(
+        self,
+        poll_interval: float = DEFAULT_WATCH_POLL_SECONDS,
+        safety_interval: float = DEFAULT_SAFETY_POLL_SECONDS,
+        use_inotify: bool = True,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.safety_interval = max(safety_interval, poll_interval)
+        self._watches: list[_Watch] = []
+        self._by_directory: dict[int, dict[str, list[_Watch]]] = {}
+        self._directories: dict[str, int] = {}
+        self._wakeup = Wakeup()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._inotify: Inotify | None = None
+        if use_inotify and inotify_available():
+            try:
+                self._inotify = Inotify()
+            except OSError as exc:
+                logger.warning("inotify unavailable, falling back to polling: %s", exc)
+        now = time.monotonic()
+        self._next_poll_at = now + self.poll_interval
+        self._next_safety_at = now + self.safety_interval
+
+    @property
+    def backend(self) -> WatcherBackend:
+        return "inotify" if self._inotify is not None else "poll"
+
+    def watch(
+        self,
+        path: str | None,
+        load: StateLoader,
+        callback: StateCallback,
+        change_key: ChangeKey = sequence_key,
+        initial_state: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Start watching a state file and return its current state.
+
+        Watches without a path, or whose directory cannot be watched, are
+        reloaded every poll interval instead.
+        """
+        state = initial_state if initial_state is not None else load()
+        watch = _Watch(path, load, callback, change_key, last_key=change_key(state))
+        if path is not None:
+            watch.signature = _stat_signature(path)
+            if self._inotify is not None:
+                watch.notified = self._add_inotify_watch(watch, path)
+        self._watches.append(watch)
+        if self._loop is not None:
+            self._schedule_timer()
+        return state
+
+    def watch_file(self, path: str, callback: ChangeCallback) -> None:
+        """Call back with no arguments whenever the file is replaced, written or removed."""
+
+        def load() -> dict[str, Any]:
+            return {"signature": _stat_signature(path)}
+
+        self.watch(path, load, lambda _state: callback(), change_key=signature_key)
+
+    def _add_inotify_watch(self, watch: _Watch, path: str) -> bool:
+        assert self._inotify is not None
+        directory = os.path.dirname(os.path.abspath(path))
+        wd = self._directories.get(directory)
+        if wd is None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                wd = self._inotify.add_watch(directory, WATCH_MASK)
+            except OSError as exc:
+                logger.warning("Cannot watch %s, polling instead: %s", directory, exc)
+                return False
+            self._directories[directory] = wd
+        self._by_directory.setdefault(wd, {}).setdefault(os.path.basename(path), []).append(watch)
+        return True
+
+    def wake(self) -> None:
+        """Interrupt a blocked wait(). Safe to call from a signal handler."""
+        self._wakeup.set()
+
+    def _deadline(self, timeout: float | None) -> float:
+        now = time.monotonic()
+        deadline = self._next_safety_at
+        if any(not watch.notified for watch in self._watches):
+            deadline = min(deadline, self._next_poll_at)
+        if timeout is not None:
+            deadline = min(deadline, now + timeout)
+        return deadline
+
+    def wait(self, timeout: float | None = None, extra_fds: Iterable[int] = ()) -> list[int]:
+        """
+        Block until a watched file changes, wake() is called, an extra fd is
+        readable or the timeout expires, then dispatch callbacks.
+
+        With timeout=None the wait still returns at the next poll or safety
+        deadline. Returns the extra fds that are readable.
+        """
+        extra = list(extra_fds)
+        readers: list[Any] = [self._wakeup, *extra]
+        if self._inotify is not None:
+            readers.append(self._inotify.fd)
+        remaining = max(0.0, self._deadline(timeout) - time.monotonic())
+        readable, _, _ = select.select(readers, (), (), remaining)
+
+        if self._wakeup in readable:
+            self._wakeup.clear()
+        if self._inotify is not None and self._inotify.fd in readable:
+            self._dispatch_inotify()
+        self._run_due()
+        return [fd for fd in extra if fd in readable]
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Deliver callbacks on loop from now on; wait() is not used with this front end."""
+        self._loop = loop
+        if self._inotify is not None:
+            loop.add_reader(self._inotify.fd, self._dispatch_inotify)
+        self._schedule_timer()
+
+    def _schedule_timer(self) -> None:
+        assert self._loop is not None
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(0.0, self._deadline(None) - time.monotonic())
+        self._timer = self._loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._run_due()
+        self._schedule_timer()
+
+    def _run_due(self) -> None:
+        """Poll the watches without inotify and run the safety reload, if due."""
+        now = time.monotonic()
+        if now >= self._next_poll_at:
+            self._next_poll_at = now + self.poll_interval
+            for watch in self._watches:
+                if not watch.notified:
+                    self._poll(watch)
+        if now >= self._next_safety_at:
+            self._next_safety_at = now + self.safety_interval
+            for watch in self._watches:
+                if watch.notified:
+                    self._dispatch(watch)
+
+    def check(self) -> int:
+        """Reload every watch now; returns how many callbacks fired."""
+        return sum(self._dispatch(watch) for watch in self._watches)
+
+    def _dispatch_inotify(self) -> None:
+        assert self._inotify is not None
+        touched: list[_Watch] = []
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                touched = list(self._watches)
+                break
+            for watch in self._by_directory.get(wd, {}).get(name, ()):
+                if watch not in touched:
+                    touched.append(watch)
+        for watch in touched:
+            self._dispatch(watch)
+
+    def _poll(self, watch: _Watch) -> None:
+        if watch.path is not None:
+            signature = _stat_signature(watch.path)
+            if signature == watch.signature:
+                return
+            watch.signature = signature
+        self._dispatch(watch)
+
+    def _dispatch(self, watch: _Watch) -> bool:
+        try:
+            state = watch.load()
+            key = watch.change_key(state)
+            if key == watch.last_key:
+                return False
+            watch.last_key = key
+            watch.callback(state)
+            return True
+        except Exception:
+            logger.exception("State watcher callback failed for %s", watch.path or "<unnamed>")
+            return False
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._inotify is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        self._wakeup.close()
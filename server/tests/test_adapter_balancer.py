@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from runtime import adapter_balancer
+from runtime.adapter_balancer import ADAPTER_FAILURE_LIMIT, AdapterBalancer
+from runtime.connection_scheduler import ConnectCandidate
+
+
+def _candidate(address, adapter="default"):
+    return ConnectCandidate(address, address, None, 0, adapter)
+
+
+class AdapterBalancerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.balancer = AdapterBalancer(["hci0", "hci1"])
+
+    def _connect(self, address, full=frozenset()):
+        adapter = self.balancer.place(_candidate(address), set(full))
+        self.balancer.connected(address)
+        return adapter
+
+    def test_spreads_links_and_skips_full_adapters(self):
+        self.assertEqual([self._connect(f"AA:{index}") for index in range(4)], ["hci0", "hci1", "hci0", "hci1"])
+        self.assertEqual(self._connect("AA:4", full={"hci0"}), "hci1")
+        self.assertIsNone(self.balancer.place(_candidate("AA:5"), {"hci0", "hci1"}))
+
+        self.balancer.released("AA:1")
+        self.assertEqual([entry["links"] for entry in self.balancer.stats()], [2, 2])
+        self.assertEqual(self.balancer.adapter_of("AA:3"), "hci1")
+
+    def test_prefers_adapters_that_heard_the_module(self):
+        self._connect("AA:0")
+        self.balancer.note_advertisement("AA:1", "hci0")
+        self.assertEqual(self.balancer.place(_candidate("AA:1"), set()), "hci0")
+        # A direct reconnect with no advertisement breaks ties on the adapter it used last.
+        self.balancer.released("AA:0")
+        self.balancer.released("AA:1")
+        self.assertEqual(self.balancer.place(_candidate("AA:2", adapter="hci1"), set()), "hci1")
+
+    def test_notification_jitter_counts_against_an_adapter(self):
+        self._connect("AA:0")
+        self._connect("AA:1")
+        arrival = 0.0
+        for index in range(200):
+            arrival += 0.001 if index % 2 else 0.005
+            self.balancer.note_notification("AA:0", arrival)
+        jitter = self.balancer.stats()[0]["jitter_us"]
+        self.assertGreater(jitter, 3000.0)
+        self.assertEqual(self._connect("AA:2"), "hci1")
+
+    def test_failing_adapter_is_taken_out_of_rotation(self):
+        for index in range(ADAPTER_FAILURE_LIMIT):
+            self.assertEqual(self.balancer.place(_candidate(f"AA:{index}"), set()), "hci0")
+            self.balancer.connect_failed(f"AA:{index}")
+        self.assertFalse(self.balancer.available("hci0"))
+        self.assertEqual([self._connect(f"BB:{index}") for index in range(2)], ["hci1", "hci1"])
+
+        with mock.patch.object(adapter_balancer.time, "monotonic", return_value=10**9):
+            self.assertTrue(self.balancer.available("hci0"))
+            self.assertEqual(self._connect("BB:2"), "hci0")
+
+
+if __name__ == "__main__":
+    unittest.main()
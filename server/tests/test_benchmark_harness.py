@@ -0,0 +1,42 @@
+import unittest
+
+from benchmarks.harness import compare_to_baseline, time_ns_per_op
+from benchmarks.pipeline import make_config, make_info_payload, make_press_trace
+from device_descriptor import parse_info_tlv
+from runtime.report_builder import build_mapping_cache
+
+
+class BenchmarkHarnessTestCase(unittest.TestCase):
+    def test_compare_flags_only_timed_metrics_over_threshold(self):
+        baseline = {"reducer": {"keyboard": {"median_ns": 100.0}, "gamepad_pc": {"median_ns": 100.0}}, "file_bytes": 10}
+        results = {
+            "reducer": {"keyboard": {"median_ns": 125.0}, "gamepad_pc": {"median_ns": 105.0}},
+            "file_bytes": 100,
+            "new_case": {"median_ns": 1.0},
+        }
+
+        regressions = compare_to_baseline(results, baseline, threshold=0.10)
+
+        self.assertEqual([item["metric"] for item in regressions], ["reducer.keyboard.median_ns"])
+        self.assertAlmostEqual(regressions[0]["change"], 0.25)
+
+    def test_time_ns_per_op_divides_by_operations(self):
+        calls = []
+        timing = time_ns_per_op(lambda: calls.append(1), number=4, repeats=2, ops_per_call=10)
+        self.assertEqual(len(calls), 8)
+        self.assertLessEqual(timing["best_ns"], timing["median_ns"])
+
+    def test_fixtures_are_deterministic_and_valid(self):
+        config = make_config(2, profiles_per_device=3)
+        device_ids = list(config["devices"])
+        self.assertEqual(make_press_trace(device_ids, length=64), make_press_trace(device_ids, length=64))
+        self.assertEqual(set(build_mapping_cache(config)), set(device_ids))
+
+        descriptor = parse_info_tlv(make_info_payload(4))
+        assert descriptor is not None
+        self.assertEqual(descriptor.control_count, 4)
+        self.assertEqual(descriptor.controls[3].label, "BTN4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import random
+import time
+import unittest
+
+from constants import CHAR_UUID, INFO_CHAR_UUID
+from device_descriptor import parse_info_tlv
+from runtime.clock_sync import DEVICE_CLOCK_WRAP, DeviceClock
+from runtime.link_monitor import LinkMonitor
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+from runtime.state_decoder import StateDecoder
+
+
+def _feed(clock, skew_ppm, seconds, rate_hz=100.0, start_us=0, seed=1):
+    """Inputs at a steady rate, delivered after a 1 ms floor plus 0-4 ms of radio delay."""
+    rng = random.Random(seed)
+    latencies = []
+    for index in range(int(seconds * rate_hz)):
+        edge = 100.0 + index / rate_hz
+        device_us = start_us + int(edge * (1_000_000.0 + skew_ppm))
+        excess = rng.random() * 0.004
+        latency = clock.note(device_us % DEVICE_CLOCK_WRAP, edge + 0.001 + excess)
+        if latency is not None:
+            latencies.append((latency, excess))
+    return latencies
+
+
+class DeviceClockTestCase(unittest.TestCase):
+    def test_fit_recovers_skew_and_latency_across_a_wrap(self):
+        clock = DeviceClock()
+        start_us = DEVICE_CLOCK_WRAP - 100_000_000 - 10_000_000  # wraps ~10 s in
+
+        latencies = _feed(clock, skew_ppm=250.0, seconds=20.0, start_us=start_us)
+
+        self.assertAlmostEqual(clock.drift_ppm, 250.0, delta=10.0)
+        self.assertEqual(clock.restarts, 0)
+        settled = latencies[len(latencies) // 2 :]
+        worst = max(abs(latency - excess) for latency, excess in settled)
+        self.assertLess(worst, 0.0002)
+        summary = clock.summary()
+        self.assertAlmostEqual(summary["p50_us"], 2000, delta=300)
+
+    def test_step_backwards_restarts_the_fit(self):
+        clock = DeviceClock(window_seconds=0.1)
+        _feed(clock, skew_ppm=0.0, seconds=1.0)
+        clock.note(5_000, 200.0)
+
+        self.assertEqual(clock.restarts, 1)
+        self.assertEqual(clock.summary()["fit_windows"], 0)
+
+    def test_simulated_fleet_with_injected_skew(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=1, notify_rate_hz=500.0, connect_latency=0.0, clock_skew_ppm=1500.0)
+        )
+        monitor = LinkMonitor()
+        clock = DeviceClock(window_seconds=0.1)
+        payload_sizes = set()
+        decoders = []
+
+        def on_notification(_sender, data):
+            received_at = time.perf_counter()
+            payload_sizes.add(len(data))
+            device_us = decoders[0].device_time(data)
+            clock.note(device_us, received_at)
+            monitor.note_device_time("AA", device_us, received_at)
+
+        async def main():
+            client = transport.create_client(transport.devices[0], disconnected_callback=None, timeout=1.0)
+            await client.connect()
+            # The module's descriptor flags the timestamp the decoder reads.
+            info = parse_info_tlv(bytes(await client.read_gatt_char(INFO_CHAR_UUID)))
+            decoders.append(StateDecoder(info.to_dict()))
+            await client.start_notify(CHAR_UUID, on_notification)
+            await asyncio.sleep(1.5)
+            await client.disconnect()
+
+        asyncio.run(main())
+
+        self.assertEqual(payload_sizes, {8})
+        self.assertAlmostEqual(clock.drift_ppm, 1500.0, delta=300.0)
+        self.assertGreater(monitor.summary("AA")["radio_latency"]["samples"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
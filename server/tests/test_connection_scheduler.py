@@ -0,0 +1,163 @@
+import asyncio
+import time
+import unittest
+
+from runtime.adapter_balancer import AdapterBalancer
+from runtime.connection_scheduler import ConnectionScheduler
+from runtime.metrics import RuntimeMetrics
+from runtime.sessions import SessionSupervisor
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+
+
+class ConnectionSchedulerTestCase(unittest.TestCase):
+    def test_concurrency_is_bounded_globally_and_per_adapter(self):
+        running = {"total": 0, "peak": 0}
+        per_adapter: dict[str, int] = {}
+        peaks: dict[str, int] = {}
+
+        async def connect(candidate):
+            running["total"] += 1
+            running["peak"] = max(running["peak"], running["total"])
+            per_adapter[candidate.adapter] = per_adapter.get(candidate.adapter, 0) + 1
+            peaks[candidate.adapter] = max(peaks.get(candidate.adapter, 0), per_adapter[candidate.adapter])
+            await asyncio.sleep(0.01)
+            running["total"] -= 1
+            per_adapter[candidate.adapter] -= 1
+            return True
+
+        async def scenario():
+            scheduler = ConnectionScheduler(connect, max_concurrent=3, per_adapter_cap=2)
+            for index in range(8):
+                scheduler.submit(f"dev-{index}", None, adapter="hci0" if index % 2 else "hci1")
+            while not scheduler.idle:
+                await asyncio.sleep(0.005)
+            return scheduler
+
+        scheduler = asyncio.run(scenario())
+        self.assertEqual(running["peak"], 3)
+        self.assertEqual(peaks, {"hci0": 2, "hci1": 2})
+        self.assertEqual(scheduler.last_burst["attempts"], 8)
+        self.assertEqual(scheduler.last_burst["failures"], 0)
+        delay = scheduler.stats()["connect_start_delay"]
+        self.assertEqual(delay["count"], 8)
+        self.assertLess(delay["p50_us"], delay["max_us"])  # later candidates waited for a slot
+
+    def test_place_callback_picks_adapter_at_start_from_those_under_cap(self):
+        balancer = AdapterBalancer(["hci0", "hci1"])
+        placed = []
+
+        async def connect(candidate):
+            placed.append(candidate.adapter)
+            await asyncio.sleep(0.01)
+            balancer.connected(candidate.address)
+            return True
+
+        async def scenario():
+            scheduler = ConnectionScheduler(connect, max_concurrent=4, per_adapter_cap=1, place=balancer.place)
+            for index in range(4):
+                scheduler.submit(f"dev-{index}", None)
+            self.assertEqual(scheduler.in_flight_count, 2)  # one per adapter
+            while not scheduler.idle:
+                await asyncio.sleep(0.005)
+
+        asyncio.run(scenario())
+        self.assertEqual(placed, ["hci0", "hci1", "hci0", "hci1"])
+
+    def test_candidates_start_by_priority_then_signal(self):
+        order = []
+
+        async def connect(candidate):
+            order.append(candidate.address)
+            await asyncio.sleep(0)
+            return True
+
+        async def scenario():
+            scheduler = ConnectionScheduler(connect, max_concurrent=1, per_adapter_cap=1)
+            scheduler.submit("first", None, rssi=-90)  # starts at once, the slot was free
+            scheduler.submit("weak", None, rssi=-80)
+            scheduler.submit("strong", None, rssi=-45)
+            scheduler.submit("configured", None, rssi=-95, priority=1)
+            scheduler.submit("unknown", None)
+            self.assertFalse(scheduler.submit("weak", None, rssi=-40))  # refreshes the waiting candidate
+            while not scheduler.idle:
+                await asyncio.sleep(0.001)
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["first", "configured", "weak", "strong", "unknown"])
+
+    def test_scanning_paused_for_connects_and_resumed_when_idle(self):
+        events = []
+        metrics = RuntimeMetrics()
+
+        async def connect(candidate):
+            events.append(f"connect:{candidate.address}")
+            await asyncio.sleep(0.01)
+            return candidate.address != "bad"
+
+        async def stop_scanning():
+            events.append("stop")
+
+        async def resume_scanning():
+            events.append("resume")
+
+        async def scenario():
+            scheduler = ConnectionScheduler(
+                connect,
+                max_concurrent=2,
+                per_adapter_cap=2,
+                stop_scanning=stop_scanning,
+                resume_scanning=resume_scanning,
+                metrics=metrics,
+            )
+            scheduler.submit("good", None)
+            scheduler.submit("bad", None)
+            self.assertEqual(metrics.gauges["connects_in_flight"], 2)
+            while not scheduler.idle:
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0)
+            return scheduler
+
+        scheduler = asyncio.run(scenario())
+        self.assertEqual(events[0], "stop")
+        self.assertEqual(events.count("stop"), 2)
+        self.assertEqual(events[-1], "resume")
+        self.assertEqual(events.count("resume"), 1)
+        self.assertEqual(scheduler.last_burst["failures"], 1)
+        self.assertGreater(metrics.gauges["time_to_all_connected_seconds"], 0.0)
+        self.assertEqual(metrics.gauges["connects_in_flight"], 0)
+
+
+class SessionSupervisorConnectTestCase(unittest.TestCase):
+    def test_simulated_fleet_connects_concurrently(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(
+                device_count=4,
+                notify_rate_hz=50.0,
+                connect_latency=0.3,
+                advertise_interval=0.01,
+                scan_blocks_connect=True,
+            )
+        )
+        supervisor = SessionSupervisor(lambda *_: None, lambda *_: None, transport=transport)
+
+        async def scenario():
+            supervisor.start(asyncio.get_running_loop())
+            started = time.monotonic()
+            try:
+                while len(supervisor.connected_addresses) < 4:
+                    if time.monotonic() - started > 5.0:
+                        break
+                    await asyncio.sleep(0.01)
+                return time.monotonic() - started
+            finally:
+                supervisor.stop()
+                await supervisor.wait_closed()
+
+        elapsed = asyncio.run(scenario())
+        self.assertEqual(transport.stats.snapshot()["connect_failures"], 0)
+        # Serial connects would need at least 4 x 0.3 s.
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
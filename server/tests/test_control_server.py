@@ -0,0 +1,145 @@
+import asyncio
+import json
+import unittest
+
+from runtime.control_server import RuntimeControlServer
+
+
+async def _noop() -> None:
+    return None
+
+
+class RuntimeControlServerTestCase(unittest.TestCase):
+    def _dispatch(self, server, message):
+        return asyncio.run(server._dispatch(json.dumps(message).encode("utf-8")))
+
+    def test_report_stats_are_returned_when_provider_is_set(self):
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_report_stats=lambda: {"overflow": 2, "coalesced": 5},
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(server, {"type": "get_report_stats"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["report_stats"], {"overflow": 2, "coalesced": 5})
+
+    def test_report_stats_unavailable_without_provider(self):
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(server, {"type": "get_report_stats"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "report_stats_not_available")
+
+    def test_latency_stats_are_returned_when_provider_is_set(self):
+        latency = {"keyboard": {"total": {"count": 3, "p50_us": 900}}}
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_latency_stats=lambda: latency,
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(server, {"type": "get_latency_stats"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["latency"], latency)
+
+    def test_scan_stats_are_returned_when_provider_is_set(self):
+        scan = {"scanning": False, "deferred_scans": 1, "windows": []}
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_scan_stats=lambda: scan,
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(server, {"type": "get_scan_stats"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["scan"], scan)
+
+    def test_shard_stats_require_sharded_ingestion(self):
+        shards = {"shards": [{"index": 0, "alive": True, "devices": ["AA"]}], "merges": 3}
+        unsharded = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            socket_path="/tmp/unused.sock",
+        )
+        sharded = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_shard_stats=lambda: shards,
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(unsharded, {"type": "get_shard_stats"})
+        self.assertEqual(response, {"ok": False, "error": "shard_stats_not_available"})
+        response = self._dispatch(sharded, {"type": "get_shard_stats"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["shards"], shards)
+
+    def test_link_stats_for_all_or_one_device(self):
+        links = {"devices": {"AA": {"jitter_us": 40.0}, "BB": {"jitter_us": 900.0}}, "by_jitter": ["BB", "AA"]}
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_link_stats=lambda: links,
+            socket_path="/tmp/unused.sock",
+        )
+
+        self.assertEqual(self._dispatch(server, {"type": "get_link_stats"})["links"], links)
+        response = self._dispatch(server, {"type": "get_link_stats", "device_id": "BB"})
+        self.assertEqual(response["links"]["devices"], {"BB": {"jitter_us": 900.0}})
+
+    def test_reconnect_stats_require_provider(self):
+        reconnects = {"AA": {"failure_streak": 3, "next_attempt_in_s": 4.2}}
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            socket_path="/tmp/unused.sock",
+        )
+        response = self._dispatch(server, {"type": "get_reconnect_stats"})
+        self.assertEqual(response, {"ok": False, "error": "reconnect_stats_not_available"})
+
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_reconnect_stats=lambda: reconnects,
+            socket_path="/tmp/unused.sock",
+        )
+        self.assertEqual(self._dispatch(server, {"type": "get_reconnect_stats"}), {"ok": True, "reconnects": reconnects})
+
+    def test_metrics_support_json_and_prometheus_formats(self):
+        snapshot = {"counters": {"reports_published": 4}, "gauges": {}, "devices": {}}
+        server = RuntimeControlServer(
+            on_config_updated=_noop,
+            get_connected_devices=set,
+            get_device_states=dict,
+            get_metrics=lambda: snapshot,
+            socket_path="/tmp/unused.sock",
+        )
+
+        response = self._dispatch(server, {"type": "get_metrics"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["metrics"], snapshot)
+
+        response = self._dispatch(server, {"type": "get_metrics", "format": "prometheus"})
+        self.assertTrue(response["ok"])
+        self.assertIn("openarcade_reports_published_total 4", response["prometheus"])
+
+
+if __name__ == "__main__":
+    unittest.main()
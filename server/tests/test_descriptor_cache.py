@@ -0,0 +1,106 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from default_descriptor import default_descriptor
+from descriptor_cache import DescriptorCache, descriptor_key
+from device_config_store import DeviceConfigStore
+from device_descriptor import DEVICE_FLAG_TIMESTAMP, encode_info_tlv, parse_info_tlv
+from runtime.info_reader import InfoReader
+from runtime.metrics import RuntimeMetrics
+from runtime.simulated_ble import SIM_UNIQUE_ID_BASE, SimulatedFleetConfig, SimulatedTransport
+
+
+def _descriptor(unique_id=0xC0FFEE01, fw_ver=2):
+    descriptor = default_descriptor()
+    descriptor.unique_id = unique_id
+    descriptor.fw_ver = fw_ver
+    return descriptor
+
+
+class _UnreadableClient:
+    async def read_gatt_char(self, char_specifier):
+        raise OSError("characteristic not found")
+
+
+class DescriptorCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "descriptor_cache.json")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_info_tlv_round_trips(self):
+        descriptor = _descriptor()
+        descriptor.flags = DEVICE_FLAG_TIMESTAMP
+        self.assertEqual(parse_info_tlv(encode_info_tlv(descriptor)).to_dict(), descriptor.to_dict())
+
+    def test_descriptors_persist_by_unique_id_and_firmware(self):
+        cache = DescriptorCache(self.path)
+        descriptor = _descriptor().to_dict()
+        self.assertEqual(cache.store("AA:AA", descriptor), "c0ffee01:2")
+        self.assertIsNone(cache.store("BB:BB", default_descriptor().to_dict()))
+
+        reloaded = DescriptorCache(self.path)
+        self.assertEqual(reloaded.lookup("AA:AA"), descriptor)
+        self.assertIsNone(reloaded.lookup("BB:BB"))
+        self.assertTrue(reloaded.forget("AA:AA"))
+        self.assertIsNone(reloaded.lookup("AA:AA"))
+        self.assertEqual(reloaded.get("c0ffee01:2"), descriptor)
+        self.assertIsNone(descriptor_key({"unique_id": 1}))
+
+
+class InfoReaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.config_store = DeviceConfigStore(os.path.join(self._tmpdir.name, "config.json"))
+        self.cache = DescriptorCache(os.path.join(self._tmpdir.name, "descriptor_cache.json"))
+        self.metrics = RuntimeMetrics()
+        self.reader = InfoReader(self.cache, self.config_store, metrics=self.metrics)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _sync_simulated(self, transport, device, connects=1):
+        async def main():
+            results = []
+            for _ in range(connects):
+                client = transport.create_client(device, disconnected_callback=None, timeout=1.0)
+                await client.connect()
+                results.append(await self.reader.sync(device.address, client))
+                await client.disconnect()
+            return results
+
+        return asyncio.run(main())
+
+    def test_reads_once_then_reconnects_from_cache(self):
+        transport = SimulatedTransport(SimulatedFleetConfig(device_count=1, connect_latency=0.0, info_read_latency=0.0))
+        device = transport.devices[0]
+
+        first, second = self._sync_simulated(transport, device, connects=2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["unique_id"], SIM_UNIQUE_ID_BASE)
+        self.assertEqual(device.info_reads, 1)
+        self.assertEqual(self.config_store.load()["devices"][device.address]["descriptor"], first)
+        counters = self.metrics.snapshot()["counters"]
+        self.assertEqual((counters["descriptor_cache_hits"], counters["descriptor_cache_misses"]), (1, 1))
+        self.assertEqual(counters["descriptor_reads"], 1)
+
+        # A forgotten module is read again and picks up its new firmware's descriptor.
+        device.fw_ver = 2
+        self.cache.forget(device.address)
+        (updated,) = self._sync_simulated(transport, device)
+        self.assertEqual(updated["fw_ver"], 2)
+        self.assertEqual(self.config_store.load()["devices"][device.address]["descriptor"]["fw_ver"], 2)
+
+    def test_module_without_info_keeps_config_descriptor(self):
+        self.assertIsNone(asyncio.run(self.reader.sync("AA:AA", _UnreadableClient())))
+        self.assertNotIn("AA:AA", self.config_store.load()["devices"])
+        self.assertEqual(self.metrics.snapshot()["counters"]["descriptor_read_failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+from input_recording import (
+    RECORD_MODE,
+    RECORD_STATE,
+    InputRecord,
+    InputRecorder,
+    Recording,
+    ReplayedReport,
+    diff_reports,
+    read_recording,
+    replay_reports,
+)
+from runtime.report_builder import build_keyboard_report, build_mapping_cache
+from runtime.state_reducer import StateReducer
+
+
+class InputRecordingTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "input.bin")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_records_round_trip_in_order(self):
+        recorder = InputRecorder(self.path, capacity=16)
+        recorder.record_mode("keyboard")
+        recorder.record_state("AA:AA", 0b01)
+        recorder.record_state("BB:BB", 0b10)
+        recorder.record_state("AA:AA", 0)
+        recorder.close()
+
+        recording = read_recording(self.path)
+
+        self.assertEqual(recording.devices, ("AA:AA", "BB:BB"))
+        self.assertEqual(
+            [(record.kind, record.device_index, record.value) for record in recording.records],
+            [(RECORD_MODE, 0, 0), (RECORD_STATE, 0, 0b01), (RECORD_STATE, 1, 0b10), (RECORD_STATE, 0, 0)],
+        )
+        timestamps = [record.timestamp_ns for record in recording.records]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(recording.initial_mode(), "keyboard")
+        self.assertEqual(recording.device_traces(), [[0b01, 0], [0b10]])
+
+    def test_ring_keeps_most_recent_records_across_flushes(self):
+        recorder = InputRecorder(self.path, capacity=4)
+        for state in range(3):
+            recorder.record_state("AA:AA", state)
+        recorder.flush()
+        for state in range(3, 10):
+            recorder.record_state("AA:AA", state)
+        recorder.close()
+
+        recording = read_recording(self.path)
+
+        self.assertEqual(recorder.written, 10)
+        self.assertEqual([record.value for record in recording.records], [6, 7, 8, 9])
+
+    def test_rejects_files_that_are_not_recordings(self):
+        with open(self.path, "wb") as handle:
+            handle.write(b"\0" * 8192)
+        with self.assertRaises(ValueError):
+            read_recording(self.path)
+
+
+class ReplayTestCase(unittest.TestCase):
+    def test_replay_matches_reducer_and_drops_unchanged_reports(self):
+        config = {"devices": {}}
+        states = [("AA:AA", 0b01), ("AA:AA", 0b01), ("BB:BB", 0b10), ("AA:AA", 0), ("BB:BB", 0)]
+        recording = Recording(
+            ("AA:AA", "BB:BB"),
+            [
+                InputRecord(1_000 * index, 0 if address == "AA:AA" else 1, RECORD_STATE, state)
+                for index, (address, state) in enumerate(states)
+            ],
+        )
+
+        reports = replay_reports(recording, config)
+
+        reducer = StateReducer(build_mapping_cache(config))
+        expected = [reducer.update_device_state(address, state) for address, state in states]
+        self.assertEqual([report.report for report in reports], [r for r in expected if r is not None])
+        self.assertEqual([report.offset_ns for report in reports], [0, 2_000, 3_000, 4_000])
+        self.assertEqual(reports[-1].report, build_keyboard_report([]))
+
+    def test_recorded_mode_switch_changes_report_format(self):
+        recording = Recording(
+            ("AA:AA",),
+            [
+                InputRecord(0, 0, RECORD_STATE, 0b01),
+                InputRecord(1, 0, RECORD_MODE, 1),  # gamepad_pc
+            ],
+        )
+
+        followed = replay_reports(recording, {"devices": {}})
+        ignored = replay_reports(recording, {"devices": {}}, follow_mode_changes=False)
+
+        self.assertEqual(len(followed), 2)
+        self.assertEqual(followed[-1].address, "")
+        self.assertEqual(len(ignored), 1)
+
+    def test_diff_reports_flags_changed_and_missing_reports(self):
+        expected = [ReplayedReport(0, "AA:AA", b"\x01"), ReplayedReport(1, "AA:AA", b"\x02")]
+        actual = [ReplayedReport(5, "AA:AA", b"\x01"), ReplayedReport(6, "AA:AA", b"\x03"), ReplayedReport(7, "", b"\x00")]
+
+        differences = diff_reports(expected, actual)
+
+        self.assertEqual([difference.index for difference in differences], [1, 2])
+        self.assertIsNone(differences[-1].expected)
+        self.assertEqual(diff_reports(expected, expected), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from known_device_registry import (
+    OPENARCADE_KNOWN_DEVICES_PATH_ENV_VAR,
+    KnownDeviceRegistry,
+    resolve_known_devices_path,
+)
+
+
+class KnownDeviceRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "known_devices.json")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_connects_persist_with_parameters_and_recency_order(self):
+        registry = KnownDeviceRegistry(self.path)
+        registry.record_connect("AA:AA", name="NimBLE_GATT", rssi=-60, adapter="hci0", connect_seconds=0.41234)
+        registry.record_connect("BB:BB", rssi=-50)
+        registry.record_connect("AA:AA", rssi=-55)
+
+        reloaded = KnownDeviceRegistry(self.path)
+        entry = reloaded.get("AA:AA")
+
+        self.assertEqual(reloaded.addresses(), ["AA:AA", "BB:BB"])
+        self.assertEqual(entry["name"], "NimBLE_GATT")
+        self.assertEqual(entry["rssi"], -55)
+        self.assertEqual(entry["adapter"], "hci0")
+        self.assertEqual(entry["connect_seconds"], 0.4123)
+        self.assertEqual(entry["connect_count"], 2)
+
+    def test_forget_and_unreadable_file(self):
+        with open(self.path, "w", encoding="utf-8") as handle:
+            handle.write("{not json")
+        registry = KnownDeviceRegistry(self.path)
+        self.assertEqual(registry.addresses(), [])
+
+        registry.record_connect("AA:AA")
+        self.assertTrue(registry.forget("AA:AA"))
+        self.assertFalse(registry.forget("AA:AA"))
+        self.assertEqual(KnownDeviceRegistry(self.path).load(), {})
+
+    def test_path_defaults_next_to_device_config(self):
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(OPENARCADE_KNOWN_DEVICES_PATH_ENV_VAR, None)
+            self.assertEqual(
+                resolve_known_devices_path("/var/lib/openarcade/config.json"),
+                "/var/lib/openarcade/known_devices.json",
+            )
+        with mock.patch.dict(os.environ, {OPENARCADE_KNOWN_DEVICES_PATH_ENV_VAR: self.path}):
+            self.assertEqual(resolve_known_devices_path("/elsewhere/config.json"), self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import multiprocessing
+import random
+import unittest
+
+from latency_trace import (
+    BUCKET_COUNT,
+    MAX_TRACKED_US,
+    STAGE_REDUCE,
+    STAGE_TOTAL,
+    STAGE_WRITE,
+    LatencyHistograms,
+    bucket_index,
+    bucket_upper_bound,
+    next_trace_id,
+)
+
+
+def _record_writes(histograms, count):
+    for index in range(count):
+        histograms.record("gamepad_pc", STAGE_WRITE, 0.002, trace_id=index + 1)
+
+
+class BucketTestCase(unittest.TestCase):
+    def test_bucket_bounds_cover_value_within_relative_error(self):
+        rng = random.Random(7)
+        values = list(range(0, 200)) + [rng.randrange(MAX_TRACKED_US) for _ in range(2000)]
+        for value in values:
+            index = bucket_index(value)
+            self.assertLess(index, BUCKET_COUNT)
+            upper = bucket_upper_bound(index)
+            self.assertGreaterEqual(upper, value)
+            self.assertLessEqual(upper - value, max(1, value // 16))
+
+    def test_values_past_range_clamp_into_top_bucket(self):
+        self.assertEqual(bucket_index(MAX_TRACKED_US * 4), BUCKET_COUNT - 1)
+
+    def test_trace_ids_skip_zero_on_wrap(self):
+        self.assertEqual(next_trace_id(0), 1)
+        self.assertEqual(next_trace_id(0xFFFFFFFF), 1)
+
+
+class LatencyHistogramsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.histograms = LatencyHistograms.create()
+
+    def tearDown(self):
+        self.histograms.close()
+        self.histograms.unlink()
+
+    def test_summary_reports_percentiles_and_max_trace(self):
+        for value_us in range(1, 1001):
+            self.histograms.record("keyboard", STAGE_TOTAL, value_us / 1_000_000.0, trace_id=value_us)
+
+        total = self.histograms.summary()["keyboard"]["total"]
+        self.assertEqual(total["count"], 1000)
+        self.assertAlmostEqual(total["p50_us"], 500, delta=500 // 16 + 1)
+        self.assertAlmostEqual(total["p99_us"], 990, delta=990 // 16 + 1)
+        self.assertEqual(total["max_us"], 1000)
+        self.assertEqual(total["max_trace_id"], 1000)
+        self.assertLessEqual(total["p999_us"], total["max_us"])
+
+    def test_modes_and_stages_are_separate(self):
+        self.histograms.record("keyboard", STAGE_REDUCE, 0.00001)
+        self.histograms.record("gamepad_switch_hori", STAGE_WRITE, 0.003)
+        self.histograms.record("unknown", STAGE_WRITE, 0.003)
+
+        summary = self.histograms.summary()
+        self.assertEqual(set(summary), {"keyboard", "gamepad_switch_hori"})
+        self.assertEqual(set(summary["keyboard"]), {"reduce"})
+        self.assertEqual(summary["gamepad_switch_hori"]["write"]["max_us"], 3000)
+
+    def test_other_process_contributes_samples(self):
+        context = multiprocessing.get_context("fork")
+        process = context.Process(target=_record_writes, args=(self.histograms, 50))
+        process.start()
+        process.join()
+
+        write = self.histograms.summary()["gamepad_pc"]["write"]
+        self.assertEqual(write["count"], 50)
+        self.assertEqual(write["max_us"], 2000)
+
+    def test_reset_clears_samples(self):
+        self.histograms.record("keyboard", STAGE_TOTAL, 0.001)
+        self.histograms.reset()
+        self.assertEqual(self.histograms.summary(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
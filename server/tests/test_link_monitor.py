@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+
+from runtime.link_monitor import RSSI_SAMPLE_COUNT, LinkMonitor
+
+
+class LinkMonitorTestCase(unittest.TestCase):
+    def test_intervals_jitter_and_duplicates(self):
+        monitor = LinkMonitor()
+        arrivals = [0.0, 0.010, 0.020, 0.032, 0.042, 5.0, 5.010]
+        for index, received_at in enumerate(arrivals):
+            monitor.note_notification("AA", received_at, duplicate=index % 2 == 1)
+
+        summary = monitor.summary("AA")
+
+        self.assertEqual((summary["notifications"], summary["duplicates"]), (7, 3))
+        intervals = summary["intervals"]
+        self.assertEqual((intervals["count"], intervals["idle_gaps"]), (5, 1))
+        self.assertAlmostEqual(intervals["max_us"], 12_000, delta=1)
+        self.assertGreater(summary["jitter_us"], 0.0)
+        self.assertIsNone(monitor.summary("BB"))
+
+    def test_disconnects_downtime_rssi_ring_and_sequence_gaps(self):
+        monitor = LinkMonitor()
+        with mock.patch("runtime.link_monitor.time.monotonic", side_effect=[10.0, 12.0, 15.0, 20.0]):
+            monitor.connected("AA")
+            monitor.disconnected("AA")
+            monitor.connected("AA")
+            summary = monitor.summary("AA")
+        self.assertEqual((summary["connects"], summary["disconnects"]), (2, 1))
+        self.assertEqual(summary["last_downtime_s"], 3.0)
+        self.assertEqual(summary["uptime_s"], 5.0)
+
+        for rssi in range(-40, -40 - RSSI_SAMPLE_COUNT - 8, -1):
+            monitor.note_rssi("AA", rssi)
+        for sequence in (250, 251, 254, 255, 1):
+            monitor.note_sequence("AA", sequence)
+
+        summary = monitor.summary("AA")
+        self.assertEqual(summary["rssi"]["samples"], RSSI_SAMPLE_COUNT + 8)
+        self.assertEqual(summary["rssi"]["last"], -79)
+        self.assertEqual(summary["rssi"]["max"], -48)
+        self.assertEqual(summary["sequence_gaps"], 3)
+        self.assertEqual(monitor.brief("AA")["rssi"], -79)
+
+    def test_stats_rank_connected_modules_by_jitter(self):
+        monitor = LinkMonitor()
+        for address, step in (("AA", 0.0), ("BB", 0.004)):
+            monitor.connected(address)
+            received_at = 0.0
+            for index in range(20):
+                received_at += 0.01 + (step if index % 2 else 0.0)
+                monitor.note_notification(address, received_at)
+        monitor.note_rssi("CC", -90)
+
+        stats = monitor.stats()
+
+        self.assertEqual(stats["by_jitter"], ["BB", "AA"])
+        self.assertEqual(sorted(stats["devices"]), ["AA", "BB", "CC"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+from runtime.metrics import MetricsExporter, RuntimeMetrics, render_prometheus
+
+
+class RuntimeMetricsTestCase(unittest.TestCase):
+    def test_snapshot_includes_per_device_counters(self):
+        metrics = RuntimeMetrics()
+        metrics.increment_device("notifications_received", "aa:bb")
+        metrics.increment_device("notifications_received", "aa:bb")
+        metrics.increment_device("notifications_received", "cc:dd")
+        metrics.increment("reports_published")
+        metrics.record_mapping_cache_rebuild(0.25)
+        metrics.record_mapping_cache_rebuild(0.5)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["notifications_received"], 3)
+        self.assertEqual(snapshot["devices"]["notifications_received"], {"aa:bb": 2, "cc:dd": 1})
+        self.assertEqual(snapshot["counters"]["reports_published"], 1)
+        self.assertEqual(snapshot["counters"]["mapping_cache_rebuilds"], 2)
+        self.assertEqual(snapshot["gauges"]["mapping_cache_rebuild_seconds"], 0.5)
+        self.assertEqual(snapshot["gauges"]["mapping_cache_rebuild_seconds_total"], 0.75)
+
+    def test_scanner_on_time_includes_running_interval(self):
+        metrics = RuntimeMetrics()
+        metrics.scanner_started()
+        self.assertGreaterEqual(metrics.snapshot()["gauges"]["scanner_on_seconds"], 0.0)
+        metrics.scanner_stopped()
+        stopped = metrics.snapshot()["gauges"]["scanner_on_seconds"]
+        self.assertEqual(metrics.snapshot()["gauges"]["scanner_on_seconds"], stopped)
+
+    def test_render_prometheus_labels_devices(self):
+        metrics = RuntimeMetrics()
+        metrics.increment_device("notifications_received", "aa:bb")
+        metrics.increment("connect_failures", 2)
+
+        text = render_prometheus(metrics.snapshot())
+        self.assertIn("# TYPE openarcade_notifications_received_total counter", text)
+        self.assertIn('openarcade_notifications_received_total{device="aa:bb"} 1', text)
+        self.assertIn("openarcade_connect_failures_total 2", text)
+        self.assertIn("# TYPE openarcade_loop_lag_seconds gauge", text)
+
+    def test_exporter_serves_metrics(self):
+        async def scenario():
+            metrics = RuntimeMetrics()
+            metrics.increment("reports_published", 7)
+            exporter = MetricsExporter(metrics, port=0)
+            await exporter.start()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", exporter.port)
+                writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+                await writer.wait_closed()
+            finally:
+                await exporter.stop()
+            return response.decode("utf-8")
+
+        response = asyncio.run(scenario())
+        self.assertTrue(response.startswith("HTTP/1.1 200 OK"))
+        self.assertIn("openarcade_reports_published_total 7", response)
+
+
+if __name__ == "__main__":
+    unittest.main()
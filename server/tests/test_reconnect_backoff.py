@@ -0,0 +1,92 @@
+import random
+import unittest
+from unittest import mock
+
+from runtime.reconnect_backoff import ReconnectBackoff
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReconnectBackoffTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch("runtime.reconnect_backoff.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _backoff(self, jitter=0.0):
+        return ReconnectBackoff(
+            first_delay=0.2,
+            base_delay=1.0,
+            max_delay=8.0,
+            healthy_seconds=30.0,
+            jitter=jitter,
+            rng=random.Random(7),
+        )
+
+    def test_failures_grow_exponentially_up_to_the_cap(self):
+        backoff = self._backoff()
+        self.assertTrue(backoff.ready("AA"))
+        delays = [backoff.connect_failed("AA") for _ in range(6)]
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0, 8.0, 8.0])
+        self.assertFalse(backoff.ready("AA"))
+        self.clock.now += 8.0
+        self.assertTrue(backoff.ready("AA"))
+
+        stats = backoff.stats()["AA"]
+        self.assertEqual((stats["failure_streak"], stats["connect_failures"]), (6, 6))
+        self.assertEqual(stats["next_attempt_in_s"], 0.0)
+
+    def test_healthy_link_drop_retries_fast_and_resets_streak(self):
+        backoff = self._backoff()
+        backoff.connect_failed("AA")
+        backoff.connect_failed("AA")
+        backoff.connected("AA")
+        self.assertTrue(backoff.ready("AA"))
+
+        self.clock.now += 60.0
+        self.assertEqual(backoff.disconnected("AA"), 0.2)
+        self.assertEqual(backoff.stats()["AA"]["failure_streak"], 0)
+        self.assertEqual(backoff.connect_failed("AA"), 1.0)
+
+    def test_flapping_link_keeps_backing_off(self):
+        backoff = self._backoff()
+        delays = []
+        for _ in range(3):
+            backoff.connected("AA")
+            self.clock.now += 2.0
+            delays.append(backoff.disconnected("AA"))
+        self.assertEqual(delays, [1.0, 2.0, 4.0])
+        self.assertEqual(backoff.stats()["AA"]["last_uptime_s"], 2.0)
+        # Not marked connected, e.g. a drop during setup: the connect path reports it instead.
+        self.assertIsNone(backoff.disconnected("AA"))
+        self.assertIsNone(backoff.disconnected("BB"))
+
+    def test_jitter_spreads_delays_within_bounds(self):
+        backoff = self._backoff(jitter=0.2)
+        delays = set()
+        for index in range(50):
+            address = f"M{index}"
+            delays.add(backoff.connect_failed(address))
+        self.assertGreater(len(delays), 40)
+        self.assertTrue(all(0.8 <= delay <= 1.2 for delay in delays))
+
+    def test_clear_lets_every_module_retry_now(self):
+        backoff = self._backoff()
+        backoff.connect_failed("AA")
+        backoff.connect_failed("AA")
+        backoff.clear()
+        self.assertTrue(backoff.ready("AA"))
+        self.assertEqual(backoff.connect_failed("AA"), 4.0)
+        backoff.forget("AA")
+        self.assertEqual(backoff.stats(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
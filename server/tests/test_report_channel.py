@@ -0,0 +1,147 @@
+import multiprocessing
+import unittest
+
+from report_channel import (
+    REPORT_CAPACITY,
+    REPORT_POLICY_LATEST,
+    REPORT_POLICY_MAX_PER_POLL,
+    REPORT_POLICY_PRESS_EDGES,
+    ReportChannel,
+    ReportRing,
+    ReportSnapshot,
+    coalesce_reports,
+)
+from runtime.report_builder import build_keyboard_report
+
+
+def _publish_reports(channel, count):
+    for version in range(1, count + 1):
+        channel.publish(bytes([version & 0xFF]) * 8, input_at=float(version), published_at=float(version))
+
+
+class ReportChannelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.channel = ReportChannel.create()
+
+    def tearDown(self):
+        self.channel.close()
+        self.channel.unlink()
+
+    def test_publish_and_read_roundtrip(self):
+        version = self.channel.publish(b"\x01\x02\x03", input_at=1.5, published_at=2.5)
+
+        snapshot = self.channel.read()
+        assert snapshot is not None
+        self.assertEqual(snapshot.version, version)
+        self.assertEqual(snapshot.report, b"\x01\x02\x03")
+        self.assertEqual(snapshot.input_at, 1.5)
+        self.assertEqual(snapshot.published_at, 2.5)
+
+    def test_read_returns_none_until_new_version(self):
+        version = self.channel.publish(b"\x00" * 8)
+        self.assertIsNone(self.channel.read(version))
+
+        self.channel.publish(b"\x04" * 8)
+        snapshot = self.channel.read(version)
+        assert snapshot is not None
+        self.assertEqual(snapshot.version, version + 1)
+        self.assertEqual(self.channel.current_version(), version + 1)
+
+    def test_long_reports_are_truncated_to_capacity(self):
+        self.channel.publish(b"\xff" * (REPORT_CAPACITY + 10))
+        snapshot = self.channel.read()
+        assert snapshot is not None
+        self.assertEqual(len(snapshot.report), REPORT_CAPACITY)
+
+    def test_reader_in_other_process_sees_consistent_reports(self):
+        writer = multiprocessing.get_context("fork").Process(
+            target=_publish_reports,
+            args=(self.channel, 2000),
+        )
+        writer.start()
+
+        last_seen_version = 0
+        while writer.is_alive() or self.channel.current_version() != last_seen_version:
+            snapshot = self.channel.read(last_seen_version)
+            if snapshot is None:
+                continue
+            last_seen_version = snapshot.version
+            self.assertEqual(snapshot.report, bytes([snapshot.version & 0xFF]) * 8)
+            self.assertEqual(snapshot.input_at, float(snapshot.version))
+        writer.join()
+
+        self.assertEqual(last_seen_version, 2000)
+
+
+def _keyboard_snapshots(*key_sets):
+    return [
+        ReportSnapshot(version, build_keyboard_report(keys), 0.0, 0.0)
+        for version, keys in enumerate(key_sets, start=1)
+    ]
+
+
+class ReportRingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.ring = ReportRing.create(capacity=4)
+
+    def tearDown(self):
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_drain_returns_every_report_in_order(self):
+        self.ring.publish(b"\x01" * 8)
+        self.ring.publish(b"\x00" * 8)
+
+        drained = self.ring.drain()
+        self.assertEqual([snapshot.report for snapshot in drained], [b"\x01" * 8, b"\x00" * 8])
+        self.assertEqual(self.ring.drain(), [])
+        self.assertEqual(self.ring.stats()["pending"], 0)
+
+    def test_overflow_still_delivers_latest_report(self):
+        for value in range(1, 7):
+            self.ring.publish(bytes([value]) * 8)
+
+        drained = self.ring.drain()
+        self.assertEqual([snapshot.version for snapshot in drained], [1, 2, 3, 4, 6])
+        self.assertEqual(drained[-1].report, b"\x06" * 8)
+        self.assertEqual(self.ring.stats()["overflow"], 2)
+
+    def test_record_coalesced_is_visible_in_stats(self):
+        self.ring.record_coalesced(3)
+        self.assertEqual(self.ring.stats()["coalesced"], 3)
+
+
+class CoalesceReportsTestCase(unittest.TestCase):
+    def test_press_edges_keeps_quick_tap(self):
+        neutral = build_keyboard_report([])
+        snapshots = _keyboard_snapshots([4], [])
+
+        kept = coalesce_reports(snapshots, REPORT_POLICY_PRESS_EDGES, "keyboard", neutral)
+        self.assertEqual(kept, snapshots)
+
+        kept = coalesce_reports(snapshots, REPORT_POLICY_LATEST, "keyboard", neutral)
+        self.assertEqual(kept, snapshots[-1:])
+
+    def test_press_edges_keeps_release_between_repeated_taps(self):
+        neutral = build_keyboard_report([])
+        snapshots = _keyboard_snapshots([4], [4, 5], [5], [], [4])
+
+        kept = coalesce_reports(snapshots, REPORT_POLICY_PRESS_EDGES, "keyboard", neutral)
+        self.assertEqual([snapshot.version for snapshot in kept], [1, 2, 4, 5])
+
+    def test_max_per_poll_caps_to_newest_reports(self):
+        neutral = build_keyboard_report([])
+        snapshots = _keyboard_snapshots([4], [], [5], [], [6], [])
+
+        kept = coalesce_reports(
+            snapshots,
+            REPORT_POLICY_MAX_PER_POLL,
+            "keyboard",
+            neutral,
+            max_per_poll=2,
+        )
+        self.assertEqual([snapshot.version for snapshot in kept], [5, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
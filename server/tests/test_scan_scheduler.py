@@ -0,0 +1,172 @@
+import time
+import unittest
+from unittest import mock
+
+from runtime.metrics import RuntimeMetrics
+from runtime.scan_scheduler import DUTY_WINDOW_SECONDS, ScanScheduler
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ScanSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch("runtime.scan_scheduler.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _scheduler(self, **kwargs):
+        kwargs.setdefault("activity_window", 3.0)
+        kwargs.setdefault("max_duty_cycle", 0.5)
+        return ScanScheduler(
+            settle_seconds=5.0,
+            background_interval=15.0,
+            background_duration=1.0,
+            **kwargs,
+        )
+
+    def test_scans_freely_without_connected_modules(self):
+        scheduler = self._scheduler()
+        scheduler.note_input()
+
+        self.assertTrue(scheduler.should_scan(True, 0))
+        self.assertFalse(scheduler.should_scan(False, 0))
+
+    def test_recent_input_defers_settle_window_into_idle_gap(self):
+        scheduler = self._scheduler()
+        scheduler.note_input()
+
+        self.assertFalse(scheduler.should_scan(True, 2))
+        self.assertFalse(scheduler.should_scan(True, 2))
+        self.assertEqual(scheduler.deferred_scans, 1)
+
+        self.clock.now += 3.5
+        self.assertTrue(scheduler.should_scan(True, 2))
+        self.clock.now += 2.0
+        self.assertFalse(scheduler.should_scan(True, 2))
+
+    def test_due_background_scan_waits_for_idle_gap(self):
+        scheduler = self._scheduler()
+        self.clock.now += 25.0
+        scheduler.note_input()
+
+        self.assertFalse(scheduler.should_scan(True, 1))
+        self.clock.now += 10.0  # well past the next background slot
+        scheduler.note_input()
+        self.assertFalse(scheduler.should_scan(True, 1))
+
+        self.clock.now += 3.0
+        self.assertTrue(scheduler.should_scan(True, 1))
+        scheduler.scan_started()
+        self.clock.now += 1.5
+        self.assertFalse(scheduler.should_scan(True, 1))
+        scheduler.scan_stopped()
+
+        window = scheduler.stats()["windows"][-1]
+        self.assertEqual(window["reason"], "background")
+        self.assertFalse(window["interrupted"])
+
+    def test_input_interrupts_running_scan_once(self):
+        metrics = RuntimeMetrics()
+        scheduler = self._scheduler(metrics=metrics)
+        self.assertTrue(scheduler.should_scan(True, 1))
+        scheduler.scan_started()
+
+        self.assertTrue(scheduler.note_input())
+        self.assertFalse(scheduler.note_input())
+        self.assertFalse(scheduler.should_scan(True, 1))
+        self.clock.now += 0.5
+        scheduler.scan_stopped()
+
+        stats = scheduler.stats()
+        self.assertEqual(stats["interrupted_scans"], 1)
+        self.assertTrue(stats["windows"][-1]["interrupted"])
+        self.assertEqual(metrics.counters["scans_interrupted"], 1)
+        self.assertAlmostEqual(metrics.gauges["scan_duty_cycle"], 0.5 / DUTY_WINDOW_SECONDS)
+
+    def test_duty_cycle_caps_scan_time(self):
+        scheduler = self._scheduler(max_duty_cycle=0.05)
+        scheduler.scan_started()
+        self.clock.now += 3.0  # 5% of the 60 s window
+        self.assertFalse(scheduler.should_scan(True, 1))
+        scheduler.scan_stopped()
+
+        scheduler.extend_window()
+        self.assertFalse(scheduler.should_scan(True, 1))
+        self.clock.now += DUTY_WINDOW_SECONDS
+        self.assertTrue(scheduler.should_scan(True, 1))
+
+    def test_next_change_in_tracks_the_earliest_deadline(self):
+        scheduler = self._scheduler()
+        self.assertIsNone(scheduler.next_change_in(False, 1))
+        self.assertIsNone(scheduler.next_change_in(True, 0))
+        self.assertAlmostEqual(scheduler.next_change_in(True, 1), 5.0)
+
+        self.clock.now += 4.0
+        scheduler.note_input()
+        self.assertAlmostEqual(scheduler.next_change_in(True, 1), 1.0)
+        self.clock.now += 2.0
+        self.assertAlmostEqual(scheduler.next_change_in(True, 1), 1.0)  # input window expiry
+        self.clock.now += 1.0
+        self.assertAlmostEqual(scheduler.next_change_in(True, 1), 13.0)  # next background scan
+
+    def test_pending_connect_with_overdue_background_does_not_spin(self):
+        scheduler = self._scheduler()
+        self.clock.now += 30.0  # settle window over, background scan overdue
+
+        # Reconciler passes while a direct reconnect is queued, then in flight on a radio
+        # that cannot scan meanwhile: each must wait on an event or a future deadline.
+        self.assertTrue(scheduler.should_scan(True, 1, discovery_pending=True))
+        scheduler.scan_started()
+        timeouts = [scheduler.next_change_in(True, 1)]
+        for _ in range(3):
+            self.assertTrue(scheduler.should_scan(True, 1, discovery_pending=True))
+            timeouts.append(scheduler.next_change_in(True, 1))
+        scheduler.scan_stopped()
+        for _ in range(3):
+            self.assertFalse(scheduler.should_scan(True, 1, discovery_pending=True, connect_in_flight=True))
+            timeouts.append(scheduler.next_change_in(True, 1))
+
+        self.assertTrue(all(timeout is None or timeout > 0.0 for timeout in timeouts), timeouts)
+        # The discovery scan stood in for the background scan.
+        self.assertAlmostEqual(scheduler.next_background_at, self.clock.now + 15.0)
+
+    def test_jitter_is_split_by_scanner_state(self):
+        scheduler = self._scheduler()
+        arrivals = [0.0, 0.010, 0.020, 0.030]
+        for received_at in arrivals:
+            scheduler.note_notification("AA:AA", received_at)
+        scheduler.scan_started()
+        for received_at in (0.045, 0.050, 0.068, 0.070):
+            scheduler.note_notification("AA:AA", received_at)
+        # A pause between presses is not jitter.
+        scheduler.note_notification("AA:AA", 5.0)
+        scheduler.note_notification("AA:AA", 5.010)
+
+        jitter = scheduler.stats()["notification_jitter"]
+        self.assertEqual(jitter["idle"]["count"], 2)
+        self.assertLess(jitter["idle"]["max_us"], 10)
+        self.assertEqual(jitter["scanning"]["count"], 4)
+        self.assertGreaterEqual(jitter["scanning"]["max_us"], 15_000)
+
+
+class ScanSchedulerDefaultsTestCase(unittest.TestCase):
+    def test_environment_overrides_and_invalid_values(self):
+        with mock.patch.dict(
+            "os.environ",
+            {"OPENARCADE_SCAN_ACTIVITY_WINDOW": "1.5", "OPENARCADE_SCAN_MAX_DUTY_CYCLE": "lots"},
+        ):
+            scheduler = ScanScheduler()
+        self.assertEqual(scheduler.activity_window, 1.5)
+        self.assertEqual(scheduler.max_duty_cycle, 0.1)
+        self.assertLess(scheduler.scan_until, time.monotonic() + 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
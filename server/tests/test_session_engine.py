@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from runtime.session_engine import SessionEngine
+from runtime.simulated_ble import SimulatedFleetConfig, SimulatedTransport
+
+
+async def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+class SessionEngineTestCase(unittest.TestCase):
+    def test_sessions_share_the_app_loop_and_fail_independently(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=3, notify_rate_hz=100.0, advertise_interval=0.01)
+        )
+        addresses = sorted(device.address for device in transport.devices)
+        updates: dict[str, int] = {address: 0 for address in addresses}
+        update_threads: set[int] = set()
+        stopped: list[str] = []
+
+        def on_state_update(address, _state, _axes):
+            update_threads.add(threading.get_ident())
+            updates[address] += 1
+            if address == addresses[0]:
+                raise RuntimeError("bad mapping")
+
+        engine = SessionEngine(on_state_update, stopped.append, transport=transport)
+        threads_before = threading.active_count()
+
+        async def scenario():
+            engine.start(asyncio.get_running_loop())
+            try:
+                await _wait_until(lambda: len(engine.connected_addresses) == 3)
+                self.assertEqual(threading.active_count(), threads_before)
+
+                transport.drop_connection(addresses[1])
+                await _wait_until(lambda: addresses[1] in stopped)
+                before = dict(updates)
+                await asyncio.sleep(0.1)
+                return before
+            finally:
+                engine.stop()
+                await engine.wait_closed()
+
+        before = asyncio.run(scenario())
+
+        self.assertEqual(update_threads, {threading.get_ident()})
+        # The raising callback and the dropped link each affected only their own module.
+        self.assertGreater(updates[addresses[0]], before[addresses[0]])
+        self.assertGreater(updates[addresses[2]], before[addresses[2]])
+        self.assertEqual(updates[addresses[1]], before[addresses[1]])
+        self.assertEqual(sorted(stopped), addresses)
+        self.assertEqual(engine.connected_addresses, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+import asyncio
+import multiprocessing
+import pickle
+import time
+import unittest
+
+from device_descriptor import ControlType, ReportFormat
+from device_state_table import DeviceStateTable
+from runtime.shard_coordinator import REBALANCE_IDLE_SECONDS, ShardConnectError, ShardCoordinator
+from runtime.state_decoder import StateDecoder
+from wakeup import Wakeup
+
+
+def _record_states(table, slot, count):
+    for state in range(1, count + 1):
+        table.record(slot, state, float(state))
+
+
+class _FakeShard:
+    """Answers coordinator commands the way ingest_shard_process does."""
+
+    def __init__(self, loop, link):
+        self.link = link
+        self.slots = {}
+        self.adapters = {}
+        self.decoders = {}
+        self.decoder_updates = []
+        loop.add_reader(link.fileno(), self._read)
+
+    def _read(self):
+        while self.link.poll():
+            message = self.link.recv()
+            if message[0] == "connect":
+                self.slots[message[1]] = message[2]
+                self.adapters[message[1]] = message[3]
+                self.decoders[message[1]] = message[4]
+                self.link.send(("connected", message[1], True, None))
+            elif message[0] == "decoder":
+                self.decoders[message[1]] = message[2]
+                self.decoder_updates.append(message[1:])
+            else:
+                self.slots.pop(message[1], None)
+                self.link.send(("disconnected", message[1]))
+
+    def drop(self, address):
+        self.slots.pop(address)
+        self.link.send(("disconnected", address))
+
+
+class DeviceStateTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = DeviceStateTable.create(slots=4)
+
+    def tearDown(self):
+        self.table.close()
+        self.table.unlink()
+
+    def test_only_changed_states_move_the_sequence(self):
+        self.assertFalse(self.table.record(1, 0, 1.0))
+        self.assertTrue(self.table.record(1, 5, 2.0))
+        self.assertFalse(self.table.record(1, 5, 3.0))
+
+        snapshot = self.table.read(1)
+        self.assertEqual(snapshot.state, 5)
+        self.assertEqual(snapshot.input_at, 2.0)
+        self.assertEqual(snapshot.sequence, 2)
+        self.assertEqual((snapshot.notifications, snapshot.duplicates), (3, 2))
+
+        self.assertIsNone(snapshot.axes)
+        self.table.reset(1)
+        self.assertEqual(self.table.read(1).notifications, 0)
+        with self.assertRaises(IndexError):
+            self.table.read(4)
+
+    def test_axes_changes_are_stored_with_the_state(self):
+        self.assertTrue(self.table.record(0, 1, 1.0, (0x80, 0x80, 0x80, 0x80)))
+        self.assertFalse(self.table.record(0, 1, 2.0, (0x80, 0x80, 0x80, 0x80)))
+        self.assertTrue(self.table.record(0, 1, 3.0, (0xFF, 0x80, 0x80, 0x80)))
+        self.assertEqual(self.table.read(0).axes, (0xFF, 0x80, 0x80, 0x80))
+        self.assertTrue(self.table.record(0, 1, 4.0))
+        self.assertIsNone(self.table.read(0).axes)
+        self.assertEqual(self.table.read(0).input_at, 4.0)
+
+    def test_writer_in_other_process_leaves_consistent_slots(self):
+        attached = pickle.loads(pickle.dumps(self.table))
+        writer = multiprocessing.get_context("fork").Process(target=_record_states, args=(attached, 2, 5000))
+        writer.start()
+        while writer.is_alive():
+            snapshot = self.table.read(2)
+            if snapshot is not None and snapshot.sequence:
+                self.assertEqual(float(snapshot.state), snapshot.input_at)
+        writer.join()
+        attached.close()
+
+        self.assertEqual(self.table.read(2).state, 5000)
+        self.assertEqual(self.table.read(2).sequence, 10000)
+
+
+class ShardCoordinatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = DeviceStateTable.create(slots=8)
+        self.wakeup = Wakeup()
+        self.merged = []
+        self.disconnected = []
+
+    def tearDown(self):
+        self.wakeup.close()
+        self.table.close()
+        self.table.unlink()
+
+    def _run(self, scenario, shard_count=2, decoder_of=None):
+        async def main():
+            loop = asyncio.get_running_loop()
+            pipes = [multiprocessing.Pipe(duplex=True) for _ in range(shard_count)]
+            shards = [_FakeShard(loop, shard_end) for _aggregator_end, shard_end in pipes]
+            coordinator = ShardCoordinator(
+                [aggregator_end for aggregator_end, _shard_end in pipes],
+                self.table,
+                self.wakeup,
+                lambda *args: self.merged.append(args),
+                decoder_of=decoder_of,
+            )
+            coordinator.start(loop)
+            try:
+                return await scenario(coordinator, shards)
+            finally:
+                coordinator.close()
+                for _aggregator_end, shard_end in pipes:
+                    if not shard_end.closed:
+                        loop.remove_reader(shard_end.fileno())
+
+        return asyncio.run(main())
+
+    async def _connect(self, coordinator, address):
+        client = coordinator.create_client(address, disconnected_callback=self.disconnected.append)
+        await client.connect()
+        await client.start_notify("char", None)
+        return client
+
+    def test_places_on_least_loaded_shard_and_merges_changed_slots(self):
+        async def scenario(coordinator, shards):
+            clients = [await self._connect(coordinator, f"AA:{index}") for index in range(3)]
+            self.assertEqual(coordinator.loads(), [2, 1])
+            self.assertEqual(coordinator.shard_of("AA:1"), 1)
+            self.assertTrue(clients[1].is_connected)
+            with self.assertRaises(ShardConnectError):
+                await coordinator.create_client("AA:1").connect()
+
+            slot = shards[1].slots["AA:1"]
+            self.table.record(slot, 0, 1.0)
+            self.table.record(slot, 7, 2.0)
+            self.wakeup.set()
+            await asyncio.sleep(0.01)
+            self.table.record(slot, 7, 3.0)
+            coordinator.merge()  # counters only
+            coordinator.merge()  # nothing new
+            return coordinator.stats()
+
+        stats = self._run(scenario)
+
+        self.assertEqual(self.merged, [("AA:1", 7, 2.0, 2, 1, None), ("AA:1", 7, 2.0, 1, 1, None)])
+        self.assertEqual(stats["shards"][0]["devices"], ["AA:0", "AA:2"])
+        self.assertEqual(stats["slots"]["in_use"], 3)
+
+    def test_shards_get_the_decoder_and_merge_axes(self):
+        descriptor = {
+            "report_format": ReportFormat.PACKED,
+            "report_bytes": 2,
+            "controls": [
+                {"type": ControlType.BUTTON, "format": ReportFormat.PACKED, "byte_offset": 0, "bit_offset": 0},
+                {"type": ControlType.AXIS, "format": ReportFormat.PACKED, "byte_offset": 1, "bit_width": 8},
+            ],
+        }
+        decoders = {"AA:1": StateDecoder(descriptor)}
+
+        async def scenario(coordinator, shards):
+            await self._connect(coordinator, "AA:0")
+            await self._connect(coordinator, "AA:1")
+            self.assertIsNone(shards[0].decoders["AA:0"])
+            # The decoder crossed the pipe and was recompiled from its descriptor.
+            state, axes = shards[1].decoders["AA:1"].decode(b"\x01\x20")
+            self.table.record(shards[1].slots["AA:1"], state, 2.0, axes)
+            coordinator.merge()
+
+            decoders["AA:0"] = StateDecoder(descriptor)
+            decoders["AA:1"] = StateDecoder(descriptor)  # same layout: not resent
+            coordinator.refresh_decoders()
+            await asyncio.sleep(0.01)
+            return shards
+
+        shards = self._run(scenario, decoder_of=decoders.get)
+
+        self.assertEqual(self.merged, [("AA:1", 1, 2.0, 1, 0, (0x20, 0x80, 0x80, 0x80))])
+        self.assertEqual([address for address, _decoder in shards[0].decoder_updates], ["AA:0"])
+        self.assertEqual(shards[1].decoder_updates, [])
+
+    def test_disconnect_moves_an_idle_module_off_the_busiest_shard(self):
+        async def scenario(coordinator, shards):
+            for index in range(4):
+                await self._connect(coordinator, f"AA:{index}")
+            # Recent input keeps AA:2 in place; AA:0 has never sent any.
+            slot = shards[0].slots["AA:2"]
+            self.table.record(slot, 1, time.perf_counter() + REBALANCE_IDLE_SECONDS)
+            coordinator.merge()
+
+            shards[1].drop("AA:1")
+            shards[1].drop("AA:3")
+            await asyncio.sleep(0.05)
+            return coordinator.stats()
+
+        stats = self._run(scenario)
+
+        self.assertEqual(stats["migrations"], 1)
+        self.assertEqual(self.disconnected[-1].address, "AA:0")
+        self.assertEqual(stats["shards"][0]["devices"], ["AA:2"])
+
+    def test_lost_shard_drops_its_modules(self):
+        async def scenario(coordinator, shards):
+            for index in range(2):
+                await self._connect(coordinator, f"AA:{index}")
+            asyncio.get_running_loop().remove_reader(shards[0].link.fileno())
+            shards[0].link.close()
+            await asyncio.sleep(0.05)
+            await self._connect(coordinator, "AA:0")
+            return coordinator.stats()
+
+        stats = self._run(scenario)
+
+        self.assertEqual([client.address for client in self.disconnected], ["AA:0"])
+        self.assertFalse(stats["shards"][0]["alive"])
+        self.assertEqual(stats["shards"][1]["devices"], ["AA:0", "AA:1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import asyncio
+import struct
+import unittest
+
+from constants import CHAR_UUID
+from runtime.simulated_ble import (
+    SimulatedBleError,
+    SimulatedFleetConfig,
+    SimulatedTransport,
+    random_press_states,
+)
+from runtime.transport import BLE_TRANSPORT_SIMULATED, create_ble_transport
+
+
+class SimulatedBleTestCase(unittest.TestCase):
+    def test_scanner_advertises_disconnected_modules(self):
+        transport = SimulatedTransport(SimulatedFleetConfig(device_count=3, advertise_interval=0.01))
+        seen = {}
+
+        async def scenario():
+            scanner = transport.create_scanner(lambda device, adv: seen.setdefault(device.address, adv.local_name))
+            await scanner.start()
+            await asyncio.sleep(0.05)
+            await scanner.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(set(seen.values()), {"NimBLE_GATT"})
+
+    def test_connected_module_notifies_scripted_states(self):
+        trace = [1, 3, 2, 0]
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=1, notify_rate_hz=500.0, connect_latency=0.0, traces=[trace])
+        )
+        received = []
+        disconnected = []
+
+        async def scenario():
+            client = transport.create_client(transport.devices[0], disconnected.append, timeout=1.0)
+            await client.connect()
+            self.assertEqual(transport.stats.snapshot()["connected"], 1)
+            await client.start_notify(CHAR_UUID, lambda _sender, data: received.append(struct.unpack("<I", data)[0]))
+            while len(received) < 8:
+                await asyncio.sleep(0.005)
+            await client.disconnect()
+            return client
+
+        client = asyncio.run(scenario())
+        self.assertEqual(received[:8], trace + trace)
+        self.assertEqual(disconnected, [client])
+        stats = transport.stats.snapshot()
+        self.assertEqual(stats["connected"], 0)
+        self.assertGreaterEqual(stats["delivered"], 8)
+        self.assertEqual(stats["delivery_lag"]["count"], stats["delivered"])
+
+    def test_connect_failure_rate_raises(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=1, connect_latency=0.0, connect_failure_rate=1.0)
+        )
+
+        async def scenario():
+            client = transport.create_client(transport.devices[0].address, None, timeout=1.0)
+            with self.assertRaises(SimulatedBleError):
+                await client.connect()
+            self.assertFalse(client.is_connected)
+
+        asyncio.run(scenario())
+        self.assertEqual(transport.stats.snapshot()["connect_failures"], 1)
+
+    def test_failed_adapter_drops_its_links_and_refuses_connects(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=3, connect_latency=0.0, adapters=("hci0", "hci1"))
+        )
+        disconnected = []
+
+        async def scenario():
+            clients = [
+                transport.create_client(device, disconnected.append, timeout=1.0, adapter=adapter)
+                for device, adapter in zip(transport.devices, ("hci0", "hci1", "hci0"))
+            ]
+            for client in clients:
+                await client.connect()
+            self.assertEqual((transport.adapter_links("hci0"), transport.adapter_links("hci1")), (2, 1))
+
+            transport.fail_adapter("hci0")
+            with self.assertRaises(SimulatedBleError):
+                await transport.create_client(transport.devices[0], None, timeout=1.0, adapter="hci0").connect()
+            with self.assertRaises(SimulatedBleError):
+                await transport.create_scanner(lambda *_args: None, adapter="hci0").start()
+            # Fails over to the other adapter.
+            await transport.create_client(transport.devices[0], None, timeout=1.0, adapter="hci1").connect()
+            return clients
+
+        clients = asyncio.run(scenario())
+        self.assertEqual(disconnected, [clients[0], clients[2]])
+        self.assertEqual(transport.adapter_links("hci1"), 2)
+        with self.assertRaises(SimulatedBleError):
+            transport.check_adapter("hci7")
+
+    def test_each_adapter_scanner_hears_modules_at_its_own_strength(self):
+        transport = SimulatedTransport(
+            SimulatedFleetConfig(device_count=1, advertise_interval=0.01, adapters=("hci0", "hci1"))
+        )
+        heard = {}
+
+        async def scenario():
+            scanners = [
+                transport.create_scanner(lambda _device, adv, name=name: heard.setdefault(name, adv.rssi), adapter=name)
+                for name in transport.adapters
+            ]
+            for scanner in scanners:
+                await scanner.start()
+            await asyncio.sleep(0.03)
+            for scanner in scanners:
+                await scanner.stop()
+
+        asyncio.run(scenario())
+        self.assertGreater(heard["hci0"], heard["hci1"])
+
+    def test_random_trace_changes_one_button_at_a_time(self):
+        states = random_press_states(seed=3)
+        previous = 0
+        for _ in range(200):
+            state = next(states)
+            self.assertEqual(bin(state ^ previous).count("1"), 1)
+            self.assertLessEqual(bin(state).count("1"), 3)
+            previous = state
+
+    def test_transport_factory_builds_simulated_backend(self):
+        self.assertEqual(create_ble_transport(BLE_TRANSPORT_SIMULATED).name, BLE_TRANSPORT_SIMULATED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from gadget_state import OPENARCADE_GADGET_STATE_PATH_ENV_VAR, GadgetState
+from hid_mode_state import OPENARCADE_HID_MODE_PATH_ENV_VAR, HIDModeState
+import hid_writer
+from hid_writer import (
+    OPENARCADE_HID_DEVICE_DIR_ENV_VAR,
+    hid_writer_process,
+    is_hid_sink,
+    resolve_mode_device_candidates,
+)
+from report_channel import ReportRing
+from simulated_hidg import SimulatedHidGadget
+from state_board import OPENARCADE_STATE_BOARD_PATH_ENV_VAR
+from wakeup import Wakeup, wait_for_wakeups
+
+
+class SimulatedHidGadgetTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        self.gadget = SimulatedHidGadget(os.path.join(self.tmpdir, "hidg0"), poll_interval=0.001)
+        self.gadget.start()
+
+    def tearDown(self):
+        self.gadget.close()
+        self._tmpdir.cleanup()
+
+    def _open_writer(self):
+        fd = os.open(self.gadget.path, os.O_WRONLY | os.O_NONBLOCK)
+        return os.fdopen(fd, "wb", buffering=0)
+
+    def test_endpoint_holds_one_report_until_host_polls(self):
+        self.gadget.pause()
+        with self._open_writer() as handle:
+            self.assertEqual(handle.write(b"\x01" * 8), 8)
+            self.assertIsNone(handle.write(b"\x02" * 8))  # EAGAIN
+
+            self.assertEqual(self.gadget.poll(), b"\x01" * 8)
+            self.assertEqual(handle.write(b"\x03" * 8), 8)
+            self.assertEqual(self.gadget.poll(), b"\x03" * 8)
+            self.assertIsNone(self.gadget.poll())
+
+    def test_polling_host_reads_reports_in_order(self):
+        with self._open_writer() as handle:
+            for value in range(1, 6):
+                report = bytes((value,)) * 8
+                while handle.write(report) is None:
+                    pass
+        self.assertTrue(self.gadget.wait_for_reads(5))
+        self.assertEqual([read.report[0] for read in self.gadget.reads], [1, 2, 3, 4, 5])
+
+    def test_fifo_is_accepted_as_hid_sink_and_paths_follow_device_dir(self):
+        self.assertTrue(is_hid_sink(os.stat(self.gadget.path).st_mode))
+        self.assertFalse(is_hid_sink(stat.S_IFREG | 0o644))
+        candidates = resolve_mode_device_candidates(self.tmpdir)
+        self.assertEqual(candidates["keyboard"], (self.gadget.path,))
+        self.assertEqual(candidates["gamepad_pc"], (os.path.join(self.tmpdir, "hidg1"),))
+
+
+class HidWriterSinkTestCase(unittest.TestCase):
+    def test_writer_delivers_published_report_to_gadget(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            environment = {
+                OPENARCADE_HID_DEVICE_DIR_ENV_VAR: tmpdir,
+                OPENARCADE_HID_MODE_PATH_ENV_VAR: os.path.join(tmpdir, "hid_mode.json"),
+                OPENARCADE_GADGET_STATE_PATH_ENV_VAR: os.path.join(tmpdir, "gadget_state.json"),
+                OPENARCADE_STATE_BOARD_PATH_ENV_VAR: os.path.join(tmpdir, "state_board"),
+            }
+            gadget = SimulatedHidGadget(os.path.join(tmpdir, "hidg1"))
+            report_ring = ReportRing.create()
+            report_wakeup = Wakeup()
+            context = multiprocessing.get_context("fork")
+            stop_event = context.Event()
+            mailbox = {"report_ring": report_ring, "report_wakeup": report_wakeup}
+            with mock.patch.dict(os.environ, environment):
+                gadget.start()
+                mode_state = HIDModeState().save("gamepad_pc", source="test")
+                GadgetState().save("pc", True, mode_state["sequence"])
+                writer = context.Process(target=hid_writer_process, args=(mailbox, stop_event, 0))
+                writer.start()
+            try:
+                # The writer sends a neutral report as soon as it opens the endpoint.
+                self.assertTrue(gadget.wait_for_reads(1, timeout=5.0))
+                report = bytes((0x01, 0x00, 0x0F, 0x80, 0x80, 0x80, 0x80, 0x00))
+                report_ring.publish(report, input_at=1.0, published_at=1.0)
+                report_wakeup.set()
+                self.assertTrue(gadget.wait_for_reads(2, timeout=5.0))
+                self.assertEqual(gadget.reads[-1].report, report)
+            finally:
+                stop_event.set()
+                report_wakeup.set()
+                writer.join(timeout=5.0)
+                if writer.is_alive():
+                    writer.terminate()
+                gadget.close()
+                report_ring.close()
+                report_ring.unlink()
+                report_wakeup.close()
+
+    def test_pending_report_without_open_device_does_not_busy_loop(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            environment = {
+                OPENARCADE_HID_DEVICE_DIR_ENV_VAR: tmpdir,
+                OPENARCADE_HID_MODE_PATH_ENV_VAR: os.path.join(tmpdir, "hid_mode.json"),
+                OPENARCADE_GADGET_STATE_PATH_ENV_VAR: os.path.join(tmpdir, "gadget_state.json"),
+                OPENARCADE_STATE_BOARD_PATH_ENV_VAR: os.path.join(tmpdir, "state_board"),
+            }
+            report_ring = ReportRing.create()
+            report_wakeup = Wakeup()
+            stop_event = threading.Event()
+            mailbox = {"report_ring": report_ring, "report_wakeup": report_wakeup}
+            waits = []
+
+            def counting_wait(wakeups, timeout):
+                waits.append(timeout)
+                return wait_for_wakeups(wakeups, timeout)
+
+            with (
+                mock.patch.dict(os.environ, environment),
+                mock.patch.object(hid_writer, "set_cpu_affinity"),
+                mock.patch.object(hid_writer, "wait_for_wakeups", counting_wait),
+            ):
+                # The gadget never becomes ready, so no endpoint is opened.
+                HIDModeState().save("gamepad_pc", source="test")
+                writer = threading.Thread(target=hid_writer_process, args=(mailbox, stop_event, 0))
+                writer.start()
+                try:
+                    report_ring.publish(b"\x01" + bytes(7), input_at=1.0, published_at=1.0)
+                    report_wakeup.set()
+                    time.sleep(0.3)
+                finally:
+                    stop_event.set()
+                    report_wakeup.set()
+                    writer.join(timeout=5.0)
+                    report_ring.close()
+                    report_ring.unlink()
+                    report_wakeup.close()
+
+            self.assertFalse(writer.is_alive())
+            self.assertLess(len(waits), 10)
+            self.assertNotIn(hid_writer.PENDING_REPORT_RETRY_SECONDS, waits)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import os
+import stat
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from gadget_state import GadgetState
+from hid_mode_state import HIDModeState
+from pairing_mode_state import PairingModeState
+import state_board
+from state_board import (
+    DEFAULT_STATE_DIR,
+    OPENARCADE_STATE_BOARD_PATH_ENV_VAR,
+    STATE_BOARD_MODE,
+    StateBoard,
+    get_state_board,
+    resolve_state_board_path,
+)
+
+
+def _wait_for_mode(board_path, mode, result):
+    board = StateBoard(board_path)
+    deadline = time.monotonic() + 5.0
+    last_seen_version = -1
+    while time.monotonic() < deadline:
+        snapshot = board.read(last_seen_version)
+        if snapshot is not None:
+            last_seen_version = snapshot.version
+            if snapshot.mode == mode:
+                result.value = 1
+                break
+    board.close()
+
+
+class StateBoardTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        self.board_path = os.path.join(self.tmpdir, "state_board")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_fresh_board_has_no_sections(self):
+        board = StateBoard(self.board_path)
+        try:
+            snapshot = board.read()
+            assert snapshot is not None
+            self.assertIsNone(snapshot.mode)
+            self.assertIsNone(snapshot.pairing_enabled)
+            self.assertIsNone(snapshot.gadget_persona)
+        finally:
+            board.close()
+
+    def test_sections_update_independently_and_bump_version(self):
+        board = StateBoard(self.board_path)
+        try:
+            board.publish_mode("gamepad_pc", 3)
+            first = board.read()
+            assert first is not None
+            self.assertIsNone(board.read(first.version))
+
+            board.publish_pairing(True, 7)
+            board.publish_gadget("switch-hori", True, 3)
+            second = board.read(first.version)
+            assert second is not None
+            self.assertGreater(second.version, first.version)
+            self.assertEqual(second.mode, "gamepad_pc")
+            self.assertEqual(second.mode_sequence, 3)
+            self.assertTrue(second.pairing_enabled)
+            self.assertEqual(second.pairing_sequence, 7)
+            self.assertEqual(second.gadget_persona, "switch-hori")
+            self.assertTrue(second.gadget_ready)
+            self.assertEqual(second.gadget_mode_sequence, 3)
+        finally:
+            board.close()
+
+    def test_state_saves_publish_to_board(self):
+        hid_mode_state = HIDModeState(
+            path=os.path.join(self.tmpdir, "hid_mode.json"),
+            state_board_path=self.board_path,
+        )
+        pairing_mode_state = PairingModeState(
+            path=os.path.join(self.tmpdir, "pairing_mode.json"),
+            state_board_path=self.board_path,
+        )
+        gadget_state = GadgetState(
+            path=os.path.join(self.tmpdir, "gadget_state.json"),
+            state_board_path=self.board_path,
+        )
+
+        hid_mode_state.save("gamepad_switch_hori", source="test")
+        pairing_mode_state.save(True, source="test")
+        gadget_state.save("switch-hori", True, 1)
+
+        snapshot = get_state_board(self.board_path).read()
+        assert snapshot is not None
+        self.assertEqual(snapshot.mode, "gamepad_switch_hori")
+        self.assertEqual(snapshot.mode_sequence, 1)
+        self.assertTrue(snapshot.pairing_enabled)
+        self.assertEqual(snapshot.pairing_sequence, 1)
+        self.assertEqual(snapshot.gadget_persona, "switch-hori")
+        self.assertTrue(snapshot.gadget_ready)
+
+    def test_load_seeds_board_from_newer_file(self):
+        path = os.path.join(self.tmpdir, "hid_mode.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"active_mode": "gamepad_pc", "source": "test", "sequence": 5, "updated_at": "x"}, handle)
+        board = get_state_board(self.board_path)
+        board.publish_mode("keyboard", 2)
+
+        HIDModeState(path=path, state_board_path=self.board_path).load()
+
+        snapshot = board.read()
+        assert snapshot is not None
+        self.assertEqual(snapshot.mode, "gamepad_pc")
+        self.assertEqual(snapshot.mode_sequence, 5)
+
+    def test_each_state_directory_gets_its_own_board(self):
+        live_board = os.path.join(self.tmpdir, "live_board")
+        environment = {key: value for key, value in os.environ.items() if key != OPENARCADE_STATE_BOARD_PATH_ENV_VAR}
+        with (
+            mock.patch.dict(os.environ, environment, clear=True),
+            mock.patch.object(state_board, "DEFAULT_STATE_BOARD_PATH", live_board),
+        ):
+            self.assertEqual(resolve_state_board_path(DEFAULT_STATE_DIR), live_board)
+            other = resolve_state_board_path(self.tmpdir)
+            self.assertTrue(other.startswith(f"{live_board}-"))
+            self.assertEqual(resolve_state_board_path(os.path.join(self.tmpdir, ".")), other)
+
+            # State files in a scratch directory stay off the live board.
+            HIDModeState(path=os.path.join(self.tmpdir, "hid_mode.json")).save("gamepad_pc", source="test")
+            self.assertFalse(os.path.exists(live_board))
+            self.assertTrue(os.path.exists(other))
+
+            with mock.patch.dict(os.environ, {OPENARCADE_STATE_BOARD_PATH_ENV_VAR: self.board_path}):
+                self.assertEqual(resolve_state_board_path(self.tmpdir), self.board_path)
+
+    def test_gadget_reconcile_corrects_a_board_that_disagrees_with_the_file(self):
+        gadget_state = GadgetState(
+            path=os.path.join(self.tmpdir, "gadget_state.json"),
+            state_board_path=self.board_path,
+        )
+        gadget_state.save("pc", False, 4)
+        board = get_state_board(self.board_path)
+        board.publish_gadget("pc", True, 4)  # a writer that bypassed the file
+
+        state = gadget_state.reconcile_state_board()
+
+        self.assertFalse(state["ready"])
+        snapshot = board.read()
+        assert snapshot is not None
+        self.assertFalse(snapshot.gadget_ready)
+
+    def test_change_is_visible_to_other_process(self):
+        board = StateBoard(self.board_path)
+        context = multiprocessing.get_context("fork")
+        result = context.Value("i", 0)
+        process = context.Process(target=_wait_for_mode, args=(self.board_path, "gamepad_pc", result))
+        process.start()
+        try:
+            board.publish_mode("gamepad_pc", 1)
+            process.join(timeout=10.0)
+            self.assertEqual(result.value, 1)
+        finally:
+            if process.is_alive():
+                process.terminate()
+            board.close()
+
+    def test_board_is_not_world_writable(self):
+        # A board left world-writable (e.g. by an older release) is tightened on open.
+        os.close(os.open(self.board_path, os.O_RDWR | os.O_CREAT, 0o666))
+        os.chmod(self.board_path, 0o666)
+        state_dir = os.path.join(self.tmpdir, "state")
+        os.makedirs(state_dir)
+        if os.geteuid() == 0:
+            os.chown(state_dir, -1, 4321)
+
+        board = StateBoard(self.board_path, owner_path=state_dir)
+        board.close()
+
+        info = os.stat(self.board_path)
+        self.assertEqual(stat.S_IMODE(info.st_mode), STATE_BOARD_MODE)
+        if os.geteuid() == 0:
+            self.assertEqual(info.st_gid, 4321)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import struct
+import unittest
+
+import constants as const
+from default_descriptor import default_descriptor
+from device_descriptor import DEVICE_FLAG_TIMESTAMP, ControlDescriptor, ControlType, DeviceDescriptor, ReportFormat
+from runtime.report_builder import build_mapping
+from runtime.state_decoder import StateDecoder, build_decoder_cache, needs_decoder
+
+
+def _packed(control_id, control_type, byte_offset, bit_offset, bit_width, fmt=ReportFormat.PACKED):
+    return ControlDescriptor(
+        control_id,
+        control_type,
+        fmt,
+        byte_offset=byte_offset,
+        bit_offset=bit_offset,
+        bit_width=bit_width,
+    )
+
+
+def _arcade_stick_descriptor():
+    """12 buttons, a 4-bit hat and two 16-bit axes in a 7-byte report.
+
+    The hat takes payload bits 8-11, where the joystick state bits it sets
+    are, and the buttons the bits around it.
+    """
+    controls = [_packed(index + 1, ControlType.BUTTON, 0, index, 1) for index in range(8)]
+    controls.extend(_packed(index + 1, ControlType.BUTTON, 1, index - 4, 1) for index in range(8, 12))
+    controls.append(_packed(13, ControlType.HAT, 1, 0, 4))
+    controls.append(_packed(14, ControlType.AXIS, 3, 0, 16, ReportFormat.AXIS))
+    controls.append(_packed(15, ControlType.AXIS, 5, 0, 16, ReportFormat.AXIS))
+    return DeviceDescriptor(report_format=ReportFormat.PACKED, report_bytes=7, controls=controls).to_dict()
+
+
+class StateDecoderTestCase(unittest.TestCase):
+    def test_default_bitfield_descriptor_keeps_the_legacy_path(self):
+        self.assertFalse(needs_decoder(default_descriptor().to_dict()))
+        self.assertFalse(needs_decoder(None))
+        self.assertTrue(needs_decoder(_arcade_stick_descriptor()))
+
+    def test_decodes_buttons_hat_and_axes_in_one_pass(self):
+        decoder = StateDecoder(_arcade_stick_descriptor())
+        self.assertEqual(decoder.report_bytes, 7)
+
+        # Buttons 1 and 3, hat down-left (5) and axes at min and max.
+        payload = bytes((0b101, 5, 0)) + struct.pack("<HH", 0x0000, 0xFFFF)
+        state, axes = decoder.decode(payload)
+        self.assertEqual(state, 0b101 | (1 << 8) | (1 << 11))
+        self.assertEqual(axes, (0x00, 0xFF, const.GP_AXIS_NEUTRAL, const.GP_AXIS_NEUTRAL))
+
+        # A centered hat adds no direction; a short payload is not decoded.
+        state, _axes = decoder.decode(bytes((0, 8, 0)) + struct.pack("<HH", 0x8000, 0x8000))
+        self.assertEqual(state, 0)
+        self.assertIsNone(decoder.decode(payload[:6]))
+
+    def test_unaligned_and_narrow_controls_scale_to_report_bytes(self):
+        descriptor = DeviceDescriptor(
+            report_format=ReportFormat.PACKED,
+            report_bytes=16,
+            controls=[
+                _packed(1, ControlType.BUTTON, 0, 0, 1),
+                _packed(2, ControlType.AXIS, 0, 4, 12),  # straddles bytes 0 and 1
+                _packed(3, ControlType.AXIS, 2, 0, 4),
+                _packed(4, ControlType.BUTTON, 12, 0, 1),  # past the 32 state bits: ignored
+            ],
+        ).to_dict()
+        decoder = StateDecoder(descriptor)
+
+        payload = bytearray(16)
+        struct.pack_into("<H", payload, 0, (0xABC << 4) | 1)
+        payload[2] = 0xF
+        payload[12] = 1
+        state, axes = decoder.decode(payload)
+        self.assertEqual(state, 1)
+        self.assertEqual(axes[:2], (0xAB, 0xFF))
+
+    def test_packed_buttons_map_on_their_payload_bit(self):
+        device_config = {
+            "descriptor": _arcade_stick_descriptor(),
+            "modes": {"keyboard": {"mapping": {"10": "HID_KEY_Z"}}},
+        }
+        mapping = build_mapping(device_config, mode="keyboard")
+        self.assertEqual(mapping[13], const.HID_KEY_Z)  # control 10 is payload bit 13
+
+    def test_cache_skips_bitfield_and_undecodable_descriptors(self):
+        broken = DeviceDescriptor(
+            report_format=ReportFormat.PACKED,
+            report_bytes=3,
+            controls=[_packed(1, ControlType.AXIS, 0, 4, 16)],  # bits 4-19 fit no 1/2-byte field
+        ).to_dict()
+        config = {
+            "devices": {
+                "stick": {"descriptor": _arcade_stick_descriptor()},
+                "buttons": {"descriptor": default_descriptor().to_dict()},
+                "legacy": {"descriptor": None},
+                "broken": {"descriptor": broken},
+            }
+        }
+        with self.assertLogs("OpenArcade", level="WARNING"):
+            decoders = build_decoder_cache(config)
+        self.assertEqual(list(decoders), ["stick"])
+
+    def test_controls_outside_or_sharing_state_bits_are_reported(self):
+        self.assertEqual(StateDecoder(_arcade_stick_descriptor()).conflicts, ())
+        descriptor = DeviceDescriptor(
+            report_format=ReportFormat.PACKED,
+            report_bytes=6,
+            controls=[
+                _packed(1, ControlType.BUTTON, 1, 1, 1),  # state bit 9, the hat's right
+                _packed(2, ControlType.BUTTON, 5, 0, 1),  # payload bit 40
+                _packed(3, ControlType.HAT, 2, 0, 4),
+                _packed(4, ControlType.HAT, 2, 4, 4),
+            ],
+        ).to_dict()
+        decoder = StateDecoder(descriptor)
+        self.assertEqual(len(decoder.conflicts), 3)
+        self.assertIn("payload bits 40 are past the 32 state bits", decoder.conflicts[0])
+        self.assertIn("payload bits 9 share the hat's joystick state bits", decoder.conflicts[1])
+
+        with self.assertLogs("OpenArcade", level="WARNING") as logs:
+            decoders = build_decoder_cache({"devices": {"stick": {"descriptor": descriptor}}})
+        self.assertIn("stick", decoders)  # still decoded, as far as the state reaches
+        self.assertIn("do not fit the 32-bit state", logs.output[0])
+
+    def test_device_time_only_for_flagged_descriptors_of_exact_length(self):
+        stamp = struct.pack("<I", 123_456)
+        unflagged = StateDecoder(_arcade_stick_descriptor())
+        # An over-long report without the flag is padding, not a clock.
+        self.assertIsNone(unflagged.device_time(bytes(7) + stamp))
+
+        timestamped = default_descriptor()
+        timestamped.flags = DEVICE_FLAG_TIMESTAMP
+        self.assertTrue(needs_decoder(timestamped.to_dict()))
+        decoder = StateDecoder(timestamped.to_dict())
+        payload = struct.pack("<I", 0b101) + stamp
+        self.assertEqual(decoder.decode(payload), (0b101, None))
+        self.assertEqual(decoder.device_time(payload), 123_456)
+        self.assertIsNone(decoder.device_time(payload[:4]))
+        self.assertIsNone(decoder.device_time(payload + bytes(2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import random
+import unittest
+
+import constants as const
+from runtime.report_builder import (
+    build_gamepad_pc_report,
+    build_gamepad_switch_hori_report,
+    build_keyboard_report,
+)
+from runtime.state_reducer import StateReducer
+
+
+def _reference_report(mode, mapping_cache, device_states):
+    default_mapping = const.DEFAULT_MAPPING if mode == "keyboard" else const.DEFAULT_GAMEPAD_MAPPING
+    active = set()
+    for device_id, state in device_states.items():
+        mapping = mapping_cache.get(device_id, default_mapping)
+        for bit_index, output in mapping.items():
+            if (state >> bit_index) & 1:
+                if mode == "keyboard" and isinstance(output, int):
+                    active.add(output)
+                elif mode != "keyboard" and isinstance(output, str):
+                    active.add(output)
+    if mode == "keyboard":
+        return build_keyboard_report(active)
+    if mode == "gamepad_switch_hori":
+        return build_gamepad_switch_hori_report(active)
+    return build_gamepad_pc_report(active)
+
+
+class StateReducerTestCase(unittest.TestCase):
+    def test_shared_outputs_are_reference_counted_across_devices(self):
+        mapping_cache = {
+            "dev-a": {0: const.HID_KEY_A, 1: const.HID_KEY_B},
+            "dev-b": {0: const.HID_KEY_A},
+        }
+        reducer = StateReducer(mapping_cache)
+
+        report = reducer.update_device_state("dev-a", 0b01)
+        self.assertEqual(report[2], const.HID_KEY_A)
+        reducer.update_device_state("dev-b", 0b01)
+
+        report = reducer.update_device_state("dev-a", 0b10)
+        assert report is not None
+        self.assertIn(const.HID_KEY_A, report[2:])
+        self.assertIn(const.HID_KEY_B, report[2:])
+
+        report = reducer.remove_device_state("dev-b")
+        assert report is not None
+        self.assertNotIn(const.HID_KEY_A, report[2:])
+        self.assertIn(const.HID_KEY_B, report[2:])
+
+    def test_upper_state_bytes_resolve_through_tables(self):
+        reducer = StateReducer({"dev": {31: "xb_button_y", 17: "xb_home"}}, mode="gamepad_pc")
+
+        report = reducer.update_device_state("dev", (1 << 31) | (1 << 17))
+        assert report is not None
+        buttons = report[0] | (report[1] << 8)
+        self.assertEqual(buttons, (1 << const.GP_BUTTON_Y) | (1 << const.GP_HOME))
+
+    def test_matches_per_bit_reference_for_random_traces(self):
+        rng = random.Random(1234)
+        keyboard_outputs = [
+            const.HID_KEY_A,
+            const.HID_KEY_B,
+            const.HID_KEY_C,
+            const.HID_KEY_D,
+            const.HID_KEY_E,
+            const.HID_KEY_F,
+            const.HID_KEY_G,
+            const.HID_KEY_LEFT_SHIFT,
+            const.HID_KEY_RIGHT_ALT,
+            const.HID_KEY_UP,
+        ]
+        gamepad_outputs = list(const.GAMEPAD_INPUT_MAP)
+        mapping_cache = {}
+        for device_index in range(3):
+            mapping = {}
+            for bit_index in rng.sample(range(32), 12):
+                if rng.random() < 0.5:
+                    mapping[bit_index] = rng.choice(keyboard_outputs)
+                else:
+                    mapping[bit_index] = rng.choice(gamepad_outputs)
+            mapping_cache[f"dev-{device_index}"] = mapping
+
+        for mode in ("keyboard", "gamepad_pc", "gamepad_switch_hori"):
+            reducer = StateReducer(mapping_cache, mode=mode)
+            device_states = {}
+            for _ in range(300):
+                device_id = f"dev-{rng.randrange(4)}"
+                if device_id in device_states and rng.random() < 0.05:
+                    device_states.pop(device_id)
+                    reducer.remove_device_state(device_id)
+                else:
+                    state = rng.getrandbits(32)
+                    device_states[device_id] = state
+                    reducer.update_device_state(device_id, state)
+                self.assertEqual(
+                    reducer.build_report(),
+                    _reference_report(mode, mapping_cache, device_states),
+                )
+
+    def test_state_change_without_output_delta_returns_none(self):
+        reducer = StateReducer({"dev": {0: const.HID_KEY_A}})
+
+        self.assertIsNone(reducer.update_device_state("dev", 1 << 20))
+        self.assertIsNotNone(reducer.update_device_state("dev", (1 << 20) | 1))
+        self.assertIsNone(reducer.update_device_state("dev", 1))
+        self.assertIsNotNone(reducer.remove_device_state("dev"))
+
+    def test_hat_and_axes_follow_direction_counters(self):
+        mapping_cache = {
+            "dev-a": {0: "xb_dpad_up", 1: "xb_dpad_right", 2: "xb_left_stick_left"},
+            "dev-b": {0: "xb_dpad_up", 1: "xb_left_stick_right"},
+        }
+        reducer = StateReducer(mapping_cache, mode="gamepad_switch_hori")
+
+        report = reducer.update_device_state("dev-a", 0b011)
+        assert report is not None
+        self.assertEqual(report[2], const.SW_HORI_HAT_UP_RIGHT)
+
+        reducer.update_device_state("dev-b", 0b01)
+        report = reducer.update_device_state("dev-a", 0b100)
+        assert report is not None
+        self.assertEqual(report[2], const.SW_HORI_HAT_UP)
+        self.assertEqual(report[3], const.SW_HORI_AXIS_MIN)
+
+        report = reducer.update_device_state("dev-b", 0b10)
+        assert report is not None
+        self.assertEqual(report[2], const.SW_HORI_HAT_CENTER)
+        self.assertEqual(report[3], const.SW_HORI_AXIS_NEUTRAL)
+
+    def test_analog_axes_reach_gamepad_report_under_digital_directions(self):
+        mapping_cache = {"stick": {}, "pad": {0: "xb_left_stick_left"}}
+        reducer = StateReducer(mapping_cache, mode="gamepad_pc")
+
+        report = reducer.update_device_state("stick", 0, (0x20, 0xF0, 0x80, 0x80))
+        self.assertEqual(report, build_gamepad_pc_report([], (0x20, 0xF0, 0x80, 0x80)))
+        self.assertIsNone(reducer.update_device_state("stick", 0, (0x20, 0xF0, 0x80, 0x80)))
+
+        # A held digital direction wins over the analog value; releasing it restores it.
+        report = reducer.update_device_state("pad", 1)
+        self.assertEqual(report, build_gamepad_pc_report(["xb_left_stick_left"], (0x20, 0xF0, 0x80, 0x80)))
+        self.assertEqual(report[3], const.GP_AXIS_MIN)
+        report = reducer.update_device_state("pad", 0)
+        assert report is not None
+        self.assertEqual(report[3], 0x20)
+
+        self.assertEqual(reducer.set_mode("gamepad_switch_hori")[3:5], bytes((0x20, 0xF0)))
+        self.assertEqual(reducer.set_mode("keyboard"), build_keyboard_report([]))
+        self.assertIsNone(reducer.update_device_state("stick", 0, (0x00, 0x80, 0x80, 0x80)))
+
+        reducer.set_mode("gamepad_pc")
+        report = reducer.remove_device_state("stick")
+        self.assertEqual(report, build_gamepad_pc_report([]))
+
+    def test_set_mode_recompiles_for_new_output_type(self):
+        mapping_cache = {"dev": {0: const.HID_KEY_A}}
+        reducer = StateReducer(mapping_cache)
+        reducer.update_device_state("dev", 1)
+
+        report = reducer.set_mode("gamepad_pc")
+        self.assertEqual(report, build_gamepad_pc_report([]))
+
+        report = reducer.set_mode("keyboard")
+        self.assertEqual(report[2], const.HID_KEY_A)
+
+
+if __name__ == "__main__":
+    unittest.main()
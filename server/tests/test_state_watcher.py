@@ -0,0 +1,120 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from config_mode_state import ConfigModeState
+from hid_mode_state import HIDModeState
+from state_watcher import StateWatcher
+
+
+class StateWatcherTestCase(unittest.TestCase):
+    use_inotify = True
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        self.watcher = StateWatcher(poll_interval=0.01, safety_interval=60.0, use_inotify=self.use_inotify)
+
+    def tearDown(self):
+        self.watcher.close()
+        self._tmpdir.cleanup()
+
+    def _wait_until(self, predicate, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not predicate() and time.monotonic() < deadline:
+            self.watcher.wait(0.05)
+        return predicate()
+
+    def test_save_delivers_one_callback_per_sequence(self):
+        state = ConfigModeState(path=os.path.join(self.tmpdir, "config_mode.json"))
+        initial = state.ensure_initialized()
+        received = []
+        self.watcher.watch(state.path, lambda: state.load(use_cache=False), received.append, initial_state=initial)
+
+        state.toggle(source="test")
+
+        self.assertTrue(self._wait_until(lambda: received))
+        self.assertEqual([item["sequence"] for item in received], [1])
+        self.assertTrue(received[0]["enabled"])
+
+        # Rewriting the same sequence must not fire again.
+        with open(state.path, "r", encoding="utf-8") as handle:
+            content = handle.read()
+        with open(state.path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        self.watcher.wait(0.05)
+        self.assertEqual(self.watcher.check(), 0)
+        self.assertEqual(len(received), 1)
+
+    def test_watches_in_same_directory_only_fire_for_their_file(self):
+        hid_mode_state = HIDModeState(
+            path=os.path.join(self.tmpdir, "hid_mode.json"),
+            state_board_path=os.path.join(self.tmpdir, "state_board"),
+        )
+        config_mode_state = ConfigModeState(path=os.path.join(self.tmpdir, "config_mode.json"))
+        hid_mode_state.ensure_initialized()
+        config_mode_state.ensure_initialized()
+        hid_changes = []
+        config_changes = []
+        self.watcher.watch(hid_mode_state.path, hid_mode_state.load, hid_changes.append)
+        self.watcher.watch(config_mode_state.path, config_mode_state.load, config_changes.append)
+
+        hid_mode_state.save("gamepad_pc", source="test")
+
+        self.assertTrue(self._wait_until(lambda: hid_changes))
+        self.assertEqual(hid_changes[0]["active_mode"], "gamepad_pc")
+        self.assertEqual(config_changes, [])
+
+    def test_wake_interrupts_wait(self):
+        timer = threading.Timer(0.05, self.watcher.wake)
+        timer.start()
+        started = time.monotonic()
+        self.watcher.wait(10.0)
+        timer.join()
+        self.assertLess(time.monotonic() - started, 5.0)
+
+    def test_loop_front_end_calls_file_callback_once_per_change(self):
+        os.makedirs(os.path.join(self.tmpdir, "state"))
+        path = os.path.join(self.tmpdir, "state", "hid_mode.json")
+        calls = []
+
+        def replace(target, text):
+            with open(f"{target}.tmp", "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.replace(f"{target}.tmp", target)
+
+        async def scenario():
+            changed = asyncio.Event()
+            self.watcher.watch_file(path, lambda: calls.append("mode"))
+            self.watcher.watch_file(path, changed.set)
+            self.watcher.start(asyncio.get_running_loop())
+            replace(os.path.join(os.path.dirname(path), "other.json"), "{}")
+            replace(path, '{"active_mode": "keyboard"}')
+            await asyncio.wait_for(changed.wait(), 2.0)
+            await asyncio.sleep(0.05)
+            self.watcher.close()
+
+        asyncio.run(scenario())
+        self.assertEqual(calls, ["mode"])
+
+    def test_watch_without_path_is_polled(self):
+        states = iter([{"sequence": 0}, {"sequence": 0}, {"sequence": 1}])
+        received = []
+        self.watcher.watch(None, lambda: next(states, {"sequence": 1}), received.append)
+
+        self.assertTrue(self._wait_until(lambda: received))
+        self.assertEqual(received, [{"sequence": 1}])
+
+
+class PollingStateWatcherTestCase(StateWatcherTestCase):
+    use_inotify = False
+
+    def test_backend_is_poll(self):
+        self.assertEqual(self.watcher.backend, "poll")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import multiprocessing
+import time
+import unittest
+
+from wakeup import (
+    WAKEUP_BACKEND_EVENTFD,
+    WAKEUP_BACKEND_PIPE,
+    Wakeup,
+    eventfd_available,
+    wait_for_wakeups,
+)
+
+
+def _signal_after(wakeup, delay):
+    time.sleep(delay)
+    wakeup.set()
+
+
+class WakeupTestCase(unittest.TestCase):
+    backend = WAKEUP_BACKEND_PIPE
+
+    def setUp(self):
+        self.wakeup = Wakeup(self.backend)
+
+    def tearDown(self):
+        self.wakeup.close()
+
+    def test_wait_times_out_without_signal(self):
+        self.assertFalse(self.wakeup.wait(0.0))
+
+    def test_signals_collapse_into_one_wake(self):
+        for _ in range(5):
+            self.wakeup.set()
+
+        self.assertTrue(self.wakeup.wait(0.0))
+        self.assertFalse(self.wakeup.wait(0.0))
+
+    def test_wait_for_wakeups_returns_only_signalled(self):
+        other = Wakeup(self.backend)
+        try:
+            other.set()
+            woken = wait_for_wakeups((self.wakeup, None, other), 0.1)
+            self.assertEqual(woken, [other])
+            self.assertEqual(wait_for_wakeups((self.wakeup, other), 0.0), [])
+        finally:
+            other.close()
+
+    def test_wakes_across_fork(self):
+        context = multiprocessing.get_context("fork")
+        process = context.Process(target=_signal_after, args=(self.wakeup, 0.05))
+        process.start()
+        try:
+            self.assertTrue(self.wakeup.wait(5.0))
+        finally:
+            process.join()
+
+
+@unittest.skipUnless(eventfd_available(), "eventfd not available")
+class EventfdWakeupTestCase(WakeupTestCase):
+    backend = WAKEUP_BACKEND_EVENTFD
+
+
+if __name__ == "__main__":
+    unittest.main()
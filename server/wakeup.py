@@ -0,0 +1,133 @@
+"""
+Selectable cross-process wakeups for the HID writer.
+
+A Wakeup is a counter backed by an eventfd (Linux) or, where eventfd is not
+available, a non-blocking pipe. Signalling costs one write() and the waiting
+side can select/poll several wakeups together with a deadline, which
+multiprocessing.Event (a semaphore plus condition) cannot do.
+
+Wakeups are level triggered: a signal stays pending until the waiter drains
+it, so a publish that lands between the waiter draining the fd and reading
+shared state only costs one spurious wakeup, never a lost one.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+from collections.abc import Iterable
+from multiprocessing import reduction
+from typing import Literal
+
+
+WakeupBackend = Literal["eventfd", "pipe"]
+WAKEUP_BACKEND_EVENTFD: WakeupBackend = "eventfd"
+WAKEUP_BACKEND_PIPE: WakeupBackend = "pipe"
+
+_EVENTFD_INCREMENT = (1).to_bytes(8, "little")
+_PIPE_DRAIN_BYTES = 4096
+
+
+def eventfd_available() -> bool:
+    return hasattr(os, "eventfd")
+
+
+class Wakeup:
+    """Edge-collapsing wakeup that can be waited on with select()."""
+
+    def __init__(self, backend: WakeupBackend | None = None) -> None:
+        if backend is None:
+            backend = WAKEUP_BACKEND_EVENTFD if eventfd_available() else WAKEUP_BACKEND_PIPE
+        if backend == WAKEUP_BACKEND_EVENTFD:
+            fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self._init_fds(backend, fd, fd)
+        elif backend == WAKEUP_BACKEND_PIPE:
+            read_fd, write_fd = os.pipe()
+            os.set_blocking(read_fd, False)
+            os.set_blocking(write_fd, False)
+            self._init_fds(backend, read_fd, write_fd)
+        else:
+            raise ValueError(f"Unknown wakeup backend: {backend}")
+
+    def _init_fds(self, backend: WakeupBackend, read_fd: int, write_fd: int) -> None:
+        self.backend = backend
+        self._read_fd = read_fd
+        self._write_fd = write_fd
+
+    @classmethod
+    def _from_fds(cls, backend: WakeupBackend, read_fd: int, write_fd: int) -> Wakeup:
+        wakeup = cls.__new__(cls)
+        wakeup._init_fds(backend, read_fd, write_fd)
+        return wakeup
+
+    def __reduce__(self):
+        # Fork children inherit the fds directly; spawned children receive duplicates.
+        if self.backend == WAKEUP_BACKEND_EVENTFD:
+            return (_rebuild_eventfd_wakeup, (reduction.DupFd(self._read_fd),))
+        return (
+            _rebuild_pipe_wakeup,
+            (reduction.DupFd(self._read_fd), reduction.DupFd(self._write_fd)),
+        )
+
+    def fileno(self) -> int:
+        return self._read_fd
+
+    def set(self) -> None:
+        """Signal the waiter. Safe to call from a signal handler."""
+        try:
+            if self.backend == WAKEUP_BACKEND_EVENTFD:
+                os.write(self._write_fd, _EVENTFD_INCREMENT)
+            else:
+                os.write(self._write_fd, b"\x01")
+        except BlockingIOError:
+            # Counter or pipe is already full, so the waiter is signalled.
+            pass
+
+    def clear(self) -> bool:
+        """Drain pending signals. Returns True if any were pending."""
+        signalled = False
+        while True:
+            try:
+                data = os.read(self._read_fd, 8 if self.backend == WAKEUP_BACKEND_EVENTFD else _PIPE_DRAIN_BYTES)
+            except BlockingIOError:
+                return signalled
+            if not data:
+                return signalled
+            signalled = True
+            if self.backend == WAKEUP_BACKEND_EVENTFD:
+                # One read resets the eventfd counter.
+                return signalled
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for a signal and drain it. Returns False on timeout."""
+        return bool(wait_for_wakeups((self,), timeout))
+
+    def close(self) -> None:
+        for fd in {self._read_fd, self._write_fd}:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _rebuild_eventfd_wakeup(fd: reduction.DupFd) -> Wakeup:
+    raw_fd = fd.detach()
+    return Wakeup._from_fds(WAKEUP_BACKEND_EVENTFD, raw_fd, raw_fd)
+
+
+def _rebuild_pipe_wakeup(read_fd: reduction.DupFd, write_fd: reduction.DupFd) -> Wakeup:
+    return Wakeup._from_fds(WAKEUP_BACKEND_PIPE, read_fd.detach(), write_fd.detach())
+
+
+def wait_for_wakeups(wakeups: Iterable[Wakeup | None], timeout: float | None) -> list[Wakeup]:
+    """
+    Block until any wakeup is signalled or the timeout expires.
+
+    Signalled wakeups are drained before returning so the caller can read the
+    shared state they guard. None entries are ignored.
+    """
+    active = [wakeup for wakeup in wakeups if wakeup is not None]
+    if timeout is not None and timeout < 0:
+        timeout = 0.0
+    readable, _, _ = select.select(active, (), (), timeout)
+    return [wakeup for wakeup in readable if wakeup.clear()]